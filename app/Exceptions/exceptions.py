@@ -14,4 +14,22 @@ class PodAlreadyExists(Exception):
     pass
 
 class LabAlreadyExistsError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class NetworkOverlapError(Exception):
+    pass
+
+class AddressOutsideNetworkError(Exception):
+    pass
+
+class ImportJobNotFoundError(Exception):
+    pass
+
+class RevisionExpiredError(Exception):
+    pass
+
+class AddressPlanNotFoundError(Exception):
+    pass
+
+class SubnetExhaustedError(Exception):
+    pass
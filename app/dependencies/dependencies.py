@@ -1,11 +1,92 @@
+import os
 from app.services.pod_store import *
 from app.services.lab_store import LabDB
+from app.services.persistence import LogBackend, MemoryBackend, open_backend, restore
+from app.services.binary_snapshot import load_snapshot
+from app.services.importer import LabImporter
+from app.services.import_jobs import ImportJobs
+from app.services.change_feed import ChangeFeed
+from app.services.profiler import SlowRequestProfiler
 
-pod_db = PodDB()
-lab_db = LabDB()
+# NETWORK_STORE selects the store implementation: "memory" (default) or
+# "sqlite", which keeps the inventory in NETWORK_SQLITE_PATH. The memory
+# store lives in one process; to run several server workers, use sqlite.
+STORE = os.environ.get("NETWORK_STORE", "memory")
+
+if STORE == "sqlite":
+    from app.services.sqlite_store import SqliteChangeFeed, SqliteLabDB, SqlitePodDB, connect
+
+    _conn = connect(os.environ.get("NETWORK_SQLITE_PATH", "inventory.db"))
+    # kept in the database, so every worker's watchers see every worker's writes
+    changes = SqliteChangeFeed(_conn)
+    pod_db = SqlitePodDB(_conn, changes)
+    lab_db = SqliteLabDB(_conn, changes)
+    # SQLite is durable on its own; no log is needed
+    backend = MemoryBackend()
+else:
+    pod_db = PodDB()
+    lab_db = LabDB()
+    changes = ChangeFeed()
+    # Set NETWORK_DATA_DIR to persist the inventory (write-ahead log + snapshots).
+    # Writes are acknowledged before the log is fsynced, which happens every
+    # NETWORK_COMMIT_INTERVAL_MS milliseconds (default 50): a crash loses the
+    # writes of the last interval at most.
+    backend = open_backend(os.environ.get("NETWORK_DATA_DIR"),
+                           float(os.environ.get("NETWORK_COMMIT_INTERVAL_MS", 50)) / 1000)
+
+# NETWORK_PRELOAD names a binary snapshot (see app.services.binary_snapshot)
+# loaded into the memory store at startup when it holds nothing else.
+PRELOAD = os.environ.get("NETWORK_PRELOAD")
+
+# NETWORK_IMPORT_WORKERS sets how many processes validate bulk uploads
+# (default: one per CPU); 0 validates on a thread of the API process.
+importer = LabImporter(int(os.environ.get("NETWORK_IMPORT_WORKERS", os.cpu_count() or 1)))
+import_jobs = ImportJobs(importer)
+
+# NETWORK_PROFILE_SLOW_MS turns on the sampling profiler: requests slower
+# than this many milliseconds keep their stacks for GET /metrics/profiles.
+_slow_ms = os.environ.get("NETWORK_PROFILE_SLOW_MS")
+profiler = SlowRequestProfiler(float(_slow_ms)) if _slow_ms else None
+
+def open_store():
+    """Load the persisted inventory into the stores and start logging to it."""
+    if profiler is not None:
+        # called on the event loop's thread, which the profiler samples
+        # along with the pool threads running endpoints
+        profiler.start()
+    if STORE != "sqlite":
+        restore(backend, pod_db, lab_db)
+        if PRELOAD and not lab_db.get_lab_ids():
+            # the search index fills in behind the first requests
+            load_snapshot(PRELOAD, pod_db, lab_db, background_search=True)
+            if isinstance(backend, LogBackend):
+                # make the preloaded inventory durable before logging on top of it
+                backend.compact()
+        # attached after the replay, so restored records aren't published
+        pod_db.changes = lab_db.changes = changes
+
+def close_store():
+    """Cancel imports, flush pending log records, close the backend and stop import workers."""
+    import_jobs.cancel_all()
+    if profiler is not None:
+        profiler.stop()
+    backend.close()
+    importer.close()
 
 def get_pod_db():
     return pod_db
 
 def get_lab_db():
-    return lab_db
\ No newline at end of file
+    return lab_db
+
+def get_importer():
+    return importer
+
+def get_import_jobs():
+    return import_jobs
+
+def get_change_feed():
+    return changes
+
+def get_profiler():
+    return profiler
\ No newline at end of file
@@ -1,10 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from app.routers import pods, devices, labs, upload
+from app.routers import pods, devices, labs, upload, addresses, networks, export, search, watch, metrics, stats
+from app.dependencies.dependencies import open_store, close_store, get_profiler
+from app.services.metrics import MetricsMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.Exceptions.exceptions import *
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_store()
+    yield
+    close_store()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",  # Vite default
@@ -20,6 +31,9 @@ app.add_middleware(
     
 )
 
+# outermost, so latency and status cover CORS and the exception handlers too
+app.add_middleware(MetricsMiddleware, profiler=get_profiler())
+
 
 @app.exception_handler(LabNotFoundError)
 async def lab_not_found_handler(request: Request, exc: LabNotFoundError):
@@ -35,6 +49,13 @@ async def pod_not_found_handler(request: Request, exc: PodNotFoundError):
         content={"detail": str(exc) or "Pod not found"},
     )
 
+@app.exception_handler(DeviceNotFoundError)
+async def device_not_found_handler(request: Request, exc: DeviceNotFoundError):
+    return JSONResponse(
+        status_code=404,
+        content={"detail": str(exc) or "Device not found"},
+    )
+
 @app.exception_handler(PodAlreadyExists)
 async def pod_exists_handler(request: Request, exc: PodAlreadyExists):
     return JSONResponse(
@@ -42,6 +63,13 @@ async def pod_exists_handler(request: Request, exc: PodAlreadyExists):
         content={"detail": str(exc) or "Pod already exists"},
     )
 
+@app.exception_handler(NetworkOverlapError)
+async def network_overlap_handler(request: Request, exc: NetworkOverlapError):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": str(exc) or "Pod network overlaps an existing pod"},
+    )
+
 @app.exception_handler(DuplicateIPv4Error)
 async def duplicate_ip_handler(request: Request, exc: DuplicateIPv4Error):
     return JSONResponse(
@@ -49,8 +77,50 @@ async def duplicate_ip_handler(request: Request, exc: DuplicateIPv4Error):
         content={"detail": str(exc) or "Duplicate IPv4 addresses not allowed"},
     )
 
+@app.exception_handler(AddressOutsideNetworkError)
+async def address_outside_network_handler(request: Request, exc: AddressOutsideNetworkError):
+    return JSONResponse(
+        status_code=400,
+        content={"detail": str(exc) or "Interface address outside its network"},
+    )
+
+@app.exception_handler(AddressPlanNotFoundError)
+async def address_plan_not_found_handler(request: Request, exc: AddressPlanNotFoundError):
+    return JSONResponse(
+        status_code=404,
+        content={"detail": str(exc) or "Lab has no address plan"},
+    )
+
+@app.exception_handler(SubnetExhaustedError)
+async def subnet_exhausted_handler(request: Request, exc: SubnetExhaustedError):
+    return JSONResponse(
+        status_code=409,
+        content={"detail": str(exc) or "No free subnet of that size left"},
+    )
+
+@app.exception_handler(ImportJobNotFoundError)
+async def import_job_not_found_handler(request: Request, exc: ImportJobNotFoundError):
+    return JSONResponse(
+        status_code=404,
+        content={"detail": str(exc) or "Import job not found"},
+    )
+
+@app.exception_handler(RevisionExpiredError)
+async def revision_expired_handler(request: Request, exc: RevisionExpiredError):
+    return JSONResponse(
+        status_code=410,
+        content={"detail": str(exc) or "Revision expired"},
+    )
+
 
 app.include_router(router=pods.router)
 app.include_router(router=devices.router)
 app.include_router(router=labs.router)
 app.include_router(router=upload.router)
+app.include_router(router=addresses.router)
+app.include_router(router=networks.router)
+app.include_router(router=export.router)
+app.include_router(router=search.router)
+app.include_router(router=watch.router)
+app.include_router(router=metrics.router)
+app.include_router(router=stats.router)
@@ -0,0 +1,31 @@
+from ipaddress import IPv4Network
+from typing import Literal, Optional
+from pydantic import BaseModel
+from app.models.pod_model import DeviceExists, Location, Network
+from app.models.lab_db_model import LabMetaExists
+
+
+ChangeOp = Literal['add_lab', 'drop_lab', 'put_meta', 'drop_meta',
+                   'add_pod', 'drop_pod', 'store_device', 'drop_device',
+                   'set_pod_network', 'set_pod_location', 'put_address_plan']
+
+class ChangeEvent(BaseModel):
+    '''
+    - One mutation of the inventory, as applied by a store primitive
+    - revision: strictly increasing across events
+    - device: the device as stored, for store_device
+    - lab: the lab meta as stored, for put_meta
+    - supernet: the lab's registered supernet, for put_address_plan
+    - network: the network every port of the pod now uses, for set_pod_network
+    - location: the location every device of the pod now has, for set_pod_location
+    '''
+    revision: int
+    op: ChangeOp
+    lab_id: str
+    pod_id: Optional[str] = None
+    device_id: Optional[str] = None
+    device: Optional[DeviceExists] = None
+    lab: Optional[LabMetaExists] = None
+    supernet: Optional[IPv4Network] = None
+    network: Optional[Network] = None
+    location: Optional[Location] = None
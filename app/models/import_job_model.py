@@ -0,0 +1,22 @@
+from typing import Any, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class ImportJobError(BaseModel):
+    index: int
+    detail: Any
+
+class ImportJobStatus(BaseModel):
+    id: str
+    status: Literal['queued', 'running', 'done', 'failed', 'cancelled']
+    bytes_total: int
+    bytes_read: int = 0
+    labs: int = 0
+    pods: int = 0
+    devices: int = 0
+    elapsed: float = 0.0
+    labs_per_second: float = 0.0
+    devices_per_second: float = 0.0
+    lab_ids: list[str] = Field(default_factory=list)
+    errors: list[ImportJobError] = Field(default_factory=list)
+    detail: Optional[str] = None
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+
+
+class StackCount(BaseModel):
+    '''
+    - A folded stack ("module:function;..." root first) and how often it was sampled
+    '''
+    stack: str
+    count: int
+
+class SlowRequestProfile(BaseModel):
+    '''
+    - The stacks sampled while a slow request was being served
+    - finished: unix time the request finished
+    - samples: total samples taken during the request
+    '''
+    method: str
+    route: str
+    status: int
+    finished: float
+    duration_ms: float
+    samples: int
+    stacks: list[StackCount]
@@ -1,5 +1,6 @@
 from ipaddress import IPv4Address, IPv4Network
-from pydantic import BaseModel
+from typing import Literal, Optional, Union
+from pydantic import BaseModel, Field, field_validator, model_validator
 from pydantic.types import StringConstraints
 from typing_extensions import Annotated
 
@@ -51,4 +52,184 @@ class PodCreate(BaseModel):
 
 class PodExists(BaseModel):
     id: NonEmptyStr
-    assets: list[DeviceExists]
\ No newline at end of file
+    assets: list[DeviceExists]
+
+class AddressBlock(BaseModel):
+    '''
+    - A contiguous run of IPv4 addresses
+    - cidrs: the run expressed as the fewest covering CIDR blocks
+    '''
+    start: IPv4Address
+    end: IPv4Address
+    size: int
+    cidrs: list[IPv4Network]
+
+class FreeAddressPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    addresses: list[AddressBlock]
+
+class AddressConflict(BaseModel):
+    '''
+    - An interface address a pod can't (or probably shouldn't) use
+    - kind: duplicate (primary address of several devices of one pod),
+      outside_network (not inside its parent network) or gateway (equal to
+      its parent's gateway, which is only a warning: routers do that)
+    - lab / pod: index of the lab in the dump and of the pod in its lab, when checked
+    - devices: index of each device involved within its pod
+    - port: index of the port within its device
+    '''
+    kind: Literal['duplicate', 'outside_network', 'gateway']
+    address: IPv4Address
+    lab: Optional[int] = None
+    pod: Optional[int] = None
+    devices: list[int]
+    port: int
+
+class AddressOwner(BaseModel):
+    lab_id: NonEmptyStr
+    pod_id: NonEmptyStr
+    device_id: NonEmptyStr
+    name: NonEmptyStr
+
+class SearchHit(BaseModel):
+    lab_id: NonEmptyStr
+    pod_id: NonEmptyStr
+    device_id: NonEmptyStr
+    name: NonEmptyStr
+    score: float
+
+class SearchPage(BaseModel):
+    total: int
+    offset: int
+    limit: int
+    results: list[SearchHit]
+
+class PodNetwork(BaseModel):
+    lab_id: NonEmptyStr
+    pod_id: NonEmptyStr
+    network: IPv4Network
+
+
+class CreateDeviceOp(BaseModel):
+    op: Literal['create']
+    device: DeviceCreate
+
+class PatchDeviceIpOp(BaseModel):
+    op: Literal['patch_ip']
+    device_id: NonEmptyStr
+    ip: IPv4Address
+
+class PatchDeviceNameOp(BaseModel):
+    op: Literal['patch_name']
+    device_id: NonEmptyStr
+    name: NonEmptyStr
+
+class PatchDeviceAccessOp(BaseModel):
+    op: Literal['patch_access']
+    device_id: NonEmptyStr
+    access: AccessMethod
+
+class DeleteDeviceOp(BaseModel):
+    op: Literal['delete']
+    device_id: NonEmptyStr
+
+DeviceBatchOp = Annotated[
+    Union[CreateDeviceOp, PatchDeviceIpOp, PatchDeviceNameOp, PatchDeviceAccessOp, DeleteDeviceOp],
+    Field(discriminator='op')
+]
+
+class DeviceBatch(BaseModel):
+    '''
+    - Models a list of device mutations applied to one pod, all or nothing
+    - operations: applied in order; later operations see earlier ones
+    '''
+    operations: list[DeviceBatchOp]
+
+class DeviceBatchResult(BaseModel):
+    op: str
+    device_id: NonEmptyStr
+    device: Optional[DeviceExists] = None
+
+
+DeviceField = Literal['id', 'name', 'description', 'accessMethods', 'location', 'ports']
+
+class DeviceQuery(BaseModel):
+    '''
+    - Models the filters, page and projection of a device listing
+    - cidr: keep devices with any interface address inside the network
+    - cursor: next_cursor of the previous page; pages are in device id order
+    - fields: DeviceExists fields to return (comma-separated); id is always included
+    '''
+    name_prefix: Optional[str] = None
+    row: Optional[NonEmptyStr] = None
+    aisle: Optional[NonEmptyStr] = None
+    cidr: Optional[IPv4Network] = None
+    cursor: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1, le=1000)
+    fields: Optional[list[DeviceField]] = None
+
+    @property
+    def page_size(self) -> int:
+        return 100 if self.limit is None else self.limit
+
+    @field_validator('fields', mode='before')
+    @classmethod
+    def _split_fields(cls, value):
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            return [name.strip() for item in value for name in item.split(',') if name.strip()]
+        return value
+
+class DevicePage(BaseModel):
+    devices: list[DeviceExists]
+    next_cursor: Optional[str] = None
+
+
+class AddressPlanCreate(BaseModel):
+    '''
+    - Registers the supernet a lab's pods are carved from
+    '''
+    supernet: IPv4Network
+
+class AddressPlan(BaseModel):
+    '''
+    - A lab's supernet and how much of it is left
+    - allocated: pod networks carved from the supernet
+    - largest_free: lowest of the largest free aligned blocks, None when full
+    '''
+    lab_id: NonEmptyStr
+    supernet: IPv4Network
+    allocated: int
+    free_addresses: int
+    largest_free: Optional[IPv4Network] = None
+
+class DeviceAllocate(BaseModel):
+    name: NonEmptyStr
+    description: NonEmptyStr
+    accessMethods: list[AccessMethod]
+    location: Location
+
+class PodAllocate(BaseModel):
+    '''
+    - Models a pod whose network and addresses the server picks from the lab's supernet
+    - prefixlen: size of the pod network, by default the smallest that fits
+    - the network's first host is the gateway, devices get the next ones in order
+    '''
+    prefixlen: Optional[int] = Field(None, ge=0, le=30)
+    assets: list[DeviceAllocate] = Field(min_length=1)
+
+    @model_validator(mode='after')
+    def _fits(self):
+        # network, gateway and broadcast besides the devices
+        if self.prefixlen is not None and (1 << (32 - self.prefixlen)) < len(self.assets) + 3:
+            raise ValueError(f'A /{self.prefixlen} has no room for {len(self.assets)} devices and a gateway')
+        return self
+
+    @property
+    def network_prefixlen(self) -> int:
+        if self.prefixlen is not None:
+            return self.prefixlen
+        return 32 - (len(self.assets) + 2).bit_length()
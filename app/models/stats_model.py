@@ -0,0 +1,47 @@
+from ipaddress import IPv4Network
+from pydantic import BaseModel
+
+
+class SubnetUsage(BaseModel):
+    '''
+    - How full one pod's network is
+    - used: host addresses of the network taken by the pod's devices and gateways
+    - total: usable host addresses of the network
+    - utilization: used / total
+    '''
+    lab_id: str
+    pod_id: str
+    network: IPv4Network
+    devices: int
+    used: int
+    total: int
+    utilization: float
+
+class LabStats(BaseModel):
+    '''
+    - Device and address counts of one lab
+    - rows / aisles: devices per location row and per aisle
+    - subnets: the lab's pod networks, most exhausted first, paged by offset/limit
+    '''
+    lab_id: str
+    pods: int
+    devices: int
+    addresses: int
+    used_hosts: int
+    total_hosts: int
+    rows: dict[str, int]
+    aisles: dict[str, int]
+    subnets: list[SubnetUsage]
+
+class InventoryStats(BaseModel):
+    '''
+    - Device and address counts of every lab together
+    - subnets: pod networks of any lab, most exhausted first, paged by offset/limit
+    '''
+    labs: int
+    pods: int
+    devices: int
+    addresses: int
+    used_hosts: int
+    total_hosts: int
+    subnets: list[SubnetUsage]
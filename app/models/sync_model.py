@@ -0,0 +1,27 @@
+from typing import Literal
+from pydantic import BaseModel, Field
+
+
+class SyncCounts(BaseModel):
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+class SyncLabResult(BaseModel):
+    '''
+    - What a sync did to one lab of the dump
+    - index: position of the lab in the dump, None for a stored lab the dump
+      no longer has (deleted by a pruning sync)
+    '''
+    index: int | None
+    lab_id: str
+    name: str
+    building: str
+    status: Literal['created', 'updated', 'deleted', 'unchanged']
+
+class SyncReport(BaseModel):
+    labs: SyncCounts = Field(default_factory=SyncCounts)
+    pods: SyncCounts = Field(default_factory=SyncCounts)
+    devices: SyncCounts = Field(default_factory=SyncCounts)
+    results: list[SyncLabResult] = Field(default_factory=list)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from app.models.pod_model import *
+from app.services.pod_store import PodDB
+from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    tags=["Address"]
+)
+
+@router.get("/addresses/{ip}")
+def find_address(ip: IPv4Address, 
+                 pod_db: PodDB = Depends(get_pod_db)
+                 ) -> dict[str, list[AddressOwner]]:
+    '''Find the devices using an IPv4 address in any lab'''
+    return {'owners': pod_db.find_address(ip)}
+
+@router.get("/labs/{lab_id}/addresses/{ip}")
+def find_lab_address(lab_id: str, 
+                     ip: IPv4Address, 
+                     pod_db: PodDB = Depends(get_pod_db)
+                     ) -> dict[str, list[AddressOwner]]:
+    '''Find the devices using an IPv4 address within a lab'''
+    return {'owners': pod_db.find_lab_address(lab_id, ip)}
@@ -1,88 +1,107 @@
 from typing import Optional
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Response
+from typing_extensions import Annotated
 from app.models.pod_model import *
 from app.services.pod_store import PodDB
+from app.services.response_cache import cached_json_response
+from app.services.device_query import encode_device_page
 from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
 
 
 router = APIRouter(
+    route_class=TimedRoute,
     prefix="/lab/{lab_id}/pods/{pod_id}", 
 )
 
 @router.get("/devices", tags=["Device"])
-async def get_pod_devices(lab_id: str, 
+def get_pod_devices(lab_id: str, 
+            pod_id: str, 
+            query: Annotated[DeviceQuery, Query()],
+            if_none_match: str | None = Header(None),
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> DevicePage:
+    '''Get all pod devices, or with any filter, cursor, limit or fields, one page of them'''
+    if query == DeviceQuery():
+        return cached_json_response(pod_db.get_pod_devices_json(lab_id, pod_id), if_none_match)
+
+    page = pod_db.query_pod_devices(lab_id, pod_id, query)
+    return Response(content=encode_device_page(page, query), media_type="application/json")
+
+@router.post("/devices:batch", tags=["Device"])
+def batch_devices(lab_id: str, 
                   pod_id: str, 
+                  batch: DeviceBatch, 
                   pod_db: PodDB = Depends(get_pod_db)
-                  ) -> dict[str, list[DeviceExists]]:
-    '''Get all pod devices'''
-    devices = pod_db.get_pod_devices(lab_id, pod_id)
-    return {'devices': devices}
+                  ) -> dict[str, list[DeviceBatchResult]]:
+    '''Apply several device creates, patches and deletes to a pod at once'''
+    return {'results': pod_db.apply_device_batch(lab_id, pod_id, batch.operations)}
 
 @router.post("/device", tags=["Device"])
-async def create_device(lab_id: str, 
-                        pod_id: str, 
-                        device: DeviceCreate, 
-                        pod_db: PodDB = Depends(get_pod_db)
-                        ) -> DeviceExists:
+def create_device(lab_id: str, 
+                  pod_id: str, 
+                  device: DeviceCreate, 
+                  pod_db: PodDB = Depends(get_pod_db)
+                  ) -> DeviceExists:
     '''Create a device within a pod'''
     return pod_db.create_device(lab_id, pod_id, device)
      
 
 @router.patch("/device/{device_id}/ip", tags=["Device", "Network"])
-async def update_device_ip(lab_id: str, 
-                           pod_id: str, 
-                           device_id: str, 
-                           ip: str,  
-                           pod_db: PodDB = Depends(get_pod_db)
-                           ) -> dict[str, DeviceExists]:
+def update_device_ip(lab_id: str, 
+                     pod_id: str, 
+                     device_id: str, 
+                     ip: IPv4Address,  
+                     pod_db: PodDB = Depends(get_pod_db)
+                     ) -> dict[str, DeviceExists]:
     '''Update a devices IPv4 address'''
     device = pod_db.patch_device_ip(lab_id, pod_id, device_id, ip)
     return {"device": device}
 
-@router.patch("/device{device_id}/name", tags=["Device"])
-async def update_device_name(lab_id: str, 
-                             pod_id: str, 
-                             device_id: str, 
-                             name: str, pod_db: PodDB = Depends(get_pod_db)
-                             ) -> dict[str, DeviceExists]:
+@router.patch("/device/{device_id}/name", tags=["Device"])
+def update_device_name(lab_id: str, 
+                       pod_id: str, 
+                       device_id: str, 
+                       name: NonEmptyStr, pod_db: PodDB = Depends(get_pod_db)
+                       ) -> dict[str, DeviceExists]:
     '''Update a devices name'''
     device = pod_db.patch_device_name(lab_id, pod_id, device_id, name)
     return {"device": device}
 
 @router.patch("/device/{device_id}/accessMethod", tags=["Device", "Access Methodss"])
-async def update_device_accessMethod(lab_id: str, 
-                                     pod_id: str, 
-                                     device_id: str, 
-                                     access: AccessMethod, 
-                                     pod_db: PodDB = Depends(get_pod_db)
-                                     ) -> dict[str, DeviceExists]:
+def update_device_accessMethod(lab_id: str, 
+                               pod_id: str, 
+                               device_id: str, 
+                               access: AccessMethod, 
+                               pod_db: PodDB = Depends(get_pod_db)
+                               ) -> dict[str, DeviceExists]:
     '''Update a devices access method'''
     device = pod_db.patch_device_access_method(lab_id, pod_id, device_id, access)
     return {"device": device}
 
 @router.patch("/device/network", tags=["Device", "Network"])
-async def udpate_device_network(lab_id: str, 
-                                pod_id: str, 
-                                device_id: str, 
-                                network: Network, 
-                                pod_db: PodDB = Depends(get_pod_db)
-                                ) -> dict[str, list[DeviceExists]]:
-    '''Update all pod devices network'''
-    devices = pod_db.patch_pod_devices_network(lab_id, pod_id, device_id, network)
+def udpate_device_network(lab_id: str, 
+                          pod_id: str, 
+                          network: Network, 
+                          reject_overlap: bool = False,
+                          pod_db: PodDB = Depends(get_pod_db)
+                          ) -> dict[str, list[DeviceExists]]:
+    '''Update all pod devices network, optionally refusing overlapping networks'''
+    devices = pod_db.patch_pod_devices_network(lab_id, pod_id, network, reject_overlap)
     return {"devices": devices}
 
 @router.patch("/device/location", tags=["Device", "Location"])
-async def update_device_location(lab_id: str, 
-                                 pod_id: str, 
-                                 location: Location, 
-                                 pod_db: PodDB = Depends(get_pod_db)
-                                 ) -> dict[str, list[DeviceExists]]:
+def update_device_location(lab_id: str, 
+                           pod_id: str, 
+                           location: Location, 
+                           pod_db: PodDB = Depends(get_pod_db)
+                           ) -> dict[str, list[DeviceExists]]:
     '''Update all pod devices location'''
     device = pod_db.patch_pod_devices_location(lab_id, pod_id, location)
     return {"device": device}
 
 @router.delete("/device/{device_id}/delete", tags=['Device'])
-async def delete_device(lab_id: str, 
+def delete_device(lab_id: str, 
 pod_id: str, 
 device_id: str, 
 pod_db: PodDB = Depends(get_pod_db)
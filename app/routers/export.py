@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.models.lab_model import LabExistsDump
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.export import coalesce, gzip_chunks, iter_export
+from app.dependencies.dependencies import get_pod_db, get_lab_db
+from app.services.metrics import TimedRoute
+
+router = APIRouter(
+    route_class=TimedRoute,
+    prefix="/export",
+    tags=["Bulk"]
+)
+
+
+@router.get("", response_model=LabExistsDump)
+async def export_inventory(
+    ndjson: bool = False,
+    gzip: bool = False,
+    lab_db: LabDB = Depends(get_lab_db),
+    pod_db: PodDB = Depends(get_pod_db),
+) -> StreamingResponse:
+    """Stream every lab with its pods and devices, in the /upload/bulk dump shape plus ids.
+
+    With ndjson=true each lab is written on its own line; with gzip=true the
+    body is gzip content-encoded.
+    """
+    body = coalesce(iter_export(lab_db, pod_db, ndjson=ndjson))
+    headers = {}
+    if gzip:
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers=headers,
+    )
@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from app.models.lab_db_model import * 
+from app.models.pod_model import AddressPlan, AddressPlanCreate
+from app.models.stats_model import LabStats
 from app.services.lab_store import LabDB
 from app.services.pod_store import PodDB
 from app.dependencies.dependencies import get_pod_db, get_lab_db
+from app.services.metrics import TimedRoute
 
 router = APIRouter(
+    route_class=TimedRoute,
     prefix="/labs",
     tags=["Lab"]
 )
 
 @router.get("/{lab_id}")
-async def get_lab_meta(
+def get_lab_meta(
     lab_id: str,
     lab_db: LabDB = Depends(get_lab_db)
 ) -> LabMetaExists:
@@ -18,7 +22,7 @@ async def get_lab_meta(
     return lab_db.get_lab_meta(lab_id)
 
 @router.put("/{lab_id}/replace",  status_code=201)
-async def update_lab_meta(
+def update_lab_meta(
     lab_id: str,
     lab: LabMetaCreate,
     lab_db: LabDB = Depends(get_lab_db),
@@ -27,7 +31,7 @@ async def update_lab_meta(
     return lab_db.put_lab_meta(lab_id, lab)  
 
 @router.post("/create", status_code=201)
-async def create_lab_meta(
+def create_lab_meta(
     lab: LabMetaCreate,
     lab_db: LabDB = Depends(get_lab_db),
     lab_pod_db: PodDB = Depends(get_pod_db),
@@ -35,11 +39,46 @@ async def create_lab_meta(
     return lab_db.create_new_lab_meta(lab, lab_pod_db)
 
 @router.delete("/{lab_id}/delete")
-async def delete_lab_and_lab_meta(
+def delete_lab_and_lab_meta(
     lab_id: str, 
     lab_db: LabDB = Depends(get_lab_db),
     lab_pod_db: PodDB = Depends(get_pod_db)
     ) -> dict:
     lab_db.delete_lab_meta(lab_id)
     lab_pod_db.delete_lab_and_pod(lab_id)
-    return {"detail": f"Lab {lab_id} and it's pods have been deleted"}
\ No newline at end of file
+    return {"detail": f"Lab {lab_id} and it's pods have been deleted"}
+
+
+@router.put("/{lab_id}/address-plan")
+def put_address_plan(
+    lab_id: str,
+    plan: AddressPlanCreate,
+    lab_pod_db: PodDB = Depends(get_pod_db),
+) -> AddressPlan:
+    """Register the supernet the lab's pods are allocated from
+
+    - pod networks of the lab already inside the supernet count as allocated
+    """
+    return lab_pod_db.put_address_plan(lab_id, plan.supernet)
+
+@router.get("/{lab_id}/address-plan")
+def get_address_plan(
+    lab_id: str,
+    lab_pod_db: PodDB = Depends(get_pod_db),
+) -> AddressPlan:
+    """Get the lab's supernet and how much of it is free"""
+    return lab_pod_db.get_address_plan(lab_id)
+
+@router.get("/{lab_id}/stats")
+def get_lab_stats(
+    lab_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=0, le=1000),
+    lab_pod_db: PodDB = Depends(get_pod_db),
+) -> LabStats:
+    """Get the lab's device and address counts
+
+    - devices per row and per aisle, used/total hosts over the lab's pod networks
+    - subnets: the lab's pod networks, most exhausted first
+    """
+    return lab_pod_db.get_lab_stats(lab_id, offset, limit)
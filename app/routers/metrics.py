@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.models.metrics_model import SlowRequestProfile
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.profiler import SlowRequestProfiler
+from app.services import metrics
+from app.dependencies.dependencies import get_pod_db, get_lab_db, get_profiler
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics(pod_db: PodDB = Depends(get_pod_db),
+                lab_db: LabDB = Depends(get_lab_db)):
+    '''Request, store and inventory metrics in the Prometheus text format'''
+    pods, devices, addresses = pod_db.count_inventory()
+    metrics.INVENTORY_LABS.set(len(lab_db.get_lab_ids()))
+    metrics.INVENTORY_PODS.set(pods)
+    metrics.INVENTORY_DEVICES.set(devices)
+    metrics.INVENTORY_ADDRESSES.set(addresses)
+    return PlainTextResponse(metrics.registry.render(),
+                             media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@router.get("/profiles")
+async def get_slow_request_profiles(profiler: SlowRequestProfiler | None = Depends(get_profiler)
+                                    ) -> list[SlowRequestProfile]:
+    '''Sampled stacks of the latest slow requests, newest first
+
+    - only recorded when the server runs with NETWORK_PROFILE_SLOW_MS set
+    '''
+    if profiler is None:
+        raise HTTPException(status_code=404, detail='Profiling is off; set NETWORK_PROFILE_SLOW_MS')
+    return list(profiler.profiles)
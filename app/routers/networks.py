@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from app.models.pod_model import *
+from app.services.pod_store import PodDB
+from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    prefix="/networks",
+    tags=["Network"]
+)
+
+@router.get("/contained")
+def get_pods_in_network(cidr: IPv4Network, 
+                        pod_db: PodDB = Depends(get_pod_db)
+                        ) -> dict[str, list[PodNetwork]]:
+    '''Get the pods whose network sits inside a CIDR'''
+    return {'pods': pod_db.get_pods_in_network(cidr)}
+
+@router.get("/overlapping")
+def get_pods_overlapping_network(cidr: IPv4Network, 
+                                 pod_db: PodDB = Depends(get_pod_db)
+                                 ) -> dict[str, list[PodNetwork]]:
+    '''Get the pods whose network overlaps a CIDR'''
+    return {'pods': pod_db.get_pods_overlapping_network(cidr)}
@@ -1,60 +1,89 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query
 from app.models.pod_model import *
 from app.services.pod_store import PodDB
+from app.services.response_cache import cached_json_response
 from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
 
 
 router = APIRouter(
+    route_class=TimedRoute,
     prefix="/labs/{lab_id}"
     
 )
 
 @router.get("/pods/{pod_id}", tags=["Pod"])
-async def get_pod(lab_id: str, 
-                  pod_id: str, 
-                  pod_db: PodDB = Depends(get_pod_db)
-                  ) -> PodExists:
+def get_pod(lab_id: str, 
+            pod_id: str, 
+            if_none_match: str | None = Header(None),
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> PodExists:
     '''Get a pod within a lab'''
-    return pod_db.get_pod_by_id(lab_id, pod_id)
+    return cached_json_response(pod_db.get_pod_json(lab_id, pod_id), if_none_match)
      
 @router.get("/pods/{pod_id}/network", tags=["Pod", "Network"])
-async def get_pod(lab_id: str, 
-                  pod_id: str, 
-                  pod_db: PodDB = Depends(get_pod_db)
-                  ) -> IPv4Network:
+def get_pod(lab_id: str, 
+            pod_id: str, 
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> IPv4Network:
     '''Get a pods network'''
     return pod_db.get_pod_network(lab_id, pod_id)
      
 
 @router.get("/pods/{pod_id}/addresses/used", tags=["Pod", "Address"])
-async def get_pod(lab_id: str, 
-                  pod_id: str, 
-                  pod_db: PodDB = Depends(get_pod_db)
-                  ) -> dict:
+def get_pod(lab_id: str, 
+            pod_id: str, 
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> dict:
     '''Get all IPv4 addresses used within a pod'''
     return {'addresses': pod_db.get_all_pod_ip(lab_id, pod_id)}
     
 
 @router.get("/pods/{pod_id}/addresses/free", tags=["Pod", "Address"])
-async def get_pod_addresses_free(lab_id: str, 
-                  pod_id: str, 
-                  pod_db: PodDB = Depends(get_pod_db)
-                  ) -> dict:
-    '''Get all free IP's within the pods network'''
-    return {'addresses': pod_db.get_free_pod_ip(lab_id, pod_id)}
+def get_pod_addresses_free(lab_id: str, 
+            pod_id: str, 
+            offset: int = Query(0, ge=0),
+            limit: int = Query(100, ge=1, le=1000),
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> FreeAddressPage:
+    '''Get a page of free address blocks within the pods network'''
+    return pod_db.get_free_pod_ip(lab_id, pod_id, offset, limit)
+
+
+@router.get("/pods/{pod_id}/addresses/next", tags=["Pod", "Address"])
+def get_pod_address_next(lab_id: str, 
+            pod_id: str, 
+            pod_db: PodDB = Depends(get_pod_db)
+            ) -> dict[str, IPv4Address | None]:
+    '''Get the lowest free IP within the pods network'''
+    return {'address': pod_db.get_next_free_pod_ip(lab_id, pod_id)}
      
     
 @router.post("/pods", response_model=PodExists, tags=["Pod"])
-async def create_pod(lab_id: str, 
-                     pod: PodCreate, 
-                     pod_db: PodDB = Depends(get_pod_db)
-                     ) -> PodExists:
-    '''Create a pod within a lab'''
-    return pod_db.create_pod(lab_id, pod)
+def create_pod(lab_id: str, 
+               pod: PodCreate, 
+               reject_overlap: bool = False,
+               pod_db: PodDB = Depends(get_pod_db)
+               ) -> PodExists:
+    '''Create a pod within a lab, optionally refusing overlapping networks'''
+    return pod_db.create_pod(lab_id, pod, reject_overlap)
+     
+
+@router.post("/pods/allocate", response_model=PodExists, tags=["Pod", "Address"])
+def allocate_pod(lab_id: str, 
+                 pod: PodAllocate, 
+                 pod_db: PodDB = Depends(get_pod_db)
+                 ) -> PodExists:
+    '''Create a pod on the next free subnet of the lab's address plan
+
+    - the subnet is the smallest that fits the devices unless prefixlen is given
+    - its first host is the gateway; devices get the following hosts in order
+    '''
+    return pod_db.allocate_pod(lab_id, pod)
      
 
 @router.delete("/pods/{pod_id}/delete", tags=["Pod"])
-async def delete_pod(
+def delete_pod(
     lab_id: str, 
     pod_id: str, 
     pod_db: PodDB = Depends(get_pod_db)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from app.models.pod_model import *
+from app.services.pod_store import PodDB
+from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    tags=["Search"]
+)
+
+@router.get("/search")
+def search_devices(q: str = Query(min_length=1),
+                   offset: int = Query(0, ge=0),
+                   limit: int = Query(100, ge=1, le=1000),
+                   pod_db: PodDB = Depends(get_pod_db)
+                   ) -> SearchPage:
+    '''Search device names, descriptions and access urls across every lab'''
+    return pod_db.search_devices(q, offset, limit)
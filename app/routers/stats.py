@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from app.models.stats_model import InventoryStats
+from app.services.pod_store import PodDB
+from app.dependencies.dependencies import get_pod_db
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    tags=["Stats"]
+)
+
+@router.get("/stats")
+def get_stats(offset: int = Query(0, ge=0),
+              limit: int = Query(10, ge=0, le=1000),
+              pod_db: PodDB = Depends(get_pod_db)
+              ) -> InventoryStats:
+    '''Device and address counts across every lab
+
+    - subnets: pod networks of any lab, most exhausted first
+    '''
+    return pod_db.get_stats(offset, limit)
@@ -1,57 +1,209 @@
 from fastapi import File, UploadFile, HTTPException, APIRouter, Depends, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from app.models.lab_model import *
 from app.models.lab_db_model import *
 from app.models.pod_model import *
 from app.services.lab_store import LabDB
 from app.services.pod_store import PodDB
-from app.dependencies.dependencies import get_pod_db, get_lab_db
+from app.services.json_stream import iter_json_array_bytes
+from app.services.importer import COMMIT_ERRORS, LabImporter, commit_lab
+from app.services.conflicts import find_conflicts
+from app.services.import_jobs import ImportJobs
+from app.services.sync import sync_labs
+from app.models.import_job_model import ImportJobStatus
+from app.models.sync_model import SyncReport
+from app.dependencies.dependencies import get_pod_db, get_lab_db, get_importer, get_import_jobs
 import json
+import os
+import tempfile
+from app.services.metrics import TimedRoute
 
 router = APIRouter(
-    prefix="/upload", 
+    route_class=TimedRoute,
+    prefix="/upload",
     tags=["Bulk"]
 )
 
+
+def _check_json_upload(file: UploadFile) -> None:
+    if file.content_type not in ("application/json", "text/json"):
+        raise HTTPException(status_code=400, detail="File must be JSON")
+
+
+async def _spool_upload(file: UploadFile, chunk_size: int = 1024 * 1024) -> str:
+    """Copy an upload to a temp file that outlives the request; returns its path."""
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while chunk := await file.read(chunk_size):
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def _validate_dump(file: UploadFile, importer: LabImporter) -> list[LabCreate]:
+    """Validate every lab of an uploaded dump on the worker pool.
+
+    A bad lab rejects the whole dump before anything is stored.
+    """
+    labs = []
+    errors = []
+    try:
+        async for result in importer.validate(iter_json_array_bytes(file.read, key="data")):
+            if result.error is None:
+                labs.append(result.lab)
+            else:
+                errors.append({"index": result.index, "detail": result.error})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return labs
+
+
 @router.post("/bulk", status_code=201)
 async def upload_pod_dump(
     file: UploadFile = File(),
     lab_db: LabDB = Depends(get_lab_db),
     pod_db: PodDB = Depends(get_pod_db),
+    importer: LabImporter = Depends(get_importer),
 ) -> LabExistsDump:
     """Bulk upload multiple labs and pods"""
 
     resp = LabExistsDump()
 
-    if file.content_type not in ("application/json", "text/json"):
-        raise HTTPException(status_code=400, detail="File must be JSON")
+    _check_json_upload(file)
+
+    labs = await _validate_dump(file, importer)
+
+    # Commit in order, off the event loop: the store locks order it against other writes
+    resp.data = await run_in_threadpool(lambda: [commit_lab(lab, lab_db, pod_db) for lab in labs])
+
+    return resp
+
+
+@router.post("/sync")
+async def sync_pod_dump(
+    file: UploadFile = File(),
+    prune: bool = False,
+    lab_db: LabDB = Depends(get_lab_db),
+    pod_db: PodDB = Depends(get_pod_db),
+    importer: LabImporter = Depends(get_importer),
+) -> SyncReport:
+    """Make the inventory match a dump, applying only what changed
+
+    - labs are matched on name and building, devices on their name within a pod
+    - matched labs, pods and devices keep their ids; uploading the same dump twice changes nothing
+    - prune: also delete stored labs that are not in the dump
+    """
+
+    _check_json_upload(file)
+
+    labs = await _validate_dump(file, importer)
+
+    # applied off the event loop, as for /bulk
+    return await run_in_threadpool(sync_labs, labs, lab_db, pod_db, prune=prune)
+
+
+@router.post("/check")
+async def check_pod_dump(file: UploadFile = File()) -> dict[str, list[AddressConflict]]:
+    """Report every address conflict of a dump without importing it
+
+    - duplicate and outside_network conflicts would make the import fail
+    - gateway conflicts (an address equal to its gateway) are allowed
+    """
+
+    _check_json_upload(file)
 
     raw = await file.read()
+    try:
+        dump = await run_in_threadpool(LabCreateDump.model_validate_json, raw)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=json.loads(exc.json(include_url=False)))
+
+    return {"conflicts": await run_in_threadpool(find_conflicts, dump)}
+
+
+async def _stream_import(file: UploadFile, lab_db: LabDB, pod_db: PodDB, importer: LabImporter):
+    """Import labs as they are parsed and validated, yielding NDJSON lines."""
+    created = errors = 0
+    index = -1
 
     try:
-        req = json.loads(raw)
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        async for validated in importer.validate(iter_json_array_bytes(file.read, key="data")):
+            index = validated.index
+            if validated.error is not None:
+                errors += 1
+                yield json.dumps({"index": index, "status": "error",
+                                  "detail": validated.error}) + "\n"
+                continue
+            try:
+                # off the event loop: committing waits on the store locks
+                lab_exists = await run_in_threadpool(commit_lab, validated.lab, lab_db, pod_db)
+            except COMMIT_ERRORS as exc:
+                errors += 1
+                result = {"index": index, "status": "error",
+                          "detail": str(exc) or type(exc).__name__}
+            else:
+                created += 1
+                result = {"index": index, "status": "created",
+                          "lab": {"id": lab_exists.id,
+                                  "name": lab_exists.name,
+                                  "pods": [pod.id for pod in lab_exists.pods],
+                                  "devices": sum(len(pod.assets) for pod in lab_exists.pods)}}
+            yield json.dumps(result) + "\n"
+    except ValueError as exc:
+        errors += 1
+        yield json.dumps({"index": index + 1, "status": "error",
+                          "detail": f"Invalid JSON: {exc}"}) + "\n"
+
+    yield json.dumps({"status": "done", "created": created, "errors": errors}) + "\n"
+
 
-    lab_dump = LabCreateDump.model_validate(req)
+@router.post("/bulk/stream", status_code=201)
+async def stream_pod_dump(
+    file: UploadFile = File(),
+    lab_db: LabDB = Depends(get_lab_db),
+    pod_db: PodDB = Depends(get_pod_db),
+    importer: LabImporter = Depends(get_importer),
+) -> StreamingResponse:
+    """Bulk upload a dump one lab at a time, streaming per-lab NDJSON results"""
 
-    for lab in lab_dump.data: 
-        lab_meta_exists = lab_db.create_new_lab_meta(
-            LabMetaCreate(
-                name=lab.name, 
-                location=lab.location, 
-                building=lab.building, 
-                floor=lab.floor), pod_db)
-        
-        pod_exists = []
+    _check_json_upload(file)
 
-        for pod in lab.pods:
-            pod_exists.append(pod_db.create_pod(lab_meta_exists.id, pod))
+    return StreamingResponse(
+        _stream_import(file, lab_db, pod_db, importer),
+        status_code=201,
+        media_type="application/x-ndjson",
+    )
 
-        resp.data.append(
-                LabExists(
-                    **lab_meta_exists.model_dump(),
-                    pods=pod_exists
-                )
-        )
 
-    return resp
+@router.post("/jobs", status_code=202)
+async def submit_import_job(
+    file: UploadFile = File(),
+    lab_db: LabDB = Depends(get_lab_db),
+    pod_db: PodDB = Depends(get_pod_db),
+    jobs: ImportJobs = Depends(get_import_jobs),
+) -> ImportJobStatus:
+    """Import a dump in the background; poll /upload/jobs/{job_id} for progress"""
+
+    _check_json_upload(file)
+
+    return jobs.submit(await _spool_upload(file), lab_db, pod_db)
+
+
+@router.get("/jobs/{job_id}")
+async def get_import_job(job_id: str, jobs: ImportJobs = Depends(get_import_jobs)) -> ImportJobStatus:
+    """Get the progress of a background import"""
+    return jobs.get(job_id)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_import_job(job_id: str, jobs: ImportJobs = Depends(get_import_jobs)) -> ImportJobStatus:
+    """Cancel a background import; labs committed so far are kept"""
+    return jobs.cancel(job_id)
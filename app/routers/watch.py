@@ -0,0 +1,68 @@
+import json
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, Depends, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.Exceptions.exceptions import RevisionExpiredError
+from app.services.change_feed import ChangeFeed, watch
+from app.dependencies.dependencies import get_change_feed
+from app.services.metrics import TimedRoute
+
+
+router = APIRouter(
+    route_class=TimedRoute,
+    tags=["Watch"]
+)
+
+async def _sse(events: AsyncIterator) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            if event is None:
+                yield b': keepalive\n\n'
+            else:
+                yield (f'id: {event.revision}\nevent: {event.op}\n'
+                       f'data: {event.model_dump_json(exclude_none=True)}\n\n').encode()
+    except RevisionExpiredError as exc:
+        yield f'event: reset\ndata: {json.dumps({"detail": str(exc)})}\n\n'.encode()
+
+@router.get("/watch")
+async def watch_sse(lab_id: Optional[str] = None,
+                    pod_id: Optional[str] = None,
+                    since: Optional[int] = None,
+                    last_event_id: Optional[int] = Header(None),
+                    changes: ChangeFeed = Depends(get_change_feed)
+                    ) -> StreamingResponse:
+    '''Stream inventory changes as server-sent events
+
+    - since (or the Last-Event-ID header on reconnect): resume after this revision
+    - a "reset" event (or 410 up front) means the revision has expired; re-read and watch again
+    '''
+    if since is None:
+        since = last_event_id
+    if since is None:
+        since = changes.revision
+    else:
+        changes.read(since, limit=0)
+    return StreamingResponse(
+        _sse(watch(changes, since, lab_id, pod_id)),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@router.websocket("/watch")
+async def watch_websocket(websocket: WebSocket,
+                          lab_id: Optional[str] = None,
+                          pod_id: Optional[str] = None,
+                          since: Optional[int] = None,
+                          changes: ChangeFeed = Depends(get_change_feed)):
+    '''Stream inventory changes as JSON messages over a WebSocket'''
+    await websocket.accept()
+    try:
+        async for event in watch(changes, since, lab_id, pod_id):
+            if event is None:
+                await websocket.send_text(json.dumps({'op': 'heartbeat', 'revision': changes.revision}))
+            else:
+                await websocket.send_text(event.model_dump_json(exclude_none=True))
+    except RevisionExpiredError as exc:
+        await websocket.send_text(json.dumps({'op': 'reset', 'detail': str(exc)}))
+        await websocket.close(code=4410)
+    except WebSocketDisconnect:
+        pass
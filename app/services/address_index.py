@@ -0,0 +1,59 @@
+import threading
+from typing import Dict, Iterable
+
+
+class AddressIndex:
+    """Reverse index from an IPv4 address (as an int) to the devices using it.
+
+    Addresses are only unique within a pod, so each address maps to the set
+    of ``(lab_id, pod_id, device_id)`` locations that use it. A per-lab view
+    is kept alongside the global one so both lookups are a single dict hit.
+    Both views are shared by every pod, so updates hold an internal lock.
+    """
+
+    def __init__(self):
+        # address -> {(lab_id, pod_id, device_id)}
+        self._global: Dict[int, set[tuple[str, str, str]]] = {}
+        # lab_id -> address -> {(pod_id, device_id)}
+        self._by_lab: Dict[str, Dict[int, set[tuple[str, str]]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, addresses: Iterable[int], lab_id: str, pod_id: str, device_id: str) -> None:
+        with self._lock:
+            lab = self._by_lab.setdefault(lab_id, {})
+            for addr in addresses:
+                self._global.setdefault(addr, set()).add((lab_id, pod_id, device_id))
+                lab.setdefault(addr, set()).add((pod_id, device_id))
+
+    def discard(self, addresses: Iterable[int], lab_id: str, pod_id: str, device_id: str) -> None:
+        with self._lock:
+            lab = self._by_lab.get(lab_id, {})
+            for addr in addresses:
+                _discard(self._global, addr, (lab_id, pod_id, device_id))
+                _discard(lab, addr, (pod_id, device_id))
+
+    def drop_lab(self, lab_id: str) -> None:
+        """Forget every address used in a lab."""
+        with self._lock:
+            for addr, locations in self._by_lab.pop(lab_id, {}).items():
+                for pod_id, device_id in locations:
+                    _discard(self._global, addr, (lab_id, pod_id, device_id))
+
+    def lookup(self, addr: int) -> list[tuple[str, str, str]]:
+        """Return the ``(lab_id, pod_id, device_id)`` locations using an address."""
+        with self._lock:
+            return sorted(self._global.get(addr, ()))
+
+    def lookup_in_lab(self, lab_id: str, addr: int) -> list[tuple[str, str]]:
+        """Return the ``(pod_id, device_id)`` locations using an address in a lab."""
+        with self._lock:
+            return sorted(self._by_lab.get(lab_id, {}).get(addr, ()))
+
+
+def _discard(index: dict, addr: int, location: tuple) -> None:
+    locations = index.get(addr)
+    if locations is None:
+        return
+    locations.discard(location)
+    if not locations:
+        del index[addr]
@@ -0,0 +1,394 @@
+"""Compact binary snapshots of the inventory, for fast startup.
+
+A snapshot is columnar: every table is a run of little-endian uint32 (or
+uint8) arrays, read back with one ``array.frombytes`` each. Addresses are
+stored as integers, and strings (ids, names, descriptions, urls, lab
+fields) once each in a string table that records refer to by index, so a
+description repeated by every device of a pod is stored, decoded and kept
+in memory once. Networks and locations are tables of their own for the
+same reason.
+
+Layout, after the 8-byte magic, as ``count`` then the table's columns:
+
+    strings    offsets[count + 1], utf-8 blob[offsets[count]]
+    networks   address, prefixlen (u8), gateway
+    locations  row, aisle                          (string indexes)
+    labs       id, name, location, building, floor (string indexes), pods
+    pods       id (string index), devices
+    devices    id, name, description (string indexes), location, ports, access
+    ports      address, network
+    access     url (string index)
+    plans      lab (index into labs), network, prefixlen (u8)
+
+Labs own the next ``pods`` pods, pods the next ``devices`` devices, and
+devices the next ``ports`` ports and ``access`` access methods. Plans
+are the supernets labs allocate pods from (see PodDB.allocate_pod).
+
+Convert JSON dumps with::
+
+    python -m app.services.binary_snapshot app/data/pod_dump_aligned.json -o inventory.bin
+"""
+import argparse
+import gc
+import sys
+import time
+from array import array
+from ipaddress import IPv4Address, IPv4Network
+from itertools import accumulate
+from pathlib import Path
+from typing import Iterable
+from uuid import uuid4
+
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreateDump
+from app.models.pod_model import AccessMethod, DeviceExists, Interface, Location, Network, Port
+from app.services.persistence import MemoryBackend
+
+MAGIC = b"NETINV\x00\x02"
+
+_LITTLE = sys.byteorder == "little"
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+class _Strings:
+    """String table: each distinct string gets the index of its first use."""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def __call__(self, value: str) -> int:
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.index)
+        return i
+
+
+def _u32() -> array:
+    return array("I")
+
+
+def write_snapshot(state: dict, path: str | Path) -> None:
+    """Write an inventory to a binary snapshot.
+
+    Args:
+        state: ``{"labs": {lab_id: LabMetaCreate}, "pods": {lab_id: {pod_id:
+            [DeviceExists]}}, "address_plans": {lab_id: IPv4Network}}``, as
+            returned by persistence.snapshot_state
+        path: The file to write
+    """
+    strings = _Strings()
+    networks: dict[tuple, int] = {}
+    locations: dict[tuple, int] = {}
+    net_address, net_prefixlen, net_gateway = _u32(), array("B"), _u32()
+    loc_row, loc_aisle = _u32(), _u32()
+    lab_cols = [_u32() for _ in range(6)]
+    pod_id, pod_devices = _u32(), _u32()
+    device_cols = [_u32() for _ in range(6)]
+    port_address, port_network = _u32(), _u32()
+    access_url = _u32()
+    plan_lab, plan_network, plan_prefixlen = _u32(), _u32(), array("B")
+
+    plans = state.get("address_plans", {})
+    for lab_index, (lab_id, lab) in enumerate(state["labs"].items()):
+        supernet = plans.get(lab_id)
+        if supernet is not None:
+            plan_lab.append(lab_index)
+            plan_network.append(int(supernet.network_address))
+            plan_prefixlen.append(supernet.prefixlen)
+        pods = state["pods"].get(lab_id, {})
+        for column, value in zip(lab_cols, (strings(lab_id), strings(lab.name), strings(lab.location),
+                                            strings(lab.building), strings(lab.floor), len(pods))):
+            column.append(value)
+        for pid, devices in pods.items():
+            pod_id.append(strings(pid))
+            pod_devices.append(len(devices))
+            for device in devices:
+                key = (device.location.row, device.location.aisle)
+                loc = locations.get(key)
+                if loc is None:
+                    loc = locations[key] = len(locations)
+                    loc_row.append(strings(key[0]))
+                    loc_aisle.append(strings(key[1]))
+                for column, value in zip(device_cols, (
+                        strings(device.id), strings(device.name), strings(device.description),
+                        loc, len(device.ports), len(device.accessMethods))):
+                    column.append(value)
+                for port in device.ports:
+                    parent = port.interface.parent
+                    key = (parent.network, parent.gateway)
+                    net = networks.get(key)
+                    if net is None:
+                        net = networks[key] = len(networks)
+                        net_address.append(int(parent.network.network_address))
+                        net_prefixlen.append(parent.network.prefixlen)
+                        net_gateway.append(int(parent.gateway))
+                    port_address.append(int(port.interface.address))
+                    port_network.append(net)
+                for access in device.accessMethods:
+                    access_url.append(strings(access.url))
+
+    encoded = [s.encode() for s in strings.index]
+    offsets = array("I", accumulate((len(s) for s in encoded), initial=0))
+    tables = [
+        (len(encoded), [offsets]),
+        (len(networks), [net_address, net_prefixlen, net_gateway]),
+        (len(locations), [loc_row, loc_aisle]),
+        (len(lab_cols[0]), lab_cols),
+        (len(pod_id), [pod_id, pod_devices]),
+        (len(device_cols[0]), device_cols),
+        (len(port_address), [port_address, port_network]),
+        (len(access_url), [access_url]),
+        (len(plan_lab), [plan_lab, plan_network, plan_prefixlen]),
+    ]
+
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        for i, (count, columns) in enumerate(tables):
+            f.write(array("I", [count]).tobytes() if _LITTLE else _swapped(array("I", [count])))
+            for column in columns:
+                f.write(column.tobytes() if _LITTLE or column.itemsize == 1 else _swapped(column))
+            if i == 0:
+                f.write(b"".join(encoded))
+    tmp.replace(path)
+
+
+def _swapped(column: array) -> bytes:
+    column = array(column.typecode, column)
+    column.byteswap()
+    return column.tobytes()
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        if data[:len(MAGIC)] != MAGIC:
+            raise SnapshotFormatError("Not an inventory snapshot")
+        self.data = memoryview(data)
+        self.pos = len(MAGIC)
+
+    def column(self, typecode: str, count: int) -> array:
+        column = array(typecode)
+        end = self.pos + column.itemsize * count
+        if end > len(self.data):
+            raise SnapshotFormatError("Truncated inventory snapshot")
+        column.frombytes(self.data[self.pos:end])
+        if not _LITTLE and column.itemsize > 1:
+            column.byteswap()
+        self.pos = end
+        return column
+
+    def count(self) -> int:
+        return self.column("I", 1)[0]
+
+    def blob(self, size: int) -> memoryview:
+        if self.pos + size > len(self.data):
+            raise SnapshotFormatError("Truncated inventory snapshot")
+        blob = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return blob
+
+
+# Records are rebuilt like model_construct does, minus its per-call
+# bookkeeping: a snapshot only holds values that were validated when they
+# entered the store.
+_new = object.__new__
+_set = object.__setattr__
+
+
+def _construct(cls, values: dict):
+    model = _new(cls)
+    _set(model, "__dict__", values)
+    _set(model, "__pydantic_fields_set__", set(values))
+    _set(model, "__pydantic_extra__", None)
+    _set(model, "__pydantic_private__", None)
+    return model
+
+
+def read_snapshot(path: str | Path) -> Iterable[tuple[str, LabMetaCreate, dict[str, list[DeviceExists]],
+                                                      IPv4Network | None]]:
+    """Read a binary snapshot lab by lab, without validating it again.
+
+    Every table is read, and the counts and indexes linking them checked,
+    before the first lab is yielded.
+
+    Yields:
+        ``(lab_id, lab meta, {pod_id: [devices]}, supernet or None)`` per
+        lab, in stored order
+
+    Raises:
+        SnapshotFormatError: If the file is not a complete snapshot
+    """
+    r = _Reader(Path(path).read_bytes())
+
+    n = r.count()
+    offsets = r.column("I", n + 1)
+    blob = bytes(r.blob(offsets[n] if n else 0))
+    n = r.count()
+    net_address, net_prefixlen, net_gateway = r.column("I", n), r.column("B", n), r.column("I", n)
+    n = r.count()
+    loc_row, loc_aisle = r.column("I", n), r.column("I", n)
+    n = r.count()
+    lab_id, lab_name, lab_location, lab_building, lab_floor, lab_pods = (r.column("I", n) for _ in range(6))
+    n = r.count()
+    pod_id, pod_devices = r.column("I", n), r.column("I", n)
+    n = r.count()
+    dev_id, dev_name, dev_description, dev_location, dev_ports, dev_access = (r.column("I", n) for _ in range(6))
+    n = r.count()
+    port_address, port_network = r.column("I", n), r.column("I", n)
+    access_url = r.column("I", r.count())
+    n = r.count()
+    plan_lab, plan_network, plan_prefixlen = r.column("I", n), r.column("I", n), r.column("B", n)
+    if r.pos != len(r.data):
+        raise SnapshotFormatError("Trailing data after the inventory snapshot")
+
+    def _check(children: int, counts: array, table: str) -> None:
+        if sum(counts) != children:
+            raise SnapshotFormatError(f"Corrupt inventory snapshot: {table} don't add up")
+
+    def _check_index(column: array, size: int, table: str) -> None:
+        if column and max(column) >= size:
+            raise SnapshotFormatError(f"Corrupt inventory snapshot: {table} index out of range")
+
+    _check(len(pod_id), lab_pods, "pods")
+    _check(len(dev_id), pod_devices, "devices")
+    _check(len(port_address), dev_ports, "ports")
+    _check(len(access_url), dev_access, "access methods")
+    if any(a > b for a, b in zip(offsets, offsets[1:])):
+        raise SnapshotFormatError("Corrupt inventory snapshot: string offsets")
+    for column in (loc_row, loc_aisle, lab_id, lab_name, lab_location, lab_building, lab_floor,
+                   pod_id, dev_id, dev_name, dev_description, access_url):
+        _check_index(column, len(offsets) - 1, "string")
+    _check_index(dev_location, len(loc_row), "location")
+    _check_index(port_network, len(net_address), "network")
+    _check_index(plan_lab, len(lab_id), "lab")
+
+    try:
+        strings = [blob[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+        networks = [_construct(Network, {"network": IPv4Network((net_address[i], net_prefixlen[i])),
+                                         "gateway": IPv4Address(net_gateway[i])})
+                    for i in range(len(net_address))]
+        plans = {plan_lab[i]: IPv4Network((plan_network[i], plan_prefixlen[i]))
+                 for i in range(len(plan_lab))}
+    except ValueError as exc:
+        # bad utf-8, or a prefix length or host bits no network has
+        raise SnapshotFormatError(f"Corrupt inventory snapshot: {exc}") from exc
+    locations = [_construct(Location, {"row": strings[loc_row[i]], "aisle": strings[loc_aisle[i]]})
+                 for i in range(len(loc_row))]
+
+    pod = device = port = access = 0
+    for lab in range(len(lab_id)):
+        meta = _construct(LabMetaCreate, {
+            "name": strings[lab_name[lab]], "location": strings[lab_location[lab]],
+            "building": strings[lab_building[lab]], "floor": strings[lab_floor[lab]]})
+        pods = {}
+        for _ in range(lab_pods[lab]):
+            devices = []
+            for _ in range(pod_devices[pod]):
+                ports = [_construct(Port, {"interface": _construct(Interface, {
+                            "address": IPv4Address(port_address[i]),
+                            "parent": networks[port_network[i]]})})
+                         for i in range(port, port + dev_ports[device])]
+                port += dev_ports[device]
+                accesses = [_construct(AccessMethod, {"url": strings[access_url[i]]})
+                            for i in range(access, access + dev_access[device])]
+                access += dev_access[device]
+                devices.append(_construct(DeviceExists, {
+                    "id": strings[dev_id[device]], "name": strings[dev_name[device]],
+                    "description": strings[dev_description[device]], "accessMethods": accesses,
+                    "location": locations[dev_location[device]], "ports": ports}))
+                device += 1
+            pods[strings[pod_id[pod]]] = devices
+            pod += 1
+        yield strings[lab_id[lab]], meta, pods, plans.get(lab)
+
+
+def load_snapshot(path: str | Path, pod_db, lab_db, background_search: bool = False) -> int:
+    """Load a binary snapshot into empty in-memory stores.
+
+    Records go in through the store primitives, so every index is built
+    as usual, but nothing is logged or published while loading. The search
+    index is built in one pass at the end (or, with ``background_search``,
+    on a thread of its own after returning, searches waiting for it), and
+    the garbage collector is paused meanwhile: loading only allocates, and
+    would otherwise trigger a full collection every few thousand records.
+    The loaded records then live as long as the store, so they are frozen
+    out of later collections rather than scanned by the first one.
+
+    If loading fails, the labs loaded so far are dropped again.
+
+    Returns:
+        The number of devices loaded
+
+    Raises:
+        SnapshotFormatError: If the file is not a complete snapshot
+    """
+    pod_backend, lab_backend = pod_db.backend, lab_db.backend
+    pod_changes, lab_changes = pod_db.changes, lab_db.changes
+    pod_db.backend = lab_db.backend = MemoryBackend()
+    pod_db.changes = lab_db.changes = None
+    collecting = gc.isenabled()
+    gc.disable()
+    loaded, labs = 0, []
+    try:
+        with pod_db.search_index.bulk(background_search):
+            try:
+                for lab_id, meta, pods, supernet in read_snapshot(path):
+                    pod_db._add_lab(lab_id)
+                    labs.append(lab_id)
+                    lab_db._put_meta(lab_id, meta)
+                    for pid, devices in pods.items():
+                        pod_db._add_pod(lab_id, pid)
+                        pod_db._store_devices(lab_id, pid, devices)
+                        loaded += len(devices)
+                    if supernet is not None:
+                        pod_db._put_address_plan(lab_id, supernet)
+            except BaseException:
+                for lab_id in labs:
+                    if lab_id in lab_db.labs_by_id:
+                        lab_db._drop_meta(lab_id)
+                    pod_db._drop_lab(lab_id)
+                raise
+        gc.freeze()
+    finally:
+        if collecting:
+            gc.enable()
+        pod_db.backend, lab_db.backend = pod_backend, lab_backend
+        pod_db.changes, lab_db.changes = pod_changes, lab_changes
+    return loaded
+
+
+def dump_state(dumps: Iterable[LabCreateDump]) -> dict:
+    """Give the labs of JSON dumps fresh ids, in the shape write_snapshot takes."""
+    state = {"labs": {}, "pods": {}}
+    for dump in dumps:
+        for lab in dump.data or []:
+            lab_id = str(uuid4())
+            state["labs"][lab_id] = LabMetaCreate(
+                name=lab.name, location=lab.location, building=lab.building, floor=lab.floor)
+            state["pods"][lab_id] = {
+                str(uuid4()): [DeviceExists.model_construct(id=str(uuid4()), **dict(device))
+                               for device in pod.assets]
+                for pod in lab.pods}
+    return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert JSON inventory dumps into a binary snapshot "
+                                                 "for NETWORK_PRELOAD.")
+    parser.add_argument("dumps", nargs="+", help="LabCreateDump JSON files, e.g. app/data/*.json")
+    parser.add_argument("-o", "--output", required=True, help="snapshot file to write")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    state = dump_state(LabCreateDump.model_validate_json(Path(p).read_bytes()) for p in args.dumps)
+    write_snapshot(state, args.output)
+    devices = sum(len(d) for pods in state["pods"].values() for d in pods.values())
+    print(f"wrote {len(state['labs'])} labs, {devices} devices to {args.output} "
+          f"({Path(args.output).stat().st_size} bytes) in {time.perf_counter() - t:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
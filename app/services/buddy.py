@@ -0,0 +1,181 @@
+import threading
+from heapq import heappop, heappush
+from ipaddress import IPv4Network
+from typing import Hashable
+
+
+class BuddyAllocator:
+    """Buddy allocator of aligned subnets of a supernet.
+
+    Free space is kept as aligned blocks, one free set (plus a min-heap
+    for the lowest address) per prefix length. Allocating a /p takes the
+    lowest free block of the longest prefix that is no longer than p, and
+    splits it in halves down to /p. Releasing a block merges it with its
+    free buddy as far up as it goes. Both cost O(32 log n) for n free
+    blocks, whatever the number of allocations.
+
+    Allocated blocks may have an owner (a pod). A block handed out by
+    ``allocate`` has none until ``claim`` gives it one, or ``free`` hands
+    it back. ``claim`` also carves a pod's network out of free space, as
+    several blocks where it overlaps space allocated already, so that
+    ``allocate`` never hands out addresses a pod uses. Pods of one lab
+    change concurrently, so operations hold an internal lock.
+    """
+
+    def __init__(self, supernet: IPv4Network):
+        self.supernet = supernet
+        self._base = supernet.prefixlen
+        # prefixlen -> free block addresses; the heaps may hold stale entries
+        self._free: list[set[int]] = [set() for _ in range(33)]
+        self._heaps: list[list[int]] = [[] for _ in range(33)]
+        # (address, prefixlen) -> owner, None for an unowned block
+        self._taken: dict[tuple[int, int], Hashable | None] = {}
+        # owner -> (the network it claimed, the blocks carved for it)
+        self._owned: dict[Hashable, tuple[tuple[int, int], list[tuple[int, int]]]] = {}
+        self._unowned = 0
+        self.free_addresses = 0
+        self._lock = threading.Lock()
+        self._push(int(supernet.network_address), self._base)
+
+    def _push(self, addr: int, prefixlen: int) -> None:
+        self._free[prefixlen].add(addr)
+        heappush(self._heaps[prefixlen], addr)
+        self.free_addresses += 1 << (32 - prefixlen)
+
+    def _pop(self, prefixlen: int) -> int:
+        free, heap = self._free[prefixlen], self._heaps[prefixlen]
+        while True:
+            addr = heappop(heap)
+            if addr in free:
+                free.discard(addr)
+                self.free_addresses -= 1 << (32 - prefixlen)
+                return addr
+
+    def _take(self, addr: int, prefixlen: int) -> None:
+        self._free[prefixlen].discard(addr)
+        self.free_addresses -= 1 << (32 - prefixlen)
+
+    def __len__(self) -> int:
+        return len(self._owned) + self._unowned
+
+    def allocate(self, prefixlen: int) -> IPv4Network | None:
+        """Take the lowest free /prefixlen block, or return None if none is left."""
+        if not self._base <= prefixlen <= 32:
+            return None
+        with self._lock:
+            for q in range(prefixlen, self._base - 1, -1):
+                if self._free[q]:
+                    break
+            else:
+                return None
+            addr = self._pop(q)
+            while q < prefixlen:
+                q += 1
+                self._push(addr + (1 << (32 - q)), q)
+            self._taken[(addr, prefixlen)] = None
+            self._unowned += 1
+        return IPv4Network((addr, prefixlen))
+
+    def claim(self, network: IPv4Network, owner: Hashable) -> bool:
+        """Make ``owner`` the owner of every free block within ``network``.
+
+        A network enclosing the supernet is cut down to it. Blocks within
+        it owned by someone else stay theirs, so a network overlapping
+        other pods' ends up as the blocks between them; claiming it again
+        picks up what they have released since. Claiming another network
+        releases the owner's old one first.
+
+        Returns:
+            False if the network does not overlap the supernet
+        """
+        if not network.overlaps(self.supernet):
+            return False
+        if network.prefixlen < self._base:
+            network = self.supernet
+        key = (int(network.network_address), network.prefixlen)
+        with self._lock:
+            held = self._owned.get(owner)
+            if held is not None and held[0] != key:
+                self._release(owner)
+                held = None
+            blocks = [] if held is None else held[1]
+            self._carve(*key, owner, blocks)
+            if blocks:
+                self._owned[owner] = (key, blocks)
+            return True
+
+    def _carve(self, addr: int, prefixlen: int, owner: Hashable, blocks: list[tuple[int, int]]) -> None:
+        """Give ``owner`` the free space of a block, walking down where it is split."""
+        key = (addr, prefixlen)
+        if key in self._taken:
+            if self._taken[key] is None:
+                self._taken[key] = owner
+                self._unowned -= 1
+                blocks.append(key)
+            return
+        for q in range(prefixlen, self._base - 1, -1):
+            container = addr & ~((1 << (32 - q)) - 1) & 0xFFFFFFFF
+            if container in self._free[q]:
+                break
+            if q < prefixlen and (container, q) in self._taken:
+                # inside a block allocated already
+                return
+        else:
+            # split between smaller blocks: carve each half
+            half = 1 << (31 - prefixlen)
+            self._carve(addr, prefixlen + 1, owner, blocks)
+            self._carve(addr + half, prefixlen + 1, owner, blocks)
+            return
+        self._take(container, q)
+        while q < prefixlen:
+            q += 1
+            half = 1 << (32 - q)
+            if addr >= container + half:
+                self._push(container, q)
+                container += half
+            else:
+                self._push(container + half, q)
+        self._taken[key] = owner
+        blocks.append(key)
+
+    def release(self, owner: Hashable) -> None:
+        """Free the blocks of an owner, merging them with their free buddies."""
+        with self._lock:
+            self._release(owner)
+
+    def free(self, network: IPv4Network) -> None:
+        """Free a block handed out by ``allocate`` that no owner has claimed."""
+        key = (int(network.network_address), network.prefixlen)
+        with self._lock:
+            if key in self._taken and self._taken[key] is None:
+                del self._taken[key]
+                self._unowned -= 1
+                self._merge(*key)
+
+    def _release(self, owner: Hashable) -> None:
+        _, blocks = self._owned.pop(owner, (None, ()))
+        for key in blocks:
+            del self._taken[key]
+            self._merge(*key)
+
+    def _merge(self, addr: int, prefixlen: int) -> None:
+        """Return a block to free space, merged with its free buddies."""
+        while prefixlen > self._base:
+            buddy = addr ^ (1 << (32 - prefixlen))
+            if buddy not in self._free[prefixlen]:
+                break
+            self._take(buddy, prefixlen)
+            addr = min(addr, buddy)
+            prefixlen -= 1
+        self._push(addr, prefixlen)
+
+    def largest_free(self) -> IPv4Network | None:
+        """Return the lowest of the largest free blocks, or None if the supernet is full."""
+        with self._lock:
+            for q in range(self._base, 33):
+                free, heap = self._free[q], self._heaps[q]
+                while heap and heap[0] not in free:
+                    heappop(heap)
+                if heap:
+                    return IPv4Network((heap[0], q))
+        return None
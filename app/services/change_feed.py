@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Optional
+
+from app.Exceptions.exceptions import RevisionExpiredError
+from app.models.change_model import ChangeEvent
+
+
+class ChangeFeed:
+    """Bounded, in-process history of inventory changes.
+
+    The stores publish one ChangeEvent per applied mutation; watchers read
+    the events after the last revision they saw and wait for more. Only the
+    latest ``history`` events are kept, so a watcher that falls further
+    behind than that has to re-read the inventory.
+
+    Revisions start from the wall clock in microseconds, so they keep
+    increasing across restarts and a revision from before one is reported
+    as expired rather than mistaken for a current one.
+    """
+
+    # seconds between checks for changes made by other processes; None if
+    # every change is published through this object
+    poll_interval: Optional[float] = None
+
+    def __init__(self, history: int = 10_000):
+        self._events: deque[ChangeEvent] = deque(maxlen=history)
+        self._revision = time.time_ns() // 1000
+        self._lock = threading.Lock()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def revision(self) -> int:
+        """Revision of the latest event."""
+        return self._revision
+
+    def publish(self, op: str, lab_id: str, pod_id: str | None = None,
+                device_id: str | None = None, **data) -> None:
+        """Record a change and wake the watchers.
+
+        Args:
+            op: The store primitive that made the change
+            lab_id: Identifier of the lab changed
+            pod_id: Identifier of the pod changed, if any
+            device_id: Identifier of the device changed, if any
+            data: ``device``, ``lab``, ``supernet``, ``network`` or
+                ``location`` payload of the event
+        """
+        with self._lock:
+            self._revision += 1
+            self._events.append(ChangeEvent.model_construct(
+                revision=self._revision, op=op, lab_id=lab_id, pod_id=pod_id,
+                device_id=device_id, device=data.get('device'), lab=data.get('lab'),
+                supernet=data.get('supernet'), network=data.get('network'),
+                location=data.get('location')))
+        self._wake()
+
+    def read(self, since: int, limit: int = 1000) -> list[ChangeEvent]:
+        """Return up to ``limit`` events after revision ``since``, oldest first.
+
+        Raises:
+            RevisionExpiredError: If events after ``since`` are no longer
+                held, or ``since`` is not a revision of this feed
+        """
+        with self._lock:
+            if since > self._revision:
+                raise RevisionExpiredError(f'Revision {since} is unknown')
+            if since == self._revision:
+                return []
+            oldest = self._events[0].revision if self._events else self._revision + 1
+            if since < oldest - 1:
+                raise RevisionExpiredError(f'Revision {since} has expired, re-read the inventory')
+            start = since + 1 - oldest
+            return list(islice(self._events, start, start + limit))
+
+    async def wait(self, revision: int, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for an event after ``revision``.
+
+        Returns:
+            Whether one arrived
+        """
+        deadline = time.monotonic() + timeout
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while self.revision <= revision:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if self.poll_interval is not None:
+                    remaining = min(remaining, self.poll_interval)
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+            return True
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    def _wake(self) -> None:
+        with self._lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the watcher's loop has closed
+                pass
+
+
+def _matches(event: ChangeEvent, lab_id: str | None, pod_id: str | None) -> bool:
+    if lab_id is not None and event.lab_id != lab_id:
+        return False
+    # lab-wide events (meta, deleting the lab) concern every pod of the lab
+    return pod_id is None or event.pod_id in (None, pod_id)
+
+
+async def watch(
+    feed: ChangeFeed,
+    since: int | None = None,
+    lab_id: str | None = None,
+    pod_id: str | None = None,
+    heartbeat: float = 15.0,
+) -> AsyncIterator[ChangeEvent | None]:
+    """Stream the changes after a revision, filtered to a lab or pod.
+
+    Args:
+        feed: The feed to read
+        since: Revision to resume after; None for new changes only
+        lab_id: Only changes to this lab
+        pod_id: Only changes to this pod (and lab-wide ones of its lab)
+        heartbeat: Seconds of quiet after which None is yielded, so the
+            caller can keep its connection alive
+
+    Yields:
+        Matching ChangeEvents, oldest first, and None on every heartbeat
+
+    Raises:
+        RevisionExpiredError: If the watcher fell too far behind the feed
+    """
+    revision = feed.revision if since is None else since
+    while True:
+        events = feed.read(revision)
+        for event in events:
+            revision = event.revision
+            if _matches(event, lab_id, pod_id):
+                yield event
+        if not events and not await feed.wait(revision, heartbeat):
+            yield None
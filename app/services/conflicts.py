@@ -0,0 +1,129 @@
+from array import array
+from typing import Iterable
+from app.models.pod_model import AddressConflict, DeviceCreate, DeviceExists, PodCreate
+from app.models.lab_model import LabCreate, LabCreateDump
+from app.Exceptions.exceptions import AddressOutsideNetworkError, DuplicateIPv4Error
+
+# conflicts that make a pod unusable; "gateway" is reported but allowed
+BLOCKING = frozenset({'duplicate', 'outside_network'})
+
+
+class _Ports:
+    """Every interface of the checked pods as parallel integer columns."""
+
+    def __init__(self):
+        self.pod = array('l')        # running number of the pod, unique in the check
+        self.device = array('l')
+        self.port = array('l')
+        self.address = array('I')
+        self.first = array('I')      # parent network's first and last address
+        self.last = array('I')
+        self.gateway = array('I')
+        # running pod number -> (lab index, pod index)
+        self.pods: list[tuple[int | None, int | None]] = []
+
+    def add_pod(self, lab: int | None, pod_index: int | None, pod: PodCreate) -> None:
+        n = len(self.pods)
+        self.pods.append((lab, pod_index))
+        for d, device in enumerate(pod.assets):
+            for p, port in enumerate(device.ports):
+                iface = port.interface
+                net = iface.parent.network
+                self.pod.append(n)
+                self.device.append(d)
+                self.port.append(p)
+                self.address.append(int(iface.address))
+                self.first.append(int(net.network_address))
+                self.last.append(int(net.broadcast_address))
+                self.gateway.append(int(iface.parent.gateway))
+
+
+def _pods(source: PodCreate | LabCreate | LabCreateDump | Iterable[LabCreate]) -> _Ports:
+    ports = _Ports()
+    if isinstance(source, PodCreate):
+        ports.add_pod(None, None, source)
+    elif isinstance(source, LabCreate):
+        for p, pod in enumerate(source.pods):
+            ports.add_pod(None, p, pod)
+    else:
+        labs = (source.data or []) if isinstance(source, LabCreateDump) else source
+        for l, lab in enumerate(labs):
+            for p, pod in enumerate(lab.pods):
+                ports.add_pod(l, p, pod)
+    return ports
+
+
+def find_conflicts(source: PodCreate | LabCreate | LabCreateDump | Iterable[LabCreate]) -> list[AddressConflict]:
+    """Find every address conflict of a pod, a lab or a whole dump at once.
+
+    All interface addresses are flattened into integer arrays first.
+    Duplicates (primary addresses only, per pod, as the stores enforce them)
+    come from one sort of ``(pod, address)`` keys; the network and gateway
+    checks are comparisons over the same arrays. Nothing is mutated, so
+    callers can refuse a write before any of it is applied.
+
+    Args:
+        source: A PodCreate, a LabCreate, or a LabCreateDump (or list of labs)
+
+    Returns:
+        The conflicts, ordered by lab, pod, device and port
+    """
+    ports = _pods(source)
+    pod, device, port, address = ports.pod, ports.device, ports.port, ports.address
+    found: list[tuple] = []
+
+    primary = [i for i in range(len(address)) if port[i] == 0]
+    keys = [(pod[i] << 32) | address[i] for i in primary]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    start = 0
+    for end in range(1, len(order) + 1):
+        if end == len(order) or keys[order[end]] != keys[order[start]]:
+            if end - start > 1:
+                rows = sorted(primary[j] for j in order[start:end])
+                found.append((pod[rows[0]], device[rows[0]], 0, 'duplicate', address[rows[0]],
+                              [device[i] for i in rows]))
+            start = end
+
+    first, last, gateway = ports.first, ports.last, ports.gateway
+    for i in range(len(address)):
+        a = address[i]
+        if a < first[i] or a > last[i]:
+            found.append((pod[i], device[i], port[i], 'outside_network', a, [device[i]]))
+        elif a == gateway[i]:
+            found.append((pod[i], device[i], port[i], 'gateway', a, [device[i]]))
+
+    found.sort(key=lambda c: c[:4])
+    return [AddressConflict(kind=kind, address=a, lab=ports.pods[n][0], pod=ports.pods[n][1],
+                            devices=devices, port=p)
+            for n, _, p, kind, a, devices in found]
+
+
+def check_pod_addresses(pod: PodCreate) -> None:
+    """Refuse a pod with blocking address conflicts, naming all of them.
+
+    Raises:
+        DuplicateIPv4Error: If devices of the pod share a primary address
+        AddressOutsideNetworkError: If an address is outside its parent network
+    """
+    conflicts = find_conflicts(pod)
+    duplicates = [c for c in conflicts if c.kind == 'duplicate']
+    if duplicates:
+        raise DuplicateIPv4Error("Duplicate IPv4 addresses not allowed: " + ", ".join(
+            f"{c.address} (devices {', '.join(map(str, c.devices))})" for c in duplicates))
+    outside = [c for c in conflicts if c.kind == 'outside_network']
+    if outside:
+        raise AddressOutsideNetworkError("Interface addresses outside their network: " + ", ".join(
+            f"{c.address} (device {c.devices[0]} port {c.port})" for c in outside))
+
+
+def check_device_addresses(device: DeviceCreate | DeviceExists) -> None:
+    """Refuse a device added to or patched within a pod if an address is outside its parent network.
+
+    Raises:
+        AddressOutsideNetworkError: If an address is outside its parent network
+    """
+    outside = [c for c in find_conflicts(PodCreate.model_construct(assets=[device]))
+               if c.kind == 'outside_network']
+    if outside:
+        raise AddressOutsideNetworkError("Interface addresses outside their network: " + ", ".join(
+            f"{c.address} (port {c.port})" for c in outside))
@@ -0,0 +1,36 @@
+from typing import Callable
+from app.models.pod_model import DeviceExists, DevicePage, DeviceQuery
+from app.services.metrics import phase
+
+
+def device_matcher(query: DeviceQuery) -> Callable[[DeviceExists], bool]:
+    """Return a predicate applying a query's filters to a device."""
+    checks = []
+    if query.name_prefix is not None:
+        prefix = query.name_prefix
+        checks.append(lambda device: device.name.startswith(prefix))
+    if query.row is not None:
+        row = query.row
+        checks.append(lambda device: device.location.row == row)
+    if query.aisle is not None:
+        aisle = query.aisle
+        checks.append(lambda device: device.location.aisle == aisle)
+    if query.cidr is not None:
+        lo, hi = int(query.cidr.network_address), int(query.cidr.broadcast_address)
+        checks.append(lambda device: any(lo <= int(port.interface.address) <= hi
+                                         for port in device.ports))
+    return lambda device: all(check(device) for check in checks)
+
+
+def projected_fields(query: DeviceQuery) -> set[str]:
+    """Return the DeviceExists fields a query asks for (id always included)."""
+    if query.fields is None:
+        return set(DeviceExists.model_fields)
+    return {'id', *query.fields}
+
+
+def encode_device_page(page: DevicePage, query: DeviceQuery) -> bytes:
+    """Serialize a page as JSON, writing only the projected device fields."""
+    with phase('serialization'):
+        return page.model_dump_json(
+            include={'devices': {'__all__': projected_fields(query)}, 'next_cursor': True})
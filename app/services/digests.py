@@ -0,0 +1,29 @@
+from hashlib import blake2b
+from typing import Iterable
+
+from app.models.pod_model import DeviceCreate, DeviceExists
+
+
+def device_digest(device: DeviceCreate | DeviceExists) -> bytes:
+    """Digest of a device's content, leaving out its id.
+
+    A DeviceCreate and the DeviceExists stored from it have the same digest,
+    so an incoming device can be compared with a stored one directly.
+    """
+    location = device.location
+    content = (
+        device.name,
+        device.description,
+        location.row,
+        location.aisle,
+        tuple(access.url for access in device.accessMethods),
+        tuple((int(port.interface.address), int(port.interface.parent.network.network_address),
+               port.interface.parent.network.prefixlen, int(port.interface.parent.gateway))
+              for port in device.ports),
+    )
+    return blake2b(repr(content).encode(), digest_size=16).digest()
+
+
+def pod_digest(devices: Iterable[DeviceCreate | DeviceExists]) -> str:
+    """Digest of a pod's devices, ignoring their ids and their order."""
+    return blake2b(b''.join(sorted(map(device_digest, devices))), digest_size=16).hexdigest()
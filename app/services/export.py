@@ -0,0 +1,85 @@
+import zlib
+from typing import Iterable, Iterator
+from app.Exceptions.exceptions import LabNotFoundError, PodNotFoundError
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _iter_lab_parts(lab_id: str, lab_db: LabDB, pod_db: PodDB) -> Iterator[bytes]:
+    """Yield one lab as LabExists JSON, a pod at a time.
+
+    Raises:
+        LabNotFoundError: If the lab was deleted before it was started.
+    """
+    meta = lab_db.get_lab_meta(lab_id).model_dump_json().encode()
+    pod_ids = pod_db.get_lab_pod_ids(lab_id)
+
+    # LabMetaExists has LabExists' fields in order, less the pods
+    yield meta[:-1] + b',"pods":['
+    sep = b''
+    for pod_id in pod_ids:
+        try:
+            pod = pod_db.get_pod_by_id(lab_id, pod_id)
+        except (LabNotFoundError, PodNotFoundError):
+            continue
+        yield sep + pod.model_dump_json().encode()
+        sep = b','
+    yield b']}'
+
+
+def iter_export(lab_db: LabDB, pod_db: PodDB, ndjson: bool = False) -> Iterator[bytes]:
+    """Yield the whole inventory as LabExistsDump JSON (or one lab per NDJSON line).
+
+    Only one pod is encoded at a time, so memory stays bounded however big
+    the inventory is. Labs and pods are read as they are reached, so the
+    export is not a point-in-time snapshot: labs or pods deleted while it
+    runs are skipped.
+
+    Args:
+        lab_db: Lab store to export
+        pod_db: Pod store to export
+        ndjson: Write each LabExists on its own line instead of one document
+
+    Yields:
+        Pieces of the encoded export
+    """
+    if not ndjson:
+        yield b'{"data":['
+    sep = b''
+    for lab_id in lab_db.get_lab_ids():
+        parts = _iter_lab_parts(lab_id, lab_db, pod_db)
+        try:
+            first = next(parts)
+        except LabNotFoundError:
+            continue
+        yield first if ndjson else sep + first
+        yield from parts
+        if ndjson:
+            yield b'\n'
+        sep = b','
+    if not ndjson:
+        yield b']}'
+
+
+def coalesce(parts: Iterable[bytes], size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Regroup small pieces into chunks of about ``size`` bytes."""
+    buf = bytearray()
+    for part in parts:
+        buf += part
+        if len(buf) >= size:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of chunks incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
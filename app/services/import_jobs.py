@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import suppress
+from typing import BinaryIO
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.Exceptions.exceptions import ImportJobNotFoundError
+from app.models.import_job_model import ImportJobError, ImportJobStatus
+from app.services.importer import COMMIT_ERRORS, LabImporter, commit_lab
+from app.services.json_stream import iter_json_array_bytes
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+
+
+class ImportJob:
+    """A dump being imported in the background, and its progress so far."""
+
+    def __init__(self, path: str, size: int):
+        self.id = str(uuid.uuid4())
+        self.path = path
+        self.status = ImportJobStatus(id=self.id, status='queued', bytes_total=size)
+        self.task: asyncio.Task | None = None
+        self._started: float | None = None
+        self._finished: float | None = None
+
+    def snapshot(self) -> ImportJobStatus:
+        """Return the job's progress with up to date throughput figures."""
+        status = self.status.model_copy(deep=True)
+        if self._started is not None:
+            elapsed = (self._finished or time.monotonic()) - self._started
+            status.elapsed = round(elapsed, 3)
+            if elapsed > 0:
+                status.labs_per_second = round(status.labs / elapsed, 2)
+                status.devices_per_second = round(status.devices / elapsed, 2)
+        return status
+
+
+class ImportJobs:
+    """Runs dump imports as background tasks and keeps their progress.
+
+    The dump is read from a spooled temp file (the request's upload is closed
+    once the response is sent), validated on the LabImporter's worker pool
+    and committed one lab at a time, exactly as ``/upload/bulk/stream`` does.
+    Finished jobs are kept, up to ``keep`` of them, so they can still be
+    polled.
+    """
+
+    def __init__(self, importer: LabImporter, keep: int = 100):
+        self.importer = importer
+        self.keep = keep
+        self._jobs: OrderedDict[str, ImportJob] = OrderedDict()
+
+    def submit(self, path: str, lab_db: LabDB, pod_db: PodDB) -> ImportJobStatus:
+        """Start importing the dump spooled at ``path``; the job owns the file.
+
+        Args:
+            path: Temp file holding the uploaded JSON dump
+            lab_db: Lab store to commit into
+            pod_db: Pod store to commit into
+
+        Returns:
+            The new job's status
+        """
+        job = ImportJob(path, os.path.getsize(path))
+        self._jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.get_running_loop().create_task(self._run(job, lab_db, pod_db))
+        # a callback rather than _run's cleanup: a task cancelled before its
+        # first step never runs the coroutine at all
+        job.task.add_done_callback(lambda task: os.unlink(job.path))
+        return job.snapshot()
+
+    def get(self, job_id: str) -> ImportJobStatus:
+        """Return a job's progress.
+
+        Raises:
+            ImportJobNotFoundError
+        """
+        return self._get(job_id).snapshot()
+
+    def cancel(self, job_id: str) -> ImportJobStatus:
+        """Stop a job after the lab it is committing; labs already committed stay.
+
+        Raises:
+            ImportJobNotFoundError
+        """
+        job = self._get(job_id)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            job.status.status = 'cancelled'
+        return job.snapshot()
+
+    def cancel_all(self) -> None:
+        """Cancel every job still running, e.g. on shutdown."""
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+                job.status.status = 'cancelled'
+
+    def _get(self, job_id: str) -> ImportJob:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ImportJobNotFoundError(f'Import job {job_id} does not exist')
+        return job
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job.task is not None and job.task.done()]
+        for job_id in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job_id]
+
+    async def _run(self, job: ImportJob, lab_db: LabDB, pod_db: PodDB) -> None:
+        status = job.status
+        status.status = 'running'
+        job._started = time.monotonic()
+
+        try:
+            with open(job.path, 'rb') as dump:
+                async for validated in self.importer.validate(
+                        iter_json_array_bytes(_reader(dump, status), key='data')):
+                    if validated.error is not None:
+                        status.errors.append(
+                            ImportJobError(index=validated.index, detail=validated.error))
+                        continue
+                    # off the event loop: committing waits on the store locks
+                    commit = asyncio.ensure_future(
+                        run_in_threadpool(commit_lab, validated.lab, lab_db, pod_db))
+                    try:
+                        await asyncio.wait({commit})
+                    except asyncio.CancelledError:
+                        # the lab lands anyway; report it before stopping
+                        await asyncio.wait({commit})
+                        with suppress(Exception):
+                            _record(status, validated.index, commit)
+                        raise
+                    _record(status, validated.index, commit)
+            status.status = 'done'
+        except asyncio.CancelledError:
+            status.status = 'cancelled'
+            raise
+        except ValueError as exc:
+            status.status = 'failed'
+            status.detail = f'Invalid JSON: {exc}'
+        except Exception as exc:
+            status.status = 'failed'
+            status.detail = str(exc) or type(exc).__name__
+        finally:
+            job._finished = time.monotonic()
+
+
+def _record(status: ImportJobStatus, index: int, commit: asyncio.Future) -> None:
+    """Add the outcome of committing one lab to a job's progress."""
+    exc = commit.exception()
+    if isinstance(exc, COMMIT_ERRORS):
+        status.errors.append(ImportJobError(index=index, detail=str(exc) or type(exc).__name__))
+        return
+    if exc is not None:
+        raise exc
+    lab_exists = commit.result()
+    status.labs += 1
+    status.pods += len(lab_exists.pods)
+    status.devices += sum(len(pod.assets) for pod in lab_exists.pods)
+    status.lab_ids.append(lab_exists.id)
+
+
+def _reader(dump: BinaryIO, status: ImportJobStatus):
+    """Async ``read(size)`` over a spooled dump that records bytes read."""
+    async def read(size: int) -> bytes:
+        chunk = await asyncio.to_thread(dump.read, size)
+        status.bytes_read += len(chunk)
+        return chunk
+    return read
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, NamedTuple
+
+from pydantic import ValidationError
+
+from app.models.lab_model import LabCreate, LabExists
+from app.models.lab_db_model import LabMetaCreate
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.conflicts import BLOCKING, find_conflicts
+from app.Exceptions.exceptions import (
+    AddressOutsideNetworkError, DuplicateIPv4Error, LabAlreadyExistsError, LabNotFoundError,
+    NetworkOverlapError)
+
+# what committing a validated lab can still fail on, reported against that
+# lab while the rest of the dump goes on
+COMMIT_ERRORS = (DuplicateIPv4Error, AddressOutsideNetworkError, NetworkOverlapError,
+                 LabAlreadyExistsError, LabNotFoundError)
+
+
+class ValidatedLab(NamedTuple):
+    """Outcome of validating one lab of a dump.
+
+    Exactly one of ``lab`` and ``error`` is set. ``error`` is either a list of
+    pydantic error dicts, a list of AddressConflict dicts or a message string.
+    """
+    index: int
+    lab: LabCreate | None
+    error: Any = None
+
+
+def validate_lab(raw: bytes) -> tuple[LabCreate | None, Any]:
+    """Parse and validate the JSON of one lab.
+
+    Runs in a worker process, so it only touches the models. Besides the
+    pydantic checks it rejects a lab with blocking address conflicts
+    (duplicate primary addresses in a pod, addresses outside their network),
+    the checks a brand new lab can fail on when it is committed; validated
+    labs therefore commit without partial failures.
+
+    Args:
+        raw: The lab's JSON bytes.
+
+    Returns:
+        ``(lab, None)`` on success or ``(None, error)``; the error of a lab
+        with conflicts lists all of them, as AddressConflict dicts
+    """
+    try:
+        lab = LabCreate.model_validate_json(raw)
+    except ValidationError as exc:
+        return None, json.loads(exc.json(include_url=False))
+
+    conflicts = [c for c in find_conflicts(lab) if c.kind in BLOCKING]
+    if conflicts:
+        return None, [c.model_dump(mode='json', exclude_none=True) for c in conflicts]
+
+    return lab, None
+
+
+def commit_lab(lab: LabCreate, lab_db: LabDB, pod_db: PodDB) -> LabExists:
+    """Create a validated lab's meta and all of its pods."""
+    lab_meta_exists = lab_db.create_new_lab_meta(
+        LabMetaCreate(
+            name=lab.name,
+            location=lab.location,
+            building=lab.building,
+            floor=lab.floor), pod_db)
+
+    pod_exists = pod_db.create_pods(lab_meta_exists.id, lab.pods)
+
+    return LabExists(
+        **lab_meta_exists.model_dump(),
+        pods=pod_exists
+    )
+
+
+class LabImporter:
+    """Validates the labs of a dump in parallel, yielding them in order.
+
+    Labs are independent, so parsing and validation (the expensive part of
+    an import) is spread over a process pool of ``workers`` processes while
+    the event loop stays free to serve other requests. Results come back in
+    submission order so the caller can commit them one at a time as the
+    single writer to the stores. With ``workers=0`` validation runs on the
+    loop's default thread pool instead.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor | None:
+        if self.workers > 0 and self._pool is None:
+            # spawn: the API process runs threads (log flusher, uvicorn), which
+            # forked children must not inherit
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def validate(self, raw_labs: AsyncIterator[bytes]) -> AsyncIterator[ValidatedLab]:
+        """Validate raw lab JSON as it arrives, yielding results in order.
+
+        At most a few labs per worker are in flight, so memory stays bounded
+        however large the dump is.
+
+        Args:
+            raw_labs: The JSON bytes of each lab, e.g. from iter_json_array_bytes
+
+        Yields:
+            A ValidatedLab per input lab, in input order
+
+        Raises:
+            ValueError: If ``raw_labs`` does (the document is not valid JSON)
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        window = 4 * max(self.workers, 1)
+        pending: deque[asyncio.Future] = deque()
+        index = 0
+
+        try:
+            async for raw in raw_labs:
+                pending.append(loop.run_in_executor(executor, validate_lab, raw))
+                if len(pending) >= window:
+                    yield ValidatedLab(index, *await pending.popleft())
+                    index += 1
+
+            while pending:
+                yield ValidatedLab(index, *await pending.popleft())
+                index += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """Shut the worker processes down."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,224 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from ipaddress import IPv4Address, IPv4Network
+from typing import Iterable, Iterator
+
+
+def host_bounds(net: IPv4Network) -> tuple[int, int]:
+    """Return the first and last usable host of a network as ints.
+
+    Mirrors ``IPv4Network.hosts()``: the network and broadcast addresses are
+    excluded except for /31 and /32 networks.
+    """
+    first = int(net.network_address)
+    last = int(net.broadcast_address)
+    if net.prefixlen < 31:
+        return first + 1, last - 1
+    return first, last
+
+
+class IPv4RangeSet:
+    """A set of IPv4 addresses stored as sorted, coalesced integer ranges.
+
+    Memory and lookup cost depend on how fragmented the set is rather than
+    on how many addresses it holds or how large the enclosing subnet is.
+    Membership, insertion and removal are O(log n) in the number of ranges.
+    The range bounds are kept in ``array('I')``, 4 bytes each, instead of
+    lists of int objects; iteration yields addresses already in order.
+    """
+
+    __slots__ = ("_starts", "_ends", "_count")
+
+    def __init__(self, addresses: Iterable[IPv4Address | int] = ()):
+        self._starts = array("I")
+        self._ends = array("I")
+        self._count = 0
+        self.update(addresses)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, addr: IPv4Address | int) -> bool:
+        a = int(addr)
+        i = bisect_right(self._starts, a) - 1
+        return i >= 0 and self._ends[i] >= a
+
+    def __iter__(self) -> Iterator[IPv4Address]:
+        for start, end in zip(self._starts, self._ends):
+            for a in range(start, end + 1):
+                yield IPv4Address(a)
+
+    def ranges(self) -> Iterator[tuple[int, int]]:
+        """Yield the stored ``(first, last)`` integer ranges in order."""
+        return zip(self._starts, self._ends)
+
+    def add(self, addr: IPv4Address | int) -> bool:
+        """Add an address.
+
+        Returns:
+            True if the address was added, False if it was already present.
+        """
+        a = int(addr)
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, a) - 1
+        if i >= 0 and ends[i] >= a:
+            return False
+
+        joins_left = i >= 0 and ends[i] == a - 1
+        joins_right = i + 1 < len(starts) and starts[i + 1] == a + 1
+
+        if joins_left and joins_right:
+            ends[i] = ends[i + 1]
+            del starts[i + 1]
+            del ends[i + 1]
+        elif joins_left:
+            ends[i] = a
+        elif joins_right:
+            starts[i + 1] = a
+        else:
+            starts.insert(i + 1, a)
+            ends.insert(i + 1, a)
+
+        self._count += 1
+        return True
+
+    def update(self, addresses: Iterable[IPv4Address | int]) -> int:
+        """Add many addresses at once.
+
+        The new addresses are sorted and coalesced into ranges, then merged
+        with the stored ranges in one linear pass, instead of one insertion
+        into the arrays per address.
+
+        Returns:
+            How many of the addresses were not already present.
+        """
+        new = sorted({int(a) for a in addresses})
+        if not new:
+            return 0
+
+        starts, ends = [], []
+        start = prev = new[0]
+        for a in new:
+            if a > prev + 1:
+                starts.append(start)
+                ends.append(prev)
+                start = a
+            prev = a
+        starts.append(start)
+        ends.append(prev)
+
+        before = self._count
+        if self._starts:
+            merged_starts, merged_ends = [], []
+            for start, end in merge(zip(self._starts, self._ends), zip(starts, ends)):
+                if merged_ends and start <= merged_ends[-1] + 1:
+                    if end > merged_ends[-1]:
+                        merged_ends[-1] = end
+                else:
+                    merged_starts.append(start)
+                    merged_ends.append(end)
+            starts, ends = merged_starts, merged_ends
+
+        self._starts = array("I", starts)
+        self._ends = array("I", ends)
+        self._count = sum(ends) - sum(starts) + len(starts)
+        return self._count - before
+
+    def discard(self, addr: IPv4Address | int) -> bool:
+        """Remove an address if present.
+
+        Returns:
+            True if the address was removed, False if it was not present.
+        """
+        a = int(addr)
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, a) - 1
+        if i < 0 or ends[i] < a:
+            return False
+
+        start, end = starts[i], ends[i]
+        if start == end:
+            del starts[i]
+            del ends[i]
+        elif a == start:
+            starts[i] = a + 1
+        elif a == end:
+            ends[i] = a - 1
+        else:
+            ends[i] = a - 1
+            starts.insert(i + 1, a + 1)
+            ends.insert(i + 1, end)
+
+        self._count -= 1
+        return True
+
+    def remove(self, addr: IPv4Address | int) -> None:
+        """Remove an address.
+
+        Raises:
+            KeyError: If the address is not present.
+        """
+        if not self.discard(addr):
+            raise KeyError(addr)
+
+    def iter_free(self, lo: int, hi: int, exclude: Iterable[int] = ()) -> Iterator[tuple[int, int]]:
+        """Yield the ``(first, last)`` ranges within ``[lo, hi]`` not in the set.
+
+        Addresses in ``exclude`` (a few, such as gateways) count as used too.
+        """
+        points = sorted({a for a in exclude if lo <= a <= hi})
+        if not points:
+            yield from self._iter_free(lo, hi)
+            return
+        i = 0
+        for start, end in self._iter_free(lo, hi):
+            while i < len(points) and points[i] < start:
+                i += 1
+            while i < len(points) and points[i] <= end:
+                if points[i] > start:
+                    yield start, points[i] - 1
+                start = points[i] + 1
+                i += 1
+            if start <= end:
+                yield start, end
+
+    def _iter_free(self, lo: int, hi: int) -> Iterator[tuple[int, int]]:
+        starts, ends = self._starts, self._ends
+        i = bisect_right(starts, lo) - 1
+        cur = lo
+        if i >= 0 and ends[i] >= lo:
+            cur = ends[i] + 1
+        i += 1
+
+        while cur <= hi:
+            if i < len(starts) and starts[i] <= hi:
+                if starts[i] > cur:
+                    yield cur, starts[i] - 1
+                cur = ends[i] + 1
+                i += 1
+            else:
+                yield cur, hi
+                return
+
+    def first_free(self, lo: int, hi: int, exclude: Iterable[int] = ()) -> int | None:
+        """Return the lowest address within ``[lo, hi]`` in neither the set nor ``exclude``."""
+        return next((start for start, _ in self.iter_free(lo, hi, exclude)), None)
+
+    def count_within(self, lo: int, hi: int) -> int:
+        """Return how many addresses of the set lie within ``[lo, hi]``.
+
+        Counted as the total minus the ranges outside the window, so the
+        cost is O(log n) plus the number of ranges outside it, which is
+        usually none.
+        """
+        starts, ends = self._starts, self._ends
+        first = bisect_left(ends, lo)       # ranges before it end below lo
+        last = bisect_right(starts, hi)     # ranges from it start above hi
+        if first >= last:
+            return 0
+        count = self._count
+        count -= sum(ends[:first]) - sum(starts[:first]) + first
+        count -= sum(ends[last:]) - sum(starts[last:]) + len(starts) - last
+        count -= max(0, lo - starts[first]) + max(0, ends[last - 1] - hi)
+        return count
@@ -0,0 +1,167 @@
+import re
+from typing import AsyncIterator, Awaitable, Callable
+
+# Characters that change the scanner's state outside / inside a JSON string.
+_STRUCTURAL = re.compile(rb'[{}\[\]",]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+
+
+class JSONArrayScanner:
+    """Incrementally pull the elements of one top-level array out of a JSON
+    object that arrives in arbitrary chunks.
+
+    Only the bytes of the element currently being read are buffered, so a
+    document like ``{"data": [{...}, {...}, ...]}`` can be consumed one
+    element at a time no matter how large the array is. Elements are
+    returned as raw JSON bytes; decoding is left to the caller.
+    """
+
+    def __init__(self, key: str):
+        self._key = key.encode()
+        self._buf = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        self._expect_key = False
+        self._last_key: bytes | None = None
+        self._in_array = False
+        self._item_start: int | None = None
+
+    def _compact(self) -> None:
+        """Drop bytes that can no longer be part of an element or key."""
+        if self._item_start is not None:
+            keep = self._item_start
+        elif self._in_string:
+            keep = self._string_start
+        else:
+            keep = self._pos
+        if keep:
+            del self._buf[:keep]
+            self._pos -= keep
+            self._string_start -= keep
+            if self._item_start is not None:
+                self._item_start -= keep
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Scan the next chunk of the document.
+
+        Args:
+            chunk: The next bytes of the JSON document.
+
+        Returns:
+            The raw bytes of every array element completed by this chunk.
+
+        Raises:
+            ValueError: If an element of the array is not a JSON object or
+                the document is structurally invalid.
+        """
+        self._compact()
+        self._buf += chunk
+        buf = self._buf
+        items = []
+
+        while True:
+            if self._in_string:
+                m = _STRING_SPECIAL.search(buf, self._pos)
+                if m is None:
+                    self._pos = len(buf)
+                    break
+                i = m.start()
+                if buf[i] == 0x5C:  # backslash, skip the escaped byte
+                    if i + 1 >= len(buf):
+                        self._pos = i
+                        break
+                    self._pos = i + 2
+                    continue
+                self._pos = i + 1
+                self._in_string = False
+                if self._depth == 1 and self._expect_key:
+                    self._last_key = bytes(buf[self._string_start + 1:i])
+                    self._expect_key = False
+                continue
+
+            m = _STRUCTURAL.search(buf, self._pos)
+            # between elements only whitespace may precede the next , { or ]
+            # (numbers, true, false and null have no structural byte)
+            if (self._in_array and self._depth == 2
+                    and buf[self._pos:len(buf) if m is None else m.start()].strip()):
+                raise ValueError("Array elements must be JSON objects")
+            if m is None:
+                self._pos = len(buf)
+                break
+            i = m.start()
+            c = buf[i]
+            self._pos = i + 1
+
+            if c == 0x22:  # "
+                if self._in_array and self._depth == 2:
+                    raise ValueError("Array elements must be JSON objects")
+                self._in_string = True
+                self._string_start = i
+            elif c in (0x7B, 0x5B):  # { [
+                if self._in_array and self._depth == 2:
+                    if c != 0x7B:
+                        raise ValueError("Array elements must be JSON objects")
+                    self._item_start = i
+                elif self._depth == 0:
+                    if c != 0x7B:
+                        raise ValueError("Document must be a JSON object")
+                    self._expect_key = True
+                elif (self._depth == 1 and c == 0x5B
+                      and self._last_key == self._key):
+                    self._in_array = True
+                self._depth += 1
+            elif c in (0x7D, 0x5D):  # } ]
+                self._depth -= 1
+                if self._depth < 0:
+                    raise ValueError("Unbalanced JSON document")
+                if self._in_array:
+                    if self._depth == 2 and self._item_start is not None:
+                        items.append(bytes(buf[self._item_start:self._pos]))
+                        self._item_start = None
+                    elif self._depth == 1:
+                        self._in_array = False
+            elif c == 0x2C and self._depth == 1:  # ,
+                self._expect_key = True
+                self._last_key = None
+
+        return items
+
+    def close(self) -> None:
+        """Signal the end of the document.
+
+        Raises:
+            ValueError: If the document ended in the middle of a value.
+        """
+        if self._depth != 0 or self._in_string:
+            raise ValueError("Truncated JSON document")
+
+
+async def iter_json_array_bytes(
+    read: Callable[[int], Awaitable[bytes]],
+    key: str = "data",
+    chunk_size: int = 64 * 1024,
+) -> AsyncIterator[bytes]:
+    """Yield the raw JSON bytes of each element of the top-level ``key`` array.
+
+    Args:
+        read: An async ``read(size)`` callable such as ``UploadFile.read``.
+        key: Name of the top-level array to stream.
+        chunk_size: Number of bytes to read per call.
+
+    Yields:
+        Each element of the array as undecoded JSON bytes.
+
+    Raises:
+        ValueError: If the document is not valid JSON of the expected shape.
+    """
+    scanner = JSONArrayScanner(key)
+    while True:
+        chunk = await read(chunk_size)
+        if not chunk:
+            break
+        for item in scanner.feed(chunk):
+            yield item
+    scanner.close()
+
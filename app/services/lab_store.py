@@ -2,10 +2,40 @@ from typing import Dict
 from app.models.lab_db_model import *
 from app.Exceptions.exceptions import LabNotFoundError, LabAlreadyExistsError
 from app.services.pod_store import PodDB
+from app.services.persistence import MemoryBackend, StorageBackend
+from app.services.locks import StoreLocks
+from app.services.change_feed import ChangeFeed
+from app.services.metrics import instrument_store
 
+@instrument_store
 class LabDB: 
-    def __init__(self):
+    def __init__(
+        self,
+        backend: StorageBackend | None = None,
+        locks: StoreLocks | None = None,
+        changes: ChangeFeed | None = None,
+    ):
         self.labs_by_id: Dict[str, LabMetaCreate] = {}
+        # durability hook; shared with the PodDB so both log in one order
+        self.backend = backend or MemoryBackend()
+        # pass the PodDB's locks so both stores share one lock hierarchy
+        self.locks = locks or StoreLocks()
+        # change feed shared with the PodDB, None to publish nothing
+        self.changes = changes
+
+    # ---------- storage primitives ----------
+
+    def _put_meta(self, lab_id: str, lab: LabMetaCreate) -> None:
+        self.labs_by_id[lab_id] = lab
+        self.backend.append(('labs', 'put_meta', lab_id, lab))
+        if self.changes is not None:
+            self.changes.publish('put_meta', lab_id, lab=LabMetaExists(id=lab_id, **lab.model_dump()))
+
+    def _drop_meta(self, lab_id: str) -> None:
+        del self.labs_by_id[lab_id]
+        self.backend.append(('labs', 'drop_meta', lab_id))
+        if self.changes is not None:
+            self.changes.publish('drop_meta', lab_id)
 
     def get_lab_meta(self, lab_id: str) -> LabMetaExists: 
         lab = self.labs_by_id.get(lab_id)
@@ -15,10 +45,15 @@ class LabDB:
         
         raise LabNotFoundError(f'Lab {lab_id} does not exist')
     
+    def get_lab_ids(self) -> list[str]:
+        """Return the ids of every lab, in creation order."""
+        return list(self.labs_by_id)
+
     def put_lab_meta(self, lab_id: str, lab: LabMetaExists) -> LabMetaExists:
 
         try: 
-            self.labs_by_id[lab_id] = lab
+            with self.locks.lab(lab_id):
+                self._put_meta(lab_id, lab)
             return LabMetaExists(id=lab_id, **lab.model_dump())
         
         except KeyError:
@@ -26,14 +61,16 @@ class LabDB:
     
     def create_new_lab_meta(self, lab: LabMetaCreate, lab_pods: PodDB) -> LabMetaExists:
         
-        lab_id = lab_pods._init_lab()
+        with self.locks.writing():
+            lab_id = lab_pods._init_lab()
 
-        self.labs_by_id[lab_id] = lab
+            self._put_meta(lab_id, lab)
 
         return LabMetaExists(id=lab_id, **lab.model_dump())
  
     def delete_lab_meta(self, lab_id) -> bool:
-        if lab_id not in self.labs_by_id:
-            raise LabNotFoundError(f'Lab {lab_id} does not exist')
-        del self.labs_by_id[lab_id]
+        with self.locks.lab(lab_id):
+            if lab_id not in self.labs_by_id:
+                raise LabNotFoundError(f'Lab {lab_id} does not exist')
+            self._drop_meta(lab_id)
         return True
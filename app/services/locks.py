@@ -0,0 +1,130 @@
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+
+class RWLock:
+    """Shared/exclusive lock. Waiting writers hold off new readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class StoreLocks:
+    """Lock hierarchy for the in-memory stores.
+
+    Every write holds the store-wide lock shared, so ``exclusive()`` (used to
+    capture snapshots) waits for in-flight writes and holds off new ones.
+    Below it, changes to a lab's structure (its pods, its meta, deleting it)
+    hold that lab's lock exclusively, while changes inside a pod hold the lab
+    lock shared and the pod's own lock exclusively. Writes to different pods
+    therefore never wait on each other.
+
+    Scopes are reentrant per thread: a method that already holds a lab's
+    lock can call one that asks for a pod of that lab. The one ordering not
+    supported is asking for a lab scope from inside a pod scope of the same
+    lab: it would wait on its own shared hold forever, so it raises
+    RuntimeError instead. Locks of labs and pods nobody is using are
+    dropped automatically.
+    """
+
+    def __init__(self):
+        self._store = RWLock()
+        self._mutex = threading.Lock()
+        self._locks: weakref.WeakValueDictionary[Hashable, RWLock] = weakref.WeakValueDictionary()
+        self._local = threading.local()
+        # held while checking a new pod network against every other lab's
+        self.networks = threading.Lock()
+
+    def _held(self) -> set:
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = set()
+        return held
+
+    def _lock_for(self, key: Hashable) -> RWLock:
+        with self._mutex:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = RWLock()
+            return lock
+
+    @contextmanager
+    def _scope(self, key: Hashable, acquire, release) -> Iterator[None]:
+        held = self._held()
+        if key in held:
+            yield
+            return
+        acquire()
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            release()
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Scope for a write that creates new entries (e.g. a new lab)."""
+        with self._scope('store', self._store.acquire_read, self._store.release_read):
+            yield
+
+    @contextmanager
+    def lab(self, lab_id: str) -> Iterator[None]:
+        """Scope for a write to a lab's structure or meta."""
+        held = self._held()
+        if ('lab', lab_id, 'read') in held and ('lab', lab_id, 'write') not in held:
+            raise RuntimeError(f'Lab {lab_id} scope requested inside one of its pod scopes')
+        lock = self._lock_for(('lab', lab_id))
+        with self.writing():
+            with self._scope(('lab', lab_id, 'write'), lock.acquire_write, lock.release_write):
+                yield
+
+    @contextmanager
+    def pod(self, lab_id: str, pod_id: str) -> Iterator[None]:
+        """Scope for a write (or consistent read) inside one pod."""
+        held = self._held()
+        if ('lab', lab_id, 'write') in held:
+            yield
+            return
+        lab_lock = self._lock_for(('lab', lab_id))
+        pod_lock = self._lock_for(('pod', lab_id, pod_id))
+        with self.writing():
+            with self._scope(('lab', lab_id, 'read'), lab_lock.acquire_read, lab_lock.release_read):
+                with self._scope(('pod', lab_id, pod_id), pod_lock.acquire_write, pod_lock.release_write):
+                    yield
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold off every writer, waiting for the ones in flight to finish."""
+        with self._scope('store', self._store.acquire_write, self._store.release_write):
+            yield
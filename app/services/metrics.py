@@ -0,0 +1,367 @@
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from time import perf_counter
+from typing import Callable, Iterable, Iterator
+
+from fastapi.routing import APIRoute
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._samples(labels, value))
+        return lines
+
+    def _samples(self, labels: tuple, value) -> list[str]:
+        return [f'{self.name}{_labels(self.labelnames, labels)} {value}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # per-bucket counts (the last is +Inf), sum
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][i] += 1
+            state[1] += value
+
+    def _samples(self, labels: tuple, value) -> list[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float('inf')), counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """The metrics of the process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STORE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Requests handled, by route and status.', ('method', 'route', 'status')))
+HTTP_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time from request start to the last response byte.',
+    ('method', 'route'), LATENCY_BUCKETS))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    'http_requests_in_flight', 'Requests being handled.'))
+HTTP_REQUEST_SIZE = registry.register(Histogram(
+    'http_request_size_bytes', 'Request body sizes.', ('method', 'route'), SIZE_BUCKETS))
+HTTP_RESPONSE_SIZE = registry.register(Histogram(
+    'http_response_size_bytes', 'Response body sizes.', ('method', 'route'), SIZE_BUCKETS))
+HTTP_PHASE = registry.register(Histogram(
+    'http_request_phase_seconds',
+    'Exclusive time a request spent per phase: validation (parameters and body), '
+    'handler, store, serialization (response models and JSON encoding).',
+    ('route', 'phase'), LATENCY_BUCKETS))
+STORE_DURATION = registry.register(Histogram(
+    'store_call_duration_seconds', 'Time spent in each public store method, lock waits included.',
+    ('store', 'method'), STORE_BUCKETS))
+INVENTORY_LABS = registry.register(Gauge('inventory_labs', 'Labs in the inventory.'))
+INVENTORY_PODS = registry.register(Gauge('inventory_pods', 'Pods in the inventory.'))
+INVENTORY_DEVICES = registry.register(Gauge('inventory_devices', 'Devices in the inventory.'))
+INVENTORY_ADDRESSES = registry.register(Gauge(
+    'inventory_tracked_addresses', 'Primary device addresses tracked across all pods.'))
+
+
+class RequestTimings:
+    """Exclusive time per phase of one request.
+
+    Phases nest (store calls made while encoding, serialization inside a
+    store method); each phase is charged only the time not spent in the
+    phases inside it, so the phases add up to the request's handling time.
+    """
+
+    __slots__ = ('phases', '_stack', 'endpoint_end', 'threads', 'profiler')
+
+    def __init__(self, profiler=None):
+        self.phases: dict[str, float] = {}
+        self._stack: list[float] = []
+        self.endpoint_end: float | None = None
+        # idents of the threads that ran the endpoint
+        self.threads: set[int] = set()
+        # SlowRequestProfiler told which threads those are, if enabled
+        self.profiler = profiler
+
+    def enter(self) -> None:
+        self._stack.append(0.0)
+
+    def exit(self, name: str, elapsed: float) -> None:
+        inner = self._stack.pop()
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed - inner
+        if self._stack:
+            self._stack[-1] += elapsed
+
+
+_timings: ContextVar[RequestTimings | None] = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def _endpoint_thread() -> Iterator[None]:
+    """Record the thread running the current request's endpoint for the profiler."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    ident = threading.get_ident()
+    timings.threads.add(ident)
+    profiler = timings.profiler
+    if profiler is None:
+        yield
+        return
+    profiler.thread_started(ident)
+    try:
+        yield
+    finally:
+        profiler.thread_finished(ident)
+
+
+class phase:
+    """Charge the time spent in a block to a phase of the current request."""
+
+    __slots__ = ('name', '_timings', '_start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        self._timings = _timings.get()
+        self._start = perf_counter()
+        if self._timings is not None:
+            self._timings.enter()
+
+    def __exit__(self, *exc) -> None:
+        if self._timings is not None:
+            self._timings.exit(self.name, perf_counter() - self._start)
+
+
+def instrument_store(cls):
+    """Class decorator timing every public method of a store.
+
+    Each call is observed in store_call_duration_seconds and charged to the
+    current request's "store" phase.
+    """
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith('_') and callable(attr):
+            setattr(cls, name, _timed(cls.__name__, name, attr))
+    return cls
+
+
+def _timed(store: str, name: str, method: Callable) -> Callable:
+    @wraps(method)
+    def timed(*args, **kwargs):
+        timings = _timings.get()
+        if timings is not None:
+            timings.enter()
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            if timings is not None:
+                timings.exit('store', elapsed)
+            STORE_DURATION.observe(elapsed, store, name)
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits its handling time into phases.
+
+    Time before the endpoint runs (dependencies, parameter and body
+    validation) is charged to "validation", the endpoint itself to
+    "handler", and time after it returns (response model validation and
+    dumping, JSON rendering) to "serialization".
+    """
+
+    def get_route_handler(self):
+        endpoint = self.dependant.call
+        if getattr(endpoint, '__timed_endpoint__', False):
+            return super().get_route_handler()
+
+        if iscoroutinefunction(endpoint):
+            @wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                with _endpoint_thread(), phase('handler'):
+                    try:
+                        return await endpoint(*args, **kwargs)
+                    finally:
+                        _mark_endpoint_end()
+        else:
+            @wraps(endpoint)
+            def timed_endpoint(*args, **kwargs):
+                # runs on the thread pool
+                with _endpoint_thread(), phase('handler'):
+                    try:
+                        return endpoint(*args, **kwargs)
+                    finally:
+                        _mark_endpoint_end()
+        timed_endpoint.__timed_endpoint__ = True
+        self.dependant.call = timed_endpoint
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = _timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.enter()
+            start = perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                end = perf_counter()
+                timings.exit('validation', end - start)
+                if timings.endpoint_end is not None:
+                    # the framework's share after the endpoint returned
+                    after = end - timings.endpoint_end
+                    timings.phases['validation'] -= after
+                    timings.phases['serialization'] = timings.phases.get('serialization', 0.0) + after
+        return timed_handler
+
+
+def _mark_endpoint_end() -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.endpoint_end = perf_counter()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency, sizes and phases.
+
+    Requests are labelled by their route's path template (``unmatched``
+    when no route matched), so label cardinality stays bounded. An enabled
+    SlowRequestProfiler is told about every request.
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profiler = self.profiler
+        timings = RequestTimings(profiler)
+        token = _timings.set(timings)
+        sizes = [0, 0]
+        status = [500]
+
+        async def counting_receive():
+            message = await receive()
+            if message['type'] == 'http.request':
+                sizes[0] += len(message.get('body', b''))
+            return message
+
+        async def counting_send(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            elif message['type'] == 'http.response.body':
+                sizes[1] += len(message.get('body', b''))
+            await send(message)
+
+        if profiler is not None:
+            profiler.request_started()
+        HTTP_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            end = perf_counter()
+            HTTP_IN_FLIGHT.dec()
+            _timings.reset(token)
+
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            method = scope['method']
+            HTTP_REQUESTS.inc(method, path, str(status[0]))
+            HTTP_DURATION.observe(end - start, method, path)
+            HTTP_REQUEST_SIZE.observe(sizes[0], method, path)
+            HTTP_RESPONSE_SIZE.observe(sizes[1], method, path)
+            for name, seconds in timings.phases.items():
+                HTTP_PHASE.observe(max(seconds, 0.0), path, name)
+            if profiler is not None:
+                profiler.request_finished(method, path, status[0], start, end, timings.threads)
@@ -0,0 +1,297 @@
+import os
+import pickle
+import struct
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager
+
+# Every mutation of PodDB/LabDB is reduced to a record of the form
+# (target, op, *args) where target is "pods" or "labs" and op names the
+# store primitive ``_<op>`` that applied it. Replaying a record calls that
+# same primitive again, so replay rebuilds every derived index as well.
+Record = tuple
+
+_FRAME_HEADER = struct.Struct(">I")
+
+# first record of a log: the generation of the snapshot it follows
+_LOG_START = "wal"
+
+
+class StorageBackend:
+    """Durability hook behind PodDB/LabDB. The base backend keeps nothing."""
+
+    def append(self, record: Record) -> None:
+        """Record a mutation that has just been applied to the store."""
+
+    def load(self) -> tuple[Any, list[Record]]:
+        """Return the latest snapshot (or None) and the records logged after it."""
+        return None, []
+
+    def flush(self) -> None:
+        """Make every appended record durable."""
+
+    def close(self) -> None:
+        """Flush and release any resources."""
+
+
+class MemoryBackend(StorageBackend):
+    """In-process only storage; everything is lost on restart."""
+
+
+class LogBackend(StorageBackend):
+    """Append-only write-ahead log with periodic compacted snapshots.
+
+    Records are pickled into length-prefixed frames and buffered; a
+    background thread writes and fsyncs the buffer every ``commit_interval``
+    seconds, so many requests share one fsync (group commit). Writes are
+    acknowledged before that fsync: a crash can lose the writes of the last
+    interval, which is the durability window the interval sets.
+
+    Once ``snapshot_every`` records have been logged, the flusher thread
+    writes the full state returned by ``snapshot_source`` to a snapshot file
+    and truncates the log, so startup only replays the log tail. Writers are
+    held off with ``quiesce`` while the state is captured.
+
+    Snapshots are numbered, and the log starts with the number of the
+    snapshot it follows. A crash after a new snapshot replaced the old one
+    but before the log was truncated leaves a log that the snapshot
+    already covers; startup recognises it by its older number and skips it
+    instead of replaying it a second time.
+    """
+
+    SNAPSHOT = "snapshot.bin"
+    LOG = "wal.log"
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        commit_interval: float = 0.05,
+        snapshot_every: int = 50_000,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.snapshot_source: Callable[[], Any] | None = None
+        # context that holds off store writers while a snapshot is captured
+        self.quiesce: Callable[[], ContextManager] = nullcontext
+
+        self._pending: list[bytes] = []
+        self._records_since_snapshot = 0
+        # generation of the latest snapshot, 0 before the first one
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._log = None
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    @property
+    def _snapshot_path(self) -> Path:
+        return self.directory / self.SNAPSHOT
+
+    @property
+    def _log_path(self) -> Path:
+        return self.directory / self.LOG
+
+    # ---------- startup ----------
+
+    def load(self) -> tuple[Any, list[Record]]:
+        """Read the snapshot and the log tail, dropping any torn final frame.
+
+        A log left over from before the snapshot is dropped as a whole.
+        Opens the log for appending and starts the group-commit thread.
+        """
+        snapshot = None
+        if self._snapshot_path.exists():
+            with open(self._snapshot_path, "rb") as f:
+                snapshot = pickle.load(f)
+            # snapshots written before they were numbered are a bare state
+            if isinstance(snapshot, tuple):
+                self._generation, snapshot = snapshot
+
+        records = []
+        good = 0
+        if self._log_path.exists():
+            data = self._log_path.read_bytes()
+            pos = 0
+            while pos + _FRAME_HEADER.size <= len(data):
+                (size,) = _FRAME_HEADER.unpack_from(data, pos)
+                end = pos + _FRAME_HEADER.size + size
+                if end > len(data):
+                    break
+                try:
+                    records.append(pickle.loads(data[pos + _FRAME_HEADER.size:end]))
+                except Exception:
+                    break
+                pos = good = end
+
+        generation = 0
+        if records and records[0][0] == _LOG_START:
+            generation = records.pop(0)[1]
+        if generation != self._generation:
+            # written before the snapshot, which already holds all of it
+            records, good = [], 0
+
+        self._log = open(self._log_path, "ab")
+        if good:
+            self._log.truncate(good)
+        else:
+            self._start_log()
+        self._records_since_snapshot = len(records)
+
+        self._flusher = threading.Thread(target=self._run_flusher, name="wal-flusher", daemon=True)
+        self._flusher.start()
+        return snapshot, records
+
+    def _start_log(self) -> None:
+        """Empty the log and mark it as following the current snapshot."""
+        frame = pickle.dumps((_LOG_START, self._generation), protocol=pickle.HIGHEST_PROTOCOL)
+        self._log.truncate(0)
+        self._log.write(_FRAME_HEADER.pack(len(frame)) + frame)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+    # ---------- writes ----------
+
+    def append(self, record: Record) -> None:
+        frame = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._pending.append(_FRAME_HEADER.pack(len(frame)))
+            self._pending.append(frame)
+            self._records_since_snapshot += 1
+
+    def _run_flusher(self) -> None:
+        while not self._stop.wait(self.commit_interval):
+            if (self.snapshot_source is not None
+                    and self._records_since_snapshot >= self.snapshot_every):
+                self.compact()
+            else:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            self._write(pending)
+
+    def _write(self, pending: list[bytes]) -> None:
+        if not pending or self._log is None:
+            return
+        self._log.write(b"".join(pending))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+    def compact(self) -> None:
+        """Write a snapshot of the current state and truncate the log.
+
+        The state is captured under ``quiesce`` together with taking the
+        buffered records, so the snapshot reflects exactly the records
+        appended so far; records appended after it stay buffered. The
+        records taken are still logged before the snapshot is written, so
+        a crash while writing it loses nothing, and the log is only
+        truncated once the new snapshot is in place.
+        """
+        tmp = self._snapshot_path.with_suffix(".tmp")
+        with self._io_lock:
+            with self.quiesce():
+                state = self.snapshot_source()
+                # Everything buffered or logged so far is covered by the snapshot.
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    self._records_since_snapshot = 0
+            self._write(pending)
+
+            generation = self._generation + 1
+            with open(tmp, "wb") as f:
+                pickle.dump((generation, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self._snapshot_path)
+            self._fsync_directory()
+            # from here on a restart skips the old log, whatever happens next
+            self._generation = generation
+
+            if self._log is not None:
+                self._start_log()
+
+    def _fsync_directory(self) -> None:
+        try:
+            fd = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def open_backend(directory: str | None, commit_interval: float = 0.05) -> StorageBackend:
+    """Return a LogBackend for a data directory, or a MemoryBackend if None.
+
+    Args:
+        directory: Where the log and snapshots are kept
+        commit_interval: Seconds between fsyncs of the log; writes of the
+            last interval are lost on a crash
+    """
+    if not directory:
+        return MemoryBackend()
+    return LogBackend(directory, commit_interval)
+
+
+def snapshot_state(pod_db, lab_db) -> dict:
+    """Capture the full inventory of both stores as plain containers."""
+    return {
+        "labs": dict(lab_db.labs_by_id),
+        "pods": {lab_id: {pod_id: list(pod["assets"].values())
+                          for pod_id, pod in lab.items()}
+                 for lab_id, lab in pod_db.pods_by_id.items()},
+        "address_plans": {lab_id: plan.supernet for lab_id, plan in pod_db.address_plans.items()},
+    }
+
+
+def apply_record(record: Record, pod_db, lab_db) -> None:
+    """Re-apply one logged mutation through the store primitive that made it."""
+    target, op, *args = record
+    db = pod_db if target == "pods" else lab_db
+    getattr(db, f"_{op}")(*args)
+
+
+def restore(backend: StorageBackend, pod_db, lab_db) -> None:
+    """Load the backend's snapshot and log tail into empty stores, then attach
+    the backend so that further mutations are logged.
+    """
+    snapshot, records = backend.load()
+
+    if snapshot is not None:
+        for lab_id, pods in snapshot["pods"].items():
+            pod_db._add_lab(lab_id)
+            for pod_id, devices in pods.items():
+                pod_db._add_pod(lab_id, pod_id)
+                pod_db._store_devices(lab_id, pod_id, list(devices))
+        for lab_id, lab in snapshot["labs"].items():
+            lab_db._put_meta(lab_id, lab)
+        for lab_id, supernet in snapshot.get("address_plans", {}).items():
+            pod_db._put_address_plan(lab_id, supernet)
+
+    for record in records:
+        apply_record(record, pod_db, lab_db)
+
+    pod_db.backend = backend
+    lab_db.backend = backend
+    lab_db.locks = pod_db.locks
+    if isinstance(backend, LogBackend):
+        backend.snapshot_source = lambda: snapshot_state(pod_db, lab_db)
+        backend.quiesce = pod_db.locks.exclusive
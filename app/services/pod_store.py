@@ -1,16 +1,142 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
 from uuid import uuid4
-from ipaddress import IPv4Address
+from ipaddress import IPv4Address, summarize_address_range
+from itertools import islice
 from typing import Dict
 from app.models.pod_model import *
+from app.models.stats_model import InventoryStats, LabStats
 from app.Exceptions.exceptions import *
+from app.services.ip_ranges import IPv4RangeSet, host_bounds
+from app.services.response_cache import CachedResponse, ResponseCache
+from app.services.persistence import MemoryBackend, StorageBackend
+from app.services.address_index import AddressIndex
+from app.services.prefix_trie import PrefixTrie
+from app.services.search_index import SearchDoc, SearchIndex
+from app.services.locks import StoreLocks
+from app.services.change_feed import ChangeFeed
+from app.services.device_query import device_matcher
+from app.services.metrics import instrument_store
+from app.services.conflicts import check_device_addresses, check_pod_addresses
+from app.services.value_pool import ValuePool
+from app.services.digests import pod_digest
+from app.services.buddy import BuddyAllocator
+from app.services.utilization import UtilizationStats
 
 
+def _device_addresses(device: DeviceExists) -> set[int]:
+    """Return every interface address of a device as ints."""
+    return {int(port.interface.address) for port in device.ports}
+
+
+def _count_gateways(gateways: Counter, device: DeviceExists, n: int) -> None:
+    """Add (or, negative, remove) n references to each gateway of a device's ports."""
+    for gateway in {int(port.interface.parent.gateway) for port in device.ports}:
+        gateways[gateway] += n
+        if not gateways[gateway]:
+            del gateways[gateway]
+
+
+def _pod_network(assets: dict[str, DeviceExists]) -> IPv4Network | None:
+    """Return a pods derived network (first device's first port's parent), or None."""
+    first_device = next(iter(assets.values()), None)
+    if first_device is None or not first_device.ports:
+        return None
+    return first_device.ports[0].interface.parent.network
+
+
+def _search_doc(device: DeviceExists) -> SearchDoc:
+    """Return the searchable text of a device."""
+    return SearchDoc.build(device.name, device.description,
+                           (access_method.url for access_method in device.accessMethods))
+
+
+def _with_primary_ip(device: DeviceExists, ip: IPv4Address) -> DeviceExists:
+    """Return a copy of a device with its first port moved to a new address."""
+    port = device.ports[0]
+    port = port.model_copy(update={
+        'interface': port.interface.model_copy(update={'address': ip})})
+    return device.model_copy(update={'ports': [port, *device.ports[1:]]})
+
+
+def _with_access_method(device: DeviceExists, access_method: AccessMethod) -> DeviceExists:
+    """Return a copy of a device with its first access method replaced."""
+    access_methods = [access_method, *device.accessMethods[1:]]
+    return device.model_copy(update={'accessMethods': access_methods})
+
+
+def _lab_scope(method):
+    """Run a ``(self, lab_id, ...)`` store method holding the lab's lock."""
+    @wraps(method)
+    def locked(self, lab_id, *args, **kwargs):
+        with self.locks.lab(lab_id):
+            return method(self, lab_id, *args, **kwargs)
+    return locked
+
+
+def _pod_scope(method):
+    """Run a ``(self, lab_id, pod_id, ...)`` store method holding the pod's lock."""
+    @wraps(method)
+    def locked(self, lab_id, pod_id, *args, **kwargs):
+        with self.locks.pod(lab_id, pod_id):
+            return method(self, lab_id, pod_id, *args, **kwargs)
+    return locked
+
+
+def _pod_network_list(found) -> list[PodNetwork]:
+    return [PodNetwork.model_construct(lab_id=lab_id, pod_id=pod_id, network=net)
+            for (lab_id, pod_id), net in sorted(found, key=lambda item: item[1])]
+
+
+@instrument_store
 class PodDB:
-    def __init__(self):
-        # lab_id -> pod_id -> Pod
-        self.pods_by_id: Dict[str, Dict[str, PodExists]] = {}
-        # lab_id -> pod_id -> set[IPv4Address]
-        self.pod_ip_list: Dict[str, Dict[str, set[IPv4Address]]] = {}
+    def __init__(
+        self,
+        backend: StorageBackend | None = None,
+        locks: StoreLocks | None = None,
+        changes: ChangeFeed | None = None,
+    ):
+        # lab_id -> pod_id -> {'assets': device_id -> DeviceExists,
+        #                      'ids': sorted device ids, for keyset paging,
+        #                      'gateways': gateway address -> devices using it}
+        # Stored devices are validated once on the way in and never mutated
+        # in place; patches swap in an updated copy, so reads can hand the
+        # stored records out directly.
+        self.pods_by_id: Dict[str, Dict[str, dict[str, dict[str, DeviceExists]]]] = {}
+        # lab_id -> pod_id -> used addresses as sorted integer ranges
+        self.pod_ip_list: Dict[str, Dict[str, IPv4RangeSet]] = {}
+        # address -> devices using it, globally and per lab
+        self.address_index = AddressIndex()
+        # (lab_id, pod_id) -> derived pod network, also indexed by prefix
+        self.pod_networks: Dict[tuple[str, str], IPv4Network] = {}
+        self.network_trie = PrefixTrie()
+        # lab_id -> allocator over the lab's registered supernet; its blocks
+        # are the pod networks inside the supernet, of any lab
+        self.address_plans: Dict[str, BuddyAllocator] = {}
+        # registered supernets, keyed by lab_id
+        self.plan_trie = PrefixTrie()
+        # device and address counters per pod/lab/inventory, kept by the
+        # primitives below so /stats never walks the pods
+        self.utilization = UtilizationStats()
+        # shared Network/Location instances and interned descriptions of stored devices
+        self.values = ValuePool()
+        # device name/description/access url tokens -> (lab_id, pod_id, device_id)
+        self.search_index = SearchIndex()
+        # encoded GET bodies per pod, invalidated by _pod_changed
+        self.response_cache = ResponseCache()
+        # lab_id -> pod_id -> content digest (see get_pod_digests), dropped
+        # by _pod_changed along with the cached bodies
+        self.pod_digests: Dict[str, Dict[str, str]] = {}
+        # durability hook; every primitive below logs what it applied
+        self.backend = backend or MemoryBackend()
+        # per-lab/per-pod write locks, shared with the LabDB; public methods
+        # take them, primitives expect the caller to hold them
+        self.locks = locks or StoreLocks()
+        # every primitive below publishes what it applied for /watch; None
+        # (e.g. while restore replays the log) publishes nothing
+        self.changes = changes
 
     # ---------- internal helpers ----------
 
@@ -24,18 +150,14 @@ class PodDB:
             a UUID representing the pod id.
     """
         pod_id = str(uuid4())
-        self.pods_by_id.get(lab_id).setdefault(pod_id, {})
-        self.pod_ip_list.get(lab_id).setdefault(pod_id, set())
+        self._add_pod(lab_id, pod_id)
         return pod_id
     
     def _init_device(self) -> str: 
-        """Initialize a pod in pods_by_id and pod_ip_list db's.
-
-        Args:
-            lab_id: Identifier of the lab to place the pod in. 
+        """Pick an id for a new device; nothing is stored until the record is.
 
         Returns:
-            a UUID representing the pod id.
+            a UUID representing the device id.
     """
         device_id = str(uuid4())
 
@@ -48,18 +170,18 @@ class PodDB:
             a UUID representing the lab id.
     """
         lab_id = str(uuid4())
-        self.pods_by_id.setdefault(lab_id, {})
-        self.pod_ip_list.setdefault(lab_id, {})
+        with self.locks.writing():
+            self._add_lab(lab_id)
         return lab_id
     
-    def _get_device_or_error(self, assets, device_id: str) -> DeviceCreate:
+    def _get_device_or_error(self, assets, device_id: str) -> DeviceExists:
         """Return a pods existing device by id.
         Args: 
             assets: A pods devices
             device_id: A device identifier
 
         Returns:
-            a DeviceCreate object
+            a DeviceExists object
         """
         try: 
            return assets[device_id]
@@ -105,7 +227,263 @@ class PodDB:
         except KeyError:
             raise PodNotFoundError({'detail': f"Pod {pod_id} not found"})
 
-    def _get_ip_set(self, lab_id: str, pod_id: str) -> set[IPv4Address]:
+    # ---------- storage primitives ----------
+    # Every mutation goes through these. Each one applies its change to all
+    # of the store's structures and then logs itself to the backend, so
+    # replaying the log calls the same primitives again.
+
+    def _log(self, op: str, *args) -> None:
+        self.backend.append(('pods', op, *args))
+
+    def _publish(self, op: str, lab_id: str, pod_id: str | None = None,
+                 device_id: str | None = None, **data) -> None:
+        if self.changes is not None:
+            self.changes.publish(op, lab_id, pod_id, device_id, **data)
+
+    def _add_lab(self, lab_id: str) -> None:
+        """Create the empty containers for a lab."""
+        self.pods_by_id.setdefault(lab_id, {})
+        self.pod_ip_list.setdefault(lab_id, {})
+        self.utilization.add_lab(lab_id)
+        self._log('add_lab', lab_id)
+        self._publish('add_lab', lab_id)
+
+    def _add_pod(self, lab_id: str, pod_id: str) -> None:
+        """Create the empty containers for a pod."""
+        self.pods_by_id[lab_id].setdefault(pod_id, {'assets': {}, 'ids': [], 'gateways': Counter()})
+        self.pod_ip_list[lab_id].setdefault(pod_id, IPv4RangeSet())
+        self.utilization.add_pod(lab_id, pod_id)
+        self._log('add_pod', lab_id, pod_id)
+        self._publish('add_pod', lab_id, pod_id)
+
+    def _store_device(self, lab_id: str, pod_id: str, device: DeviceExists) -> DeviceExists:
+        """Insert or replace a pod device record.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            device: An already validated device
+
+        Returns:
+            The stored DeviceExists object
+        """
+        return self._store_devices(lab_id, pod_id, [device])[0]
+
+    def _store_devices(self, lab_id: str, pod_id: str, devices: list[DeviceExists]) -> list[DeviceExists]:
+        """Insert or replace several records of one pod in one pass.
+
+        Values the devices repeat (networks, locations, descriptions) are
+        swapped for the pool's shared instances. The new addresses are
+        bulk-inserted into the pod's set, and the pod network and cached
+        responses are refreshed once; each device is still logged and
+        published as its own store_device.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            devices: Already validated devices, each at most once
+
+        Returns:
+            The stored devices
+        """
+        pod = self.pods_by_id[lab_id][pod_id]
+        assets, gateways = pod['assets'], pod['gateways']
+        ip_set = self.pod_ip_list[lab_id][pod_id]
+
+        devices = [self.values.device(device) for device in devices]
+        new_ids = []
+        moved = []
+        for device in devices:
+            old = assets.get(device.id)
+            new_addresses = _device_addresses(device)
+            moved.append((device.location.row, device.location.aisle, 1))
+            _count_gateways(gateways, device, 1)
+            if old is None:
+                new_ids.append(device.id)
+                self.address_index.add(new_addresses, lab_id, pod_id, device.id)
+            else:
+                moved.append((old.location.row, old.location.aisle, -1))
+                _count_gateways(gateways, old, -1)
+                old_addresses = _device_addresses(old)
+                if old.ports:
+                    ip_set.discard(old.ports[0].interface.address)
+                self.address_index.discard(old_addresses - new_addresses, lab_id, pod_id, device.id)
+                self.address_index.add(new_addresses - old_addresses, lab_id, pod_id, device.id)
+            assets[device.id] = device
+        self.search_index.put_many(((lab_id, pod_id, device.id), _search_doc(device)) for device in devices)
+        ip_set.update(device.ports[0].interface.address for device in devices if device.ports)
+        if len(new_ids) == 1:
+            insort(pod['ids'], new_ids[0])
+        elif new_ids:
+            pod['ids'].extend(new_ids)
+            pod['ids'].sort()
+
+        self.utilization.count_devices(lab_id, pod_id, moved)
+        self._refresh_pod_network(lab_id, pod_id)
+        self._refresh_pod_usage(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        for device in devices:
+            self._log('store_device', lab_id, pod_id, device)
+            self._publish('store_device', lab_id, pod_id, device.id, device=device)
+        return devices
+
+    def _drop_device(self, lab_id: str, pod_id: str, device_id: str) -> None:
+        """Remove a pod device record and release its address."""
+        pod = self.pods_by_id[lab_id][pod_id]
+        device = pod['assets'].pop(device_id)
+        del pod['ids'][bisect_left(pod['ids'], device_id)]
+        _count_gateways(pod['gateways'], device, -1)
+        if device.ports:
+            self.pod_ip_list[lab_id][pod_id].discard(device.ports[0].interface.address)
+        self.address_index.discard(_device_addresses(device), lab_id, pod_id, device_id)
+        self.search_index.remove((lab_id, pod_id, device_id))
+        self.utilization.count_devices(lab_id, pod_id, [(device.location.row, device.location.aisle, -1)])
+        self._refresh_pod_network(lab_id, pod_id)
+        self._refresh_pod_usage(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        self._log('drop_device', lab_id, pod_id, device_id)
+        self._publish('drop_device', lab_id, pod_id, device_id)
+
+    def _drop_pod(self, lab_id: str, pod_id: str) -> None:
+        """Remove a pod and everything in it."""
+        for device in self.pods_by_id[lab_id][pod_id]['assets'].values():
+            self.address_index.discard(_device_addresses(device), lab_id, pod_id, device.id)
+            self.search_index.remove((lab_id, pod_id, device.id))
+        del self.pods_by_id[lab_id][pod_id]
+        del self.pod_ip_list[lab_id][pod_id]
+        self.utilization.drop_pod(lab_id, pod_id)
+        self._refresh_pod_network(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        self._log('drop_pod', lab_id, pod_id)
+        self._publish('drop_pod', lab_id, pod_id)
+
+    def _drop_lab(self, lab_id: str) -> None:
+        """Remove a lab and all of its pods."""
+        self.address_index.drop_lab(lab_id)
+        for pod_id, pod in self.pods_by_id[lab_id].items():
+            for device_id in pod['assets']:
+                self.search_index.remove((lab_id, pod_id, device_id))
+        pod_ids = list(self.pods_by_id[lab_id])
+        del self.pods_by_id[lab_id]
+        del self.pod_ip_list[lab_id]
+        for pod_id in pod_ids:
+            self._refresh_pod_network(lab_id, pod_id)
+        plan = self.address_plans.pop(lab_id, None)
+        if plan is not None:
+            self.plan_trie.remove(plan.supernet, lab_id)
+        self.utilization.drop_lab(lab_id)
+        self._pod_changed(lab_id)
+        self._log('drop_lab', lab_id)
+        self._publish('drop_lab', lab_id)
+
+    def _set_pod_network(self, lab_id: str, pod_id: str, network: Network) -> None:
+        """Point every port of a pod at one network.
+
+        Addresses, names and access methods stay, so the address and
+        search indexes are left alone; the gateways, pod network and usage
+        are redone once for the pod. Logged and published as one record.
+        """
+        pod = self.pods_by_id[lab_id][pod_id]
+        assets = pod['assets']
+        network = self.values.network(network)
+        with_ports = 0
+        for device_id, device in assets.items():
+            if device.ports:
+                with_ports += 1
+                assets[device_id] = device.model_copy(update={'ports': [
+                    Port.model_construct(interface=Interface.model_construct(
+                        address=port.interface.address, parent=network))
+                    for port in device.ports]})
+        pod['gateways'] = Counter({int(network.gateway): with_ports}) if with_ports else Counter()
+        self._refresh_pod_network(lab_id, pod_id)
+        self._refresh_pod_usage(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        self._log('set_pod_network', lab_id, pod_id, network)
+        self._publish('set_pod_network', lab_id, pod_id, network=network)
+
+    def _set_pod_location(self, lab_id: str, pod_id: str, location: Location) -> None:
+        """Move every device of a pod to one location.
+
+        Only the location counters change besides the records; logged and
+        published as one record.
+        """
+        assets = self.pods_by_id[lab_id][pod_id]['assets']
+        location = self.values.location(location)
+        for device_id, device in assets.items():
+            assets[device_id] = device.model_copy(update={'location': location})
+        self.utilization.relocate_pod(lab_id, pod_id, location.row, location.aisle)
+        self._pod_changed(lab_id, pod_id)
+        self._log('set_pod_location', lab_id, pod_id, location)
+        self._publish('set_pod_location', lab_id, pod_id, location=location)
+
+    def _refresh_pod_network(self, lab_id: str, pod_id: str) -> None:
+        """Re-derive a pods network and move it in the prefix trie if it changed."""
+        pod = self.pods_by_id.get(lab_id, {}).get(pod_id)
+        net = None if pod is None else _pod_network(pod['assets'])
+        key = (lab_id, pod_id)
+        old = self.pod_networks.get(key)
+        if net == old:
+            return
+        if old is not None:
+            self.network_trie.remove(old, key)
+            del self.pod_networks[key]
+        if net is not None:
+            self.network_trie.insert(net, key)
+            self.pod_networks[key] = net
+
+        # every plan whose supernet overlapped or overlaps the network, whichever lab it is
+        plan_labs = {plan_lab for changed in (old, net) if changed is not None
+                     for plan_lab, _ in self.plan_trie.overlapping(changed)}
+        for plan_lab in plan_labs:
+            plan = self.address_plans.get(plan_lab)
+            if plan is None:
+                continue
+            if net is None or not plan.claim(net, key):
+                plan.release(key)
+            if old is not None:
+                # pods sharing the old network's addresses take back what it held
+                for other, other_net in self.network_trie.overlapping(old):
+                    plan.claim(other_net, other)
+
+    def _refresh_pod_usage(self, lab_id: str, pod_id: str) -> None:
+        """Recount how many hosts of a pods network its devices and gateways use."""
+        net = self.pod_networks.get((lab_id, pod_id))
+        ip_set = self.pod_ip_list[lab_id][pod_id]
+        used = 0
+        if net is not None:
+            lo, hi = host_bounds(net)
+            used = ip_set.count_within(lo, hi) + sum(
+                1 for gateway in self.pods_by_id[lab_id][pod_id]['gateways']
+                if lo <= gateway <= hi and gateway not in ip_set)
+        self.utilization.set_usage(lab_id, pod_id, net, used, len(ip_set))
+
+    def _put_address_plan(self, lab_id: str, supernet: IPv4Network) -> None:
+        """Register a lab's supernet; pod networks overlapping it, of any lab, count as allocated."""
+        plan = BuddyAllocator(supernet)
+        for key, net in sorted(self.network_trie.overlapping(supernet), key=lambda item: item[1]):
+            plan.claim(net, key)
+        old = self.address_plans.get(lab_id)
+        if old is not None:
+            self.plan_trie.remove(old.supernet, lab_id)
+        self.plan_trie.insert(supernet, lab_id)
+        self.address_plans[lab_id] = plan
+        self._log('put_address_plan', lab_id, supernet)
+        self._publish('put_address_plan', lab_id, supernet=supernet)
+
+    def _pod_changed(self, lab_id: str, pod_id: str | None = None) -> None:
+        """Record that a pod (or every pod of a lab) was mutated.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod, or None for the whole lab
+        """
+        self.response_cache.invalidate(lab_id, pod_id)
+        if pod_id is None:
+            self.pod_digests.pop(lab_id, None)
+        else:
+            self.pod_digests.get(lab_id, {}).pop(pod_id, None)
+
+    def _get_ip_set(self, lab_id: str, pod_id: str) -> IPv4RangeSet:
         """Return a pods list of used ip's.
 
         Args:
@@ -113,7 +491,7 @@ class PodDB:
             pod_id: Identifier of the pod
 
         Returns:
-            A set of IPv4Addresses
+            An IPv4RangeSet of the pod's used addresses
         """
         return self.pod_ip_list[lab_id][pod_id]
 
@@ -150,7 +528,7 @@ class PodDB:
                     continue
                 addr = device.ports[0].interface.address
                 if addr in temp_ip_set:
-                    DuplicateIPv4Error("Duplicate IPv4 addresses not allowed")
+                    raise DuplicateIPv4Error("Duplicate IPv4 addresses not allowed")
                 temp_ip_set.add(addr)
             
             return temp_ip_set
@@ -180,10 +558,40 @@ class PodDB:
             PodNotFoundError: If the pod does not exist.
         """
         pod = self._get_pod_or_error(lab_id, pod_id)
-        return PodExists(id=pod_id, 
-                         assets=[
-                             DeviceExists.model_validate({'id': device_id, **device})
-                         for device_id, device in pod['assets'].items()])
+        return PodExists.model_construct(id=pod_id, assets=list(pod['assets'].values()))
+
+    def get_lab_pod_ids(self, lab_id: str) -> list[str]:
+        """Return the ids of a lab's pods, in creation order.
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+        """
+        return list(self._get_lab_or_error(lab_id))
+
+    def get_pod_digests(self, lab_id: str) -> dict[str, str]:
+        """Return a content digest of each of a lab's pods, in creation order.
+
+        Digests ignore device ids and order (see app.services.digests), so
+        a pod can be compared with an incoming PodCreate. Each is computed
+        holding the pod's lock and kept until the pod changes.
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+        """
+        pods = self._get_lab_or_error(lab_id)
+        digests = {}
+        for pod_id in list(pods):
+            with self.locks.pod(lab_id, pod_id):
+                pod = pods.get(pod_id)
+                if pod is None or self.pods_by_id.get(lab_id) is not pods:
+                    # deleted since the ids were listed
+                    continue
+                lab_digests = self.pod_digests.setdefault(lab_id, {})
+                digest = lab_digests.get(pod_id)
+                if digest is None:
+                    digest = lab_digests[pod_id] = pod_digest(pod['assets'].values())
+                digests[pod_id] = digest
+        return digests
 
     def get_pod_devices(self, lab_id: str, pod_id: str) -> list[DeviceExists]:
         """Get a pods devices
@@ -200,8 +608,7 @@ class PodDB:
             PodNotFoundError: If the pod does not exist.
         """
         pod = self._get_pod_or_error(lab_id, pod_id)
-        return [DeviceExists.model_validate({'id': device_id, **device})
-                         for device_id, device in pod['assets'].items()]
+        return list(pod['assets'].values())
 
     def get_pod_device_by_id(
         self,
@@ -224,64 +631,391 @@ class PodDB:
             PodNotFoundError: If the pod does not exist.
         """
         pod = self._get_pod_or_error(lab_id, pod_id)
-        device = self._get_device_or_error(pod['assets'], device_id)
-        return DeviceExists.model_validate({'id': device_id, **device})
+        return self._get_device_or_error(pod['assets'], device_id)
+
+    @_pod_scope
+    def query_pod_devices(self, lab_id: str, pod_id: str, query: DeviceQuery) -> DevicePage:
+        """Get one page of a pods devices matching a query, in device id order.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            query: Filters, cursor and page size
+
+        Returns:
+            A DevicePage; next_cursor is None on the last page
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        pod = self._get_pod_or_error(lab_id, pod_id)
+        assets, ids = pod['assets'], pod['ids']
+        start = 0 if query.cursor is None else bisect_right(ids, query.cursor)
+        matches = device_matcher(query)
+
+        devices = []
+        for device_id in islice(ids, start, None):
+            device = assets[device_id]
+            if matches(device):
+                if len(devices) == query.page_size:
+                    return DevicePage.model_construct(devices=devices, next_cursor=devices[-1].id)
+                devices.append(device)
+        return DevicePage.model_construct(devices=devices, next_cursor=None)
+
+    def get_pod_json(self, lab_id: str, pod_id: str) -> CachedResponse:
+        """Get a pod as an encoded PodExists JSON body.
+
+        Returns:
+            A CachedResponse of the body and its ETag
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+        return self.response_cache.get_or_build(
+            lab_id, pod_id, 'pod',
+            lambda: self.get_pod_by_id(lab_id, pod_id).model_dump_json().encode())
+
+    def get_pod_devices_json(self, lab_id: str, pod_id: str) -> CachedResponse:
+        """Get a pods devices as an encoded DevicePage JSON body.
+
+        The body is the single page of every device, so its next_cursor
+        is null.
+
+        Returns:
+            A CachedResponse of the body and its ETag
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+        return self.response_cache.get_or_build(
+            lab_id, pod_id, 'devices',
+            lambda: DevicePage.model_construct(
+                devices=self.get_pod_devices(lab_id, pod_id), next_cursor=None).model_dump_json().encode())
 
     def get_pod_network(self, lab_id: str, pod_id: str) -> IPv4Network:
         """Return derived pod network (first device's first port's parent), or None."""
-        pod = self._get_pod_or_error(lab_id, pod_id)
-        if pod.get('assets') == []:
-            return None
-        first_device = next(iter(pod['assets'].values()))
-        if not first_device['ports']:
-            return None
-        return first_device['ports'][0]['interface']['parent']['network']
+        self._get_pod_or_error(lab_id, pod_id)
+        return self.pod_networks.get((lab_id, pod_id))
+
+    def get_pods_in_network(self, network: IPv4Network) -> list[PodNetwork]:
+        """Return the pods whose network lies inside (or equals) a network."""
+        return _pod_network_list(self.network_trie.contained(network))
+
+    def get_pods_overlapping_network(self, network: IPv4Network) -> list[PodNetwork]:
+        """Return the pods whose network shares any address with a network."""
+        return _pod_network_list(self.network_trie.overlapping(network))
+
+    def _address_owners(self, locations) -> list[AddressOwner]:
+        """Resolve index locations, skipping devices removed since the lookup."""
+        owners = []
+        for lab_id, pod_id, device_id in locations:
+            pod = self.pods_by_id.get(lab_id, {}).get(pod_id)
+            device = None if pod is None else pod['assets'].get(device_id)
+            if device is not None:
+                owners.append(AddressOwner.model_construct(
+                    lab_id=lab_id, pod_id=pod_id, device_id=device_id, name=device.name))
+        return owners
+
+    def find_address(self, ip: IPv4Address) -> list[AddressOwner]:
+        """Return every device, in any lab, with an interface using an address.
+
+        Args:
+            ip: The address to resolve
+
+        Returns:
+            A list of AddressOwner objects (empty if the address is unused)
+        """
+        return self._address_owners(self.address_index.lookup(int(ip)))
+
+    def find_lab_address(self, lab_id: str, ip: IPv4Address) -> list[AddressOwner]:
+        """Return every device in a lab with an interface using an address.
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+        """
+        self._get_lab_or_error(lab_id)
+        return self._address_owners(
+            (lab_id, pod_id, device_id)
+            for pod_id, device_id in self.address_index.lookup_in_lab(lab_id, int(ip)))
+
+    def search_devices(self, q: str, offset: int = 0, limit: int = 100) -> SearchPage:
+        """Return a page of the devices matching a free text query, best first.
+
+        Matches terms against device names, descriptions and access method
+        urls through the search index, so only devices sharing the query's
+        trigrams are ever scored.
+
+        Args:
+            q: The query text
+            offset: Number of results to skip.
+            limit: Maximum number of results to return.
+
+        Returns:
+            A SearchPage of SearchHits
+        """
+        hits = self.search_index.search(q)
+        results = []
+        for rank, (lab_id, pod_id, device_id), _ in islice(hits, offset, offset + limit):
+            device = self.pods_by_id.get(lab_id, {}).get(pod_id, {}).get('assets', {}).get(device_id)
+            if device is not None:
+                results.append(SearchHit.model_construct(
+                    lab_id=lab_id, pod_id=pod_id, device_id=device_id,
+                    name=device.name, score=rank))
+        return SearchPage(total=len(hits), offset=offset, limit=limit, results=results)
+
+    def get_address_plan(self, lab_id: str) -> AddressPlan:
+        """Return a lab's supernet and how much of it is free.
+
+        Raises:
+            LabNotFoundError
+            AddressPlanNotFoundError
+        """
+        self._get_lab_or_error(lab_id)
+        plan = self.address_plans.get(lab_id)
+        if plan is None:
+            raise AddressPlanNotFoundError(f'Lab {lab_id} has no address plan')
+        return AddressPlan.model_construct(
+            lab_id=lab_id, supernet=plan.supernet, allocated=len(plan),
+            free_addresses=plan.free_addresses, largest_free=plan.largest_free())
+
+    def get_lab_stats(self, lab_id: str, offset: int = 0, limit: int = 10) -> LabStats:
+        """Return a lab's device and address counts and its most exhausted subnets.
+
+        Args:
+            lab_id: Identifier of the lab.
+            offset: Number of subnets to skip.
+            limit: Maximum number of subnets to return.
 
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+        """
+        stats = self.utilization.lab(lab_id, offset, limit)
+        if stats is None:
+            raise LabNotFoundError({'detail': f"Lab {lab_id} not found"})
+        return stats
+
+    def get_stats(self, offset: int = 0, limit: int = 10) -> InventoryStats:
+        """Return the inventory's device and address counts and its most exhausted subnets."""
+        return self.utilization.inventory(offset, limit)
+
+    def count_inventory(self) -> tuple[int, int, int]:
+        """Return how many pods, devices and tracked addresses the store holds."""
+        return self.utilization.counts()
+
+    @_pod_scope
     def get_all_pod_ip(self, lab_id: str, pod_id: str) -> list[IPv4Address]:
         """Return all IPs used in this pod (sorted)."""
-        return sorted(self._get_ip_set(lab_id, pod_id))
+        self._get_pod_or_error(lab_id, pod_id)
+        return list(self._get_ip_set(lab_id, pod_id))
+
+    @_pod_scope
+    def get_free_pod_ip(
+        self,
+        lab_id: str,
+        pod_id: str,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> FreeAddressPage:
+        """Return a page of the unused address blocks in the pod's network.
 
-    def get_free_pod_ip(self, lab_id: str, pod_id: str) -> list[IPv4Address]:
-        """Return all unused IPs in the pod's network."""
+        Free space is walked as the gaps between the pod's used address
+        ranges, so the cost depends on how fragmented the pod is rather than
+        on the size of its subnet. Gateways of the pod's ports are not free.
 
-        net:IPv4Network = self.get_pod_network(lab_id, pod_id)
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            offset: Number of free blocks to skip.
+            limit: Maximum number of free blocks to return.
+
+        Returns:
+            A FreeAddressPage of AddressBlocks in ascending order
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        net: IPv4Network = self.get_pod_network(lab_id, pod_id)
         if net is None:
-            return []
+            return FreeAddressPage(total=0, offset=offset, limit=limit, addresses=[])
+
+        gateways = self.pods_by_id[lab_id][pod_id]['gateways']
+        free = list(self._get_ip_set(lab_id, pod_id).iter_free(*host_bounds(net), exclude=gateways))
+        blocks = []
+        for start, end in islice(free, offset, offset + limit):
+            first, last = IPv4Address(start), IPv4Address(end)
+            blocks.append(AddressBlock(
+                start=first,
+                end=last,
+                size=end - start + 1,
+                cidrs=list(summarize_address_range(first, last)),
+            ))
+
+        return FreeAddressPage(total=len(free), offset=offset, limit=limit, addresses=blocks)
 
-        usable = set(net.hosts())
-        used = set(self.get_all_pod_ip(lab_id, pod_id))
+    @_pod_scope
+    def get_next_free_pod_ip(self, lab_id: str, pod_id: str) -> IPv4Address | None:
+        """Return the lowest unused host address in the pod's network, or None.
+
+        Gateways of the pod's ports are never handed out.
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        net: IPv4Network = self.get_pod_network(lab_id, pod_id)
+        if net is None:
+            return None
 
-        return sorted(usable - used)
+        gateways = self.pods_by_id[lab_id][pod_id]['gateways']
+        addr = self._get_ip_set(lab_id, pod_id).first_free(*host_bounds(net), exclude=gateways)
+        return None if addr is None else IPv4Address(addr)
 
     # ---------- post methods ----------
 
-    def create_pod(self, lab_id: str, pod: PodCreate) -> DeviceExists:
+    def _check_pod_overlap(self, pod: PodCreate) -> None:
+        """Raise NetworkOverlapError if any network of a new pod overlaps an existing pod."""
+        networks = {port.interface.parent.network
+                    for device in pod.assets for port in device.ports}
+        for net in networks:
+            self._check_network_overlap(net)
+
+    def _check_network_overlap(self, net: IPv4Network, own: tuple[str, str] | None = None) -> None:
+        """Raise NetworkOverlapError if a network overlaps any pod's but ``own``'s."""
+        for (lab_id, pod_id), existing in self.network_trie.overlapping(net):
+            if (lab_id, pod_id) != own:
+                raise NetworkOverlapError(
+                    f"Network {net} overlaps {existing} of pod {pod_id} in lab {lab_id}")
+
+    @_lab_scope
+    def create_pod(self, lab_id: str, pod: PodCreate, reject_overlap: bool = False) -> PodExists:
         """Create a pod entry under a lab.
 
+        Overlap is only refused when asked: inventories carry pods that
+        share a network (a lab rebuilt from an old one keeps its
+        addressing), and refusing them by default would fail imports of
+        data that is valid today.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod: The pod to create
+            reject_overlap: Refuse the pod if its network overlaps any
+                existing pod's network.
+
         Raises:
             LabNotFoundError
             DuplicateIPv4Error
+            AddressOutsideNetworkError
+            NetworkOverlapError
         """
-        lab_pods = self._get_lab_or_error(lab_id)
+        self._get_lab_or_error(lab_id)
 
-        pod_id = self._init_pod(lab_id)
+        # overlap is checked against every lab, so the check and the insert
+        # are held together against other pod creations that check too
+        with self.locks.networks if reject_overlap else nullcontext():
+            if reject_overlap:
+                self._check_pod_overlap(pod)
 
-        lab_pods[pod_id]['assets'] = {}
+            # conflicts are refused before anything is created
+            check_pod_addresses(pod)
 
-        list_of_devices = []
+            return self._insert_pod(lab_id, pod)
+
+    def _insert_pod(self, lab_id: str, pod: PodCreate) -> PodExists:
+        """Create a pod whose addresses were already checked, storing its devices in one pass."""
+        pod_id = self._init_pod(lab_id)
 
-        for device in pod.assets: 
-            device_exists = self.create_device(lab_id, pod_id, device)
-            list_of_devices.append(device_exists)
-            lab_pods[pod_id]['assets'][device_exists.id] = device.model_dump()
+        list_of_devices = self._store_devices(lab_id, pod_id, [
+            DeviceExists.model_construct(id=self._init_device(), **dict(device))
+            for device in pod.assets])
 
-        return PodExists(id=pod_id, 
-                         assets=list_of_devices
-                         )
+        return PodExists.model_construct(id=pod_id, assets=list_of_devices)
     
+    @_lab_scope
+    def put_address_plan(self, lab_id: str, supernet: IPv4Network) -> AddressPlan:
+        """Register (or replace) the supernet a lab's pods are allocated from.
+
+        Pod networks of the lab already inside the supernet count as
+        allocated.
+
+        Raises:
+            LabNotFoundError
+        """
+        self._get_lab_or_error(lab_id)
+        self._put_address_plan(lab_id, supernet)
+        return self.get_address_plan(lab_id)
+
+    @_lab_scope
+    def allocate_pod(self, lab_id: str, pod: PodAllocate) -> PodExists:
+        """Create a pod on the next free subnet of the lab's supernet.
+
+        The network's first host becomes the gateway and the devices get
+        the hosts after it, in order. Every pod network overlapping the
+        supernet is claimed in the plan as it is stored, so the block
+        allocated is free of other pods.
+
+        Raises:
+            LabNotFoundError
+            AddressPlanNotFoundError
+            SubnetExhaustedError
+        """
+        self._get_lab_or_error(lab_id)
+        plan = self.address_plans.get(lab_id)
+        if plan is None:
+            raise AddressPlanNotFoundError(f'Lab {lab_id} has no address plan')
+
+        prefixlen = pod.network_prefixlen
+        # held like create_pod's overlap check, so the block stays free until stored
+        with self.locks.networks:
+            net = plan.allocate(prefixlen)
+            if net is None:
+                raise SubnetExhaustedError(f'No free /{prefixlen} left in {plan.supernet}')
+            try:
+                network = self.values.network(Network.model_construct(
+                    network=net, gateway=net.network_address + 1))
+                pod_id = self._init_pod(lab_id)
+                # storing the pod claims the block for it
+                devices = self._store_devices(lab_id, pod_id, [
+                    DeviceExists.model_construct(
+                        id=self._init_device(), **dict(device),
+                        ports=[Port.model_construct(interface=Interface.model_construct(
+                            address=net.network_address + 2 + i, parent=network))])
+                    for i, device in enumerate(pod.assets)])
+            except BaseException:
+                plan.free(net)
+                raise
+
+        return PodExists.model_construct(id=pod_id, assets=devices)
+
+    @_lab_scope
+    def create_pods(self, lab_id: str, pods: list[PodCreate]) -> list[PodExists]:
+        """Create several pod entries under a lab.
+
+        Every pod is checked for address conflicts before any is created.
+
+        Raises:
+            LabNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+        """
+        self._get_lab_or_error(lab_id)
+        for pod in pods:
+            check_pod_addresses(pod)
+        return [self._insert_pod(lab_id, pod) for pod in pods]
+
+    @_pod_scope
     def create_device(self, lab_id: str, pod_id: str, device: DeviceCreate) -> DeviceExists:
         """Create a new device within a pod.
 
+        The device is expected to be validated already (it is a DeviceCreate
+        built at the API boundary), so the stored record reuses its fields
+        without validating them again.
+
         Returns:
             A DeviceExists object
 
@@ -289,20 +1023,23 @@ class PodDB:
             LabNotFoundError
             PodNotFoundError
             DuplicateIPv4Error
+            AddressOutsideNetworkError
         """
-        pod: PodCreate = self._get_pod_or_error(lab_id, pod_id)
+        self._get_pod_or_error(lab_id, pod_id)
+        check_device_addresses(device)
 
         if device.ports:
             new_ip = device.ports[0].interface.address
             self._track_pod_ip_addresses(lab_id=lab_id, pod_id=pod_id, ip=new_ip)
-            self.pod_ip_list[lab_id][pod_id].add(new_ip)
         
         device_id = self._init_device()
 
-        return DeviceExists.model_validate({'id': device_id, **device})
+        return self._store_device(
+            lab_id, pod_id, DeviceExists.model_construct(id=device_id, **dict(device)))
 
     # ---------- patch methods ----------
 
+    @_pod_scope
     def patch_device_ip(
         self,
         lab_id: str,
@@ -313,30 +1050,38 @@ class PodDB:
         """Update a pod device's IP address.
 
         Returns:
-            True if updated (or unchanged).
-            False if the new IP would clash or the device/ports are missing.
+            The updated DeviceExists object (unchanged if the device has no
+            ports or already uses the address).
+
+        Raises:
+            LabNotFoundError
+            PodNotFoundError
+            DeviceNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
         """
 
         device = self.get_pod_device_by_id(lab_id, pod_id, device_id)
         if not device.ports:
-            return False
+            return device
 
-        current_ip = device.ports[0]['interface']['address']
+        port = device.ports[0]
+        current_ip = port.interface.address
 
         # No change
         if ip == current_ip:
-            return True
+            return device
+
+        patched = _with_primary_ip(device, ip)
+        check_device_addresses(patched)
 
         # Check if new IP is free for this pod
         self._track_pod_ip_addresses(lab_id, pod_id, ip)
 
-        # Update device IP and clean up old IP in index
-        device.ports[0]['interface']['address'] = ip
-        ip_set = self._get_ip_set(lab_id, pod_id)
-        # discard avoids ValueError if it's missing
-        ip_set.discard(current_ip)
-        return DeviceExists.model_validate({'id': device_id, **device})
+        # Update device IP; storing it moves the address in the index
+        return self._store_device(lab_id, pod_id, patched)
 
+    @_pod_scope
     def patch_device_name(
         self,
         lab_id: str,
@@ -346,14 +1091,11 @@ class PodDB:
     ) -> DeviceExists:
         """Patch a device's name."""
 
-        pod = self._get_pod_or_error(lab_id, pod_id)
-
-        device = self._get_device_or_error(pod['assets'], device_id)
-
-        device[name] = name
+        device = self.get_pod_device_by_id(lab_id, pod_id, device_id)
 
-        return DeviceExists.model_validate({'id': device_id, **device})
+        return self._store_device(lab_id, pod_id, device.model_copy(update={'name': name}))
 
+    @_pod_scope
     def patch_device_access_method(
         self,
         lab_id: str,
@@ -362,28 +1104,37 @@ class PodDB:
         access_method: AccessMethod,
     ) -> DeviceExists:
         """Patch a device's first access method."""
-        pod = self._get_pod_or_error(lab_id, pod_id)
-
-        device = self._get_device_or_error(pod['assets'], device_id)
-
-        device['accessMethods'][0] = access_method
+        device = self.get_pod_device_by_id(lab_id, pod_id, device_id)
 
-        return DeviceExists.model_validate({'id': device_id, **device})
+        return self._store_device(lab_id, pod_id, _with_access_method(device, access_method))
 
+    @_pod_scope
     def patch_pod_devices_network(
         self,
         lab_id: str,
         pod_id: str,
         network: Network,
+        reject_overlap: bool = False,
     ) -> list[DeviceExists]:
-        """Patch all devices in a pod to use the given network."""
+        """Patch all devices in a pod to use the given network.
+
+        Args:
+            reject_overlap: Refuse the network if it overlaps another
+                pod's, as create_pod does.
+
+        Raises:
+            LabNotFoundError
+            PodNotFoundError
+            NetworkOverlapError
+        """
         pod = self._get_pod_or_error(lab_id, pod_id)
-        for device in pod['assets'].keys():
-            for port in device['ports']:
-                port['interface']['parent'] = network
-        return [DeviceExists.model_validate({'id': device_id, **device})
-                         for device_id, device in pod['assets'].items()]
+        with self.locks.networks if reject_overlap else nullcontext():
+            if reject_overlap:
+                self._check_network_overlap(network.network, own=(lab_id, pod_id))
+            self._set_pod_network(lab_id, pod_id, network)
+        return list(pod['assets'].values())
     
+    @_pod_scope
     def patch_pod_devices_location(
         self,
         lab_id: str,
@@ -392,23 +1143,180 @@ class PodDB:
     ) -> list[DeviceExists]:
         """Patch all devices in a pod to share the same location."""
         pod = self._get_pod_or_error(lab_id, pod_id)
-        for device in pod['assets'].keys():
-            device['location'] = location
-        return [DeviceExists.model_validate({'id': device_id, **device})
-                         for device_id, device in pod['assets'].items()]
+        self._set_pod_location(lab_id, pod_id, location)
+        return list(pod['assets'].values())
+
+    @_pod_scope
+    def apply_device_batch(
+        self,
+        lab_id: str,
+        pod_id: str,
+        operations: list[DeviceBatchOp],
+    ) -> list[DeviceBatchResult]:
+        """Apply a list of device mutations to one pod, all or nothing.
+
+        The lab and pod are resolved once and every operation is checked in
+        order against a working view of the pod (device overlay plus the
+        addresses claimed and released so far) before anything is stored.
+        If any operation fails nothing is applied.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            operations: create/patch_ip/patch_name/patch_access/delete ops
+
+        Returns:
+            One DeviceBatchResult per operation, in order
+
+        Raises:
+            LabNotFoundError
+            PodNotFoundError
+            DeviceNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+        """
+        pod = self._get_pod_or_error(lab_id, pod_id)
+        used = self._get_ip_set(lab_id, pod_id)
+
+        devices: dict[str, DeviceExists | None] = {}
+        claimed: set[int] = set()
+        released: set[int] = set()
+        planned: list[tuple[str, DeviceExists | str]] = []
+        results: list[DeviceBatchResult] = []
+
+        def current(i: int, device_id: str) -> DeviceExists:
+            device = devices[device_id] if device_id in devices else pod['assets'].get(device_id)
+            if device is None:
+                raise DeviceNotFoundError(
+                    {'detail': f'Operation {i}: device {device_id} not found'})
+            return device
+
+        def release(addr: IPv4Address) -> None:
+            a = int(addr)
+            if a in claimed:
+                claimed.discard(a)
+            else:
+                released.add(a)
+
+        def claim(i: int, addr: IPv4Address) -> None:
+            a = int(addr)
+            if a in claimed or (a in used and a not in released):
+                raise DuplicateIPv4Error(
+                    f"Operation {i}: duplicate IPv4 address {addr} not allowed")
+            if a in released:
+                released.discard(a)
+            else:
+                claimed.add(a)
+
+        def check_addresses(i: int, device: DeviceCreate | DeviceExists) -> None:
+            try:
+                check_device_addresses(device)
+            except AddressOutsideNetworkError as exc:
+                raise AddressOutsideNetworkError(f"Operation {i}: {exc}") from exc
+
+        for i, op in enumerate(operations):
+            if op.op == 'create':
+                check_addresses(i, op.device)
+                if op.device.ports:
+                    claim(i, op.device.ports[0].interface.address)
+                device = DeviceExists.model_construct(id=self._init_device(), **dict(op.device))
+            elif op.op == 'delete':
+                device = current(i, op.device_id)
+                if device.ports:
+                    release(device.ports[0].interface.address)
+                devices[device.id] = None
+                planned.append(('drop', device.id))
+                results.append(DeviceBatchResult.model_construct(
+                    op=op.op, device_id=device.id, device=None))
+                continue
+            else:
+                device = current(i, op.device_id)
+                if op.op == 'patch_ip':
+                    if device.ports and device.ports[0].interface.address != op.ip:
+                        check_addresses(i, _with_primary_ip(device, op.ip))
+                        release(device.ports[0].interface.address)
+                        claim(i, op.ip)
+                        device = _with_primary_ip(device, op.ip)
+                elif op.op == 'patch_name':
+                    device = device.model_copy(update={'name': op.name})
+                elif op.op == 'patch_access':
+                    device = _with_access_method(device, op.access)
+
+            devices[device.id] = device
+            planned.append(('store', device))
+            results.append(DeviceBatchResult.model_construct(
+                op=op.op, device_id=device.id, device=device))
+
+        for action, target in planned:
+            if action == 'store':
+                self._store_device(lab_id, pod_id, target)
+            else:
+                self._drop_device(lab_id, pod_id, target)
+
+        return results
+
+    @_pod_scope
+    def sync_pod_devices(
+        self,
+        lab_id: str,
+        pod_id: str,
+        update: dict[str, DeviceCreate],
+        create: list[DeviceCreate],
+        delete: list[str],
+    ) -> list[DeviceExists]:
+        """Replace, create and delete devices of a pod in one step, all or nothing.
+
+        Replaced devices keep their ids. The pod as it will be afterwards is
+        checked for address conflicts before anything changes, so devices
+        may trade addresses.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            update: New content per existing device id
+            create: Devices to add
+            delete: Ids of devices to remove
+
+        Returns:
+            The replaced and created devices
+
+        Raises:
+            LabNotFoundError
+            PodNotFoundError
+            DeviceNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+        """
+        pod = self._get_pod_or_error(lab_id, pod_id)
+        assets = pod['assets']
+        for device_id in (*update, *delete):
+            self._get_device_or_error(assets, device_id)
+
+        stored = [DeviceExists.model_construct(id=device_id, **dict(device))
+                  for device_id, device in update.items()]
+        stored += [DeviceExists.model_construct(id=self._init_device(), **dict(device))
+                   for device in create]
+        gone = set(update).union(delete)
+        kept = [device for device_id, device in assets.items() if device_id not in gone]
+        check_pod_addresses(PodCreate.model_construct(assets=kept + stored))
+
+        for device_id in delete:
+            self._drop_device(lab_id, pod_id, device_id)
+        return self._store_devices(lab_id, pod_id, stored) if stored else []
 
     # ---------- delete methods ----------
 
+    @_lab_scope
     def delete_lab_and_pod(
             self, 
             lab_id: str
     ) -> bool:
         """delete a lab and it's pods"""
         self._get_lab_or_error(lab_id)
-        del self.pods_by_id[lab_id]
-        del self.pod_ip_list[lab_id]
+        self._drop_lab(lab_id)
         return True
     
+    @_lab_scope
     def delete_pod(
         self, 
         lab_id: str,
@@ -416,10 +1324,10 @@ class PodDB:
     ) -> bool:
         """delete a pod"""
         self._get_pod_or_error(lab_id, pod_id)
-        del self.pods_by_id[lab_id][pod_id]
-        del self.pod_ip_list[lab_id][pod_id]
+        self._drop_pod(lab_id, pod_id)
         return True
     
+    @_pod_scope
     def delete_device(
             self, 
             lab_id: str, 
@@ -429,11 +1337,8 @@ class PodDB:
         """delete a device from a pod"""
         pod = self._get_pod_or_error(lab_id, pod_id)
 
-        device = self._get_device_or_error(pod['assets'], device_id)
-        addr = device.ports[0].interface.address
-        
-        del pod['assets'][device_id]
+        self._get_device_or_error(pod['assets'], device_id)
 
-        self._get_ip_set(lab_id, pod_id).remove(addr)
+        self._drop_device(lab_id, pod_id, device_id)
 
         return True
\ No newline at end of file
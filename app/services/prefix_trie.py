@@ -0,0 +1,114 @@
+import threading
+from ipaddress import IPv4Network
+from typing import Hashable, Iterator
+
+
+class _Node:
+    __slots__ = ("children", "items")
+
+    def __init__(self):
+        self.children: list["_Node | None"] = [None, None]
+        self.items: dict[Hashable, IPv4Network] | None = None
+
+
+def _bits(net: IPv4Network) -> Iterator[int]:
+    value = int(net.network_address)
+    for i in range(net.prefixlen):
+        yield (value >> (31 - i)) & 1
+
+
+class PrefixTrie:
+    """Binary radix trie over IPv4 prefixes.
+
+    Each prefix node holds the keys stored at exactly that prefix. Finding
+    the prefixes that contain, are contained by, or overlap a query walks at
+    most ``prefixlen`` nodes plus the matching subtree, independent of how
+    many prefixes are stored elsewhere. Every pod's network lives in the
+    one trie, so operations hold an internal lock.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, net: IPv4Network, key: Hashable) -> None:
+        """Store a key under a prefix."""
+        with self._lock:
+            node = self._root
+            for bit in _bits(net):
+                child = node.children[bit]
+                if child is None:
+                    child = node.children[bit] = _Node()
+                node = child
+            if node.items is None:
+                node.items = {}
+            if key not in node.items:
+                self._size += 1
+            node.items[key] = net
+
+    def remove(self, net: IPv4Network, key: Hashable) -> None:
+        """Remove a key stored under a prefix, pruning emptied nodes."""
+        with self._lock:
+            path = [self._root]
+            node = self._root
+            for bit in _bits(net):
+                node = node.children[bit]
+                if node is None:
+                    return
+                path.append(node)
+            if not node.items or key not in node.items:
+                return
+            del node.items[key]
+            self._size -= 1
+            if not node.items:
+                node.items = None
+
+            for depth in range(len(path) - 1, 0, -1):
+                node = path[depth]
+                if node.items or node.children[0] or node.children[1]:
+                    break
+                bit = (int(net.network_address) >> (32 - depth)) & 1
+                path[depth - 1].children[bit] = None
+
+    def containing(self, net: IPv4Network) -> list[tuple[Hashable, IPv4Network]]:
+        """Return the stored prefixes equal to or enclosing ``net``."""
+        with self._lock:
+            found = []
+            node = self._root
+            if node.items:
+                found.extend(node.items.items())
+            for bit in _bits(net):
+                node = node.children[bit]
+                if node is None:
+                    break
+                if node.items:
+                    found.extend(node.items.items())
+            return found
+
+    def contained(self, net: IPv4Network) -> list[tuple[Hashable, IPv4Network]]:
+        """Return the stored prefixes equal to or inside ``net``."""
+        with self._lock:
+            node = self._root
+            for bit in _bits(net):
+                node = node.children[bit]
+                if node is None:
+                    return []
+
+            found = []
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                if node.items:
+                    found.extend(node.items.items())
+                stack.extend(child for child in node.children if child is not None)
+            return found
+
+    def overlapping(self, net: IPv4Network) -> list[tuple[Hashable, IPv4Network]]:
+        """Return the stored prefixes sharing any address with ``net``."""
+        found = dict(self.containing(net))
+        found.update(self.contained(net))
+        return list(found.items())
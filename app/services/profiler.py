@@ -0,0 +1,114 @@
+import sys
+import threading
+from collections import Counter, deque
+from time import perf_counter, sleep, time
+from typing import Iterable
+
+
+def _fold(frame) -> str:
+    '''Render a stack root-first as "module:function;module:function;..."'''
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps the stacks of slow requests.
+
+    While any request is in flight a daemon thread samples, every
+    ``interval`` seconds into a short rolling window, the stacks of the
+    event loop and of every thread currently running an endpoint (plain
+    ``def`` endpoints run on the thread pool). When a request finishes
+    after more than ``threshold_ms`` the samples taken during it on the
+    threads that ran its endpoint are folded into stack counts and kept,
+    newest first, up to ``keep`` profiles.
+
+    An async endpoint runs on the event loop, so its profile also holds the
+    stacks of whatever else the loop ran meanwhile.
+    """
+
+    def __init__(self, threshold_ms: float, interval: float = 0.005, keep: int = 20,
+                 window: int = 20_000):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.profiles: deque[dict] = deque(maxlen=keep)
+        self._samples: deque[tuple[float, int, str]] = deque(maxlen=window)
+        self._active = 0
+        # thread ident -> endpoints it is running
+        self._threads: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._target: int | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        '''Start sampling; the calling thread is taken to be the event loop'''
+        self._target = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            if not self._active:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            with self._lock:
+                targets = {self._target, *self._threads}
+            frames = sys._current_frames()
+            now = perf_counter()
+            for ident in targets:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._samples.append((now, ident, _fold(frame)))
+            # don't keep the sampled frames alive until the next sample
+            frames = frame = None
+            sleep(self.interval)
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._active += 1
+        self._wake.set()
+
+    def thread_started(self, ident: int) -> None:
+        '''Sample a thread while it runs an endpoint'''
+        with self._lock:
+            self._threads[ident] += 1
+
+    def thread_finished(self, ident: int) -> None:
+        with self._lock:
+            self._threads[ident] -= 1
+            if not self._threads[ident]:
+                del self._threads[ident]
+
+    def request_finished(self, method: str, route: str, status: int, start: float, end: float,
+                         threads: Iterable[int] = ()) -> None:
+        '''Record a finished request; ``threads`` ran its endpoint (default: the event loop)'''
+        with self._lock:
+            self._active -= 1
+        if end - start < self.threshold:
+            return
+        idents = set(threads) or {self._target}
+        stacks = Counter(stack for t, ident, stack in list(self._samples)
+                         if start <= t <= end and ident in idents)
+        self.profiles.appendleft({
+            'method': method,
+            'route': route,
+            'status': status,
+            'finished': time(),
+            'duration_ms': (end - start) * 1000,
+            'samples': sum(stacks.values()),
+            'stacks': [{'stack': stack, 'count': count} for stack, count in stacks.most_common(50)],
+        })
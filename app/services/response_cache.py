@@ -0,0 +1,114 @@
+import threading
+from hashlib import blake2b
+from typing import Callable, Dict, NamedTuple
+from fastapi import Response
+from app.services.metrics import phase
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """Already-encoded JSON response bodies, kept per pod.
+
+    Entries are dropped by the store whenever the pod they were built from
+    changes, so a hit can be returned as raw bytes without rebuilding or
+    re-serializing any models. A body built while its pod was being
+    changed (or deleted) is returned but not kept, so a stale body is never
+    cached and a deleted pod never gets entries back.
+    """
+
+    def __init__(self):
+        # lab_id -> pod_id -> kind -> CachedResponse
+        self._entries: Dict[str, Dict[str, Dict[str, CachedResponse]]] = {}
+        # bumped by every invalidation; a build that saw another value may
+        # predate a change to its pod
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(
+        self,
+        lab_id: str,
+        pod_id: str,
+        kind: str,
+        build: Callable[[], bytes],
+    ) -> CachedResponse:
+        """Return the cached body for a pod view, encoding it on a miss.
+
+        Args:
+            lab_id: Identifier of the lab.
+            pod_id: Identifier of the pod
+            kind: Name of the view of the pod being cached.
+            build: Callable producing the encoded JSON body; it must raise
+                if the pod no longer exists.
+
+        Returns:
+            A CachedResponse of the body and its ETag
+        """
+        with self._lock:
+            pod_entries = self._entries.get(lab_id, {}).get(pod_id)
+            cached = None if pod_entries is None else pod_entries.get(kind)
+            generation = self._generation
+        if cached is None:
+            with phase('serialization'):
+                body = build()
+            cached = CachedResponse(body, f'"{blake2b(body, digest_size=16).hexdigest()}"')
+            with self._lock:
+                current = self._entries.get(lab_id, {}).get(pod_id)
+                if pod_entries is not None:
+                    # invalidate() drops the pod's entries; if it ran during
+                    # the build, the body may predate the change
+                    fresh = current is pod_entries
+                else:
+                    # nothing to compare with: keep the body only if nothing
+                    # was invalidated at all, e.g. the pod wasn't deleted
+                    fresh = generation == self._generation
+                    if fresh and current is None:
+                        current = self._entries.setdefault(lab_id, {})[pod_id] = {}
+                if fresh:
+                    current[kind] = cached
+        return cached
+
+    def invalidate(self, lab_id: str, pod_id: str | None = None) -> None:
+        """Drop the cached bodies of one pod, or of every pod in a lab."""
+        with self._lock:
+            self._generation += 1
+            if pod_id is None:
+                self._entries.pop(lab_id, None)
+            else:
+                lab_entries = self._entries.get(lab_id)
+                if lab_entries is not None:
+                    lab_entries.pop(pod_id, None)
+                    if not lab_entries:
+                        del self._entries[lab_id]
+
+    def clear(self) -> None:
+        """Drop every cached body."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Number of pods with cached bodies."""
+        with self._lock:
+            return sum(len(lab_entries) for lab_entries in self._entries.values())
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return True if an If-None-Match header value matches the ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cached_json_response(cached: CachedResponse, if_none_match: str | None) -> Response:
+    """Build a raw JSON response for a cached body, or a 304 if the client has it."""
+    headers = {"ETag": cached.etag}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -0,0 +1,267 @@
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, Iterator, NamedTuple
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# relative weight of a term matching in each field
+_NAME, _DESCRIPTION, _URL = 3.0, 1.0, 1.0
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+def _grams(token: str) -> set[str]:
+    """Index keys for a token: its trigrams, plus 1- and 2-char prefixes for short terms."""
+    grams = {'^' + token[:1], '^' + token[:2]}
+    grams.update(token[i:i + 3] for i in range(len(token) - 2))
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def _tokens(text: str) -> frozenset[str]:
+    return frozenset(tokenize(text))
+
+
+@lru_cache(maxsize=65536)
+def _token_grams(token: str) -> frozenset[str]:
+    return frozenset(_grams(token))
+
+
+@lru_cache(maxsize=65536)
+def _field_grams(tokens: frozenset[str]) -> frozenset[str]:
+    # descriptions, urls and name stems repeat across devices, so their
+    # grams are worked out once
+    grams = set()
+    for token in tokens:
+        grams |= _token_grams(token)
+    return frozenset(grams)
+
+
+def _query_grams(term: str) -> set[str]:
+    if len(term) < 3:
+        return {'^' + term}
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class SearchDoc(NamedTuple):
+    """The searchable text of one device, lowercased and tokenized."""
+    name: str
+    name_tokens: frozenset[str]
+    description: str
+    description_tokens: frozenset[str]
+    urls: str
+    url_tokens: frozenset[str]
+
+    @classmethod
+    def build(cls, name: str, description: str, urls: Iterable[str]) -> "SearchDoc":
+        urls = ' '.join(urls).lower()
+        name, description = name.lower(), description.lower()
+        return cls(name, _tokens(name), description, _tokens(description), urls, _tokens(urls))
+
+    def grams(self) -> frozenset[str]:
+        return (_field_grams(self.name_tokens) | _field_grams(self.description_tokens)
+                | _field_grams(self.url_tokens))
+
+
+def _term_score(term: str, text: str, tokens: frozenset[str]) -> float:
+    if term in tokens:
+        return 3.0
+    if any(token.startswith(term) for token in tokens):
+        return 2.0
+    # a term too short for trigrams is only indexed as a token prefix
+    if len(term) >= 3 and term in text:
+        return 1.0
+    return 0.0
+
+
+def score(doc: SearchDoc, query: str) -> float:
+    """Rank a device against a query; 0 means it does not match.
+
+    Every query term has to appear in some field. A term scores more as a
+    whole token than as a token prefix or a plain substring (terms of one
+    or two characters only match as a token or token prefix), and more in
+    the name than in the description or access URLs; a name equal to or
+    starting with the whole query earns a bonus.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return 0.0
+
+    total = 0.0
+    for term in terms:
+        best = max(_NAME * _term_score(term, doc.name, doc.name_tokens),
+                   _DESCRIPTION * _term_score(term, doc.description, doc.description_tokens),
+                   _URL * _term_score(term, doc.urls, doc.url_tokens))
+        if not best:
+            return 0.0
+        total += best
+
+    whole = query.strip().lower()
+    if doc.name == whole:
+        total += 10.0
+    elif doc.name.startswith(whole):
+        total += 5.0
+    return total
+
+
+class SearchIndex:
+    """Inverted index over device names, descriptions and access URLs.
+
+    Each device is indexed under the trigrams of its tokens (and their
+    1- and 2-character prefixes), so a query term of any length narrows the
+    candidates to a few posting lists before they are scored. Devices are
+    keyed by ``(lab_id, pod_id, device_id)``. The index is shared by every
+    pod, so updates hold an internal lock.
+    """
+
+    def __init__(self):
+        self._docs: Dict[tuple[str, str, str], SearchDoc] = {}
+        self._postings: Dict[str, set[tuple[str, str, str]]] = {}
+        self._lock = threading.Lock()
+        # iterables of (key, doc or None for a removal), while bulk() defers puts
+        self._pending: list | None = None
+        # cleared while a deferred pass is still indexing on its own thread
+        self._ready = threading.Event()
+        self._ready.set()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def put(self, key: tuple[str, str, str], doc: SearchDoc) -> None:
+        """Index (or re-index) a device."""
+        self.put_many([(key, doc)])
+
+    def put_many(self, items: Iterable[tuple[tuple[str, str, str], SearchDoc]]) -> None:
+        """Index (or re-index) several devices under one lock acquisition.
+
+        New devices are grouped by token first, so each posting list grows
+        by one set update per token rather than one insert per device.
+        Inside ``bulk()`` the items are only kept, and iterated (building
+        their docs, if they are generated) when the deferred pass runs.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(items)
+                return
+            self._put_many(items)
+
+    @contextmanager
+    def bulk(self, background: bool = False) -> Iterator[None]:
+        """Defer the puts made inside the block and index them in one pass.
+
+        Meant for loading a whole inventory: until the pass is done, those
+        devices are not searchable. With ``background`` the pass runs on a
+        thread of its own once the block exits, so the caller can start
+        serving; puts and removals keep being deferred and searches wait
+        until it is done.
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            yield
+        finally:
+            if background:
+                self._ready.clear()
+                threading.Thread(target=self._flush, name='search-index', daemon=True).start()
+            else:
+                self._flush()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for a deferred pass to finish; returns whether the index is complete."""
+        return self._ready.wait(timeout)
+
+    def _flush(self) -> None:
+        try:
+            with self._lock:
+                # the last put or removal of a key wins, as it would have one by one
+                pending, self._pending = dict(chain.from_iterable(self._pending)), None
+                self._put_many((key, doc) for key, doc in pending.items() if doc is not None)
+        finally:
+            self._ready.set()
+
+    def _put_many(self, items: Iterable[tuple[tuple[str, str, str], SearchDoc]]) -> None:
+        postings = self._postings
+        # new devices, grouped by the token set of each field and then by
+        # token; descriptions and urls repeat, so the groups are few
+        by_field: Dict[frozenset[str], list[tuple[str, str, str]]] = {}
+        for key, doc in items:
+            old = self._docs.get(key)
+            if old == doc:
+                continue
+            if old is None:
+                for tokens in (doc.name_tokens, doc.description_tokens, doc.url_tokens):
+                    keys = by_field.get(tokens)
+                    if keys is None:
+                        by_field[tokens] = [key]
+                    else:
+                        keys.append(key)
+            else:
+                old_grams, new_grams = old.grams(), doc.grams()
+                for gram in old_grams - new_grams:
+                    self._discard(gram, key)
+                for gram in new_grams - old_grams:
+                    postings.setdefault(gram, set()).add(key)
+            self._docs[key] = doc
+        by_token: Dict[str, list[list[tuple[str, str, str]]]] = {}
+        for tokens, keys in by_field.items():
+            for token in tokens:
+                groups = by_token.get(token)
+                if groups is None:
+                    by_token[token] = [keys]
+                else:
+                    groups.append(keys)
+        for token, groups in by_token.items():
+            for gram in _token_grams(token):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = set()
+                for keys in groups:
+                    posting.update(keys)
+
+    def remove(self, key: tuple[str, str, str]) -> None:
+        """Stop indexing a device."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(((key, None),))
+            doc = self._docs.pop(key, None)
+            if doc is not None:
+                for gram in doc.grams():
+                    self._discard(gram, key)
+
+    def _discard(self, gram: str, key: tuple[str, str, str]) -> None:
+        keys = self._postings.get(gram)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._postings[gram]
+
+    def search(self, query: str) -> list[tuple[float, tuple[str, str, str], str]]:
+        """Return ``(score, key, name)`` for every matching device, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        self._ready.wait()
+        with self._lock:
+            candidates = None
+            for term in terms:
+                for gram in _query_grams(term):
+                    keys = self._postings.get(gram, set())
+                    candidates = set(keys) if candidates is None else candidates & keys
+                    if not candidates:
+                        return []
+            docs = [(key, self._docs[key]) for key in candidates]
+
+        hits = []
+        for key, doc in docs:
+            rank = score(doc, query)
+            if rank:
+                hits.append((rank, key, doc.name))
+        hits.sort(key=lambda hit: (-hit[0], hit[2], hit[1]))
+        return hits
@@ -0,0 +1,1178 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from ipaddress import IPv4Address, IPv4Network, summarize_address_range
+from itertools import groupby, islice
+from operator import itemgetter
+from uuid import uuid4
+from app.models.lab_db_model import *
+from app.models.pod_model import *
+from app.models.stats_model import InventoryStats, LabStats
+from app.Exceptions.exceptions import *
+from app.services.ip_ranges import IPv4RangeSet, host_bounds
+from app.services.response_cache import CachedResponse, ResponseCache
+from app.services.device_query import projected_fields
+from app.services.search_index import SearchDoc, score, tokenize
+from app.services.change_feed import ChangeFeed
+from app.models.change_model import ChangeEvent
+from app.services.metrics import instrument_store
+from app.services.conflicts import check_device_addresses, check_pod_addresses
+from app.services.digests import pod_digest
+from app.services.buddy import BuddyAllocator
+from app.services.utilization import UtilizationStats
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labs (
+    id        TEXT PRIMARY KEY,
+    name      TEXT,
+    location  TEXT,
+    building  TEXT,
+    floor     TEXT
+);
+CREATE TABLE IF NOT EXISTS pods (
+    id         TEXT PRIMARY KEY,
+    lab_id     TEXT NOT NULL REFERENCES labs(id) ON DELETE CASCADE,
+    -- derived pod network (first device's first port), kept by _refresh_pod_network
+    network    INTEGER,
+    broadcast  INTEGER,
+    prefixlen  INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pods_lab_pod ON pods(lab_id, id);
+CREATE INDEX IF NOT EXISTS pods_network ON pods(network, broadcast);
+CREATE TABLE IF NOT EXISTS devices (
+    seq          INTEGER PRIMARY KEY,
+    id           TEXT NOT NULL UNIQUE,
+    lab_id       TEXT NOT NULL,
+    pod_id       TEXT NOT NULL REFERENCES pods(id) ON DELETE CASCADE,
+    name         TEXT NOT NULL,
+    description  TEXT NOT NULL,
+    loc_row      TEXT NOT NULL,
+    loc_aisle    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS devices_lab_pod ON devices(lab_id, pod_id, seq);
+CREATE INDEX IF NOT EXISTS devices_name ON devices(name);
+CREATE INDEX IF NOT EXISTS devices_pod_id ON devices(pod_id, id);
+CREATE TABLE IF NOT EXISTS ports (
+    device_id  TEXT NOT NULL REFERENCES devices(id) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    pod_id     TEXT NOT NULL,
+    address    INTEGER NOT NULL,
+    network    INTEGER NOT NULL,
+    prefixlen  INTEGER NOT NULL,
+    gateway    INTEGER NOT NULL,
+    PRIMARY KEY (device_id, position)
+);
+CREATE INDEX IF NOT EXISTS ports_address ON ports(address);
+CREATE INDEX IF NOT EXISTS ports_pod_address ON ports(pod_id, position, address);
+-- a device's primary address is unique within its pod, whichever process writes it
+CREATE UNIQUE INDEX IF NOT EXISTS ports_pod_primary ON ports(pod_id, address) WHERE position = 0;
+CREATE TABLE IF NOT EXISTS access_methods (
+    device_id  TEXT NOT NULL REFERENCES devices(id) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    pod_id     TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    PRIMARY KEY (device_id, position)
+);
+CREATE INDEX IF NOT EXISTS access_methods_pod ON access_methods(pod_id);
+-- supernet each lab's pods are allocated from (see allocate_pod)
+CREATE TABLE IF NOT EXISTS address_plans (
+    lab_id     TEXT PRIMARY KEY REFERENCES labs(id) ON DELETE CASCADE,
+    network    INTEGER NOT NULL,
+    prefixlen  INTEGER NOT NULL
+);
+-- change feed for /watch, appended by every write in its own transaction
+CREATE TABLE IF NOT EXISTS changes (
+    revision  INTEGER PRIMARY KEY AUTOINCREMENT,
+    event     TEXT NOT NULL
+);
+"""
+
+
+class Connection(sqlite3.Connection):
+    """sqlite3 connection carrying the lock its stores' transactions take."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+
+
+def connect(path: str, timeout: float = 30.0) -> Connection:
+    """Open (and if needed create) an inventory database in WAL mode.
+
+    The connection is in autocommit mode; the stores open explicit
+    transactions. It may be shared by the server's threads, whose
+    transactions and reads take turns on ``conn.lock``. Several worker
+    processes may open the same file: writers wait up to ``timeout``
+    seconds for each other instead of failing with "database is locked".
+    """
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                           check_same_thread=False, factory=Connection)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class SqliteChangeFeed(ChangeFeed):
+    """ChangeFeed kept in the database's changes table.
+
+    Every process writing the file appends its changes in the transaction
+    that makes them, so a watcher on any worker sees all of them in commit
+    order. Changes made through this connection wake watchers at once;
+    other processes' are picked up by polling.
+    """
+
+    poll_interval = 0.25
+
+    def __init__(self, conn: Connection, history: int = 10_000):
+        super().__init__(history)
+        self.conn = conn
+        self.history = history
+
+    @property
+    def revision(self) -> int:
+        with self.conn.lock:
+            row = self.conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return row[0] if row else 0
+
+    def publish(self, op: str, lab_id: str, pod_id: str | None = None,
+                device_id: str | None = None, **data) -> None:
+        """Append a change; call it inside the transaction making the change."""
+        event = ChangeEvent.model_construct(
+            revision=0, op=op, lab_id=lab_id, pod_id=pod_id, device_id=device_id,
+            device=data.get('device'), lab=data.get('lab'), supernet=data.get('supernet'),
+            network=data.get('network'), location=data.get('location'))
+        revision = self.conn.execute(
+            "INSERT INTO changes (event) VALUES (?)",
+            (event.model_dump_json(exclude={'revision'}),)).lastrowid
+        if revision % 1000 == 0:
+            self.conn.execute("DELETE FROM changes WHERE revision <= ?", (revision - self.history,))
+        self._wake()
+
+    def read(self, since: int, limit: int = 1000) -> list[ChangeEvent]:
+        with self.conn.lock:
+            revision = self.revision
+            if since > revision:
+                raise RevisionExpiredError(f'Revision {since} is unknown')
+            if since == revision:
+                return []
+            oldest = self.conn.execute("SELECT min(revision) FROM changes").fetchone()[0]
+            if oldest is None or since < oldest - 1:
+                raise RevisionExpiredError(f'Revision {since} has expired, re-read the inventory')
+            rows = self.conn.execute(
+                "SELECT revision, event FROM changes WHERE revision > ? "
+                "ORDER BY revision LIMIT ?", (since, limit)).fetchall()
+        return [ChangeEvent.model_validate({'revision': revision, **json.loads(event)})
+                for revision, event in rows]
+
+
+class _SqliteStore:
+    def __init__(self, conn: Connection, changes: SqliteChangeFeed | None = None):
+        self.conn = conn
+        # writes publish what they changed into the changes table
+        self.changes = changes or SqliteChangeFeed(conn)
+
+    @contextmanager
+    def _transaction(self):
+        """Run the block in one transaction; nested blocks join the outer one.
+
+        BEGIN IMMEDIATE takes the database's write lock before the block
+        runs, so the checks a write depends on (free address, no overlap)
+        can't interleave with another process's write. ``conn.lock`` does the
+        same for the threads sharing this connection.
+        """
+        with self.conn.lock:
+            if self.conn.in_transaction:
+                yield
+                return
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except sqlite3.IntegrityError as exc:
+                self.conn.execute("ROLLBACK")
+                if "ports.pod_id, ports.address" in str(exc):
+                    raise DuplicateIPv4Error("Duplicate IPv4 addresses not allowed") from exc
+                raise
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self.conn.execute("COMMIT")
+
+
+def _reading(method):
+    """Run a store read holding ``conn.lock``.
+
+    The threads share one connection, so a read running while another
+    thread is inside ``_transaction`` would see its uncommitted rows,
+    including those of a transaction about to roll back.
+    """
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.conn.lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def _device_rows(lab_id: str, pod_id: str, devices: list[DeviceExists]):
+    """Split devices into rows for the devices, ports and access_methods tables."""
+    device_rows, port_rows, access_rows = [], [], []
+    for d in devices:
+        device_rows.append((d.id, lab_id, pod_id, d.name, d.description,
+                            d.location.row, d.location.aisle))
+        for i, port in enumerate(d.ports):
+            iface = port.interface
+            net = iface.parent.network
+            port_rows.append((d.id, i, pod_id, int(iface.address),
+                              int(net.network_address), net.prefixlen,
+                              int(iface.parent.gateway)))
+        for i, access in enumerate(d.accessMethods):
+            access_rows.append((d.id, i, pod_id, access.url))
+    return device_rows, port_rows, access_rows
+
+
+def _port(address: int, network: int, prefixlen: int, gateway: int) -> Port:
+    return Port.model_construct(interface=Interface.model_construct(
+        address=IPv4Address(address),
+        parent=Network.model_construct(
+            network=IPv4Network((network, prefixlen)),
+            gateway=IPv4Address(gateway))))
+
+
+@instrument_store
+class SqlitePodDB(_SqliteStore):
+    """PodDB implemented on SQLite tables instead of in-process dicts.
+
+    Rows were validated before they were written, so reads rebuild the
+    device models with ``model_construct`` rather than validating them.
+    """
+
+    def __init__(self, conn: Connection, changes: SqliteChangeFeed | None = None):
+        super().__init__(conn, changes)
+        # encoded GET bodies per pod, invalidated by _pod_changed, and
+        # dropped wholesale when another process commits (see _sync_cache)
+        self.response_cache = ResponseCache()
+        # (lab_id, pod_id) -> content digest (see get_pod_digests), dropped
+        # with the pod's cached bodies
+        self._digests: dict[tuple[str, str], str] = {}
+        # lab_id -> allocator over the lab's supernet, rebuilt from the pods
+        # table when missing and dropped along with the cached bodies
+        self._plans: dict[str, BuddyAllocator] = {}
+        # utilization counters, counted from the tables on first use; the
+        # labs/pods this store writes are marked stale and recounted on the
+        # next read, and another process's commit drops them wholesale
+        self._stats: UtilizationStats | None = None
+        self._stale: set[tuple[str, str | None]] = set()
+        self._data_version = None
+
+    # ---------- internal helpers ----------
+
+    def _init_lab(self) -> str:
+        """Initialize a lab row.
+
+        Returns:
+            a UUID representing the lab id.
+        """
+        lab_id = str(uuid4())
+        self.conn.execute("INSERT INTO labs (id) VALUES (?)", (lab_id,))
+        self._stale.add((lab_id, None))
+        self.changes.publish('add_lab', lab_id)
+        return lab_id
+
+    def _get_lab_or_error(self, lab_id: str) -> None:
+        """Raises LabNotFoundError if the lab does not exist."""
+        row = self.conn.execute("SELECT 1 FROM labs WHERE id = ?", (lab_id,)).fetchone()
+        if row is None:
+            raise LabNotFoundError({'detail': f"Lab {lab_id} not found"})
+
+    def _get_pod_or_error(self, lab_id: str, pod_id: str) -> None:
+        """Raises LabNotFoundError/PodNotFoundError if the lab or pod does not exist."""
+        self._get_lab_or_error(lab_id)
+        row = self.conn.execute(
+            "SELECT 1 FROM pods WHERE lab_id = ? AND id = ?", (lab_id, pod_id)).fetchone()
+        if row is None:
+            raise PodNotFoundError({'detail': f"Pod {pod_id} not found"})
+
+    def _get_device_or_error(self, lab_id: str, pod_id: str, device_id: str) -> DeviceExists:
+        devices = self._load_devices(lab_id, pod_id, device_id)
+        if not devices:
+            raise DeviceNotFoundError({'detail': f'Device {device_id} not found'})
+        return devices[0]
+
+    def _pod_changed(self, lab_id: str, pod_id: str | None = None) -> None:
+        self.response_cache.invalidate(lab_id, pod_id)
+        with self.conn.lock:
+            if pod_id is None:
+                for key in [key for key in self._digests if key[0] == lab_id]:
+                    del self._digests[key]
+            else:
+                self._digests.pop((lab_id, pod_id), None)
+        # any lab's plan may hold the pod's network
+        self._plans.clear()
+        with self.conn.lock:
+            self._stale.add((lab_id, pod_id))
+
+    def _utilization(self) -> UtilizationStats:
+        """Return the utilization counters, recounting the labs and pods marked stale.
+
+        The caller holds ``conn.lock``.
+        """
+        if self._stats is None:
+            self._stats, self._stale = UtilizationStats(), set()
+            self._count_usage(self._stats)
+            return self._stats
+
+        stale, self._stale = self._stale, set()
+        labs = {lab_id for lab_id, pod_id in stale if pod_id is None}
+        for lab_id in labs:
+            self._stats.drop_lab(lab_id)
+            self._count_usage(self._stats, lab_id)
+        for lab_id, pod_id in stale:
+            if pod_id is not None and lab_id not in labs:
+                self._stats.drop_pod(lab_id, pod_id)
+                self._count_usage(self._stats, lab_id, pod_id)
+        return self._stats
+
+    def _count_usage(self, stats: UtilizationStats, lab_id: str | None = None,
+                     pod_id: str | None = None) -> None:
+        """Count every lab, one lab or one pod from the tables into ``stats``."""
+        labs_where = pods_where = devices_where = ""
+        params: tuple = ()
+        if lab_id is not None:
+            labs_where, pods_where, devices_where = " WHERE id = ?", " WHERE pods.lab_id = ?", " WHERE lab_id = ?"
+            params = (lab_id,)
+        if pod_id is not None:
+            pods_where += " AND pods.id = ?"
+            devices_where += " AND pod_id = ?"
+
+        for (found,) in self.conn.execute(f"SELECT id FROM labs{labs_where}", params):
+            stats.add_lab(found)
+        params = params if pod_id is None else (lab_id, pod_id)
+        # primary addresses, and those and the gateways within the pod network's host range
+        for found_lab, found_pod, network, prefixlen, addresses, used in self.conn.execute(
+                "SELECT pods.lab_id, pods.id, pods.network, pods.prefixlen, "
+                "(SELECT COUNT(*) FROM ports p WHERE p.pod_id = pods.id AND p.position = 0), "
+                "(SELECT COUNT(*) FROM ("
+                "  SELECT address AS a FROM ports p WHERE p.pod_id = pods.id AND p.position = 0 "
+                "  UNION SELECT gateway FROM ports p WHERE p.pod_id = pods.id) "
+                " WHERE a BETWEEN pods.network + (pods.prefixlen < 31) "
+                " AND pods.broadcast - (pods.prefixlen < 31)) "
+                f"FROM pods{pods_where}", params):
+            stats.add_pod(found_lab, found_pod)
+            network = None if network is None else IPv4Network((network, prefixlen))
+            stats.set_usage(found_lab, found_pod, network, used, addresses)
+
+        locations: dict[tuple[str, str], list[tuple[str, str, int]]] = {}
+        for found_lab, found_pod, row, aisle, n in self.conn.execute(
+                "SELECT lab_id, pod_id, loc_row, loc_aisle, COUNT(*) FROM devices"
+                f"{devices_where} GROUP BY lab_id, pod_id, loc_row, loc_aisle", params):
+            locations.setdefault((found_lab, found_pod), []).append((row, aisle, n))
+        for (found_lab, found_pod), changes in locations.items():
+            stats.count_devices(found_lab, found_pod, changes)
+
+    def _address_plan(self, lab_id: str) -> BuddyAllocator:
+        """Return the allocator of a lab's supernet, rebuilding it from the pods table.
+
+        Raises:
+            AddressPlanNotFoundError
+        """
+        plan = self._plans.get(lab_id)
+        if plan is not None:
+            return plan
+        row = self.conn.execute(
+            "SELECT network, prefixlen FROM address_plans WHERE lab_id = ?", (lab_id,)).fetchone()
+        if row is None:
+            raise AddressPlanNotFoundError(f'Lab {lab_id} has no address plan')
+        plan = BuddyAllocator(IPv4Network(row))
+        first, last = int(plan.supernet.network_address), int(plan.supernet.broadcast_address)
+        for pod_lab, pod_id, network, prefixlen in self.conn.execute(
+                "SELECT lab_id, id, network, prefixlen FROM pods WHERE network <= ? "
+                "AND broadcast >= ? ORDER BY network, prefixlen", (last, first)):
+            plan.claim(IPv4Network((network, prefixlen)), (pod_lab, pod_id))
+        self._plans[lab_id] = plan
+        return plan
+
+    def _store_changed_device(self, lab_id: str, pod_id: str, device_id: str) -> DeviceExists:
+        """Reload a device updated in place and publish its new state."""
+        device = self._get_device_or_error(lab_id, pod_id, device_id)
+        self.changes.publish('store_device', lab_id, pod_id, device_id, device=device)
+        return device
+
+    def _refresh_pod_network(self, pod_id: str) -> None:
+        """Re-derive the network stored on a pod row from its first device."""
+        self.conn.execute(
+            "UPDATE pods SET (network, prefixlen) = ("
+            "  SELECT p.network, p.prefixlen FROM devices d "
+            "  LEFT JOIN ports p ON p.device_id = d.id AND p.position = 0 "
+            "  WHERE d.pod_id = pods.id ORDER BY d.seq LIMIT 1), "
+            "broadcast = NULL WHERE id = ?", (pod_id,))
+        self.conn.execute(
+            "UPDATE pods SET broadcast = network + (1 << (32 - prefixlen)) - 1 "
+            "WHERE id = ? AND network IS NOT NULL", (pod_id,))
+
+    def _check_pod_overlap(self, pod: PodCreate) -> None:
+        networks = {port.interface.parent.network
+                    for device in pod.assets for port in device.ports}
+        for net in networks:
+            self._check_network_overlap(net)
+
+    def _check_network_overlap(self, net: IPv4Network, own: tuple[str, str] | None = None) -> None:
+        for existing in self.get_pods_overlapping_network(net):
+            if (existing.lab_id, existing.pod_id) != own:
+                raise NetworkOverlapError(
+                    f"Network {net} overlaps {existing.network} of pod "
+                    f"{existing.pod_id} in lab {existing.lab_id}")
+
+    def _check_ip_free(self, pod_id: str, ip: IPv4Address) -> None:
+        row = self.conn.execute(
+            "SELECT 1 FROM ports WHERE pod_id = ? AND position = 0 AND address = ?",
+            (pod_id, int(ip))).fetchone()
+        if row is not None:
+            raise DuplicateIPv4Error("Duplicate IPv4 addresses not allowed")
+
+    def _load_devices(
+        self,
+        lab_id: str,
+        pod_id: str,
+        device_id: str | None = None,
+    ) -> list[DeviceExists]:
+        """Rebuild a pod's devices (or a single device) from their rows."""
+        if device_id is None:
+            where, params = "pod_id = ?", (pod_id,)
+        else:
+            where, params = "pod_id = ? AND device_id = ?", (pod_id, device_id)
+
+        ports = self._load_ports(where, params)
+        access = self._load_access_methods(where, params)
+
+        if device_id is None:
+            rows = self.conn.execute(
+                "SELECT id, name, description, loc_row, loc_aisle FROM devices "
+                "WHERE lab_id = ? AND pod_id = ? ORDER BY seq", (lab_id, pod_id))
+        else:
+            rows = self.conn.execute(
+                "SELECT id, name, description, loc_row, loc_aisle FROM devices "
+                "WHERE lab_id = ? AND pod_id = ? AND id = ?", (lab_id, pod_id, device_id))
+
+        return [
+            DeviceExists.model_construct(
+                id=d_id,
+                name=name,
+                description=description,
+                accessMethods=access.get(d_id, []),
+                location=Location.model_construct(row=row, aisle=aisle),
+                ports=ports.get(d_id, []),
+            )
+            for d_id, name, description, row, aisle in rows
+        ]
+
+    def _load_ports(self, where: str, params: tuple) -> dict[str, list[Port]]:
+        """Rebuild the ports of the devices matching a ports-table condition."""
+        return {
+            dev: [_port(*row[1:]) for row in rows]
+            for dev, rows in groupby(self.conn.execute(
+                f"SELECT device_id, address, network, prefixlen, gateway FROM ports "
+                f"WHERE {where} ORDER BY device_id, position", params), key=itemgetter(0))
+        }
+
+    def _load_access_methods(self, where: str, params: tuple) -> dict[str, list[AccessMethod]]:
+        """Rebuild the access methods of the devices matching an access_methods condition."""
+        return {
+            dev: [AccessMethod.model_construct(url=row[1]) for row in rows]
+            for dev, rows in groupby(self.conn.execute(
+                f"SELECT device_id, url FROM access_methods "
+                f"WHERE {where} ORDER BY device_id, position", params), key=itemgetter(0))
+        }
+
+    def _insert_devices(self, lab_id: str, pod_id: str, devices: list[DeviceExists]) -> None:
+        device_rows, port_rows, access_rows = _device_rows(lab_id, pod_id, devices)
+        self.conn.executemany(
+            "INSERT INTO devices (id, lab_id, pod_id, name, description, loc_row, loc_aisle) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", device_rows)
+        self._insert_device_children(port_rows, access_rows)
+
+    def _replace_devices(self, lab_id: str, pod_id: str, devices: list[DeviceExists]) -> None:
+        """Rewrite the rows of existing devices in place, keeping their order."""
+        device_rows, port_rows, access_rows = _device_rows(lab_id, pod_id, devices)
+        ids = [(device.id,) for device in devices]
+        # every old port goes before any new one, so devices may trade addresses
+        self.conn.executemany("DELETE FROM ports WHERE device_id = ?", ids)
+        self.conn.executemany("DELETE FROM access_methods WHERE device_id = ?", ids)
+        self.conn.executemany(
+            "UPDATE devices SET name = ?, description = ?, loc_row = ?, loc_aisle = ? WHERE id = ?",
+            [(name, description, row, aisle, device_id)
+             for device_id, _, _, name, description, row, aisle in device_rows])
+        self._insert_device_children(port_rows, access_rows)
+
+    def _insert_device_children(self, port_rows: list[tuple], access_rows: list[tuple]) -> None:
+        self.conn.executemany(
+            "INSERT INTO ports (device_id, position, pod_id, address, network, prefixlen, gateway) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", port_rows)
+        self.conn.executemany(
+            "INSERT INTO access_methods (device_id, position, pod_id, url) "
+            "VALUES (?, ?, ?, ?)", access_rows)
+
+    def _insert_pod(self, lab_id: str, pod: PodCreate) -> PodExists:
+        pod_id = str(uuid4())
+        self.conn.execute("INSERT INTO pods (id, lab_id) VALUES (?, ?)", (pod_id, lab_id))
+        self._stale.add((lab_id, pod_id))
+        self._plans.clear()
+
+        seen = set()
+        devices = []
+        for device in pod.assets:
+            if device.ports:
+                addr = device.ports[0].interface.address
+                if addr in seen:
+                    raise DuplicateIPv4Error("Duplicate IPv4 addresses not allowed")
+                seen.add(addr)
+            devices.append(DeviceExists.model_construct(id=str(uuid4()), **dict(device)))
+
+        self._insert_devices(lab_id, pod_id, devices)
+        self._refresh_pod_network(pod_id)
+        self.changes.publish('add_pod', lab_id, pod_id)
+        for device in devices:
+            self.changes.publish('store_device', lab_id, pod_id, device.id, device=device)
+        return PodExists.model_construct(id=pod_id, assets=devices)
+
+    # ---------- get methods ----------
+
+    @_reading
+    def get_pod_by_id(self, lab_id: str, pod_id: str) -> PodExists:
+        """Get a pod
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+        return PodExists.model_construct(id=pod_id, assets=self._load_devices(lab_id, pod_id))
+
+    @_reading
+    def get_lab_pod_ids(self, lab_id: str) -> list[str]:
+        """Return the ids of a lab's pods, in creation order."""
+        self._get_lab_or_error(lab_id)
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM pods WHERE lab_id = ? ORDER BY rowid", (lab_id,))]
+
+    @_reading
+    def get_pod_digests(self, lab_id: str) -> dict[str, str]:
+        """Return a content digest of each of a lab's pods, in creation order.
+
+        Kept until the pod changes, like its cached bodies (see
+        PodDB.get_pod_digests).
+        """
+        self._sync_cache()
+        digests = {}
+        for pod_id in self.get_lab_pod_ids(lab_id):
+            digest = self._digests.get((lab_id, pod_id))
+            if digest is None:
+                digest = self._digests[(lab_id, pod_id)] = pod_digest(
+                    self._load_devices(lab_id, pod_id))
+            digests[pod_id] = digest
+        return digests
+
+    @_reading
+    def get_pod_devices(self, lab_id: str, pod_id: str) -> list[DeviceExists]:
+        """Get a pods devices
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+        return self._load_devices(lab_id, pod_id)
+
+    @_reading
+    def get_pod_device_by_id(self, lab_id: str, pod_id: str, device_id: str) -> DeviceExists:
+        """Get a pod device
+
+        Raises:
+            LabNotFoundError: If the lab does not exist.
+            PodNotFoundError: If the pod does not exist.
+            DeviceNotFoundError: If the device does not exist.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+        return self._get_device_or_error(lab_id, pod_id, device_id)
+
+    @_reading
+    def query_pod_devices(self, lab_id: str, pod_id: str, query: DeviceQuery) -> DevicePage:
+        """Get one page of a pods devices matching a query, in device id order.
+
+        Filters run in SQL, and port and access method rows are only read
+        when those fields are projected.
+        """
+        self._get_pod_or_error(lab_id, pod_id)
+
+        where, params = ["lab_id = ?", "pod_id = ?"], [lab_id, pod_id]
+        if query.cursor is not None:
+            where.append("id > ?")
+            params.append(query.cursor)
+        if query.name_prefix is not None:
+            where.append("substr(name, 1, ?) = ?")
+            params += [len(query.name_prefix), query.name_prefix]
+        if query.row is not None:
+            where.append("loc_row = ?")
+            params.append(query.row)
+        if query.aisle is not None:
+            where.append("loc_aisle = ?")
+            params.append(query.aisle)
+        if query.cidr is not None:
+            where.append("EXISTS (SELECT 1 FROM ports WHERE ports.device_id = devices.id "
+                         "AND ports.address BETWEEN ? AND ?)")
+            params += [int(query.cidr.network_address), int(query.cidr.broadcast_address)]
+
+        rows = self.conn.execute(
+            f"SELECT id, name, description, loc_row, loc_aisle FROM devices "
+            f"WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            (*params, query.page_size + 1)).fetchall()
+        next_cursor = None
+        if len(rows) > query.page_size:
+            rows = rows[:query.page_size]
+            next_cursor = rows[-1][0]
+
+        fields = projected_fields(query)
+        ids = [row[0] for row in rows]
+        in_ids = (f"pod_id = ? AND device_id IN ({', '.join('?' * len(ids))})", (pod_id, *ids))
+        ports = self._load_ports(*in_ids) if ids and 'ports' in fields else {}
+        access = self._load_access_methods(*in_ids) if ids and 'accessMethods' in fields else {}
+
+        devices = [
+            DeviceExists.model_construct(
+                id=d_id,
+                name=name,
+                description=description,
+                accessMethods=access.get(d_id, []),
+                location=Location.model_construct(row=row, aisle=aisle),
+                ports=ports.get(d_id, []),
+            )
+            for d_id, name, description, row, aisle in rows
+        ]
+        return DevicePage.model_construct(devices=devices, next_cursor=next_cursor)
+
+    def _sync_cache(self) -> None:
+        """Drop cached bodies if another connection committed since the last check.
+
+        ``data_version`` only changes for commits made by other connections
+        (e.g. other worker processes); this store invalidates its own writes.
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self.response_cache.clear()
+            self._digests.clear()
+            self._plans.clear()
+            self._stats = None
+            self._data_version = version
+
+    @_reading
+    def get_pod_json(self, lab_id: str, pod_id: str) -> CachedResponse:
+        """Get a pod as an encoded PodExists JSON body."""
+        self._sync_cache()
+        self._get_pod_or_error(lab_id, pod_id)
+
+        def build() -> bytes:
+            return self.get_pod_by_id(lab_id, pod_id).model_dump_json().encode()
+
+        return self.response_cache.get_or_build(lab_id, pod_id, 'pod', build)
+
+    @_reading
+    def get_pod_devices_json(self, lab_id: str, pod_id: str) -> CachedResponse:
+        """Get a pods devices as an encoded DevicePage JSON body of every device."""
+        self._sync_cache()
+        self._get_pod_or_error(lab_id, pod_id)
+
+        def build() -> bytes:
+            return DevicePage.model_construct(
+                devices=self.get_pod_devices(lab_id, pod_id), next_cursor=None).model_dump_json().encode()
+
+        return self.response_cache.get_or_build(lab_id, pod_id, 'devices', build)
+
+    @_reading
+    def get_pod_network(self, lab_id: str, pod_id: str) -> IPv4Network:
+        """Return derived pod network (first device's first port's parent), or None."""
+        self._get_pod_or_error(lab_id, pod_id)
+        row = self.conn.execute(
+            "SELECT network, prefixlen FROM pods WHERE id = ?", (pod_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return IPv4Network((row[0], row[1]))
+
+    def _find_networks(self, where: str, params: tuple) -> list[PodNetwork]:
+        rows = self.conn.execute(
+            f"SELECT lab_id, id, network, prefixlen FROM pods WHERE {where} "
+            f"ORDER BY network, prefixlen", params)
+        return [PodNetwork.model_construct(lab_id=l, pod_id=p, network=IPv4Network((n, plen)))
+                for l, p, n, plen in rows]
+
+    @_reading
+    def get_pods_in_network(self, network: IPv4Network) -> list[PodNetwork]:
+        """Return the pods whose network lies inside (or equals) a network."""
+        return self._find_networks(
+            "network >= ? AND network <= ? AND broadcast <= ?",
+            (int(network.network_address), int(network.broadcast_address),
+             int(network.broadcast_address)))
+
+    @_reading
+    def get_pods_overlapping_network(self, network: IPv4Network) -> list[PodNetwork]:
+        """Return the pods whose network shares any address with a network."""
+        return self._find_networks(
+            "network <= ? AND broadcast >= ?",
+            (int(network.broadcast_address), int(network.network_address)))
+
+    def _used_ints(self, pod_id: str):
+        return (row[0] for row in self.conn.execute(
+            "SELECT address FROM ports WHERE pod_id = ? AND position = 0 ORDER BY address",
+            (pod_id,)))
+
+    def _gateway_ints(self, pod_id: str) -> list[int]:
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT gateway FROM ports WHERE pod_id = ?", (pod_id,))]
+
+    @_reading
+    def find_address(self, ip: IPv4Address) -> list[AddressOwner]:
+        """Return every device, in any lab, with an interface using an address."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT d.lab_id, d.pod_id, d.id, d.name FROM ports p "
+            "JOIN devices d ON d.id = p.device_id WHERE p.address = ? "
+            "ORDER BY d.lab_id, d.pod_id, d.id", (int(ip),))
+        return [AddressOwner.model_construct(lab_id=l, pod_id=p, device_id=d, name=n)
+                for l, p, d, n in rows]
+
+    @_reading
+    def find_lab_address(self, lab_id: str, ip: IPv4Address) -> list[AddressOwner]:
+        """Return every device in a lab with an interface using an address."""
+        self._get_lab_or_error(lab_id)
+        return [owner for owner in self.find_address(ip) if owner.lab_id == lab_id]
+
+    @_reading
+    def search_devices(self, q: str, offset: int = 0, limit: int = 100) -> SearchPage:
+        """Return a page of the devices matching a free text query, best first.
+
+        SQL narrows the devices to those containing every query term in some
+        field; they are then ranked exactly as the in-memory search index
+        ranks them, which also drops short terms found only mid-token.
+        """
+        terms = tokenize(q)
+        if not terms:
+            return SearchPage(total=0, offset=offset, limit=limit, results=[])
+
+        term_match = ("(instr(lower(d.name), ?) OR instr(lower(d.description), ?) OR EXISTS ("
+                      "SELECT 1 FROM access_methods a WHERE a.device_id = d.id "
+                      "AND instr(lower(a.url), ?)))")
+        rows = self.conn.execute(
+            "SELECT d.lab_id, d.pod_id, d.id, d.name, d.description, "
+            "(SELECT group_concat(url, ' ') FROM access_methods a WHERE a.device_id = d.id) "
+            "FROM devices d WHERE " + " AND ".join([term_match] * len(terms)),
+            tuple(term for term in terms for _ in range(3))).fetchall()
+
+        hits = []
+        for lab_id, pod_id, device_id, name, description, urls in rows:
+            rank = score(SearchDoc.build(name, description, [urls or '']), q)
+            if rank:
+                hits.append((rank, name.lower(), (lab_id, pod_id, device_id), name))
+        hits.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+
+        results = [SearchHit.model_construct(lab_id=lab_id, pod_id=pod_id, device_id=device_id,
+                                             name=name, score=rank)
+                   for rank, _, (lab_id, pod_id, device_id), name in hits[offset:offset + limit]]
+        return SearchPage(total=len(hits), offset=offset, limit=limit, results=results)
+
+    @_reading
+    def get_address_plan(self, lab_id: str) -> AddressPlan:
+        """Return a lab's supernet and how much of it is free."""
+        self._sync_cache()
+        self._get_lab_or_error(lab_id)
+        plan = self._address_plan(lab_id)
+        return AddressPlan.model_construct(
+            lab_id=lab_id, supernet=plan.supernet, allocated=len(plan),
+            free_addresses=plan.free_addresses, largest_free=plan.largest_free())
+
+    @_reading
+    def get_lab_stats(self, lab_id: str, offset: int = 0, limit: int = 10) -> LabStats:
+        """Return a lab's device and address counts and its most exhausted subnets."""
+        self._sync_cache()
+        stats = self._utilization().lab(lab_id, offset, limit)
+        if stats is None:
+            raise LabNotFoundError({'detail': f"Lab {lab_id} not found"})
+        return stats
+
+    @_reading
+    def get_stats(self, offset: int = 0, limit: int = 10) -> InventoryStats:
+        """Return the inventory's device and address counts and its most exhausted subnets."""
+        self._sync_cache()
+        return self._utilization().inventory(offset, limit)
+
+    @_reading
+    def count_inventory(self) -> tuple[int, int, int]:
+        """Return how many pods, devices and tracked addresses the store holds."""
+        self._sync_cache()
+        return self._utilization().counts()
+
+    @_reading
+    def get_all_pod_ip(self, lab_id: str, pod_id: str) -> list[IPv4Address]:
+        """Return all IPs used in this pod (sorted)."""
+        self._get_pod_or_error(lab_id, pod_id)
+        return [IPv4Address(a) for a in self._used_ints(pod_id)]
+
+    @_reading
+    def get_free_pod_ip(
+        self,
+        lab_id: str,
+        pod_id: str,
+        offset: int = 0,
+        limit: int = 100,
+    ) -> FreeAddressPage:
+        """Return a page of the unused address blocks in the pod's network."""
+        net = self.get_pod_network(lab_id, pod_id)
+        if net is None:
+            return FreeAddressPage(total=0, offset=offset, limit=limit, addresses=[])
+
+        free = list(IPv4RangeSet(self._used_ints(pod_id)).iter_free(
+            *host_bounds(net), exclude=self._gateway_ints(pod_id)))
+        blocks = []
+        for start, end in islice(free, offset, offset + limit):
+            first, last = IPv4Address(start), IPv4Address(end)
+            blocks.append(AddressBlock(
+                start=first,
+                end=last,
+                size=end - start + 1,
+                cidrs=list(summarize_address_range(first, last)),
+            ))
+
+        return FreeAddressPage(total=len(free), offset=offset, limit=limit, addresses=blocks)
+
+    @_reading
+    def get_next_free_pod_ip(self, lab_id: str, pod_id: str) -> IPv4Address | None:
+        """Return the lowest unused host address in the pod's network, or None."""
+        net = self.get_pod_network(lab_id, pod_id)
+        if net is None:
+            return None
+        addr = IPv4RangeSet(self._used_ints(pod_id)).first_free(
+            *host_bounds(net), exclude=self._gateway_ints(pod_id))
+        return None if addr is None else IPv4Address(addr)
+
+    # ---------- post methods ----------
+
+    def create_pods(self, lab_id: str, pods: list[PodCreate]) -> list[PodExists]:
+        """Create several pods under a lab in one transaction.
+
+        Raises:
+            LabNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+        """
+        for pod in pods:
+            check_pod_addresses(pod)
+        with self._transaction():
+            self._get_lab_or_error(lab_id)
+            return [self._insert_pod(lab_id, pod) for pod in pods]
+
+    def create_pod(self, lab_id: str, pod: PodCreate, reject_overlap: bool = False) -> PodExists:
+        """Create a pod entry under a lab.
+
+        Raises:
+            LabNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+            NetworkOverlapError
+        """
+        with self._transaction():
+            if reject_overlap:
+                self._check_pod_overlap(pod)
+            return self.create_pods(lab_id, [pod])[0]
+
+    def put_address_plan(self, lab_id: str, supernet: IPv4Network) -> AddressPlan:
+        """Register (or replace) the supernet a lab's pods are allocated from."""
+        with self._transaction():
+            self._get_lab_or_error(lab_id)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO address_plans (lab_id, network, prefixlen) VALUES (?, ?, ?)",
+                (lab_id, int(supernet.network_address), supernet.prefixlen))
+            self._plans.pop(lab_id, None)
+            self.changes.publish('put_address_plan', lab_id, supernet=supernet)
+        return self.get_address_plan(lab_id)
+
+    def allocate_pod(self, lab_id: str, pod: PodAllocate) -> PodExists:
+        """Create a pod on the next free subnet of the lab's supernet.
+
+        See PodDB.allocate_pod. The allocator is cached per lab and kept up
+        to date by allocations, so a burst of them doesn't re-read the pods.
+        """
+        prefixlen = pod.network_prefixlen
+        with self._transaction():
+            # inside the write lock, so other processes' pods are seen
+            self._sync_cache()
+            self._get_lab_or_error(lab_id)
+            plan = self._address_plan(lab_id)
+            try:
+                net = plan.allocate(prefixlen)
+                if net is None:
+                    raise SubnetExhaustedError(f'No free /{prefixlen} left in {plan.supernet}')
+                network = Network.model_construct(network=net, gateway=net.network_address + 1)
+                created = self._insert_pod(lab_id, PodCreate.model_construct(assets=[
+                    DeviceCreate.model_construct(
+                        **dict(device),
+                        ports=[Port.model_construct(interface=Interface.model_construct(
+                            address=net.network_address + 2 + i, parent=network))])
+                    for i, device in enumerate(pod.assets)]))
+                plan.claim(net, (lab_id, created.id))
+                # other labs' plans may cover the new pod as well
+                self._plans = {lab_id: plan}
+            except BaseException:
+                # the transaction rolls back, so the allocator is stale
+                self._plans.pop(lab_id, None)
+                raise
+        return created
+
+    def create_device(self, lab_id: str, pod_id: str, device: DeviceCreate) -> DeviceExists:
+        """Create a new device within a pod.
+
+        Raises:
+            LabNotFoundError
+            PodNotFoundError
+            DuplicateIPv4Error
+            AddressOutsideNetworkError
+        """
+        check_device_addresses(device)
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            if device.ports:
+                self._check_ip_free(pod_id, device.ports[0].interface.address)
+            device_exists = DeviceExists.model_construct(id=str(uuid4()), **dict(device))
+            self._insert_devices(lab_id, pod_id, [device_exists])
+            self._refresh_pod_network(pod_id)
+            self.changes.publish('store_device', lab_id, pod_id, device_exists.id, device=device_exists)
+        self._pod_changed(lab_id, pod_id)
+        return device_exists
+
+    # ---------- patch methods ----------
+
+    def patch_device_ip(self, lab_id: str, pod_id: str, device_id: str, ip: IPv4Address) -> DeviceExists:
+        """Update a pod device's IP address."""
+        with self._transaction():
+            device = self.get_pod_device_by_id(lab_id, pod_id, device_id)
+            if not device.ports or device.ports[0].interface.address == ip:
+                return device
+            port = device.ports[0]
+            check_device_addresses(device.model_copy(update={'ports': [port.model_copy(update={
+                'interface': port.interface.model_copy(update={'address': ip})}), *device.ports[1:]]}))
+            self._check_ip_free(pod_id, ip)
+            self.conn.execute(
+                "UPDATE ports SET address = ? WHERE device_id = ? AND position = 0",
+                (int(ip), device_id))
+            device = self._store_changed_device(lab_id, pod_id, device_id)
+        self._pod_changed(lab_id, pod_id)
+        return device
+
+    def patch_device_name(self, lab_id: str, pod_id: str, device_id: str, name: str) -> DeviceExists:
+        """Patch a device's name."""
+        with self._transaction():
+            self.get_pod_device_by_id(lab_id, pod_id, device_id)
+            self.conn.execute("UPDATE devices SET name = ? WHERE id = ?", (name, device_id))
+            device = self._store_changed_device(lab_id, pod_id, device_id)
+        self._pod_changed(lab_id, pod_id)
+        return device
+
+    def patch_device_access_method(
+        self,
+        lab_id: str,
+        pod_id: str,
+        device_id: str,
+        access_method: AccessMethod,
+    ) -> DeviceExists:
+        """Patch a device's first access method."""
+        with self._transaction():
+            self.get_pod_device_by_id(lab_id, pod_id, device_id)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO access_methods (device_id, position, pod_id, url) "
+                "VALUES (?, 0, ?, ?)", (device_id, pod_id, access_method.url))
+            device = self._store_changed_device(lab_id, pod_id, device_id)
+        self._pod_changed(lab_id, pod_id)
+        return device
+
+    def patch_pod_devices_network(self, lab_id: str, pod_id: str, network: Network,
+                                  reject_overlap: bool = False) -> list[DeviceExists]:
+        """Patch all devices in a pod to use the given network."""
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            if reject_overlap:
+                self._check_network_overlap(network.network, own=(lab_id, pod_id))
+            self.conn.execute(
+                "UPDATE ports SET network = ?, prefixlen = ?, gateway = ? WHERE pod_id = ?",
+                (int(network.network.network_address), network.network.prefixlen,
+                 int(network.gateway), pod_id))
+            self._refresh_pod_network(pod_id)
+            self.changes.publish('set_pod_network', lab_id, pod_id, network=network)
+            devices = self._load_devices(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        return devices
+
+    def patch_pod_devices_location(self, lab_id: str, pod_id: str, location: Location) -> list[DeviceExists]:
+        """Patch all devices in a pod to share the same location."""
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            self.conn.execute(
+                "UPDATE devices SET loc_row = ?, loc_aisle = ? WHERE lab_id = ? AND pod_id = ?",
+                (location.row, location.aisle, lab_id, pod_id))
+            self.changes.publish('set_pod_location', lab_id, pod_id, location=location)
+            devices = self._load_devices(lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        return devices
+
+    def apply_device_batch(
+        self,
+        lab_id: str,
+        pod_id: str,
+        operations: list[DeviceBatchOp],
+    ) -> list[DeviceBatchResult]:
+        """Apply a list of device mutations to one pod in a single transaction."""
+        results = []
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            for i, op in enumerate(operations):
+                try:
+                    if op.op == 'create':
+                        device = self.create_device(lab_id, pod_id, op.device)
+                    elif op.op == 'patch_ip':
+                        device = self.patch_device_ip(lab_id, pod_id, op.device_id, op.ip)
+                    elif op.op == 'patch_name':
+                        device = self.patch_device_name(lab_id, pod_id, op.device_id, op.name)
+                    elif op.op == 'patch_access':
+                        device = self.patch_device_access_method(lab_id, pod_id, op.device_id, op.access)
+                    else:
+                        self.delete_device(lab_id, pod_id, op.device_id)
+                        device = None
+                except DuplicateIPv4Error:
+                    raise DuplicateIPv4Error(f"Operation {i}: duplicate IPv4 address not allowed")
+                except AddressOutsideNetworkError as exc:
+                    raise AddressOutsideNetworkError(f"Operation {i}: {exc}") from exc
+                except DeviceNotFoundError:
+                    raise DeviceNotFoundError(
+                        {'detail': f'Operation {i}: device {op.device_id} not found'})
+                results.append(DeviceBatchResult.model_construct(
+                    op=op.op, device_id=device.id if device else op.device_id, device=device))
+        return results
+
+    def sync_pod_devices(
+        self,
+        lab_id: str,
+        pod_id: str,
+        update: dict[str, DeviceCreate],
+        create: list[DeviceCreate],
+        delete: list[str],
+    ) -> list[DeviceExists]:
+        """Replace, create and delete devices of a pod in one transaction.
+
+        Replaced devices keep their ids; see PodDB.sync_pod_devices.
+        """
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            current = {device.id: device for device in self._load_devices(lab_id, pod_id)}
+            for device_id in (*update, *delete):
+                if device_id not in current:
+                    raise DeviceNotFoundError({'detail': f'Device {device_id} not found'})
+
+            replaced = [DeviceExists.model_construct(id=device_id, **dict(device))
+                        for device_id, device in update.items()]
+            created = [DeviceExists.model_construct(id=str(uuid4()), **dict(device))
+                       for device in create]
+            gone = set(update).union(delete)
+            kept = [device for device_id, device in current.items() if device_id not in gone]
+            check_pod_addresses(PodCreate.model_construct(assets=kept + replaced + created))
+
+            self.conn.executemany("DELETE FROM devices WHERE id = ?", [(device_id,) for device_id in delete])
+            self._replace_devices(lab_id, pod_id, replaced)
+            self._insert_devices(lab_id, pod_id, created)
+            self._refresh_pod_network(pod_id)
+            for device_id in delete:
+                self.changes.publish('drop_device', lab_id, pod_id, device_id)
+            for device in replaced + created:
+                self.changes.publish('store_device', lab_id, pod_id, device.id, device=device)
+        self._pod_changed(lab_id, pod_id)
+        return replaced + created
+
+    # ---------- delete methods ----------
+
+    def delete_lab_and_pod(self, lab_id: str) -> bool:
+        """delete a lab and it's pods"""
+        with self._transaction():
+            self._get_lab_or_error(lab_id)
+            self.conn.execute("DELETE FROM labs WHERE id = ?", (lab_id,))
+            self.changes.publish('drop_lab', lab_id)
+        self._pod_changed(lab_id)
+        return True
+
+    def delete_pod(self, lab_id: str, pod_id: str) -> bool:
+        """delete a pod"""
+        with self._transaction():
+            self._get_pod_or_error(lab_id, pod_id)
+            self.conn.execute("DELETE FROM pods WHERE id = ?", (pod_id,))
+            self.changes.publish('drop_pod', lab_id, pod_id)
+        self._pod_changed(lab_id, pod_id)
+        return True
+
+    def delete_device(self, lab_id: str, pod_id: str, device_id: str) -> bool:
+        """delete a device from a pod"""
+        with self._transaction():
+            self.get_pod_device_by_id(lab_id, pod_id, device_id)
+            self.conn.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+            self._refresh_pod_network(pod_id)
+            self.changes.publish('drop_device', lab_id, pod_id, device_id)
+        self._pod_changed(lab_id, pod_id)
+        return True
+
+
+@instrument_store
+class SqliteLabDB(_SqliteStore):
+    """LabDB implemented on the labs table shared with SqlitePodDB."""
+
+    @_reading
+    def get_lab_meta(self, lab_id: str) -> LabMetaExists:
+        row = self.conn.execute(
+            "SELECT name, location, building, floor FROM labs "
+            "WHERE id = ? AND name IS NOT NULL", (lab_id,)).fetchone()
+
+        if row is not None:
+            name, location, building, floor = row
+            return LabMetaExists(id=lab_id, name=name, location=location,
+                                 building=building, floor=floor)
+
+        raise LabNotFoundError(f'Lab {lab_id} does not exist')
+
+    @_reading
+    def get_lab_ids(self) -> list[str]:
+        """Return the ids of every lab with meta, in creation order."""
+        return [row[0] for row in self.conn.execute(
+            "SELECT id FROM labs WHERE name IS NOT NULL ORDER BY rowid")]
+
+    def put_lab_meta(self, lab_id: str, lab: LabMetaCreate) -> LabMetaExists:
+        lab_meta = LabMetaExists(id=lab_id, **lab.model_dump())
+        with self._transaction():
+            self.conn.execute(
+                "INSERT INTO labs (id, name, location, building, floor) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, location = excluded.location, "
+                "building = excluded.building, floor = excluded.floor",
+                (lab_id, lab.name, lab.location, lab.building, lab.floor))
+            self.changes.publish('put_meta', lab_id, lab=lab_meta)
+        return lab_meta
+
+    def create_new_lab_meta(self, lab: LabMetaCreate, lab_pods: SqlitePodDB) -> LabMetaExists:
+        with self._transaction():
+            lab_id = lab_pods._init_lab()
+            self.put_lab_meta(lab_id, lab)
+        return LabMetaExists(id=lab_id, **lab.model_dump())
+
+    def delete_lab_meta(self, lab_id) -> bool:
+        with self._transaction():
+            self.get_lab_meta(lab_id)
+            self.conn.execute(
+                "UPDATE labs SET name = NULL, location = NULL, building = NULL, floor = NULL "
+                "WHERE id = ?", (lab_id,))
+            self.changes.publish('drop_meta', lab_id)
+        return True
@@ -0,0 +1,227 @@
+"""Idempotent imports: make the stores match a dump by applying only what differs.
+
+Labs are matched by their natural key, ``(name, building)``. The pods of
+a matched lab are matched by content digest first, which settles every
+unchanged pod without looking at its devices. Each remaining incoming
+pod then goes to the remaining stored pod it shares the most device names
+with. Within a matched pod, devices are matched by name, and devices that
+share a name are paired in order. Whatever is left is created or deleted.
+
+Matched labs, pods and devices keep their ids, so re-importing an
+unchanged dump changes nothing. A dump that differs in a few devices
+costs a few store writes on top of hashing it.
+"""
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+
+from app.Exceptions.exceptions import LabNotFoundError
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreate
+from app.models.pod_model import DeviceCreate, DeviceExists, PodCreate
+from app.models.sync_model import SyncLabResult, SyncReport
+from app.services.digests import device_digest, pod_digest
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+
+
+def sync_labs(labs: list[LabCreate], lab_db: LabDB, pod_db: PodDB, prune: bool = False) -> SyncReport:
+    """Create, update and delete labs, pods and devices until the stores match a dump.
+
+    Like a bulk import, expects validated labs. In the memory store each
+    matched lab is synced holding that lab's lock, so writers to other labs
+    carry on meanwhile; only pruning holds off every writer. On SQLite each
+    write commits on its own, interleaved with other writers'.
+
+    Args:
+        labs: The dump's labs
+        lab_db: The lab store
+        pod_db: The pod store
+        prune: Also delete stored labs the dump does not have
+
+    Returns:
+        What was created, updated, deleted and left unchanged
+    """
+    locks = getattr(pod_db, 'locks', None)
+    report = SyncReport()
+
+    stored: dict[tuple[str, str], list[str]] = defaultdict(list)
+    for lab_id in lab_db.get_lab_ids():
+        meta = lab_db.get_lab_meta(lab_id)
+        stored[(meta.name, meta.building)].append(lab_id)
+
+    for index, lab in enumerate(labs):
+        # labs sharing a key (e.g. from repeated plain imports) pair in order
+        candidates = stored.get((lab.name, lab.building))
+        lab_id = candidates.pop(0) if candidates else None
+        if lab_id is not None:
+            with locks.lab(lab_id) if locks is not None else nullcontext():
+                if _lab_exists(lab_db, lab_id):
+                    status = 'updated' if _sync_lab(lab_id, lab, lab_db, pod_db, report) else 'unchanged'
+                else:
+                    # deleted since the labs were listed
+                    lab_id = None
+        if lab_id is None:
+            lab_id = commit_lab(lab, lab_db, pod_db).id
+            status = 'created'
+            report.pods.created += len(lab.pods)
+            report.devices.created += sum(len(pod.assets) for pod in lab.pods)
+        _count(report.labs, status)
+        report.results.append(SyncLabResult(
+            index=index, lab_id=lab_id, name=lab.name, building=lab.building, status=status))
+
+    if prune:
+        with locks.exclusive() if locks is not None else nullcontext():
+            _prune(stored, lab_db, pod_db, report)
+
+    return report
+
+
+def _prune(stored: dict[tuple[str, str], list[str]], lab_db: LabDB, pod_db: PodDB,
+           report: SyncReport) -> None:
+    """Delete the stored labs no incoming lab was matched with."""
+    for (name, building), lab_ids in stored.items():
+        for lab_id in lab_ids:
+            if not _lab_exists(lab_db, lab_id):
+                continue
+            pod_ids = pod_db.get_lab_pod_ids(lab_id)
+            report.pods.deleted += len(pod_ids)
+            report.devices.deleted += sum(
+                len(pod_db.get_pod_devices(lab_id, pod_id)) for pod_id in pod_ids)
+            lab_db.delete_lab_meta(lab_id)
+            pod_db.delete_lab_and_pod(lab_id)
+            report.labs.deleted += 1
+            report.results.append(SyncLabResult(
+                index=None, lab_id=lab_id, name=name, building=building, status='deleted'))
+
+
+def _lab_exists(lab_db: LabDB, lab_id: str) -> bool:
+    try:
+        lab_db.get_lab_meta(lab_id)
+    except LabNotFoundError:
+        return False
+    return True
+
+
+def _count(counts, status: str) -> None:
+    setattr(counts, status, getattr(counts, status) + 1)
+
+
+def _sync_lab(lab_id: str, lab: LabCreate, lab_db: LabDB, pod_db: PodDB, report: SyncReport) -> bool:
+    """Bring a stored lab in line with an incoming one; returns whether anything changed."""
+    changed = False
+
+    meta = lab_db.get_lab_meta(lab_id)
+    if (meta.location, meta.floor) != (lab.location, lab.floor):
+        lab_db.put_lab_meta(lab_id, LabMetaCreate(
+            name=lab.name, location=lab.location, building=lab.building, floor=lab.floor))
+        changed = True
+
+    stored_digests = pod_db.get_pod_digests(lab_id)
+    by_digest: dict[str, list[str]] = defaultdict(list)
+    for pod_id, digest in stored_digests.items():
+        by_digest[digest].append(pod_id)
+
+    incoming = []
+    for pod in lab.pods:
+        same = by_digest.get(pod_digest(pod.assets))
+        if same:
+            same.pop(0)
+            report.pods.unchanged += 1
+            report.devices.unchanged += len(pod.assets)
+        else:
+            incoming.append(pod)
+    leftover = {pod_id for pod_ids in by_digest.values() for pod_id in pod_ids}
+    if not incoming and not leftover:
+        return changed
+
+    pairs, created, deleted = _pair_pods(
+        incoming, {pod_id: pod_db.get_pod_devices(lab_id, pod_id)
+                   for pod_id in stored_digests if pod_id in leftover})
+
+    for pod_id, devices in deleted.items():
+        pod_db.delete_pod(lab_id, pod_id)
+        report.pods.deleted += 1
+        report.devices.deleted += len(devices)
+
+    for pod_id, devices, pod in pairs:
+        update, create, delete, unchanged = _diff_devices(devices, pod.assets)
+        pod_db.sync_pod_devices(lab_id, pod_id, update, create, delete)
+        report.pods.updated += 1
+        report.devices.updated += len(update)
+        report.devices.created += len(create)
+        report.devices.deleted += len(delete)
+        report.devices.unchanged += unchanged
+
+    if created:
+        pod_db.create_pods(lab_id, created)
+        report.pods.created += len(created)
+        report.devices.created += sum(len(pod.assets) for pod in created)
+
+    return True
+
+
+def _pair_pods(
+    incoming: list[PodCreate],
+    stored: dict[str, list[DeviceExists]],
+) -> tuple[list[tuple[str, list[DeviceExists], PodCreate]], list[PodCreate], dict[str, list[DeviceExists]]]:
+    """Pair changed pods with the stored pods they share the most device names with.
+
+    Returns:
+        ``(pod_id, stored devices, incoming pod)`` pairs, the incoming pods
+        to create and the stored pods (with their devices) to delete
+    """
+    owners: dict[str, list[str]] = defaultdict(list)
+    for pod_id, devices in stored.items():
+        for name in {device.name for device in devices}:
+            owners[name].append(pod_id)
+
+    pairs, created = [], []
+    for pod in incoming:
+        shared = Counter(pod_id for name in {device.name for device in pod.assets}
+                         for pod_id in owners.get(name, ()) if pod_id in stored)
+        if shared:
+            pod_id = shared.most_common(1)[0][0]
+            pairs.append((pod_id, stored.pop(pod_id), pod))
+        else:
+            created.append(pod)
+    return pairs, created, stored
+
+
+def _diff_devices(
+    stored: list[DeviceExists],
+    incoming: list[DeviceCreate],
+) -> tuple[dict[str, DeviceCreate], list[DeviceCreate], list[str], int]:
+    """Match a pod's incoming devices to its stored ones by name.
+
+    Returns:
+        ``(update, create, delete, unchanged)``: new content per stored
+        device id, devices to add, device ids to remove and how many
+        devices are identical
+    """
+    by_name: dict[str, list[tuple[DeviceExists, bytes]]] = defaultdict(list)
+    for device in stored:
+        by_name[device.name].append((device, device_digest(device)))
+
+    unchanged = 0
+    pending = []
+    for device in incoming:
+        digest = device_digest(device)
+        candidates = by_name.get(device.name, [])
+        for i, (_, stored_digest) in enumerate(candidates):
+            if stored_digest == digest:
+                del candidates[i]
+                unchanged += 1
+                break
+        else:
+            pending.append(device)
+
+    update, create = {}, []
+    for device in pending:
+        candidates = by_name.get(device.name)
+        if candidates:
+            update[candidates.pop(0)[0].id] = device
+        else:
+            create.append(device)
+    delete = [device.id for candidates in by_name.values() for device, _ in candidates]
+    return update, create, delete, unchanged
@@ -0,0 +1,206 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from ipaddress import IPv4Network
+from typing import Iterable
+
+from app.models.stats_model import InventoryStats, LabStats, SubnetUsage
+from app.services.ip_ranges import host_bounds
+
+
+class _Usage:
+    """Counters summed over a pod, a lab or the whole inventory."""
+
+    __slots__ = ('devices', 'addresses', 'used', 'total')
+
+    def __init__(self):
+        self.devices = self.addresses = self.used = self.total = 0
+
+
+class _PodUsage(_Usage):
+    __slots__ = ('network', 'locations', 'rank')
+
+    def __init__(self):
+        super().__init__()
+        self.network: IPv4Network | None = None
+        # (row, aisle) -> devices
+        self.locations: Counter = Counter()
+        # the pod's key in the rankings, None while it has no network
+        self.rank: tuple | None = None
+
+
+class _LabUsage(_Usage):
+    __slots__ = ('pods', 'rows', 'aisles', 'ranking')
+
+    def __init__(self):
+        super().__init__()
+        self.pods: set[str] = set()
+        self.rows: Counter = Counter()
+        self.aisles: Counter = Counter()
+        self.ranking: list[tuple] = []
+
+
+def _count(counter: Counter, key, n: int) -> None:
+    counter[key] += n
+    if not counter[key]:
+        del counter[key]
+
+
+class UtilizationStats:
+    """Device and address counters per pod, per lab and for the whole inventory.
+
+    The store reports every change to a pod (devices joining or leaving a
+    location, its used addresses, its network) and the counters of the
+    pod, its lab and the totals are adjusted by the difference, so reading
+    them costs nothing however large the inventory is. Pods with a network
+    are also kept in rankings, most exhausted first (highest share of used
+    hosts, then fewest free), one per lab and one overall, so the top of
+    either is a slice. Pods of one lab change concurrently, so operations
+    hold an internal lock.
+    """
+
+    def __init__(self):
+        self._pods: dict[tuple[str, str], _PodUsage] = {}
+        self._labs: dict[str, _LabUsage] = {}
+        self._totals = _Usage()
+        self._ranking: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def add_lab(self, lab_id: str) -> None:
+        with self._lock:
+            self._labs.setdefault(lab_id, _LabUsage())
+
+    def drop_lab(self, lab_id: str) -> None:
+        with self._lock:
+            lab = self._labs.pop(lab_id, None)
+            if lab is None:
+                return
+            for pod_id in lab.pods:
+                pod = self._pods.pop((lab_id, pod_id))
+                if pod.rank is not None:
+                    del self._ranking[bisect_left(self._ranking, pod.rank)]
+            self._add(self._totals, lab, -1)
+
+    def add_pod(self, lab_id: str, pod_id: str) -> None:
+        with self._lock:
+            if (lab_id, pod_id) not in self._pods:
+                self._labs[lab_id].pods.add(pod_id)
+                self._pods[(lab_id, pod_id)] = _PodUsage()
+
+    def drop_pod(self, lab_id: str, pod_id: str) -> None:
+        with self._lock:
+            pod = self._pods.pop((lab_id, pod_id), None)
+            if pod is None:
+                return
+            lab = self._labs[lab_id]
+            lab.pods.discard(pod_id)
+            self._unrank(pod, lab)
+            for (row, aisle), n in pod.locations.items():
+                _count(lab.rows, row, -n)
+                _count(lab.aisles, aisle, -n)
+            self._add(lab, pod, -1)
+            self._add(self._totals, pod, -1)
+
+    def count_devices(self, lab_id: str, pod_id: str, changes: Iterable[tuple[str, str, int]]) -> None:
+        """Apply ``(row, aisle, n)`` changes: n devices at that location joined (or, negative, left) a pod."""
+        with self._lock:
+            pod, lab = self._pods[(lab_id, pod_id)], self._labs[lab_id]
+            for row, aisle, n in changes:
+                _count(pod.locations, (row, aisle), n)
+                _count(lab.rows, row, n)
+                _count(lab.aisles, aisle, n)
+                pod.devices += n
+                lab.devices += n
+                self._totals.devices += n
+
+    def relocate_pod(self, lab_id: str, pod_id: str, row: str, aisle: str) -> None:
+        """Move every device of a pod to one location."""
+        with self._lock:
+            pod, lab = self._pods[(lab_id, pod_id)], self._labs[lab_id]
+            for (old_row, old_aisle), n in pod.locations.items():
+                _count(lab.rows, old_row, -n)
+                _count(lab.aisles, old_aisle, -n)
+            pod.locations = Counter({(row, aisle): pod.devices}) if pod.devices else Counter()
+            if pod.devices:
+                _count(lab.rows, row, pod.devices)
+                _count(lab.aisles, aisle, pod.devices)
+
+    def set_usage(self, lab_id: str, pod_id: str, network: IPv4Network | None,
+                  used: int, addresses: int) -> None:
+        """Record a pod's network, how many of its hosts are used and how many addresses it holds.
+
+        Args:
+            lab_id: Identifier of the lab
+            pod_id: Identifier of the pod
+            network: The pod's network, or None
+            used: Host addresses of the network in use, gateways included
+            addresses: Addresses the pod uses, inside its network or not
+        """
+        if network is None:
+            total = used = 0
+        else:
+            first, last = host_bounds(network)
+            total = last - first + 1
+        with self._lock:
+            pod, lab = self._pods[(lab_id, pod_id)], self._labs[lab_id]
+            if (pod.network, pod.used, pod.addresses) == (network, used, addresses):
+                return
+            self._unrank(pod, lab)
+            for usage in (lab, self._totals):
+                usage.addresses += addresses - pod.addresses
+                usage.used += used - pod.used
+                usage.total += total - pod.total
+            pod.network, pod.used, pod.total, pod.addresses = network, used, total, addresses
+            if network is not None:
+                pod.rank = (-(used / total), total - used, lab_id, pod_id)
+                insort(lab.ranking, pod.rank)
+                insort(self._ranking, pod.rank)
+
+    def _unrank(self, pod: _PodUsage, lab: _LabUsage) -> None:
+        if pod.rank is not None:
+            del lab.ranking[bisect_left(lab.ranking, pod.rank)]
+            del self._ranking[bisect_left(self._ranking, pod.rank)]
+            pod.rank = None
+
+    @staticmethod
+    def _add(usage: _Usage, part: _Usage, sign: int) -> None:
+        usage.devices += sign * part.devices
+        usage.addresses += sign * part.addresses
+        usage.used += sign * part.used
+        usage.total += sign * part.total
+
+    def _subnets(self, ranking: list[tuple], offset: int, limit: int) -> list[SubnetUsage]:
+        subnets = []
+        for rank in ranking[offset:offset + limit]:
+            lab_id, pod_id = rank[2:]
+            pod = self._pods[(lab_id, pod_id)]
+            subnets.append(SubnetUsage.model_construct(
+                lab_id=lab_id, pod_id=pod_id, network=pod.network, devices=pod.devices,
+                used=pod.used, total=pod.total, utilization=-rank[0]))
+        return subnets
+
+    def lab(self, lab_id: str, offset: int = 0, limit: int = 10) -> LabStats | None:
+        """Return a lab's counters and a page of its most exhausted subnets, or None for an unknown lab."""
+        with self._lock:
+            lab = self._labs.get(lab_id)
+            if lab is None:
+                return None
+            return LabStats.model_construct(
+                lab_id=lab_id, pods=len(lab.pods), devices=lab.devices, addresses=lab.addresses,
+                used_hosts=lab.used, total_hosts=lab.total,
+                rows=dict(lab.rows), aisles=dict(lab.aisles),
+                subnets=self._subnets(lab.ranking, offset, limit))
+
+    def inventory(self, offset: int = 0, limit: int = 10) -> InventoryStats:
+        """Return the inventory's counters and a page of its most exhausted subnets."""
+        with self._lock:
+            totals = self._totals
+            return InventoryStats.model_construct(
+                labs=len(self._labs), pods=len(self._pods), devices=totals.devices,
+                addresses=totals.addresses, used_hosts=totals.used, total_hosts=totals.total,
+                subnets=self._subnets(self._ranking, offset, limit))
+
+    def counts(self) -> tuple[int, int, int]:
+        """Return how many pods, devices and addresses are counted."""
+        with self._lock:
+            return len(self._pods), self._totals.devices, self._totals.addresses
@@ -0,0 +1,62 @@
+import sys
+import threading
+from weakref import WeakValueDictionary
+from app.models.pod_model import DeviceExists, Interface, Location, Network, Port
+
+
+class ValuePool:
+    """Shared instances of the value objects devices repeat.
+
+    Devices of a pod usually repeat the same parent Network on every port,
+    the same Location and the same description. Stored devices are never
+    mutated in place, so equal values can be one shared object: the pool
+    hands out one Network per (network, gateway) and one Location per
+    (row, aisle), and interns descriptions. Entries go away with the last
+    device using them.
+    """
+
+    def __init__(self):
+        self._networks: WeakValueDictionary[tuple, Network] = WeakValueDictionary()
+        self._locations: WeakValueDictionary[tuple, Location] = WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def network(self, network: Network) -> Network:
+        """Return the shared Network equal to ``network``."""
+        key = (network.network, network.gateway)
+        with self._lock:
+            shared = self._networks.get(key)
+            if shared is None:
+                shared = self._networks[key] = network
+        return shared
+
+    def location(self, location: Location) -> Location:
+        """Return the shared Location equal to ``location``."""
+        key = (location.row, location.aisle)
+        with self._lock:
+            shared = self._locations.get(key)
+            if shared is None:
+                shared = self._locations[key] = location
+        return shared
+
+    def device(self, device: DeviceExists) -> DeviceExists:
+        """Return ``device`` with its repeated values replaced by shared ones.
+
+        The device itself is returned when all of its values already are.
+        """
+        location = self.location(device.location)
+        description = sys.intern(device.description)
+        ports = device.ports
+        for i, port in enumerate(ports):
+            parent = self.network(port.interface.parent)
+            if parent is not port.interface.parent:
+                if ports is device.ports:
+                    ports = list(ports)
+                ports[i] = Port.model_construct(interface=Interface.model_construct(
+                    address=port.interface.address, parent=parent))
+
+        if (location is device.location and description is device.description
+                and ports is device.ports):
+            return device
+        return DeviceExists.model_construct(
+            id=device.id, name=device.name, description=description,
+            accessMethods=device.accessMethods, location=location, ports=ports)
@@ -0,0 +1,63 @@
+"""Per-device read cost of PodDB, before and after storing validated models.
+
+Before: devices were stored as ``model_dump()`` dicts and every read ran
+``DeviceExists.model_validate`` on them. After: the stored DeviceExists
+records are returned as-is.
+
+Run with ``python -m benchmarks.device_reads``.
+"""
+import json
+import timeit
+from pathlib import Path
+
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreateDump
+from app.models.pod_model import DeviceExists
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+
+DUMP = Path(__file__).resolve().parent.parent / "app" / "data" / "pod_dump_aligned.json"
+
+
+def load_store() -> PodDB:
+    dump = LabCreateDump.model_validate(json.loads(DUMP.read_bytes()))
+    pod_db, lab_db = PodDB(), LabDB()
+    for lab in dump.data:
+        meta = lab_db.create_new_lab_meta(
+            LabMetaCreate(name=lab.name, location=lab.location,
+                          building=lab.building, floor=lab.floor), pod_db)
+        for pod in lab.pods:
+            pod_db.create_pod(meta.id, pod)
+    return pod_db
+
+
+def main(repeat: int = 5) -> None:
+    pod_db = load_store()
+    pods = [(lab_id, pod_id)
+            for lab_id, lab in pod_db.pods_by_id.items()
+            for pod_id in lab]
+    n_devices = sum(len(pod_db.pods_by_id[l][p]['assets']) for l, p in pods)
+
+    # The previous storage layout: plain dicts revalidated on every read.
+    dicts = {(l, p): {d_id: d.model_dump(exclude={'id'})
+                      for d_id, d in pod_db.pods_by_id[l][p]['assets'].items()}
+             for l, p in pods}
+
+    def read_before():
+        for key in pods:
+            [DeviceExists.model_validate({'id': d_id, **d})
+             for d_id, d in dicts[key].items()]
+
+    def read_after():
+        for lab_id, pod_id in pods:
+            pod_db.get_pod_devices(lab_id, pod_id)
+
+    print(f"{len(pods)} pods, {n_devices} devices")
+    for name, fn in (("before (model_validate per read)", read_before),
+                     ("after (stored models)", read_after)):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print(f"{name:34s} {best * 1e6 / n_devices:8.3f} us/device")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""In-process load generator for the API.
+
+Loads the bundled dump, replicated ``--scales`` times, into fresh stores and
+drives the ASGI app through httpx with ``--concurrency`` concurrent clients
+until ``--requests`` requests (or ``--duration`` seconds) have been sent.
+Latency is measured per request around the client call, so with many
+clients it includes the time a request waits for the event loop. Reports
+p50/p95/p99 latency per route and overall, and the throughput.
+
+By default each request is drawn from a weighted mix of the API's read and
+write routes (``DEFAULT_MIX``). ``--traffic FILE`` replays a JSONL file
+instead, one request template per line::
+
+    {"method": "GET", "path": "/labs/{lab_id}/pods/{pod_id}", "weight": 5}
+    {"method": "GET", "path": "/search", "params": {"q": "{device_name}"}}
+
+Placeholders in the strings of ``path``, ``params`` and ``json``
+(``{lab_id}``, ``{pod_id}``, ``{device_id}``, ``{device_name}``, ``{ip}``)
+are filled from a random device of the loaded inventory.
+
+Run with ``python -m benchmarks.load [--scales 1 10 100] [--store sqlite]
+[--output load.json]``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+import httpx
+
+from app.main import app
+from app.dependencies.dependencies import get_change_feed, get_lab_db, get_pod_db
+from app.models.lab_model import LabCreate
+from app.services.change_feed import ChangeFeed
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.results import percentiles, write_results
+from benchmarks.synthetic import load_dump, scaled_labs
+
+
+class Template(NamedTuple):
+    method: str
+    path: str
+    params: dict | None = None
+    json: dict | list | None = None
+    weight: float = 1.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+DEFAULT_MIX = [
+    Template("GET", "/labs/{lab_id}/pods/{pod_id}", weight=30),
+    Template("GET", "/lab/{lab_id}/pods/{pod_id}/devices", weight=15),
+    Template("GET", "/lab/{lab_id}/pods/{pod_id}/devices", {"limit": "10", "fields": "id,name"}, weight=5),
+    Template("GET", "/labs/{lab_id}", weight=5),
+    Template("GET", "/labs/{lab_id}/pods/{pod_id}/addresses/free", weight=10),
+    Template("GET", "/labs/{lab_id}/pods/{pod_id}/addresses/next", weight=5),
+    Template("GET", "/addresses/{ip}", weight=10),
+    Template("GET", "/search", {"q": "{device_name}", "limit": "20"}, weight=10),
+    Template("PATCH", "/lab/{lab_id}/pods/{pod_id}/device/{device_id}/name",
+             {"name": "{device_name}"}, weight=5),
+    Template("PATCH", "/lab/{lab_id}/pods/{pod_id}/device/{device_id}/accessMethod",
+             json={"url": "ssh://{ip}"}, weight=5),
+]
+
+
+def load_traffic(path: str) -> list[Template]:
+    """Read request templates from a JSONL file."""
+    templates = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                templates.append(Template(
+                    record["method"].upper(), record["path"], record.get("params"),
+                    record.get("json"), float(record.get("weight", 1.0))))
+    return templates
+
+
+class Target(NamedTuple):
+    lab_id: str
+    pod_id: str
+    device_id: str
+    device_name: str
+    ip: str
+
+
+@contextmanager
+def serving(labs: list[LabCreate], store: str) -> Iterator[list[Target]]:
+    """Load the labs into fresh stores and point the app's dependencies at them."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if store == "sqlite":
+            from app.services.sqlite_store import SqliteChangeFeed, SqliteLabDB, SqlitePodDB, connect
+            conn = connect(os.path.join(tmp, "inventory.db"))
+            changes = SqliteChangeFeed(conn)
+            pod_db, lab_db = SqlitePodDB(conn, changes), SqliteLabDB(conn, changes)
+        else:
+            changes = ChangeFeed()
+            pod_db, lab_db = PodDB(changes=changes), LabDB(changes=changes)
+            lab_db.locks = pod_db.locks
+
+        targets = []
+        for lab in labs:
+            lab_exists = commit_lab(lab, lab_db, pod_db)
+            for pod in lab_exists.pods:
+                for device in pod.assets:
+                    if device.ports:
+                        targets.append(Target(lab_exists.id, pod.id, device.id, device.name,
+                                              str(device.ports[0].interface.address)))
+
+        app.dependency_overrides[get_pod_db] = lambda: pod_db
+        app.dependency_overrides[get_lab_db] = lambda: lab_db
+        app.dependency_overrides[get_change_feed] = lambda: changes
+        try:
+            yield targets
+        finally:
+            app.dependency_overrides.clear()
+            if store == "sqlite":
+                conn.close()
+
+
+def _fill(value, target: Target):
+    if isinstance(value, str):
+        return value.format_map(target._asdict())
+    if isinstance(value, dict):
+        return {k: _fill(v, target) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, target) for v in value]
+    return value
+
+
+async def drive(
+    templates: list[Template],
+    targets: list[Target],
+    concurrency: int,
+    total: int,
+    duration: float | None,
+    warmup: int,
+    seed: int,
+) -> dict:
+    """Send the traffic and return latency percentiles per route and overall."""
+    rng = random.Random(seed)
+    weights = [t.weight for t in templates]
+    samples: dict[str, list[float]] = defaultdict(list)
+    errors: Counter = Counter()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def send(record: bool) -> None:
+            template = rng.choices(templates, weights)[0]
+            target = rng.choice(targets)
+            t = time.perf_counter()
+            response = await client.request(
+                template.method, _fill(template.path, target),
+                params=_fill(template.params, target), json=_fill(template.json, target))
+            elapsed = time.perf_counter() - t
+            if record:
+                samples[template.name].append(elapsed)
+                if response.status_code >= 400:
+                    errors[template.name] += 1
+
+        for _ in range(warmup):
+            await send(False)
+
+        sent = 0
+        deadline = None if duration is None else time.perf_counter() + duration
+
+        async def client_loop() -> None:
+            nonlocal sent
+            while sent < total and (deadline is None or time.perf_counter() < deadline):
+                sent += 1
+                await send(True)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    everything = [s for route in samples.values() for s in route]
+    results = {"total": {**percentiles(everything),
+                         "errors": sum(errors.values()),
+                         "wall_s": wall,
+                         "throughput_rps": len(everything) / wall if wall else 0.0}}
+    for name, route in sorted(samples.items()):
+        results[name] = {**percentiles(route), "errors": errors[name]}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--traffic", help="JSONL request templates to replay instead of the default mix")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    templates = load_traffic(args.traffic) if args.traffic else DEFAULT_MIX
+    total = args.requests if args.duration is None else float("inf")
+    dump = load_dump()
+    results = {}
+    for scale in args.scales:
+        labs = [LabCreate.model_validate(lab) for lab in scaled_labs(scale, dump)]
+        t = time.perf_counter()
+        with serving(labs, args.store) as targets:
+            print(f"scale {scale}x ({args.store}): {len(labs)} labs, {len(targets)} devices "
+                  f"loaded in {time.perf_counter() - t:.1f}s")
+            scale_results = asyncio.run(drive(
+                templates, targets, args.concurrency, total, args.duration, args.warmup, args.seed))
+
+        for name, result in scale_results.items():
+            extra = f" {result['throughput_rps']:9.1f} req/s" if "throughput_rps" in result else ""
+            print(f"  {name:68s} n={result['count']:6d} p50={result['p50_ms']:8.3f} "
+                  f"p95={result['p95_ms']:8.3f} p99={result['p99_ms']:8.3f} ms "
+                  f"errors={result['errors']}{extra}")
+            results[f"{scale}x/{args.store}/{name}"] = result
+
+    write_results(args.output, "load", results, scales=args.scales, store=args.store,
+                  traffic=args.traffic, concurrency=args.concurrency, requests=args.requests,
+                  duration=args.duration, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
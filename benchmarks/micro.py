@@ -0,0 +1,184 @@
+"""Micro-benchmarks of the PodDB hot paths and the bulk import.
+
+Each benchmark runs over every pod of the bundled dump replicated
+``--scales`` times and reports the best and median of ``--repeat`` runs,
+per call. ``--output`` writes the results as JSON for
+``python -m benchmarks.results``.
+
+Run with ``python -m benchmarks.micro [--scales 1 10] [--output micro.json]``.
+"""
+import argparse
+import asyncio
+import json
+from ipaddress import IPv4Network
+
+from app.Exceptions.exceptions import DuplicateIPv4Error
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreate
+from app.models.pod_model import DeviceAllocate, PodAllocate
+from app.services.conflicts import find_conflicts
+from app.services.importer import LabImporter, commit_lab, validate_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.results import measure, write_results
+from benchmarks.synthetic import load_dump, scaled_labs
+
+
+def _new_stores(labs: list[LabCreate]) -> tuple[PodDB, LabDB, list[str]]:
+    pod_db, lab_db = PodDB(), LabDB()
+    lab_ids = [lab_db.create_new_lab_meta(
+        LabMetaCreate(name=lab.name, location=lab.location,
+                      building=lab.building, floor=lab.floor), pod_db).id
+               for lab in labs]
+    return pod_db, lab_db, lab_ids
+
+
+def bench_store(labs: list[LabCreate], repeat: int) -> dict:
+    results = {}
+    state = {}
+
+    def fresh():
+        state["pod_db"], _, state["lab_ids"] = _new_stores(labs)
+
+    def create_pods() -> int:
+        n = 0
+        for lab_id, lab in zip(state["lab_ids"], labs):
+            for pod in lab.pods:
+                state["pod_db"].create_pod(lab_id, pod)
+                n += 1
+        return n
+
+    results["create_pod"] = measure(create_pods, repeat, setup=fresh)
+
+    # the last run's store stays loaded for the read benchmarks
+    pod_db = state["pod_db"]
+    pods = [(lab_id, pod_id) for lab_id, lab in pod_db.pods_by_id.items() for pod_id in lab]
+
+    def get_pod_devices() -> int:
+        for lab_id, pod_id in pods:
+            pod_db.get_pod_devices(lab_id, pod_id)
+        return len(pods)
+
+    def get_free_pod_ip() -> int:
+        for lab_id, pod_id in pods:
+            pod_db.get_free_pod_ip(lab_id, pod_id)
+        return len(pods)
+
+    lab_ids = list(pod_db.pods_by_id)
+
+    def get_lab_stats() -> int:
+        for lab_id in lab_ids:
+            pod_db.get_lab_stats(lab_id)
+        return len(lab_ids)
+
+    all_assets = [pod.assets for lab in labs for pod in lab.pods]
+
+    def track_pod_assets() -> int:
+        for assets in all_assets:
+            pod_db._track_pod_ip_addresses(assets=assets)
+        return len(all_assets)
+
+    used = [(lab_id, pod_id, pod_db.get_all_pod_ip(lab_id, pod_id)) for lab_id, pod_id in pods]
+    probes = [(lab_id, pod_id, ips[-1]) for lab_id, pod_id, ips in used if ips]
+
+    def track_pod_ip() -> int:
+        # every probe is an address in use, so each call raises
+        for lab_id, pod_id, ip in probes:
+            try:
+                pod_db._track_pod_ip_addresses(lab_id, pod_id, ip)
+            except DuplicateIPv4Error:
+                pass
+        return len(probes)
+
+    results["get_pod_devices"] = measure(get_pod_devices, repeat)
+    results["get_free_pod_ip"] = measure(get_free_pod_ip, repeat)
+    results["get_lab_stats"] = measure(get_lab_stats, repeat)
+    results["get_stats"] = measure(lambda: (pod_db.get_stats(), 1)[1], repeat)
+    results["track_pod_ip_addresses.assets"] = measure(track_pod_assets, repeat)
+    results["track_pod_ip_addresses.ip"] = measure(track_pod_ip, repeat)
+    results["find_conflicts.dump"] = measure(lambda: (find_conflicts(labs), len(all_assets))[1], repeat)
+
+    # the same pods again, addressed by the lab's plan instead of by hand
+    requests = [PodAllocate(assets=[DeviceAllocate(**device.model_dump(exclude={"ports"}))
+                                    for device in pod.assets])
+                for lab in labs for pod in lab.pods if pod.assets]
+
+    def fresh_plan():
+        fresh()
+        state["pod_db"].put_address_plan(state["lab_ids"][0], IPv4Network("10.0.0.0/8"))
+
+    def allocate_pods() -> int:
+        for request in requests:
+            state["pod_db"].allocate_pod(state["lab_ids"][0], request)
+        return len(requests)
+
+    results["allocate_pod"] = measure(allocate_pods, repeat, setup=fresh_plan)
+    return results
+
+
+def bench_import(raw_labs: list[bytes], repeat: int, workers: int) -> dict:
+    results = {}
+
+    def import_serial() -> int:
+        pod_db, lab_db = PodDB(), LabDB()
+        for raw in raw_labs:
+            lab, error = validate_lab(raw)
+            if error is None:
+                commit_lab(lab, lab_db, pod_db)
+        return len(raw_labs)
+
+    results["bulk_import.serial"] = measure(import_serial, repeat)
+
+    if workers:
+        importer = LabImporter(workers)
+
+        async def source():
+            for raw in raw_labs:
+                yield raw
+
+        async def run() -> int:
+            pod_db, lab_db = PodDB(), LabDB()
+            async for validated in importer.validate(source()):
+                if validated.error is None:
+                    commit_lab(validated.lab, lab_db, pod_db)
+            return len(raw_labs)
+
+        try:
+            asyncio.run(run())  # start the worker processes outside the timings
+            results[f"bulk_import.pool{workers}"] = measure(lambda: asyncio.run(run()), repeat)
+        finally:
+            importer.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="also time the import on a LabImporter with this many processes")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    dump = load_dump()
+    results = {}
+    for scale in args.scales:
+        raw = list(scaled_labs(scale, dump))
+        labs = [LabCreate.model_validate(lab) for lab in raw]
+        devices = sum(len(pod.assets) for lab in labs for pod in lab.pods)
+        print(f"scale {scale}x: {len(labs)} labs, {devices} devices")
+
+        scale_results = bench_store(labs, args.repeat)
+        scale_results.update(bench_import(
+            [json.dumps(lab).encode() for lab in raw], args.repeat, args.workers))
+        for name, result in scale_results.items():
+            print(f"  {name:32s} {result['best_us_per_op']:12.2f} us/op "
+                  f"(median {result['median_us_per_op']:.2f}, {result['ops']} ops)")
+            results[f"{scale}x/{name}"] = result
+
+    write_results(args.output, "micro", results, scales=args.scales, repeat=args.repeat,
+                  workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Timing helpers and the JSON result files shared by the benchmarks.
+
+A result file records where it was measured (commit, python, platform) and
+a flat ``{name: {metric: value}}`` map, so two files can be compared with
+``python -m benchmarks.results old.json new.json``.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Return p50/p95/p99 (and min/max/mean) of latency samples in seconds, as ms."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e3
+
+    return {
+        "count": len(ordered),
+        "min_ms": ordered[0] * 1e3,
+        "mean_ms": statistics.fmean(ordered) * 1e3,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1e3,
+    }
+
+
+def measure(fn: Callable[[], int], repeat: int = 5, setup: Callable[[], None] | None = None) -> dict:
+    """Time ``fn`` ``repeat`` times; it returns how many operations it ran.
+
+    Returns:
+        The best and median run, as total seconds and microseconds per operation
+    """
+    runs = []
+    ops = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t = time.perf_counter()
+        ops = fn()
+        runs.append(time.perf_counter() - t)
+    best, median = min(runs), statistics.median(runs)
+    return {
+        "ops": ops,
+        "best_s": best,
+        "median_s": median,
+        "best_us_per_op": best * 1e6 / max(ops, 1),
+        "median_us_per_op": median * 1e6 / max(ops, 1),
+    }
+
+
+def environment() -> dict:
+    """Describe the commit and interpreter a result was measured on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_results(path: str | None, suite: str, results: dict, **params) -> None:
+    """Write a suite's results with their environment, if a path was given."""
+    if not path:
+        return
+    document = {"suite": suite, "environment": environment(), "params": params, "results": results}
+    Path(path).write_text(json.dumps(document, indent=2))
+    print(f"wrote {path}")
+
+
+# metrics where larger is better; everything else is a time
+_HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> list[str]:
+    """Return a line per shared metric, flagging changes beyond ``threshold``."""
+    lines = []
+    for name in sorted(set(old["results"]) & set(new["results"])):
+        for metric in sorted(set(old["results"][name]) & set(new["results"][name])):
+            a, b = old["results"][name][metric], new["results"][name][metric]
+            if not isinstance(a, (int, float)) or metric in ("count", "ops", "wall_s") or not a:
+                continue
+            change = (b - a) / a
+            worse = change < -threshold if metric in _HIGHER_IS_BETTER else change > threshold
+            better = change > threshold if metric in _HIGHER_IS_BETTER else change < -threshold
+            flag = "REGRESSION" if worse else "improved" if better else ""
+            lines.append(f"{name:40s} {metric:18s} {a:12.3f} -> {b:12.3f} {change:+7.1%} {flag}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change reported as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    old, new = (json.loads(Path(p).read_text()) for p in (args.old, args.new))
+    print(f"{old['environment'].get('commit')} -> {new['environment'].get('commit')}")
+    lines = compare(old, new, args.threshold)
+    print("\n".join(lines))
+    if any(line.endswith("REGRESSION") for line in lines):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the in-memory and SQLite stores on the bundled dump and a scaled copy.
+
+For each scale it measures the bulk import (one create_pods call per lab,
+which is one transaction per lab on SQLite), reading every pod's devices,
+single device lookups and free address queries.
+
+Run with ``python -m benchmarks.sqlite_store [--scales 1 100]``.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreate
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+from benchmarks.synthetic import load_dump, scaled_labs
+
+
+def import_labs(labs, lab_db, pod_db) -> list[tuple[str, str, list[str]]]:
+    pods = []
+    for lab in labs:
+        meta = lab_db.create_new_lab_meta(
+            LabMetaCreate(name=lab.name, location=lab.location,
+                          building=lab.building, floor=lab.floor), pod_db)
+        for pod in pod_db.create_pods(meta.id, lab.pods):
+            pods.append((meta.id, pod.id, [d.id for d in pod.assets]))
+    return pods
+
+
+def run(name: str, labs: list[LabCreate], lab_db, pod_db) -> dict:
+    t = time.perf_counter()
+    pods = import_labs(labs, lab_db, pod_db)
+    results = {"import_s": time.perf_counter() - t}
+
+    t = time.perf_counter()
+    for lab_id, pod_id, _ in pods:
+        pod_db.get_pod_devices(lab_id, pod_id)
+    results["read_all_pods_s"] = time.perf_counter() - t
+
+    rng = random.Random(0)
+    sample = [(l, p, rng.choice(ds)) for l, p, ds in rng.choices(pods, k=2000) if ds]
+    t = time.perf_counter()
+    for lab_id, pod_id, device_id in sample:
+        pod_db.get_pod_device_by_id(lab_id, pod_id, device_id)
+    results["device_lookup_us"] = (time.perf_counter() - t) * 1e6 / len(sample)
+
+    t = time.perf_counter()
+    for lab_id, pod_id, _ in pods[:2000]:
+        pod_db.get_free_pod_ip(lab_id, pod_id)
+    results["free_ip_us"] = (time.perf_counter() - t) * 1e6 / min(len(pods), 2000)
+
+    print(f"  {name:7s} " + "  ".join(f"{k}={v:.3f}" for k, v in results.items()))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    args = parser.parse_args()
+
+    dump = load_dump()
+    for scale in args.scales:
+        labs = [LabCreate.model_validate(lab) for lab in scaled_labs(scale, dump)]
+        devices = sum(len(pod.assets) for lab in labs for pod in lab.pods)
+        print(f"scale {scale}x: {len(labs)} labs, {devices} devices")
+
+        run("memory", labs, LabDB(), PodDB())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = connect(os.path.join(tmp, "inventory.db"))
+            run("sqlite", labs, SqliteLabDB(conn), SqlitePodDB(conn))
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Synthetic inventories built by replicating the bundled dump."""
+import copy
+import json
+from pathlib import Path
+
+DUMP = Path(__file__).resolve().parent.parent / "app" / "data" / "pod_dump_aligned.json"
+
+
+def load_dump() -> dict:
+    return json.loads(DUMP.read_bytes())
+
+
+def scaled_labs(scale: int, dump: dict | None = None):
+    """Yield the dump's labs ``scale`` times, renamed so every copy is distinct.
+
+    Addresses only have to be unique within a pod, so copies keep them.
+    """
+    labs = (dump or load_dump())["data"]
+    for i in range(scale):
+        for lab in labs:
+            lab = copy.deepcopy(lab) if i else lab
+            if i:
+                lab["name"] = f"{lab['name']}-{i}"
+            yield lab
+
+
+def scaled_dump(scale: int) -> dict:
+    """Return a dump with ``scale`` copies of every lab."""
+    return {"data": list(scaled_labs(scale))}
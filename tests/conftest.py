@@ -0,0 +1,30 @@
+"""Fixtures shared by the API tests."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies.dependencies import get_change_feed, get_lab_db, get_pod_db
+from app.main import app
+from app.services.change_feed import ChangeFeed
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+
+
+@pytest.fixture
+def api():
+    """A test client serving fresh, empty memory stores.
+
+    Yields ``(client, pod_db, lab_db)``; the stores publish to their own
+    change feed.
+    """
+    changes = ChangeFeed()
+    pod_db, lab_db = PodDB(changes=changes), LabDB(changes=changes)
+    app.dependency_overrides.update({
+        get_pod_db: lambda: pod_db,
+        get_lab_db: lambda: lab_db,
+        get_change_feed: lambda: changes,
+    })
+    try:
+        with TestClient(app) as client:
+            yield client, pod_db, lab_db
+    finally:
+        app.dependency_overrides.clear()
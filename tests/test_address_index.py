@@ -0,0 +1,77 @@
+"""Reverse lookup from an address to the devices using it."""
+from collections import defaultdict
+from ipaddress import IPv4Address
+
+from app.models.lab_model import LabCreate
+from app.services.address_index import AddressIndex
+from app.services.importer import commit_lab
+from benchmarks.synthetic import load_dump
+
+
+def test_index_keeps_every_location_of_an_address():
+    index = AddressIndex()
+    index.add([1, 2], "lab", "pod", "a")
+    index.add([1], "lab", "other", "b")
+    index.add([1], "lab2", "pod", "c")
+    assert index.lookup(1) == [("lab", "other", "b"), ("lab", "pod", "a"), ("lab2", "pod", "c")]
+    assert index.lookup_in_lab("lab", 1) == [("other", "b"), ("pod", "a")]
+
+    index.discard([1, 2], "lab", "pod", "a")
+    index.discard([7], "lab", "pod", "a")
+    assert index.lookup(2) == []
+    assert index.lookup_in_lab("lab", 1) == [("other", "b")]
+
+    index.drop_lab("lab")
+    assert index.lookup(1) == [("lab2", "pod", "c")]
+    assert index.lookup_in_lab("lab", 1) == []
+    assert index._global.keys() == {1}
+
+
+def _owners(pod_db, lab_db):
+    """Every address in use, worked out from the devices."""
+    owners = defaultdict(set)
+    for lab_id in lab_db.get_lab_ids():
+        for pod_id in pod_db.get_lab_pod_ids(lab_id):
+            for device in pod_db.get_pod_devices(lab_id, pod_id):
+                for port in device.ports:
+                    owners[port.interface.address].add((lab_id, pod_id, device.id, device.name))
+    return owners
+
+
+def _found(owners):
+    return {(o.lab_id, o.pod_id, o.device_id, o.name) for o in owners}
+
+
+def test_index_follows_the_inventory(api):
+    client, pod_db, lab_db = api
+    for lab in load_dump()["data"][:3]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_id, gone = pod_db.get_lab_pod_ids(lab_id)[:2]
+    device = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+    old = device.ports[0].interface.address
+
+    pod_db.patch_device_name(lab_id, pod_id, device.id, "renamed")
+    pod_db.patch_device_ip(lab_id, pod_id, device.id, pod_db.get_next_free_pod_ip(lab_id, pod_id))
+    pod_db.delete_pod(lab_id, gone)
+    lab_db.delete_lab_meta(lab_db.get_lab_ids()[-1])
+
+    expected = _owners(pod_db, lab_db)
+    assert old not in expected
+    for ip, owners in expected.items():
+        assert _found(pod_db.find_address(ip)) == owners
+    assert pod_db.find_address(old) == []
+
+    ip = next(iter(expected))
+    body = client.get(f"/addresses/{ip}").json()
+    assert {(o["lab_id"], o["pod_id"], o["device_id"], o["name"]) for o in body["owners"]} == expected[ip]
+    in_lab = {owner for owner in expected[ip] if owner[0] == lab_id}
+    body = client.get(f"/labs/{lab_id}/addresses/{ip}").json()
+    assert {(o["lab_id"], o["pod_id"], o["device_id"], o["name"]) for o in body["owners"]} == in_lab
+
+
+def test_unused_address_and_unknown_lab(api):
+    client, pod_db, lab_db = api
+    assert client.get(f"/addresses/{IPv4Address('192.0.2.1')}").json() == {"owners": []}
+    assert client.get("/labs/missing/addresses/192.0.2.1").status_code == 404
+    assert client.get("/addresses/192.0.2.300").status_code == 422
@@ -0,0 +1,105 @@
+"""The benchmark suite's helpers, and that its traffic fits the API."""
+import asyncio
+import json
+import sys
+
+import pytest
+
+from app.models.lab_model import LabCreate
+from benchmarks import results
+from benchmarks.load import DEFAULT_MIX, Template, drive, load_traffic, serving
+from benchmarks.micro import bench_store
+from benchmarks.synthetic import load_dump, scaled_dump
+
+
+def test_percentiles():
+    stats = results.percentiles([i / 1000 for i in range(1, 101)])
+    assert stats["count"] == 100
+    assert (stats["min_ms"], stats["max_ms"]) == pytest.approx((1, 100))
+    assert (stats["p50_ms"], stats["p95_ms"], stats["p99_ms"]) == pytest.approx((51, 96, 100))
+    assert stats["mean_ms"] == pytest.approx(50.5)
+    assert results.percentiles([]) == {}
+
+
+def test_measure_reports_per_operation():
+    calls = []
+    stats = results.measure(lambda: 4, repeat=3, setup=lambda: calls.append(1))
+    assert len(calls) == 3
+    assert stats["ops"] == 4
+    assert stats["best_us_per_op"] == pytest.approx(stats["best_s"] * 1e6 / 4)
+    assert stats["best_s"] <= stats["median_s"]
+
+
+def _document(**metrics):
+    return {"environment": {}, "results": {"route": metrics}}
+
+
+def test_compare_flags_changes_beyond_the_threshold():
+    old = _document(p50_ms=10.0, p99_ms=10.0, throughput_rps=100.0, count=10, mean_ms=10.0)
+    new = _document(p50_ms=12.0, p99_ms=8.0, throughput_rps=80.0, count=99, mean_ms=10.5)
+    lines = {line.split()[1]: line for line in results.compare(old, new, threshold=0.10)}
+    assert "count" not in lines
+    assert lines["p50_ms"].endswith("REGRESSION")
+    assert lines["p99_ms"].endswith("improved")
+    assert lines["throughput_rps"].endswith("REGRESSION")
+    assert lines["mean_ms"].rstrip().endswith("+5.0%")
+
+
+def test_results_main_fails_on_a_regression(tmp_path, monkeypatch, capsys):
+    old, new = tmp_path / "old.json", tmp_path / "new.json"
+    old.write_text(json.dumps(_document(p50_ms=10.0)))
+    new.write_text(json.dumps(_document(p50_ms=10.5)))
+    monkeypatch.setattr(sys, "argv", ["results", str(old), str(new)])
+    results.main()
+
+    new.write_text(json.dumps(_document(p50_ms=20.0)))
+    with pytest.raises(SystemExit) as exited:
+        results.main()
+    assert exited.value.code == 1
+    assert "REGRESSION" in capsys.readouterr().out
+
+
+def test_write_results(tmp_path):
+    path = tmp_path / "micro.json"
+    results.write_results(str(path), "micro", {"1x/create_pod": {"best_s": 1.0}}, scales=[1])
+    document = json.loads(path.read_text())
+    assert document["suite"] == "micro"
+    assert document["params"] == {"scales": [1]}
+    assert document["results"] == {"1x/create_pod": {"best_s": 1.0}}
+    assert set(document["environment"]) == {"commit", "python", "platform", "timestamp"}
+    results.write_results(None, "micro", {})
+
+
+def test_scaled_dump_copies_every_lab_under_a_new_name():
+    labs = load_dump()["data"]
+    scaled = scaled_dump(3)["data"]
+    assert len(scaled) == 3 * len(labs)
+    assert len({lab["name"] for lab in scaled}) == len(scaled)
+    assert scaled[len(labs)]["pods"] == labs[0]["pods"]
+
+
+def test_load_traffic(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text('{"method": "get", "path": "/labs/{lab_id}", "weight": 2}\n\n'
+                    '{"method": "GET", "path": "/search", "params": {"q": "{device_name}"}}\n')
+    assert load_traffic(str(path)) == [
+        Template("GET", "/labs/{lab_id}", None, None, 2.0),
+        Template("GET", "/search", {"q": "{device_name}"}, None, 1.0)]
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_default_mix_runs_without_errors(store):
+    labs = [LabCreate.model_validate(lab) for lab in load_dump()["data"][:2]]
+    with serving(labs, store) as targets:
+        report = asyncio.run(drive(DEFAULT_MIX, targets, concurrency=4, total=300,
+                                   duration=None, warmup=0, seed=1))
+    assert report["total"]["count"] == 300
+    assert report["total"]["errors"] == 0
+    assert {name for name in report if name != "total"} <= {t.name for t in DEFAULT_MIX}
+
+
+def test_micro_store_benchmarks():
+    labs = [LabCreate.model_validate(lab) for lab in load_dump()["data"][:1]]
+    report = bench_store(labs, repeat=1)
+    assert {"create_pod", "get_pod_devices", "get_free_pod_ip", "allocate_pod"} <= set(report)
+    assert report["create_pod"]["ops"] == len(labs[0].pods)
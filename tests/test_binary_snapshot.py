@@ -0,0 +1,140 @@
+"""Binary inventory snapshots: writing, reading back and preloading."""
+import gc
+from ipaddress import IPv4Network
+
+import pytest
+
+from app.models.lab_model import LabCreate, LabCreateDump
+from app.models.pod_model import PodAllocate
+from app.services.binary_snapshot import (
+    MAGIC, SnapshotFormatError, dump_state, load_snapshot, read_snapshot, write_snapshot)
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.persistence import snapshot_state
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+@pytest.fixture(autouse=True)
+def unfreeze():
+    yield
+    gc.unfreeze()
+
+
+def _state(labs=3):
+    return dump_state([LabCreateDump.model_validate({"data": load_dump()["data"][:labs]})])
+
+
+def _loaded(path):
+    pod_db, lab_db = PodDB(), LabDB()
+    load_snapshot(path, pod_db, lab_db)
+    return pod_db, lab_db
+
+
+def test_round_trip(tmp_path):
+    state = _state()
+    path = tmp_path / "inventory.bin"
+    write_snapshot(state, path)
+
+    read = list(read_snapshot(path))
+    assert [lab_id for lab_id, *_ in read] == list(state["labs"])
+    for lab_id, meta, pods, supernet in read:
+        assert meta == state["labs"][lab_id]
+        assert pods == state["pods"][lab_id]
+        assert supernet is None
+    # networks and locations are shared between the devices using them
+    devices = [d for _, _, pods, _ in read for ds in pods.values() for d in ds]
+    assert len({id(d.location) for d in devices}) == len({d.location.model_dump_json() for d in devices})
+
+
+def test_load_fills_every_index(tmp_path):
+    state = _state()
+    path = tmp_path / "inventory.bin"
+    write_snapshot(state, path)
+    frozen = gc.get_freeze_count()
+    pod_db, lab_db = _loaded(path)
+    assert gc.get_freeze_count() > frozen
+
+    assert lab_db.get_lab_ids() == list(state["labs"])
+    lab_id = next(iter(state["labs"]))
+    pod_id, devices = next(iter(state["pods"][lab_id].items()))
+    assert pod_db.get_pod_devices(lab_id, pod_id) == devices
+    device = next(d for d in devices if d.ports)
+    address = device.ports[0].interface.address
+    assert (lab_id, pod_id, device.id) in {
+        (o.lab_id, o.pod_id, o.device_id) for o in pod_db.find_address(address)}
+    assert device.id in {hit.device_id for hit in pod_db.search_devices(device.name, limit=1000).results}
+    network = device.ports[0].interface.parent.network
+    assert (lab_id, pod_id) in {(p.lab_id, p.pod_id) for p in pod_db.get_pods_in_network(network)}
+    assert pod_db.count_inventory()[1] == sum(
+        len(ds) for pods in state["pods"].values() for ds in pods.values())
+    # nothing was logged while loading
+    assert pod_db.backend.load() == (None, [])
+
+
+def test_address_plans_survive(tmp_path):
+    pod_db, lab_db = PodDB(), LabDB()
+    for lab in load_dump()["data"][:2]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_db.put_address_plan(lab_id, IPv4Network("10.251.0.0/24"))
+    pod = PodAllocate.model_validate({"assets": [
+        {"name": "a", "description": "a", "accessMethods": [], "location": {"row": "1", "aisle": "1"}}]})
+    pod_db.allocate_pod(lab_id, pod)
+    path = tmp_path / "inventory.bin"
+    write_snapshot(snapshot_state(pod_db, lab_db), path)
+
+    loaded, _ = _loaded(path)
+    assert loaded.get_address_plan(lab_id) == pod_db.get_address_plan(lab_id)
+    assert loaded.allocate_pod(lab_id, pod).assets[0].ports[0].interface.parent.network == \
+        pod_db.allocate_pod(lab_id, pod).assets[0].ports[0].interface.parent.network
+
+
+def _corrupt(data: bytes):
+    yield "magic", b"NOTINV\x00\x02" + data[len(MAGIC):]
+    yield "truncated", data[:len(data) // 2]
+    yield "trailing", data + b"\x00"
+    # a wrong count misaligns every table after it
+    yield "count", MAGIC + (1).to_bytes(4, "little") + data[len(MAGIC) + 4:]
+
+
+@pytest.mark.parametrize("kind", ["magic", "truncated", "trailing", "count"])
+def test_corrupt_snapshots_fail_cleanly(tmp_path, kind):
+    path = tmp_path / "inventory.bin"
+    write_snapshot(_state(), path)
+    path.write_bytes(dict(_corrupt(path.read_bytes()))[kind])
+
+    pod_db, lab_db = PodDB(), LabDB()
+    frozen = gc.get_freeze_count()
+    with pytest.raises(SnapshotFormatError):
+        load_snapshot(path, pod_db, lab_db)
+    assert lab_db.get_lab_ids() == []
+    assert gc.get_freeze_count() == frozen
+
+
+def test_a_failed_load_drops_the_labs_loaded_so_far(tmp_path, monkeypatch):
+    path = tmp_path / "inventory.bin"
+    state = _state()
+    write_snapshot(state, path)
+    pod_db, lab_db = PodDB(), LabDB()
+    backend, frozen = pod_db.backend, gc.get_freeze_count()
+    store_devices = pod_db._store_devices
+    calls = []
+
+    def fail_in_the_last_lab(lab_id, pod_id, devices):
+        calls.append(lab_id)
+        if len(set(calls)) == len(state["labs"]):
+            raise MemoryError
+        return store_devices(lab_id, pod_id, devices)
+
+    monkeypatch.setattr(pod_db, "_store_devices", fail_in_the_last_lab)
+    with pytest.raises(MemoryError):
+        load_snapshot(path, pod_db, lab_db)
+
+    assert lab_db.get_lab_ids() == [] and pod_db.pods_by_id == {}
+    device = next(d for pods in state["pods"].values() for ds in pods.values() for d in ds if d.ports)
+    assert pod_db.find_address(device.ports[0].interface.address) == []
+    assert pod_db.search_devices(device.name).total == 0
+    assert pod_db.count_inventory() == (0, 0, 0)
+    assert pod_db.backend is backend
+    assert gc.get_freeze_count() == frozen
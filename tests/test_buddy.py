@@ -0,0 +1,236 @@
+"""Buddy allocation of pod networks from a lab's supernet."""
+from ipaddress import IPv4Address, IPv4Network
+
+import pytest
+
+from app.Exceptions.exceptions import AddressPlanNotFoundError, SubnetExhaustedError
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import PodAllocate, PodCreate
+from app.services.buddy import BuddyAllocator
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+
+
+def net(text):
+    return IPv4Network(text)
+
+
+def test_allocate_splits_the_lowest_block():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    assert plan.allocate(26) == net("10.0.0.0/26")
+    assert plan.free_addresses == 192
+    assert plan.largest_free() == net("10.0.0.128/25")
+    # the /26 buddy left by the split comes before the /25
+    assert plan.allocate(26) == net("10.0.0.64/26")
+    assert plan.allocate(27) == net("10.0.0.128/27")
+    assert len(plan) == 3
+
+
+def test_freeing_coalesces_buddies():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    blocks = [plan.allocate(26) for _ in range(4)]
+    assert plan.largest_free() is None
+    plan.free(blocks[0])
+    plan.free(blocks[2])
+    # not buddies: nothing merges
+    assert plan.largest_free() == net("10.0.0.0/26")
+    plan.free(blocks[1])
+    assert plan.largest_free() == net("10.0.0.0/25")
+    plan.free(blocks[3])
+    assert plan.largest_free() == net("10.0.0.0/24")
+    assert plan.free_addresses == 256
+    assert len(plan) == 0
+
+
+def test_claim_carves_a_block_out_of_free_space():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    assert plan.claim(net("10.0.0.64/26"), "pod")
+    assert plan.allocate(26) == net("10.0.0.0/26")
+    assert plan.allocate(25) == net("10.0.0.128/25")
+    assert plan.allocate(26) is None
+
+    plan.release("pod")
+    assert plan.allocate(26) == net("10.0.0.64/26")
+
+
+def test_claim_takes_the_free_space_around_other_owners():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    assert plan.claim(net("10.0.0.0/26"), "a")
+    assert plan.claim(net("10.0.0.0/25"), "b")
+    assert plan.claim(net("10.0.0.0/26"), "c")
+    assert not plan.claim(net("10.0.1.0/26"), "d")
+    assert len(plan) == 2
+    assert plan.largest_free() == net("10.0.0.128/25")
+
+    # what an owner releases goes to an overlapping one claiming again
+    plan.release("a")
+    assert plan.claim(net("10.0.0.0/26"), "c")
+    plan.release("b")
+    assert plan.allocate(26) == net("10.0.0.64/26")
+    assert plan.allocate(25) == net("10.0.0.128/25")
+
+
+def test_claim_cuts_an_enclosing_network_down_to_the_supernet():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    block = plan.allocate(26)
+    assert plan.claim(net("10.0.0.0/16"), "pod")
+    assert plan.free_addresses == 0
+    # the block allocated before stays unowned
+    plan.free(block)
+    assert plan.free_addresses == 0
+    plan.release("pod")
+    assert plan.largest_free() == net("10.0.0.0/24")
+
+
+def test_claiming_a_new_block_releases_the_old_one():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    assert plan.claim(net("10.0.0.0/26"), "pod")
+    assert plan.claim(net("10.0.0.128/26"), "pod")
+    assert len(plan) == 1
+    assert plan.largest_free() == net("10.0.0.0/25")
+
+
+def test_an_allocated_block_can_be_claimed_by_its_pod():
+    plan = BuddyAllocator(net("10.0.0.0/24"))
+    block = plan.allocate(28)
+    assert plan.claim(block, "pod")
+    # owned now, so free() leaves it alone
+    plan.free(block)
+    assert len(plan) == 1
+    plan.release("pod")
+    assert plan.free_addresses == 256
+
+
+def test_exhausted_supernet():
+    plan = BuddyAllocator(net("10.0.0.0/28"))
+    assert plan.allocate(29) == net("10.0.0.0/29")
+    assert plan.allocate(28) is None
+    assert plan.allocate(29) == net("10.0.0.8/29")
+    assert plan.allocate(32) is None
+    assert plan.free_addresses == 0
+    assert plan.largest_free() is None
+
+
+@pytest.mark.parametrize("prefixlen", [-1, 23, 33])
+def test_prefix_outside_the_supernet_range(prefixlen):
+    assert BuddyAllocator(net("10.0.0.0/24")).allocate(prefixlen) is None
+
+
+@pytest.mark.parametrize("supernet, prefixlen, first, second", [
+    ("10.0.0.0/24", 24, "10.0.0.0/24", None),
+    ("10.0.0.0/24", 32, "10.0.0.0/32", "10.0.0.1/32"),
+    ("10.0.0.7/32", 32, "10.0.0.7/32", None),
+    ("0.0.0.0/0", 1, "0.0.0.0/1", "128.0.0.0/1"),
+    ("0.0.0.0/0", 32, "0.0.0.0/32", "0.0.0.1/32"),
+])
+def test_prefix_length_edges(supernet, prefixlen, first, second):
+    plan = BuddyAllocator(net(supernet))
+    assert plan.allocate(prefixlen) == net(first)
+    assert plan.allocate(prefixlen) == (second and net(second))
+
+
+def test_last_block_of_the_address_space():
+    plan = BuddyAllocator(net("0.0.0.0/0"))
+    assert plan.claim(net("255.255.255.255/32"), "pod")
+    assert plan.free_addresses == 2 ** 32 - 1
+    plan.release("pod")
+    assert plan.largest_free() == net("0.0.0.0/0")
+
+
+def _lab():
+    pod_db, lab_db = PodDB(), LabDB()
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    return pod_db, lab_id
+
+
+def _allocate(count, prefixlen=None):
+    device = {"name": "d", "description": "d", "accessMethods": [],
+              "location": {"row": "1", "aisle": "1"}}
+    return PodAllocate.model_validate({"prefixlen": prefixlen, "assets": [device] * count})
+
+
+def _pod(network, *hosts):
+    gateway = str(IPv4Network(network).network_address + 1)
+    return PodCreate.model_validate({"assets": [
+        {"name": f"d{i}", "description": "d", "accessMethods": [],
+         "location": {"row": "1", "aisle": "1"},
+         "ports": [{"interface": {"address": host,
+                                  "parent": {"network": network, "gateway": gateway}}}]}
+        for i, host in enumerate(hosts)]})
+
+
+def test_allocate_pod_numbers_gateway_and_devices():
+    pod_db, lab_id = _lab()
+    pod_db.put_address_plan(lab_id, net("10.0.0.0/24"))
+    pod = pod_db.allocate_pod(lab_id, _allocate(3))
+
+    parents = [port.interface.parent for device in pod.assets for port in device.ports]
+    assert len(parents) == 3
+    parent = parents[0]
+    assert all(other is parent for other in parents)
+    assert parent.network == net("10.0.0.0/29")
+    assert parent.gateway == IPv4Address("10.0.0.1")
+    assert [device.ports[0].interface.address for device in pod.assets] == [
+        IPv4Address("10.0.0.2"), IPv4Address("10.0.0.3"), IPv4Address("10.0.0.4")]
+    plan = pod_db.get_address_plan(lab_id)
+    assert (plan.allocated, plan.free_addresses) == (1, 248)
+
+
+def test_allocate_pod_skips_existing_pod_networks():
+    pod_db, lab_id = _lab()
+    pod_db.create_pod(lab_id, _pod("10.0.0.0/29", "10.0.0.2"))
+    pod_db.put_address_plan(lab_id, net("10.0.0.0/24"))
+    pod = pod_db.allocate_pod(lab_id, _allocate(1, prefixlen=29))
+    assert pod.assets[0].ports[0].interface.parent.network == net("10.0.0.8/29")
+
+    pod_db.delete_pod(lab_id, pod.id)
+    assert pod_db.get_address_plan(lab_id).allocated == 1
+
+
+def test_allocate_pod_avoids_an_enclosing_pod():
+    pod_db, lab_id = _lab()
+    pod_db.put_address_plan(lab_id, net("10.0.0.0/28"))
+    # registered after the plan, and larger than it
+    pod_db.create_pod(lab_id, _pod("10.0.0.0/27", "10.0.0.20"))
+    assert pod_db.get_address_plan(lab_id).free_addresses == 0
+    with pytest.raises(SubnetExhaustedError):
+        pod_db.allocate_pod(lab_id, _allocate(1, prefixlen=30))
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_allocate_pod_avoids_pods_sharing_a_network(backend, tmp_path):
+    if backend == "memory":
+        pod_db, lab_db = PodDB(), LabDB()
+    else:
+        conn = connect(str(tmp_path / "inventory.db"))
+        pod_db, lab_db = SqlitePodDB(conn), SqliteLabDB(conn)
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pod_db.put_address_plan(lab_id, net("10.0.0.0/28"))
+    first = pod_db.create_pod(lab_id, _pod("10.0.0.0/29", "10.0.0.2"))
+    pod_db.create_pod(lab_id, _pod("10.0.0.0/29", "10.0.0.3"))
+    pod_db.create_pod(lab_id, _pod("10.0.0.0/30", "10.0.0.2"))
+
+    # the pods still there keep the block of the one deleted
+    pod_db.delete_pod(lab_id, first.id)
+    pod = pod_db.allocate_pod(lab_id, _allocate(1, prefixlen=29))
+    assert pod.assets[0].ports[0].interface.parent.network == net("10.0.0.8/29")
+    with pytest.raises(SubnetExhaustedError):
+        pod_db.allocate_pod(lab_id, _allocate(1, prefixlen=30))
+
+
+def test_allocate_pod_until_exhausted():
+    pod_db, lab_id = _lab()
+    pod_db.put_address_plan(lab_id, net("10.0.0.0/28"))
+    pod_db.allocate_pod(lab_id, _allocate(5))
+    pod_db.allocate_pod(lab_id, _allocate(5))
+    with pytest.raises(SubnetExhaustedError):
+        pod_db.allocate_pod(lab_id, _allocate(1))
+
+
+def test_allocate_pod_needs_a_plan():
+    pod_db, lab_id = _lab()
+    with pytest.raises(AddressPlanNotFoundError):
+        pod_db.allocate_pod(lab_id, _allocate(1))
@@ -0,0 +1,40 @@
+"""Bulk uploads streamed lab by lab."""
+import json
+
+import pytest
+
+from app.Exceptions.exceptions import AddressOutsideNetworkError, LabNotFoundError
+from app.dependencies.dependencies import get_importer
+from app.main import app
+from app.services.importer import LabImporter
+from benchmarks.synthetic import load_dump
+
+
+def _stream(client, labs):
+    response = client.post("/upload/bulk/stream", files={
+        "file": ("dump.json", json.dumps({"data": labs}), "application/json")})
+    assert response.status_code == 201
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.parametrize("error", [AddressOutsideNetworkError("Interface address outside its network"),
+                                   LabNotFoundError()])
+def test_a_lab_failing_to_commit_is_reported_and_the_rest_go_on(api, monkeypatch, error):
+    client, pod_db, lab_db = api
+    app.dependency_overrides[get_importer] = lambda: LabImporter(0)
+    create_pods = pod_db.create_pods
+    calls = []
+
+    def fail_the_second_lab(lab_id, pods):
+        calls.append(lab_id)
+        if len(calls) == 2:
+            raise error
+        return create_pods(lab_id, pods)
+
+    monkeypatch.setattr(pod_db, "create_pods", fail_the_second_lab)
+    lines = _stream(client, load_dump()["data"][:3])
+
+    assert [line.get("index") for line in lines] == [0, 1, 2, None]
+    assert [line["status"] for line in lines] == ["created", "error", "created", "done"]
+    assert lines[1]["detail"] == (str(error) or type(error).__name__)
+    assert lines[-1] == {"status": "done", "created": 2, "errors": 1}
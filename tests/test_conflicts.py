@@ -0,0 +1,130 @@
+"""Address conflicts of pods and dumps, and out-of-network rejection."""
+import copy
+import json
+from ipaddress import IPv4Address
+
+import pytest
+
+from app.Exceptions.exceptions import AddressOutsideNetworkError, DuplicateIPv4Error
+from app.models.lab_db_model import LabMetaCreate
+from app.models.lab_model import LabCreateDump
+from app.models.pod_model import DeviceBatch, DeviceCreate, PodCreate
+from app.services.conflicts import check_device_addresses, check_pod_addresses, find_conflicts
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+
+NETWORK = {"network": "10.0.0.0/29", "gateway": "10.0.0.1"}
+
+
+def _device(*addresses, name="d"):
+    return {"name": name, "description": "d", "accessMethods": [],
+            "location": {"row": "1", "aisle": "1"},
+            "ports": [{"interface": {"address": a, "parent": NETWORK}} for a in addresses]}
+
+
+def _pod(*devices):
+    return {"assets": list(devices)}
+
+
+def _found(conflicts):
+    return [(c.kind, str(c.address), c.lab, c.pod, c.devices, c.port) for c in conflicts]
+
+
+def test_pod_conflicts():
+    pod = PodCreate.model_validate(_pod(
+        _device("10.0.0.2"),
+        _device("10.0.0.9", "10.0.0.2"),     # outside; a secondary copy of .2 is allowed
+        _device("10.0.0.2"),
+        _device("10.0.0.1"),                 # the gateway: reported, not blocking
+    ))
+    assert _found(find_conflicts(pod)) == [
+        ("duplicate", "10.0.0.2", None, None, [0, 2], 0),
+        ("outside_network", "10.0.0.9", None, None, [1], 0),
+        ("gateway", "10.0.0.1", None, None, [3], 0),
+    ]
+    with pytest.raises(DuplicateIPv4Error):
+        check_pod_addresses(pod)
+    with pytest.raises(AddressOutsideNetworkError):
+        check_pod_addresses(PodCreate.model_validate(_pod(_device("10.0.0.2"), _device("10.0.0.8"))))
+    check_pod_addresses(PodCreate.model_validate(_pod(_device("10.0.0.1"), _device("10.0.0.6"))))
+
+
+def test_dump_conflicts_are_per_pod():
+    lab = {"name": "lab", "location": "l", "building": "b", "floor": "1"}
+    dump = LabCreateDump.model_validate({"data": [
+        {**lab, "pods": [_pod(_device("10.0.0.2")), _pod(_device("10.0.0.2"))]},
+        {**lab, "pods": [_pod(_device("10.0.0.3")), _pod(_device("10.0.0.4"), _device("10.0.0.4"))]},
+        {**lab, "pods": [_pod(_device("10.0.0.7"), _device("10.0.0.0"))]},
+    ]})
+    assert _found(find_conflicts(dump)) == [
+        ("duplicate", "10.0.0.4", 1, 1, [0, 1], 0),
+    ]
+    # the network and broadcast addresses are still inside the network
+    assert _found(find_conflicts(dump.data[2])) == []
+    assert _found(find_conflicts(dump.data)) == _found(find_conflicts(dump))
+
+
+def test_check_device_addresses():
+    check_device_addresses(DeviceCreate.model_validate(_device("10.0.0.6")))
+    with pytest.raises(AddressOutsideNetworkError):
+        check_device_addresses(DeviceCreate.model_validate(_device("10.0.0.2", "192.0.2.1")))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    if request.param == "memory":
+        pod_db, lab_db = PodDB(), LabDB()
+    else:
+        conn = connect(str(tmp_path / "inventory.db"))
+        pod_db, lab_db = SqlitePodDB(conn), SqliteLabDB(conn)
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pod = pod_db.create_pod(lab_id, PodCreate.model_validate(_pod(_device("10.0.0.2"), _device("10.0.0.3"))))
+    return pod_db, lab_id, pod
+
+
+def test_stores_refuse_out_of_network_addresses(stores):
+    pod_db, lab_id, pod = stores
+    before = sorted(d.model_dump_json() for d in pod_db.get_pod_devices(lab_id, pod.id))
+    device = pod.assets[0]
+
+    with pytest.raises(AddressOutsideNetworkError):
+        pod_db.create_pod(lab_id, PodCreate.model_validate(_pod(_device("10.0.1.2"))))
+    with pytest.raises(AddressOutsideNetworkError):
+        pod_db.create_device(lab_id, pod.id, DeviceCreate.model_validate(_device("10.0.0.8")))
+    with pytest.raises(AddressOutsideNetworkError):
+        pod_db.patch_device_ip(lab_id, pod.id, device.id, IPv4Address("10.0.0.8"))
+    for op in ({"op": "create", "device": _device("10.0.0.8")},
+               {"op": "patch_ip", "device_id": device.id, "ip": "10.0.0.8"}):
+        operations = DeviceBatch.model_validate({"operations": [
+            {"op": "patch_name", "device_id": device.id, "name": "renamed"}, op]}).operations
+        with pytest.raises(AddressOutsideNetworkError):
+            pod_db.apply_device_batch(lab_id, pod.id, operations)
+
+    assert sorted(d.model_dump_json() for d in pod_db.get_pod_devices(lab_id, pod.id)) == before
+    assert len(pod_db.get_lab_pod_ids(lab_id)) == 1
+    # the network's broadcast is inside it, so is accepted
+    pod_db.patch_device_ip(lab_id, pod.id, device.id, IPv4Address("10.0.0.7"))
+
+
+def test_api_reports_and_refuses_conflicts(api):
+    client, pod_db, lab_db = api
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pod = pod_db.create_pod(lab_id, PodCreate.model_validate(_pod(_device("10.0.0.2"))))
+
+    response = client.post(f"/lab/{lab_id}/pods/{pod.id}/device", json=_device("10.0.0.8"))
+    assert response.status_code == 400
+    response = client.patch(f"/lab/{lab_id}/pods/{pod.id}/device/{pod.assets[0].id}/ip",
+                            params={"ip": "10.0.0.8"})
+    assert response.status_code == 400
+    response = client.post(f"/labs/{lab_id}/pods", json=_pod(_device("10.0.0.3"), _device("10.0.0.3")))
+    assert response.status_code == 400
+
+    lab = {"name": "lab", "location": "l", "building": "b", "floor": "1",
+           "pods": [_pod(_device("10.0.0.2"), _device("10.0.0.2"), _device("10.0.0.1"))]}
+    body = client.post("/upload/check", files={
+        "file": ("dump.json", json.dumps({"data": [lab, copy.deepcopy(lab)]}), "application/json")}).json()
+    assert [(c["kind"], c["lab"], c["pod"]) for c in body["conflicts"]] == [
+        ("duplicate", 0, 0), ("gateway", 0, 0), ("duplicate", 1, 0), ("gateway", 1, 0)]
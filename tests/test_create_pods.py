@@ -0,0 +1,49 @@
+"""Creating the pods of a lab in one call."""
+import copy
+
+import pytest
+
+from app.Exceptions.exceptions import DuplicateIPv4Error
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import PodCreate
+from app.services import pod_store
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _lab(pod_db):
+    return LabDB().create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+
+
+def _pods(n):
+    return [PodCreate.model_validate(pod) for pod in load_dump()["data"][0]["pods"][:n]]
+
+
+def test_each_pod_is_checked_once(monkeypatch):
+    pod_db = PodDB()
+    lab_id = _lab(pod_db)
+    checked = []
+    check = pod_store.check_pod_addresses
+    monkeypatch.setattr(pod_store, "check_pod_addresses", lambda pod: checked.append(pod) or check(pod))
+
+    pods = _pods(3)
+    created = pod_db.create_pods(lab_id, pods)
+    assert checked == pods
+    assert [len(pod.assets) for pod in created] == [len(pod.assets) for pod in pods]
+    assert pod_db.get_lab_pod_ids(lab_id) == [pod.id for pod in created]
+
+
+def test_a_conflict_creates_no_pod():
+    pod_db = PodDB()
+    lab_id = _lab(pod_db)
+    raw = copy.deepcopy(load_dump()["data"][0]["pods"][:3])
+    twin = copy.deepcopy(raw[2]["assets"][0])
+    twin["name"] = "twin"
+    raw[2]["assets"].append(twin)
+
+    with pytest.raises(DuplicateIPv4Error):
+        pod_db.create_pods(lab_id, [PodCreate.model_validate(pod) for pod in raw])
+    assert pod_db.get_lab_pod_ids(lab_id) == []
+    assert pod_db.count_inventory() == (0, 0, 0)
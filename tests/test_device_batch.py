@@ -0,0 +1,153 @@
+"""All-or-nothing device batches."""
+import pytest
+
+from app.Exceptions.exceptions import DeviceNotFoundError, DuplicateIPv4Error
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import DeviceBatch, DeviceCreate, PodCreate
+from app.services.change_feed import ChangeFeed
+from app.services.lab_store import LabDB
+from app.services.persistence import StorageBackend
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteChangeFeed, SqliteLabDB, SqlitePodDB, connect
+from benchmarks.synthetic import load_dump
+
+
+class RecordingBackend(StorageBackend):
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """Yields ``(pod_db, lab_id, pod_id, changes, records)`` for a pod with ported devices."""
+    if request.param == "memory":
+        changes, backend = ChangeFeed(), RecordingBackend()
+        pod_db = PodDB(backend=backend, changes=changes)
+        lab_db = LabDB(backend=backend, changes=changes)
+        records = backend.records
+    else:
+        conn = connect(str(tmp_path / "inventory.db"))
+        changes = SqliteChangeFeed(conn)
+        pod_db, lab_db = SqlitePodDB(conn, changes=changes), SqliteLabDB(conn, changes=changes)
+        # the store's tables are its log
+        records = []
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pods = load_dump()["data"][0]["pods"]
+    # a pod with three ported devices and room left in its subnet
+    raw = next(pod for pod in pods if sum(1 for device in pod["assets"] if device["ports"]) >= 3)
+    pod_id = pod_db.create_pod(lab_id, PodCreate.model_validate(raw)).id
+    return pod_db, lab_id, pod_id, changes, records
+
+
+def _ported(pod_db, lab_id, pod_id):
+    return [device for device in pod_db.get_pod_devices(lab_id, pod_id) if device.ports]
+
+
+def _address(device):
+    return device.ports[0].interface.address
+
+
+def _new_device(template, name, ip):
+    raw = template.model_dump(exclude={"id"})
+    raw["name"] = name
+    raw["ports"] = raw["ports"][:1]
+    raw["ports"][0]["interface"]["address"] = ip
+    return DeviceCreate.model_validate(raw)
+
+
+def _batch(*operations):
+    return DeviceBatch.model_validate({"operations": list(operations)}).operations
+
+
+def _state(pod_db, lab_id, pod_id, addresses, names):
+    return {
+        "devices": sorted(d.model_dump_json() for d in pod_db.get_pod_devices(lab_id, pod_id)),
+        "ips": sorted(pod_db.get_all_pod_ip(lab_id, pod_id)),
+        "owners": {ip: pod_db.find_address(ip) for ip in addresses},
+        "search": {name: pod_db.search_devices(name).total for name in names},
+        "stats": pod_db.get_lab_stats(lab_id),
+    }
+
+
+def test_addresses_swap_within_a_batch(store):
+    pod_db, lab_id, pod_id, _, _ = store
+    first, second = _ported(pod_db, lab_id, pod_id)[:2]
+    a, b = _address(first), _address(second)
+    spare = pod_db.get_next_free_pod_ip(lab_id, pod_id)
+
+    pod_db.apply_device_batch(lab_id, pod_id, _batch(
+        {"op": "patch_ip", "device_id": first.id, "ip": str(spare)},
+        {"op": "patch_ip", "device_id": second.id, "ip": str(a)},
+        {"op": "patch_ip", "device_id": first.id, "ip": str(b)},
+    ))
+
+    assert _address(pod_db.get_pod_device_by_id(lab_id, pod_id, first.id)) == b
+    assert _address(pod_db.get_pod_device_by_id(lab_id, pod_id, second.id)) == a
+    assert [owner.device_id for owner in pod_db.find_address(a)] == [second.id]
+    assert [owner.device_id for owner in pod_db.find_address(b)] == [first.id]
+    assert pod_db.find_address(spare) == []
+
+
+def test_released_address_can_be_reclaimed(store):
+    pod_db, lab_id, pod_id, _, _ = store
+    gone = _ported(pod_db, lab_id, pod_id)[0]
+    count = len(pod_db.get_pod_devices(lab_id, pod_id))
+
+    [_, created] = pod_db.apply_device_batch(lab_id, pod_id, _batch(
+        {"op": "delete", "device_id": gone.id},
+        {"op": "create", "device": _new_device(gone, "batch-new", str(_address(gone)))},
+    ))
+
+    assert len(pod_db.get_pod_devices(lab_id, pod_id)) == count
+    assert [owner.device_id for owner in pod_db.find_address(_address(gone))] == [created.device_id]
+    assert pod_db.search_devices("batch-new").total == 1
+
+
+def test_claimed_address_cannot_be_claimed_twice(store):
+    pod_db, lab_id, pod_id, _, _ = store
+    first, second = _ported(pod_db, lab_id, pod_id)[:2]
+    spare = pod_db.get_next_free_pod_ip(lab_id, pod_id)
+
+    with pytest.raises(DuplicateIPv4Error):
+        pod_db.apply_device_batch(lab_id, pod_id, _batch(
+            {"op": "patch_ip", "device_id": first.id, "ip": str(spare)},
+            {"op": "patch_ip", "device_id": second.id, "ip": str(spare)},
+        ))
+    assert pod_db.find_address(spare) == []
+
+
+@pytest.mark.parametrize("failing", ["duplicate", "deleted"])
+def test_failed_batch_changes_nothing(store, failing):
+    pod_db, lab_id, pod_id, changes, records = store
+    first, second, third = _ported(pod_db, lab_id, pod_id)[:3]
+    a, b = _address(first), _address(second)
+    spare = pod_db.get_next_free_pod_ip(lab_id, pod_id)
+    addresses = [a, b, _address(third), spare]
+    names = ["batch-new", "batch-renamed", first.name, second.name]
+    before = _state(pod_db, lab_id, pod_id, addresses, names)
+    logged, revision = len(records), changes.revision
+
+    operations = [
+        {"op": "create", "device": _new_device(first, "batch-new", str(spare))},
+        {"op": "patch_name", "device_id": second.id, "name": "batch-renamed"},
+        {"op": "delete", "device_id": first.id},
+        {"op": "patch_ip", "device_id": second.id, "ip": str(a)},
+    ]
+    if failing == "duplicate":
+        # the created device already holds the spare address
+        operations.append({"op": "patch_ip", "device_id": third.id, "ip": str(spare)})
+        error = DuplicateIPv4Error
+    else:
+        operations.append({"op": "patch_name", "device_id": first.id, "name": "back"})
+        error = DeviceNotFoundError
+
+    with pytest.raises(error):
+        pod_db.apply_device_batch(lab_id, pod_id, _batch(*operations))
+
+    assert _state(pod_db, lab_id, pod_id, addresses, names) == before
+    assert records[logged:] == []
+    assert changes.revision == revision
@@ -0,0 +1,57 @@
+"""Paged, filtered and projected device listings."""
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import DevicePage, PodCreate
+from benchmarks.synthetic import load_dump
+
+
+def _pod(pod_db, lab_db):
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pods = load_dump()["data"][0]["pods"]
+    raw = max(pods, key=lambda pod: sum(1 for device in pod["assets"] if device["ports"]))
+    pod = pod_db.create_pod(lab_id, PodCreate.model_validate(raw))
+    return lab_id, pod
+
+
+def test_unfiltered_listing_is_a_device_page(api):
+    client, pod_db, lab_db = api
+    lab_id, pod = _pod(pod_db, lab_db)
+
+    body = client.get(f"/lab/{lab_id}/pods/{pod.id}/devices").json()
+    assert body["next_cursor"] is None
+    page = DevicePage.model_validate(body)
+    assert {device.id for device in page.devices} == {device.id for device in pod.assets}
+
+
+def test_cursor_walks_every_device_once(api):
+    client, pod_db, lab_db = api
+    lab_id, pod = _pod(pod_db, lab_db)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        body = client.get(f"/lab/{lab_id}/pods/{pod.id}/devices", params=params).json()
+        assert len(body["devices"]) <= 2
+        seen += [device["id"] for device in body["devices"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(device.id for device in pod.assets)
+
+
+def test_filters_and_fields(api):
+    client, pod_db, lab_db = api
+    lab_id, pod = _pod(pod_db, lab_db)
+    device = pod.assets[0]
+
+    body = client.get(f"/lab/{lab_id}/pods/{pod.id}/devices", params={
+        "name_prefix": device.name, "fields": "name,location"}).json()
+    assert [d["id"] for d in body["devices"]] == sorted(
+        d.id for d in pod.assets if d.name.startswith(device.name))
+    assert set(body["devices"][0]) == {"id", "name", "location"}
+
+    device = next(d for d in pod.assets if d.ports)
+    address = device.ports[0].interface.address
+    body = client.get(f"/lab/{lab_id}/pods/{pod.id}/devices",
+                      params={"cidr": f"{address}/32"}).json()
+    assert [d["id"] for d in body["devices"]] == [device.id]
@@ -0,0 +1,56 @@
+"""The per-device and per-pod patch routes."""
+from ipaddress import IPv4Address, IPv4Network
+
+from app.models.lab_model import LabCreate
+from app.services.importer import commit_lab
+from benchmarks.synthetic import load_dump
+
+
+def _pod(api):
+    client, pod_db, lab_db = api
+    commit_lab(LabCreate.model_validate(load_dump()["data"][0]), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_id = next(pod_id for pod_id in pod_db.get_lab_pod_ids(lab_id)
+                  if pod_db.get_next_free_pod_ip(lab_id, pod_id) is not None)
+    device = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+    return f"/lab/{lab_id}/pods/{pod_id}", lab_id, pod_id, device
+
+
+def test_patch_device_name(api):
+    client, pod_db, _ = api
+    url, lab_id, pod_id, device = _pod(api)
+
+    response = client.patch(f"{url}/device/{device.id}/name", params={"name": "renamed"})
+    assert response.status_code == 200
+    assert response.json()["device"]["name"] == "renamed"
+    assert pod_db.get_pod_device_by_id(lab_id, pod_id, device.id).name == "renamed"
+
+
+def test_patch_device_ip_takes_an_ipv4_address(api):
+    client, pod_db, _ = api
+    url, lab_id, pod_id, device = _pod(api)
+    old = device.ports[0].interface.address
+    free = pod_db.get_next_free_pod_ip(lab_id, pod_id)
+
+    assert client.patch(f"{url}/device/{device.id}/ip", params={"ip": "10.0.0.300"}).status_code == 422
+    response = client.patch(f"{url}/device/{device.id}/ip", params={"ip": str(free)})
+    assert response.status_code == 200
+    assert response.json()["device"]["ports"][0]["interface"]["address"] == str(free)
+    assert pod_db.get_pod_device_by_id(lab_id, pod_id, device.id).ports[0].interface.address == free
+    used = pod_db.get_all_pod_ip(lab_id, pod_id)
+    assert free in used and old not in used
+
+
+def test_patch_pod_devices_network(api):
+    client, pod_db, _ = api
+    url, lab_id, pod_id, _ = _pod(api)
+
+    response = client.patch(f"{url}/device/network",
+                            json={"network": "10.250.0.0/24", "gateway": "10.250.0.1"})
+    assert response.status_code == 200
+    parents = {(port["interface"]["parent"]["network"], port["interface"]["parent"]["gateway"])
+               for device in response.json()["devices"] for port in device["ports"]}
+    assert parents == {("10.250.0.0/24", "10.250.0.1")}
+    assert pod_db.get_pod_network(lab_id, pod_id) == IPv4Network("10.250.0.0/24")
+    assert all(port.interface.parent.gateway == IPv4Address("10.250.0.1")
+               for device in pod_db.get_pod_devices(lab_id, pod_id) for port in device.ports)
@@ -0,0 +1,96 @@
+"""Devices are stored as validated DeviceExists records."""
+import pytest
+
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import AccessMethod, DeviceCreate, DeviceExists, Interface, PodCreate, Port
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _pod(pod_db, lab_db):
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pods = load_dump()["data"][0]["pods"]
+    raw = next(pod for pod in pods if sum(1 for device in pod["assets"] if device["ports"]) >= 3)
+    return lab_id, pod_db.create_pod(lab_id, PodCreate.model_validate(raw))
+
+
+class _Refuse:
+    def __getattr__(self, name):
+        raise AssertionError("validated a stored device")
+
+
+@pytest.fixture
+def no_validation(monkeypatch):
+    """Fail on any validation of the device models."""
+    def refuse():
+        for model in (DeviceExists, Port, Interface):
+            monkeypatch.setattr(model, "__pydantic_validator__", _Refuse())
+    return refuse
+
+
+def test_reads_return_the_stored_records(no_validation):
+    pod_db, lab_db = PodDB(), LabDB()
+    lab_id, pod = _pod(pod_db, lab_db)
+    no_validation()
+
+    devices = pod_db.get_pod_devices(lab_id, pod.id)
+    assert [device.id for device in devices] == [device.id for device in pod.assets]
+    for device in devices:
+        assert pod_db.get_pod_device_by_id(lab_id, pod.id, device.id) is device
+    assert all(a is b for a, b in zip(pod_db.get_pod_by_id(lab_id, pod.id).assets, devices))
+
+
+def test_patches_do_not_validate_or_change_earlier_records(no_validation):
+    pod_db, lab_db = PodDB(), LabDB()
+    lab_id, pod = _pod(pod_db, lab_db)
+    device = next(device for device in pod.assets if device.ports)
+    before = device.model_dump()
+    no_validation()
+
+    renamed = pod_db.patch_device_name(lab_id, pod.id, device.id, "renamed")
+    ip = pod_db.get_next_free_pod_ip(lab_id, pod.id)
+    moved = pod_db.patch_device_ip(lab_id, pod.id, device.id, ip)
+    access = pod_db.patch_device_access_method(
+        lab_id, pod.id, device.id, AccessMethod.model_construct(url="https://new.example"))
+
+    assert device.model_dump() == before
+    assert renamed.name == moved.name == access.name == "renamed"
+    assert renamed.ports[0].interface.address == device.ports[0].interface.address
+    assert moved.ports[0].interface.address == access.ports[0].interface.address == ip
+    assert moved.ports[0].interface.parent is device.ports[0].interface.parent
+    assert pod_db.get_pod_device_by_id(lab_id, pod.id, device.id) is access
+
+
+def test_created_device_is_not_validated_again(no_validation):
+    pod_db, lab_db = PodDB(), LabDB()
+    lab_id, pod = _pod(pod_db, lab_db)
+    template = next(device for device in pod.assets if device.ports)
+    raw = template.model_dump(exclude={"id"})
+    raw["ports"][0]["interface"]["address"] = str(pod_db.get_next_free_pod_ip(lab_id, pod.id))
+    create = DeviceCreate.model_validate(raw)
+    no_validation()
+
+    device = pod_db.create_device(lab_id, pod.id, create)
+    assert device.model_dump(exclude={"id"}) == create.model_dump()
+    # shared with the pod's other devices through the value pool
+    assert device.ports[0].interface.parent is template.ports[0].interface.parent
+    assert pod_db.get_pod_device_by_id(lab_id, pod.id, device.id) is device
+
+
+def test_api_rejects_invalid_devices_before_storing(api):
+    client, pod_db, lab_db = api
+    lab_id, pod = _pod(pod_db, lab_db)
+    raw = next(device for device in pod.assets if device.ports).model_dump(mode="json", exclude={"id"})
+    count = len(pod.assets)
+
+    raw["ports"][0]["interface"]["address"] = "10.0.0.300"
+    response = client.post(f"/lab/{lab_id}/pods/{pod.id}/device", json=raw)
+    assert response.status_code == 422
+    assert len(pod_db.get_pod_devices(lab_id, pod.id)) == count
+
+    raw["ports"][0]["interface"]["address"] = str(pod_db.get_next_free_pod_ip(lab_id, pod.id))
+    created = client.post(f"/lab/{lab_id}/pods/{pod.id}/device", json=raw).json()
+    stored = pod_db.get_pod_device_by_id(lab_id, pod.id, created["id"])
+    assert created == stored.model_dump(mode="json")
@@ -0,0 +1,90 @@
+"""Streaming export of the whole inventory."""
+import json
+
+from app.models.lab_model import LabCreate, LabExistsDump
+from app.services.export import coalesce, iter_export
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _inventory(labs=3):
+    pod_db, lab_db = PodDB(), LabDB()
+    for lab in load_dump()["data"][:labs]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    return pod_db, lab_db
+
+
+def _expected(pod_db, lab_db):
+    return [{**lab_db.get_lab_meta(lab_id).model_dump(mode="json"),
+             "pods": [pod_db.get_pod_by_id(lab_id, pod_id).model_dump(mode="json")
+                      for pod_id in pod_db.get_lab_pod_ids(lab_id)]}
+            for lab_id in lab_db.get_lab_ids()]
+
+
+def test_export_is_a_lab_dump(api):
+    client, pod_db, lab_db = api
+    assert client.get("/export").json() == {"data": []}
+    for lab in load_dump()["data"][:3]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+
+    response = client.get("/export")
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    LabExistsDump.model_validate(body)
+    assert body["data"] == _expected(pod_db, lab_db)
+
+
+def test_ndjson_and_gzip(api):
+    client, pod_db, lab_db = api
+    for lab in load_dump()["data"][:3]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+
+    response = client.get("/export", params={"ndjson": True})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.splitlines()
+    assert [json.loads(line) for line in lines] == _expected(pod_db, lab_db)
+
+    response = client.get("/export", params={"gzip": True})
+    assert response.headers["content-encoding"] == "gzip"
+    # decoded by the client
+    assert response.json() == {"data": _expected(pod_db, lab_db)}
+
+
+def test_export_imports_back():
+    pod_db, lab_db = _inventory()
+    dump = json.loads(b"".join(iter_export(lab_db, pod_db)))
+
+    copy_pod_db, copy_lab_db = PodDB(), LabDB()
+    for lab in dump["data"]:
+        commit_lab(LabCreate.model_validate(lab), copy_lab_db, copy_pod_db)
+
+    def view(pod_db, lab_db):
+        return [[sorted(d.model_dump_json(exclude={"id"}) for d in pod_db.get_pod_devices(lab_id, pod_id))
+                 for pod_id in pod_db.get_lab_pod_ids(lab_id)]
+                for lab_id in lab_db.get_lab_ids()]
+
+    assert view(copy_pod_db, copy_lab_db) == view(pod_db, lab_db)
+
+
+def test_labs_and_pods_deleted_while_exporting_are_skipped():
+    pod_db, lab_db = _inventory()
+    first, second, third = lab_db.get_lab_ids()
+    parts = iter_export(lab_db, pod_db)
+    # up to the start of the first lab
+    head = next(parts) + next(parts)
+    lab_db.delete_lab_meta(second)
+    pod_db.delete_pod(first, pod_db.get_lab_pod_ids(first)[-1])
+
+    body = json.loads(head + b"".join(parts))
+    assert [lab["id"] for lab in body["data"]] == [first, third]
+    assert len(body["data"][0]["pods"]) == len(pod_db.get_lab_pod_ids(first))
+
+
+def test_coalesce_regroups_pieces():
+    pieces = [b"x" * n for n in (1, 3, 5, 2, 9, 1)]
+    chunks = list(coalesce(pieces, size=6))
+    assert b"".join(chunks) == b"".join(pieces)
+    assert all(len(chunk) >= 6 for chunk in chunks[:-1])
+    assert list(coalesce([])) == []
@@ -0,0 +1,118 @@
+"""Background import jobs."""
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+from app.Exceptions.exceptions import NetworkOverlapError
+from app.services import import_jobs
+from app.services.import_jobs import ImportJobs
+from app.services.importer import LabImporter, commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _spool(tmp_path, labs):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps({"data": labs}))
+    return str(path)
+
+
+def test_job_imports_the_dump(tmp_path):
+    labs = load_dump()["data"][:2]
+    path = _spool(tmp_path, labs)
+    pod_db, lab_db = PodDB(), LabDB()
+
+    async def run():
+        jobs = ImportJobs(LabImporter(0))
+        job_id = jobs.submit(path, lab_db, pod_db).id
+        await jobs._jobs[job_id].task
+        return jobs.get(job_id)
+
+    status = asyncio.run(run())
+    assert status.status == "done"
+    assert status.labs == 2
+    assert status.lab_ids == lab_db.get_lab_ids()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("cancel", ["cancel", "cancel_all"])
+def test_job_cancelled_before_it_starts(tmp_path, cancel):
+    path = _spool(tmp_path, load_dump()["data"][:1])
+    pod_db, lab_db = PodDB(), LabDB()
+
+    async def run():
+        jobs = ImportJobs(LabImporter(0))
+        job_id = jobs.submit(path, lab_db, pod_db).id
+        task = jobs._jobs[job_id].task
+        # before the task took its first step
+        if cancel == "cancel":
+            jobs.cancel(job_id)
+        else:
+            jobs.cancel_all()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return jobs.get(job_id)
+
+    assert asyncio.run(run()).status == "cancelled"
+    assert not os.path.exists(path)
+    assert lab_db.get_lab_ids() == []
+
+
+def test_job_cancelled_while_committing_reports_the_lab(tmp_path, monkeypatch):
+    path = _spool(tmp_path, load_dump()["data"][:2])
+    pod_db, lab_db = PodDB(), LabDB()
+    committing, proceed = threading.Event(), threading.Event()
+
+    def slow_commit(*args):
+        committing.set()
+        proceed.wait(5)
+        return commit_lab(*args)
+
+    monkeypatch.setattr(import_jobs, "commit_lab", slow_commit)
+
+    async def run():
+        jobs = ImportJobs(LabImporter(0))
+        job_id = jobs.submit(path, lab_db, pod_db).id
+        task = jobs._jobs[job_id].task
+        await asyncio.to_thread(committing.wait, 5)
+        jobs.cancel(job_id)
+        await asyncio.sleep(0)
+        proceed.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return jobs.get(job_id)
+
+    status = asyncio.run(run())
+    assert status.status == "cancelled"
+    assert status.labs == 1
+    assert status.lab_ids == lab_db.get_lab_ids()
+
+
+def test_a_lab_failing_to_commit_is_an_error_of_the_job(tmp_path, monkeypatch):
+    path = _spool(tmp_path, load_dump()["data"][:3])
+    pod_db, lab_db = PodDB(), LabDB()
+    calls = []
+
+    def fail_the_second_lab(*args):
+        calls.append(1)
+        if len(calls) == 2:
+            raise NetworkOverlapError("Network overlaps an existing pod")
+        return commit_lab(*args)
+
+    monkeypatch.setattr(import_jobs, "commit_lab", fail_the_second_lab)
+
+    async def run():
+        jobs = ImportJobs(LabImporter(0))
+        job_id = jobs.submit(path, lab_db, pod_db).id
+        await jobs._jobs[job_id].task
+        return jobs.get(job_id)
+
+    status = asyncio.run(run())
+    assert status.status == "done"
+    assert status.labs == 2
+    assert [(error.index, error.detail) for error in status.errors] == [
+        (1, "Network overlaps an existing pod")]
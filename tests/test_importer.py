@@ -0,0 +1,57 @@
+"""Validating dumps on the importer's process pool."""
+import asyncio
+import copy
+import io
+import json
+
+from app.services.importer import LabImporter, commit_lab
+from app.services.json_stream import iter_json_array_bytes
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _reader(document: bytes):
+    stream = io.BytesIO(document)
+
+    async def read(size):
+        return stream.read(size)
+    return read
+
+
+def test_worker_processes_reject_a_lab_with_a_blocking_conflict():
+    labs = copy.deepcopy(load_dump()["data"][:4])
+    assets = next(pod["assets"] for pod in labs[1]["pods"]
+                  if sum(1 for device in pod["assets"] if device["ports"]) >= 2)
+    first, second = [device for device in assets if device["ports"]][:2]
+    second["ports"][0]["interface"]["address"] = first["ports"][0]["interface"]["address"]
+    del labs[2]["name"]
+    document = json.dumps({"data": labs}).encode()
+    importer, pod_db, lab_db = LabImporter(workers=2), PodDB(), LabDB()
+
+    async def run():
+        results = []
+        async for validated in importer.validate(iter_json_array_bytes(_reader(document), chunk_size=4096)):
+            if validated.error is None:
+                commit_lab(validated.lab, lab_db, pod_db)
+            results.append(validated)
+        return results
+
+    try:
+        results = asyncio.run(run())
+        processes = list(importer._pool._processes.values())
+        assert processes
+    finally:
+        importer.close()
+
+    assert [validated.index for validated in results] == [0, 1, 2, 3]
+    assert [validated.lab is None for validated in results] == [False, True, True, False]
+    assert {conflict["kind"] for conflict in results[1].error} == {"duplicate"}
+    assert results[2].error[0]["loc"] == ["name"]
+    assert [lab_db.get_lab_meta(lab_id).name for lab_id in lab_db.get_lab_ids()] == [
+        labs[0]["name"], labs[3]["name"]]
+
+    assert importer._pool is None
+    for process in processes:
+        process.join(5)
+        assert not process.is_alive()
@@ -0,0 +1,122 @@
+"""Range-coalesced IPv4 address sets."""
+import random
+from ipaddress import IPv4Address, IPv4Network
+
+import pytest
+
+from app.services.ip_ranges import IPv4RangeSet, host_bounds
+
+TOP = 2 ** 32 - 1
+
+
+def _free(used, lo, hi, exclude=()):
+    """iter_free worked out address by address."""
+    blocks = []
+    for a in range(lo, hi + 1):
+        if a in used or a in exclude:
+            continue
+        if blocks and blocks[-1][1] == a - 1:
+            blocks[-1][1] = a
+        else:
+            blocks.append([a, a])
+    return [tuple(block) for block in blocks]
+
+
+def test_add_merges_neighbouring_ranges():
+    s = IPv4RangeSet([10, 11, 14])
+    assert list(s.ranges()) == [(10, 11), (14, 14)]
+    assert s.add(13)
+    assert list(s.ranges()) == [(10, 11), (13, 14)]
+    assert s.add(12)
+    assert list(s.ranges()) == [(10, 14)]
+    assert not s.add(12)
+    assert s.add(9) and s.add(15)
+    assert list(s.ranges()) == [(9, 15)]
+    assert len(s) == 7
+
+
+def test_discard_splits_at_and_inside_range_bounds():
+    s = IPv4RangeSet(range(10, 20))
+    assert s.discard(10) and s.discard(19)
+    assert list(s.ranges()) == [(11, 18)]
+    assert s.discard(14)
+    assert list(s.ranges()) == [(11, 13), (15, 18)]
+    assert not s.discard(14)
+    assert not s.discard(100)
+    for a in (11, 12, 13):
+        s.discard(a)
+    assert list(s.ranges()) == [(15, 18)]
+    assert len(s) == 4
+    with pytest.raises(KeyError):
+        s.remove(11)
+
+
+def test_update_merges_with_stored_ranges():
+    s = IPv4RangeSet([1, 2, 10])
+    assert s.update([3, 9, 10, 20, 21]) == 4
+    assert list(s.ranges()) == [(1, 3), (9, 10), (20, 21)]
+    assert s.update([]) == 0
+    assert len(s) == 7
+
+
+def test_membership_and_iteration():
+    s = IPv4RangeSet([IPv4Address("10.0.0.1"), IPv4Address("10.0.0.2"), IPv4Address("10.0.0.9")])
+    assert IPv4Address("10.0.0.2") in s
+    assert int(IPv4Address("10.0.0.9")) in s
+    assert IPv4Address("10.0.0.3") not in s
+    assert IPv4Address("10.0.0.0") not in s
+    assert list(s) == [IPv4Address("10.0.0.1"), IPv4Address("10.0.0.2"), IPv4Address("10.0.0.9")]
+
+
+def test_ends_of_the_address_space():
+    s = IPv4RangeSet([0, TOP])
+    assert 0 in s and TOP in s
+    assert list(s.ranges()) == [(0, 0), (TOP, TOP)]
+    assert s.add(1) and s.add(TOP - 1)
+    assert list(s.ranges()) == [(0, 1), (TOP - 1, TOP)]
+    assert s.discard(0) and s.discard(TOP)
+    assert list(s.ranges()) == [(1, 1), (TOP - 1, TOP - 1)]
+
+    full = IPv4RangeSet([TOP - 2, TOP - 1, TOP])
+    assert list(full.iter_free(TOP - 3, TOP)) == [(TOP - 3, TOP - 3)]
+    assert list(full.iter_free(TOP - 2, TOP)) == []
+    assert list(IPv4RangeSet().iter_free(TOP - 1, TOP, exclude=[TOP])) == [(TOP - 1, TOP - 1)]
+    assert list(IPv4RangeSet([1]).iter_free(0, 2, exclude=[0])) == [(2, 2)]
+    assert full.first_free(TOP - 2, TOP) is None
+    assert full.count_within(0, TOP) == 3
+
+
+def test_iter_free_skips_gateways():
+    used = IPv4RangeSet([3, 4, 8])
+    # a gateway at the window edge, inside a free block, and one already used
+    assert list(used.iter_free(1, 10, exclude=[1, 6, 8, 42])) == [(2, 2), (5, 5), (7, 7), (9, 10)]
+    assert used.first_free(1, 10, exclude=[1, 2]) == 5
+    assert list(used.iter_free(3, 4)) == []
+
+
+def test_host_bounds():
+    assert host_bounds(IPv4Network("10.0.0.0/24")) == (int(IPv4Address("10.0.0.1")),
+                                                       int(IPv4Address("10.0.0.254")))
+    assert host_bounds(IPv4Network("10.0.0.0/31")) == (int(IPv4Address("10.0.0.0")),
+                                                       int(IPv4Address("10.0.0.1")))
+    assert host_bounds(IPv4Network("255.255.255.255/32")) == (TOP, TOP)
+    assert host_bounds(IPv4Network("0.0.0.0/0")) == (1, TOP - 1)
+
+
+def test_matches_a_plain_set():
+    rng = random.Random(7)
+    ranges, plain = IPv4RangeSet(), set()
+    for _ in range(3000):
+        a = rng.randrange(200)
+        if rng.random() < 0.6:
+            assert ranges.add(a) == (a not in plain)
+            plain.add(a)
+        else:
+            assert ranges.discard(a) == (a in plain)
+            plain.discard(a)
+    assert len(ranges) == len(plain)
+    assert [int(a) for a in ranges] == sorted(plain)
+    gateways = {rng.randrange(200) for _ in range(10)}
+    for lo, hi in [(0, 199), (17, 123), (150, 150), (190, 260)]:
+        assert list(ranges.iter_free(lo, hi, gateways)) == _free(plain, lo, hi, gateways)
+        assert ranges.count_within(lo, hi) == sum(1 for a in plain if lo <= a <= hi)
@@ -0,0 +1,111 @@
+"""Streaming the elements of a top-level JSON array."""
+import asyncio
+import io
+import json
+
+import pytest
+
+from app.services.json_stream import JSONArrayScanner, iter_json_array_bytes
+
+DOCUMENT = json.dumps({
+    "meta": {"data": [{"not": "these"}], "note": "a \"data\" key [in] a {string}"},
+    "data": [
+        {"name": "plain", "ports": []},
+        {"name": "esc\\aped \"quotes\" \\\\", "nested": [[1, [2, {"data": [3]}]], {"a": []}]},
+        {"name": "brackets ] } [ { , in a string", "u": "é☃"},
+        {},
+    ],
+    "after": [{"ignored": True}],
+}, ensure_ascii=False).encode()
+
+
+def _scan(document, size, key="data"):
+    scanner = JSONArrayScanner(key)
+    items = []
+    for i in range(0, len(document), size):
+        items += scanner.feed(document[i:i + size])
+    scanner.close()
+    return [json.loads(item) for item in items]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 20])
+def test_elements_survive_any_chunking(size):
+    assert _scan(DOCUMENT, size) == json.loads(DOCUMENT)["data"]
+
+
+def test_every_split_point():
+    expected = json.loads(DOCUMENT)["data"]
+    for cut in range(1, len(DOCUMENT)):
+        scanner = JSONArrayScanner("data")
+        items = scanner.feed(DOCUMENT[:cut]) + scanner.feed(DOCUMENT[cut:])
+        scanner.close()
+        assert [json.loads(item) for item in items] == expected, cut
+
+
+def test_other_keys_and_missing_array():
+    assert _scan(DOCUMENT, 5, key="after") == [{"ignored": True}]
+    assert _scan(DOCUMENT, 5, key="missing") == []
+    assert _scan(b'{"data": []}', 1) == []
+    assert _scan(b' { "data" : [ { } , {"a":1} ] } ', 3) == [{}, {"a": 1}]
+
+
+def test_only_the_current_element_is_buffered():
+    scanner = JSONArrayScanner("data")
+    scanner.feed(b'{"data": [')
+    for _ in range(1000):
+        assert scanner.feed(b'{"name": "x"},') == [b'{"name": "x"}']
+        assert len(scanner._buf) < 64
+
+
+@pytest.mark.parametrize("document", [
+    b'{"data": [1]}',
+    b'{"data": ["x"]}',
+    b'{"data": [[{}]]}',
+    b'{"data": [{}, "x"]}',
+    b'{"data": [{}, null]}',
+    b'{"data": [true, {}]}',
+    b'[{"data": []}]',
+])
+def test_non_object_elements_are_rejected(document):
+    with pytest.raises(ValueError):
+        _scan(document, 4)
+
+
+@pytest.mark.parametrize("document", [
+    b'{"data": [{"name": "x"}',
+    b'{"data": [{"name": "x',
+    b'{"data": [{"name": "x\\',
+    b'{"data": [',
+    b'{',
+])
+def test_truncated_documents_are_rejected(document):
+    with pytest.raises(ValueError):
+        _scan(document, 3)
+
+
+def test_unbalanced_document_is_rejected():
+    with pytest.raises(ValueError):
+        _scan(b'{"data": []}}', 3)
+
+
+def _read_all(document, chunk_size):
+    stream = io.BytesIO(document)
+
+    async def read(size):
+        return stream.read(size)
+
+    async def collect():
+        return [item async for item in iter_json_array_bytes(read, chunk_size=chunk_size)]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+def test_iter_json_array_bytes(chunk_size):
+    items = _read_all(DOCUMENT, chunk_size)
+    assert [json.loads(item) for item in items] == json.loads(DOCUMENT)["data"]
+
+
+def test_iter_json_array_bytes_rejects_a_truncated_upload():
+    with pytest.raises(ValueError):
+        _read_all(DOCUMENT[:-3], 16)
@@ -0,0 +1,39 @@
+"""Store lock scopes."""
+import threading
+
+import pytest
+
+from app.services.locks import StoreLocks
+
+
+def test_lab_scope_inside_pod_scope_raises():
+    locks = StoreLocks()
+    with locks.pod("lab", "pod"):
+        with pytest.raises(RuntimeError):
+            with locks.lab("lab"):
+                pass
+        # other labs are independent
+        with locks.lab("other"):
+            pass
+
+
+def test_pod_scope_inside_lab_scope():
+    locks = StoreLocks()
+    with locks.lab("lab"):
+        with locks.pod("lab", "pod"):
+            pass
+
+
+def test_pods_of_a_lab_are_written_in_parallel():
+    locks, inside = StoreLocks(), threading.Barrier(2, timeout=5)
+
+    def write(pod_id):
+        with locks.pod("lab", pod_id):
+            inside.wait()
+
+    threads = [threading.Thread(target=write, args=(pod_id,)) for pod_id in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not inside.broken
@@ -0,0 +1,95 @@
+"""Request and store metrics scraped from /metrics."""
+import re
+
+from app.models.lab_model import LabCreate
+from app.services.importer import commit_lab
+from app.services.metrics import LATENCY_BUCKETS, STORE_BUCKETS, Histogram
+from benchmarks.synthetic import load_dump
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _scrape(client):
+    """Return the samples of /metrics as {(name, frozenset of labels): value}."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, labels, value = _SAMPLE.match(line).groups()
+        samples[(name, frozenset(_LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def _get(samples, name, **labels):
+    return samples.get((name, frozenset(labels.items())), 0.0)
+
+
+def _buckets(samples, name, bounds, **labels):
+    """The cumulative bucket counts of one histogram series, +Inf last."""
+    return [_get(samples, name + "_bucket", **labels, le=le)
+            for le in [repr(bound) for bound in bounds] + ["+Inf"]]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("h", "help", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+    assert histogram.render() == [
+        "# HELP h help",
+        "# TYPE h histogram",
+        'h_bucket{route="/a",le="0.1"} 2',
+        'h_bucket{route="/a",le="1.0"} 3',
+        'h_bucket{route="/a",le="+Inf"} 4',
+        'h_sum{route="/a"} 3.65',
+        'h_count{route="/a"} 4',
+    ]
+
+
+def test_requests_and_store_calls_are_counted(api):
+    client, pod_db, lab_db = api
+    for lab in load_dump()["data"][:2]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_id = pod_db.get_lab_pod_ids(lab_id)[0]
+    route = "/lab/{lab_id}/pods/{pod_id}/devices"
+    series = {"method": "GET", "route": route}
+
+    before = _scrape(client)
+    for _ in range(3):
+        assert client.get(f"/lab/{lab_id}/pods/{pod_id}/devices", params={"limit": 5}).status_code == 200
+    assert client.get(f"/lab/{lab_id}/pods/missing/devices", params={"limit": 5}).status_code == 404
+    after = _scrape(client)
+
+    def grew(name, **labels):
+        return _get(after, name, **labels) - _get(before, name, **labels)
+
+    assert grew("http_requests_total", **series, status="200") == 3
+    assert grew("http_requests_total", **series, status="404") == 1
+    assert grew("http_request_duration_seconds_count", **series) == 4
+    buckets = _buckets(after, "http_request_duration_seconds", LATENCY_BUCKETS, **series)
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == _get(after, "http_request_duration_seconds_count", **series)
+    assert _get(after, "http_request_duration_seconds_sum", **series) > 0
+    assert grew("http_request_size_bytes_count", **series) == 4
+    assert grew("http_response_size_bytes_count", **series) == 4
+    for phase in ("validation", "handler", "store", "serialization"):
+        assert grew("http_request_phase_seconds_count", route=route, phase=phase) == 4
+
+    store = {"store": "PodDB", "method": "query_pod_devices"}
+    assert grew("store_call_duration_seconds_count", **store) == 4
+    buckets = _buckets(after, "store_call_duration_seconds", STORE_BUCKETS, **store)
+    assert buckets == sorted(buckets) and buckets[-1] == _get(
+        after, "store_call_duration_seconds_count", **store)
+    assert grew("store_call_duration_seconds_count", store="LabDB", method="get_lab_ids") >= 1
+
+    # the scrape itself is a request of its own route
+    assert grew("http_requests_total", method="GET", route="/metrics", status="200") == 1
+    assert _get(after, "http_requests_in_flight") == 1
+    pods, devices, addresses = pod_db.count_inventory()
+    assert (_get(after, "inventory_labs"), _get(after, "inventory_pods"),
+            _get(after, "inventory_devices"), _get(after, "inventory_tracked_addresses")) == (
+        2, pods, devices, addresses)
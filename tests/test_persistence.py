@@ -0,0 +1,95 @@
+"""Restarting the memory store from its write-ahead log and snapshots."""
+import pytest
+
+from app.models.lab_db_model import LabMetaCreate
+from app.services.lab_store import LabDB
+from app.services.persistence import LogBackend, restore
+from app.services.pod_store import PodDB
+
+
+def _open(directory):
+    backend = LogBackend(directory, commit_interval=60)
+    pod_db, lab_db = PodDB(), LabDB()
+    restore(backend, pod_db, lab_db)
+    return backend, pod_db, lab_db
+
+
+def _crash(backend):
+    """Stop a backend the way a killed process would: nothing more is written."""
+    backend._stop.set()
+    backend._flusher.join()
+    backend._log.close()
+
+
+def _create_lab(pod_db, lab_db, name):
+    return lab_db.create_new_lab_meta(
+        LabMetaCreate(name=name, location="l", building="b", floor="1"), pod_db).id
+
+
+def test_restart_replays_the_log(tmp_path):
+    backend, pod_db, lab_db = _open(tmp_path)
+    kept = _create_lab(pod_db, lab_db, "kept")
+    backend.compact()
+    dropped = _create_lab(pod_db, lab_db, "dropped")
+    lab_db.delete_lab_meta(dropped)
+    pod_db.delete_lab_and_pod(dropped)
+    backend.close()
+
+    backend, pod_db, lab_db = _open(tmp_path)
+    assert lab_db.get_lab_ids() == [kept]
+    backend.close()
+
+
+@pytest.mark.parametrize("step", ["_fsync_directory", "_start_log"])
+def test_crash_while_compacting(tmp_path, monkeypatch, step):
+    backend, pod_db, lab_db = _open(tmp_path)
+    kept = _create_lab(pod_db, lab_db, "kept")
+    dropped = _create_lab(pod_db, lab_db, "dropped")
+    backend.compact()
+    # logged after the first snapshot: replaying it on the second one
+    # would delete the lab a second time
+    lab_db.delete_lab_meta(dropped)
+    pod_db.delete_lab_and_pod(dropped)
+    backend.flush()
+
+    def crash():
+        raise OSError("killed")
+
+    # the new snapshot is in place, the old log is not truncated yet
+    monkeypatch.setattr(backend, step, crash)
+    with pytest.raises(OSError):
+        backend.compact()
+    _crash(backend)
+    monkeypatch.undo()
+
+    backend, pod_db, lab_db = _open(tmp_path)
+    assert lab_db.get_lab_ids() == [kept]
+    assert list(pod_db.pods_by_id) == [kept]
+    # and the store keeps logging on top of the new snapshot
+    again = _create_lab(pod_db, lab_db, "again")
+    backend.close()
+
+    backend, pod_db, lab_db = _open(tmp_path)
+    assert lab_db.get_lab_ids() == [kept, again]
+    backend.close()
+
+
+def test_crash_before_the_snapshot_is_replaced(tmp_path, monkeypatch):
+    backend, pod_db, lab_db = _open(tmp_path)
+    kept = _create_lab(pod_db, lab_db, "kept")
+    backend.compact()
+    # still buffered when compaction starts
+    added = _create_lab(pod_db, lab_db, "added")
+
+    def crash(*args):
+        raise OSError("killed")
+
+    monkeypatch.setattr("app.services.persistence.os.replace", crash)
+    with pytest.raises(OSError):
+        backend.compact()
+    _crash(backend)
+    monkeypatch.undo()
+
+    backend, pod_db, lab_db = _open(tmp_path)
+    assert lab_db.get_lab_ids() == [kept, added]
+    backend.close()
@@ -0,0 +1,127 @@
+"""Containment and overlap queries over pod networks."""
+import random
+from ipaddress import IPv4Network
+
+from app.models.lab_model import LabCreate
+from app.services.importer import commit_lab
+from app.services.prefix_trie import PrefixTrie
+from benchmarks.synthetic import load_dump
+
+
+def _random_networks(rng, count):
+    networks = []
+    for _ in range(count):
+        prefixlen = rng.choice([0, 1, 8, 16, 20, 24, 26, 28, 30, 31, 32])
+        address = rng.choice([0x0A000000, 0x0A000100, 0xC0A80000, 0xFFFFFF00]) | rng.randrange(256)
+        networks.append(IPv4Network((address, prefixlen), strict=False))
+    return networks
+
+
+def _keys(found):
+    return sorted(key for key, _ in found)
+
+
+def test_queries_match_a_linear_scan():
+    rng = random.Random(3)
+    stored = dict(enumerate(_random_networks(rng, 300)))
+    trie = PrefixTrie()
+    for key, net in stored.items():
+        trie.insert(net, key)
+    assert len(trie) == len(stored)
+
+    for query in _random_networks(rng, 200):
+        assert _keys(trie.containing(query)) == sorted(
+            key for key, net in stored.items() if query.subnet_of(net))
+        assert _keys(trie.contained(query)) == sorted(
+            key for key, net in stored.items() if net.subnet_of(query))
+        assert _keys(trie.overlapping(query)) == sorted(
+            key for key, net in stored.items() if net.overlaps(query))
+
+
+def test_remove_prunes_and_keeps_other_keys():
+    trie = PrefixTrie()
+    net = IPv4Network("10.0.0.0/24")
+    trie.insert(net, "a")
+    trie.insert(net, "b")
+    trie.insert(net, "a")
+    trie.insert(IPv4Network("10.0.0.0/26"), "c")
+    assert len(trie) == 3
+
+    trie.remove(net, "a")
+    trie.remove(net, "missing")
+    trie.remove(IPv4Network("172.16.0.0/12"), "a")
+    assert dict(trie.containing(IPv4Network("10.0.0.0/26"))) == {"b": net, "c": IPv4Network("10.0.0.0/26")}
+
+    trie.remove(net, "b")
+    trie.remove(IPv4Network("10.0.0.0/26"), "c")
+    assert len(trie) == 0
+    assert trie._root.children == [None, None]
+
+
+def test_default_route_and_host_routes():
+    trie = PrefixTrie()
+    trie.insert(IPv4Network("0.0.0.0/0"), "all")
+    trie.insert(IPv4Network("255.255.255.255/32"), "top")
+    trie.insert(IPv4Network("0.0.0.0/32"), "bottom")
+    assert _keys(trie.containing(IPv4Network("255.255.255.255/32"))) == ["all", "top"]
+    assert _keys(trie.contained(IPv4Network("0.0.0.0/0"))) == ["all", "bottom", "top"]
+    assert _keys(trie.overlapping(IPv4Network("128.0.0.0/1"))) == ["all", "top"]
+
+
+def test_pod_network_queries(api):
+    client, pod_db, lab_db = api
+    for lab in load_dump()["data"][:3]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_db.delete_pod(lab_id, pod_db.get_lab_pod_ids(lab_id)[0])
+    networks = {(lab_id, pod_id): pod_db.get_pod_network(lab_id, pod_id)
+                for lab_id in lab_db.get_lab_ids() for pod_id in pod_db.get_lab_pod_ids(lab_id)}
+    networks = {key: net for key, net in networks.items() if net is not None}
+    some = next(iter(networks.values()))
+
+    for query in [some, some.supernet(4), some.supernet(12), IPv4Network("10.0.0.0/8"),
+                  IPv4Network("192.0.2.0/24"), IPv4Network((int(some.network_address), 32))]:
+        contained = pod_db.get_pods_in_network(query)
+        assert {(p.lab_id, p.pod_id) for p in contained} == {
+            key for key, net in networks.items() if net.subnet_of(query)}
+        assert [p.network for p in contained] == sorted(p.network for p in contained)
+        assert {(p.lab_id, p.pod_id) for p in pod_db.get_pods_overlapping_network(query)} == {
+            key for key, net in networks.items() if net.overlaps(query)}
+
+    body = client.get("/networks/contained", params={"cidr": str(some.supernet(4))}).json()
+    assert {(p["lab_id"], p["pod_id"]) for p in body["pods"]} == {
+        key for key, net in networks.items() if net.subnet_of(some.supernet(4))}
+    assert client.get("/networks/overlapping", params={"cidr": "10.0.0.1/8"}).status_code == 422
+
+
+def _pod(network, host):
+    gateway = str(IPv4Network(network).network_address + 1)
+    return {"assets": [{"name": "d", "description": "d", "accessMethods": [],
+                        "location": {"row": "1", "aisle": "1"},
+                        "ports": [{"interface": {"address": host,
+                                                 "parent": {"network": network, "gateway": gateway}}}]}]}
+
+
+def test_overlapping_networks_are_refused_on_request(api):
+    client, pod_db, lab_db = api
+    commit_lab(LabCreate.model_validate(load_dump()["data"][0]), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+    first = client.post(f"/labs/{lab_id}/pods", json=_pod("10.250.0.0/24", "10.250.0.2")).json()["id"]
+    second = client.post(f"/labs/{lab_id}/pods", json=_pod("10.250.1.0/24", "10.250.1.2")).json()["id"]
+
+    refused = client.post(f"/labs/{lab_id}/pods", params={"reject_overlap": True},
+                          json=_pod("10.250.0.0/25", "10.250.0.3"))
+    assert refused.status_code == 409
+    assert first in refused.json()["detail"]
+    # allowed unless asked
+    assert client.post(f"/labs/{lab_id}/pods", json=_pod("10.250.0.0/25", "10.250.0.3")).status_code == 200
+
+    move = {"network": "10.250.0.0/23", "gateway": "10.250.0.1"}
+    url = f"/lab/{lab_id}/pods/{second}/device/network"
+    assert client.patch(url, params={"reject_overlap": True}, json=move).status_code == 409
+    assert pod_db.get_pod_network(lab_id, second) == IPv4Network("10.250.1.0/24")
+    # the pod's own network is no clash
+    same = {"network": "10.250.1.0/24", "gateway": "10.250.1.254"}
+    assert client.patch(url, params={"reject_overlap": True}, json=same).status_code == 200
+    assert client.patch(url, json=move).status_code == 200
+    assert pod_db.get_pod_network(lab_id, second) == IPv4Network("10.250.0.0/23")
@@ -0,0 +1,74 @@
+"""Slow request profiles."""
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies.dependencies import get_profiler
+from app.routers import metrics
+from app.services.metrics import MetricsMiddleware, TimedRoute
+from app.services.profiler import SlowRequestProfiler
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _app(profiler):
+    @asynccontextmanager
+    async def lifespan(app):
+        profiler.start()
+        yield
+        profiler.stop()
+
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/slow")
+    def slow_sync_handler():
+        _spin(0.3)
+        return {}
+
+    @router.get("/slow-async")
+    async def slow_async_handler():
+        _spin(0.3)
+        return {}
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(MetricsMiddleware, profiler=profiler)
+    app.include_router(router)
+    app.include_router(metrics.router)
+    app.dependency_overrides[get_profiler] = lambda: profiler
+    return app
+
+
+def _stacks(client, route):
+    profiles = client.get("/metrics/profiles").json()
+    [profile] = [p for p in profiles if p["route"] == route]
+    assert profile["samples"] > 0
+    return [stack["stack"] for stack in profile["stacks"]]
+
+
+def test_sync_handler_frames_are_sampled():
+    profiler = SlowRequestProfiler(threshold_ms=100, interval=0.002)
+    with TestClient(_app(profiler)) as client:
+        client.get("/slow")
+        stacks = _stacks(client, "/slow")
+    assert ":slow_sync_handler;" in stacks[0] and stacks[0].endswith(":_spin")
+
+
+def test_async_handler_frames_are_sampled():
+    profiler = SlowRequestProfiler(threshold_ms=100, interval=0.002)
+    with TestClient(_app(profiler)) as client:
+        client.get("/slow-async")
+        stacks = _stacks(client, "/slow-async")
+    assert ":slow_async_handler;" in stacks[0] and stacks[0].endswith(":_spin")
+
+
+def test_fast_requests_are_not_kept():
+    profiler = SlowRequestProfiler(threshold_ms=10_000, interval=0.002)
+    with TestClient(_app(profiler)) as client:
+        client.get("/slow")
+        assert client.get("/metrics/profiles").json() == []
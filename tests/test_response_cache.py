@@ -0,0 +1,84 @@
+"""Pre-encoded pod responses, their ETags and 304s."""
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import PodCreate
+from app.services.response_cache import ResponseCache, etag_matches
+from benchmarks.synthetic import load_dump
+
+
+def test_hit_skips_the_build():
+    cache, builds = ResponseCache(), []
+
+    def build():
+        builds.append(1)
+        return b'{"a": 1}'
+
+    first = cache.get_or_build("lab", "pod", "pod", build)
+    assert cache.get_or_build("lab", "pod", "pod", build) is first
+    assert len(builds) == 1
+    cache.invalidate("lab", "pod")
+    assert cache.get_or_build("lab", "pod", "pod", build) == first
+    assert len(builds) == 2
+
+
+def test_body_built_across_a_change_is_not_kept():
+    cache = ResponseCache()
+    cache.get_or_build("lab", "pod", "pod", lambda: b"old")
+
+    def build():
+        cache.invalidate("lab", "pod")
+        return b"stale"
+
+    assert cache.get_or_build("lab", "pod", "devices", build).body == b"stale"
+    assert cache.get_or_build("lab", "pod", "devices", lambda: b"new").body == b"new"
+
+
+def test_deleted_pod_gets_no_entries_back():
+    cache = ResponseCache()
+
+    def build():
+        # the pod is deleted while its body is being encoded
+        cache.invalidate("lab", "pod")
+        return b"gone"
+
+    assert cache.get_or_build("lab", "pod", "pod", build).body == b"gone"
+    assert len(cache) == 0
+    cache.get_or_build("lab", "other", "pod", lambda: b"{}")
+    cache.invalidate("lab")
+    assert len(cache) == 0
+
+
+def test_etag_matching():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"x"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_get_pod_etag_and_304(api):
+    client, pod_db, lab_db = api
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pod = pod_db.create_pod(lab_id, PodCreate.model_validate(load_dump()["data"][0]["pods"][0]))
+    url = f"/labs/{lab_id}/pods/{pod.id}"
+
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.json()["id"] == pod.id
+    unchanged = client.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["etag"] == etag
+
+    device = pod.assets[0]
+    pod_db.patch_device_name(lab_id, pod.id, device.id, "renamed")
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "renamed" in {d["name"] for d in changed.json()["assets"]}
+
+    pod_db.delete_pod(lab_id, pod.id)
+    assert client.get(url).status_code == 404
+    assert len(pod_db.response_cache) == 0
@@ -0,0 +1,40 @@
+"""The memory and SQLite stores answer free text searches alike."""
+import pytest
+
+from app.models.lab_model import LabCreate
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+from benchmarks.synthetic import load_dump
+
+QUERIES = ["9k", "41", "n9", "f2", "n9k", "9k 92", "92160", "160yc", "f241 9396", "x", "zz", "https"]
+
+
+@pytest.fixture(scope="module")
+def stores(tmp_path_factory):
+    labs = [LabCreate.model_validate(lab) for lab in load_dump()["data"][:2]]
+    conn = connect(str(tmp_path_factory.mktemp("search") / "inventory.db"))
+    memory, sqlite = (PodDB(), LabDB()), (SqlitePodDB(conn), SqliteLabDB(conn))
+    for pod_db, lab_db in (memory, sqlite):
+        for lab in labs:
+            commit_lab(lab, lab_db, pod_db)
+    return memory[0], sqlite[0]
+
+
+def _hits(pod_db, query):
+    page = pod_db.search_devices(query, 0, 100_000)
+    return page.total, [(hit.name, hit.score) for hit in page.results]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_stores_agree(stores, query):
+    memory, sqlite = stores
+    assert _hits(memory, query) == _hits(sqlite, query)
+
+
+@pytest.mark.parametrize("query", ["9k", "41"])
+def test_short_terms_match_token_prefixes_only(stores, query):
+    for pod_db in stores:
+        names = [hit.name for hit in pod_db.search_devices(query, 0, 100_000).results]
+        assert "F241.01.04-N9K-92160YC-X" not in names
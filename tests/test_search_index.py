@@ -0,0 +1,29 @@
+"""Deferred indexing of the in-memory search index."""
+import pytest
+
+from app.services.search_index import SearchDoc, SearchIndex
+
+
+def _doc(name):
+    return SearchDoc.build(name, "leaf switch", ["https://" + name.lower()])
+
+
+@pytest.mark.parametrize("background", [False, True])
+def test_bulk_matches_one_by_one(background):
+    names = [f"F241.01.{i:02}-N9K-92160YC-X" for i in range(50)]
+    one_by_one, bulk = SearchIndex(), SearchIndex()
+    for i, name in enumerate(names):
+        one_by_one.put(("lab", "pod", str(i)), _doc(name))
+    one_by_one.remove(("lab", "pod", "0"))
+    one_by_one.put(("lab", "pod", "1"), _doc("renamed"))
+
+    with bulk.bulk(background):
+        bulk.put_many((("lab", "pod", str(i)), _doc(name)) for i, name in enumerate(names))
+    # deferred as well while a background pass has not run yet
+    bulk.remove(("lab", "pod", "0"))
+    bulk.put(("lab", "pod", "1"), _doc("renamed"))
+
+    assert bulk.wait(5)
+    for query in ["n9k", "f2", "renamed", "01.07", "leaf"]:
+        assert bulk.search(query) == one_by_one.search(query)
+    assert len(bulk) == len(one_by_one) == 49
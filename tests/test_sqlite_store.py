@@ -0,0 +1,157 @@
+"""The SQLite store behaves like the memory store and is shared between workers."""
+import threading
+
+import pytest
+
+from app.Exceptions.exceptions import DeviceNotFoundError, DuplicateIPv4Error
+from app.models.lab_model import LabCreate
+from app.models.pod_model import DeviceBatch, DeviceCreate, Location
+from app.services.importer import commit_lab
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteChangeFeed, SqliteLabDB, SqlitePodDB, connect
+from benchmarks.synthetic import load_dump
+
+
+def _sqlite(path):
+    conn = connect(str(path))
+    changes = SqliteChangeFeed(conn)
+    return SqlitePodDB(conn, changes), SqliteLabDB(conn, changes)
+
+
+def _view(pod_db, lab_db):
+    """The inventory without the generated ids."""
+    view = []
+    for lab_id in lab_db.get_lab_ids():
+        lab = lab_db.get_lab_meta(lab_id).model_dump(exclude={"id"})
+        pods = []
+        for pod_id in pod_db.get_lab_pod_ids(lab_id):
+            devices = sorted(d.model_dump_json(exclude={"id"}) for d in pod_db.get_pod_devices(lab_id, pod_id))
+            free = pod_db.get_free_pod_ip(lab_id, pod_id, limit=1000)
+            pods.append((devices, pod_db.get_all_pod_ip(lab_id, pod_id), free.model_dump()))
+        # every subnet, as ties in utilization are ordered by the random pod ids
+        stats = pod_db.get_lab_stats(lab_id, limit=10_000).model_dump(exclude={"lab_id"})
+        stats["subnets"] = sorted((subnet["network"], subnet["devices"], subnet["used"], subnet["total"])
+                                  for subnet in stats["subnets"])
+        view.append((lab, pods, stats))
+    return view
+
+
+def _edit(pod_db, lab_db):
+    """The same writes, whatever the store."""
+    lab_id = lab_db.get_lab_ids()[0]
+    pod_id, other = pod_db.get_lab_pod_ids(lab_id)[:2]
+    device = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+    pod_db.patch_device_name(lab_id, pod_id, device.id, "renamed")
+    pod_db.patch_device_ip(lab_id, pod_id, device.id, pod_db.get_next_free_pod_ip(lab_id, pod_id))
+    pod_db.patch_pod_devices_location(lab_id, other, Location(row="R9", aisle="A9"))
+    pod_db.delete_device(lab_id, other, pod_db.get_pod_devices(lab_id, other)[0].id)
+    pod_db.delete_pod(lab_id, pod_db.get_lab_pod_ids(lab_id)[-1])
+    lab_db.delete_lab_meta(lab_db.get_lab_ids()[-1])
+
+
+def test_stores_agree(tmp_path):
+    labs = [LabCreate.model_validate(lab) for lab in load_dump()["data"][:3]]
+    memory, sqlite = (PodDB(), LabDB()), _sqlite(tmp_path / "inventory.db")
+    for pod_db, lab_db in (memory, sqlite):
+        for lab in labs:
+            commit_lab(lab, lab_db, pod_db)
+    assert _view(*sqlite) == _view(*memory)
+
+    for stores in (memory, sqlite):
+        _edit(*stores)
+    assert _view(*sqlite) == _view(*memory)
+    assert sqlite[0].count_inventory() == memory[0].count_inventory()
+
+
+def test_inventory_survives_reopening(tmp_path):
+    path = tmp_path / "inventory.db"
+    pod_db, lab_db = _sqlite(path)
+    for lab in load_dump()["data"][:2]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    _edit(pod_db, lab_db)
+    before = {lab_id: {pod_id: pod_db.get_pod_devices(lab_id, pod_id)
+                       for pod_id in pod_db.get_lab_pod_ids(lab_id)}
+              for lab_id in lab_db.get_lab_ids()}
+    pod_db.conn.close()
+
+    pod_db, lab_db = _sqlite(path)
+    assert {lab_id: {pod_id: pod_db.get_pod_devices(lab_id, pod_id)
+                     for pod_id in pod_db.get_lab_pod_ids(lab_id)}
+            for lab_id in lab_db.get_lab_ids()} == before
+
+
+def test_workers_see_each_others_writes(tmp_path):
+    path = tmp_path / "inventory.db"
+    writer, reader = _sqlite(path), _sqlite(path)
+    commit_lab(LabCreate.model_validate(load_dump()["data"][0]), writer[1], writer[0])
+    [lab_id] = reader[1].get_lab_ids()
+    pod_id = reader[0].get_lab_pod_ids(lab_id)[0]
+    device = reader[0].get_pod_devices(lab_id, pod_id)[0]
+    # cached by the reader
+    reader[0].get_pod_json(lab_id, pod_id)
+    revision = reader[0].changes.revision
+
+    writer[0].patch_device_name(lab_id, pod_id, device.id, "renamed")
+
+    assert reader[0].get_pod_device_by_id(lab_id, pod_id, device.id).name == "renamed"
+    assert b'"renamed"' in reader[0].get_pod_json(lab_id, pod_id).body
+    [event] = reader[0].changes.read(revision)
+    assert (event.op, event.device_id) == ("store_device", device.id)
+
+
+def test_failed_write_is_rolled_back(tmp_path):
+    pod_db, lab_db = _sqlite(tmp_path / "inventory.db")
+    commit_lab(LabCreate.model_validate(load_dump()["data"][0]), lab_db, pod_db)
+    [lab_id] = lab_db.get_lab_ids()
+    pod_id = pod_db.get_lab_pod_ids(lab_id)[0]
+    taken = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+    raw = taken.model_dump(exclude={"id"})
+    raw["name"] = "duplicate"
+    revision = pod_db.changes.revision
+
+    with pytest.raises(DuplicateIPv4Error):
+        pod_db.create_device(lab_id, pod_id, DeviceCreate.model_validate(raw))
+    assert "duplicate" not in {d.name for d in pod_db.get_pod_devices(lab_id, pod_id)}
+    assert pod_db.changes.revision == revision
+
+
+def test_reads_wait_for_a_batch_that_rolls_back(tmp_path):
+    pod_db, lab_db = _sqlite(tmp_path / "inventory.db")
+    commit_lab(LabCreate.model_validate(load_dump()["data"][0]), lab_db, pod_db)
+    [lab_id] = lab_db.get_lab_ids()
+    pod_id = next(p for p in pod_db.get_lab_pod_ids(lab_id) if pod_db.get_next_free_pod_ip(lab_id, p))
+    template = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+    raw = template.model_dump(exclude={"id"})
+    raw["name"] = "uncommitted"
+    ip = pod_db.get_next_free_pod_ip(lab_id, pod_id)
+    raw["ports"][0]["interface"]["address"] = str(ip)
+    before = (pod_db.get_pod_devices(lab_id, pod_id), pod_db.find_address(ip), 0)
+
+    seen = []
+
+    def read():
+        seen.append((pod_db.get_pod_devices(lab_id, pod_id), pod_db.find_address(ip),
+                     pod_db.search_devices("uncommitted").total))
+
+    patch_device_name = pod_db.patch_device_name
+
+    def patch_mid_batch(*args):
+        # the create above is written but not committed
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+        patch_mid_batch.reader = reader
+        return patch_device_name(*args)
+
+    pod_db.patch_device_name = patch_mid_batch
+    operations = DeviceBatch.model_validate({"operations": [
+        {"op": "create", "device": raw},
+        {"op": "patch_name", "device_id": "missing", "name": "x"},
+    ]}).operations
+    with pytest.raises(DeviceNotFoundError):
+        pod_db.apply_device_batch(lab_id, pod_id, operations)
+    patch_mid_batch.reader.join(5)
+
+    assert seen == [before]
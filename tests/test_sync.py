@@ -0,0 +1,136 @@
+"""Idempotent sync imports."""
+import copy
+import threading
+
+import pytest
+
+from app.models.lab_model import LabCreate
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+from app.services.sync import sync_labs
+from benchmarks.synthetic import load_dump
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    if request.param == "memory":
+        return PodDB(), LabDB()
+    conn = connect(str(tmp_path / "inventory.db"))
+    return SqlitePodDB(conn), SqliteLabDB(conn)
+
+
+def _labs(raw):
+    return [LabCreate.model_validate(lab) for lab in raw]
+
+
+def _inventory(pod_db, lab_db):
+    """Every lab, pod and device id with the device contents."""
+    return {lab_id: {pod_id: sorted((d.id, d.model_dump_json()) for d in pod_db.get_pod_devices(lab_id, pod_id))
+                     for pod_id in pod_db.get_lab_pod_ids(lab_id)}
+            for lab_id in lab_db.get_lab_ids()}
+
+
+def test_same_dump_twice_changes_nothing(stores):
+    pod_db, lab_db = stores
+    labs = _labs(load_dump()["data"][:2])
+    first = sync_labs(labs, lab_db, pod_db)
+    assert first.labs.created == 2
+    before = _inventory(pod_db, lab_db)
+
+    again = sync_labs(labs, lab_db, pod_db)
+    assert again.labs.unchanged == 2
+    assert again.pods.model_dump() == {"created": 0, "updated": 0, "deleted": 0,
+                                       "unchanged": first.pods.created}
+    assert again.devices.created == again.devices.updated == again.devices.deleted == 0
+    assert _inventory(pod_db, lab_db) == before
+
+
+def test_changed_dump_keeps_matched_ids(stores):
+    pod_db, lab_db = stores
+    raw = load_dump()["data"][:1]
+    sync_labs(_labs(raw), lab_db, pod_db)
+    [lab_id] = lab_db.get_lab_ids()
+    pod_ids = pod_db.get_lab_pod_ids(lab_id)
+    first_pod = {d.name: d.id for d in pod_db.get_pod_devices(lab_id, pod_ids[0])}
+
+    raw = copy.deepcopy(raw)
+    pod = raw[0]["pods"][0]
+    renamed = pod["assets"][0]["name"]
+    pod["assets"][0]["description"] = "changed"
+    removed = pod["assets"].pop()["name"]
+    report = sync_labs(_labs(raw), lab_db, pod_db)
+
+    assert report.labs.updated == 1
+    assert report.pods.updated == 1
+    assert report.devices.updated == 1 and report.devices.deleted == 1
+    assert lab_db.get_lab_ids() == [lab_id]
+    assert pod_db.get_lab_pod_ids(lab_id) == pod_ids
+    devices = {d.name: d for d in pod_db.get_pod_devices(lab_id, pod_ids[0])}
+    assert removed not in devices
+    assert devices[renamed].id == first_pod[renamed]
+    assert devices[renamed].description == "changed"
+    assert {name: d.id for name, d in devices.items()} == {
+        name: device_id for name, device_id in first_pod.items() if name != removed}
+
+
+def test_prune_deletes_only_unmatched_labs(stores):
+    pod_db, lab_db = stores
+    raw = load_dump()["data"][:3]
+    sync_labs(_labs(raw), lab_db, pod_db)
+    kept, gone, also_kept = lab_db.get_lab_ids()
+
+    report = sync_labs(_labs([raw[0], raw[2]]), lab_db, pod_db, prune=True)
+    assert report.labs.deleted == 1
+    assert [r.lab_id for r in report.results if r.status == "deleted"] == [gone]
+    assert lab_db.get_lab_ids() == [kept, also_kept]
+
+    # without prune, a missing lab is left alone
+    report = sync_labs(_labs([raw[0]]), lab_db, pod_db)
+    assert report.labs.deleted == 0
+    assert lab_db.get_lab_ids() == [kept, also_kept]
+
+
+def test_sync_does_not_wait_for_writers_of_other_labs():
+    pod_db, lab_db = PodDB(), LabDB()
+    raw = load_dump()["data"][:2]
+    sync_labs(_labs(raw), lab_db, pod_db)
+    synced, busy = lab_db.get_lab_ids()
+    holding, done = threading.Event(), threading.Event()
+    released_by_sync = []
+
+    def writer():
+        with pod_db.locks.lab(busy):
+            holding.set()
+            released_by_sync.append(done.wait(5))
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    holding.wait(5)
+    try:
+        raw = copy.deepcopy(raw[:1])
+        raw[0]["floor"] = "9"
+        report = sync_labs(_labs(raw), lab_db, pod_db)
+    finally:
+        done.set()
+        thread.join()
+    assert released_by_sync == [True]
+    assert report.labs.updated == 1
+    assert lab_db.get_lab_meta(synced).floor == "9"
+
+
+def test_pod_digests_follow_pod_changes(stores):
+    pod_db, lab_db = stores
+    sync_labs(_labs(load_dump()["data"][:1]), lab_db, pod_db)
+    [lab_id] = lab_db.get_lab_ids()
+    digests = pod_db.get_pod_digests(lab_id)
+    pod_id, other = list(digests)[:2]
+    device = pod_db.get_pod_devices(lab_id, pod_id)[0]
+
+    pod_db.patch_device_name(lab_id, pod_id, device.id, "renamed")
+    changed = pod_db.get_pod_digests(lab_id)
+    assert changed[pod_id] != digests[pod_id]
+    assert changed[other] == digests[other]
+
+    pod_db.patch_device_name(lab_id, pod_id, device.id, device.name)
+    assert pod_db.get_pod_digests(lab_id) == digests
@@ -0,0 +1,123 @@
+"""Utilization counters follow every change to the inventory."""
+from collections import Counter
+from ipaddress import IPv4Network
+
+import pytest
+
+from app.models.lab_model import LabCreate
+from app.models.pod_model import DeviceBatch, DeviceCreate, Location, Network, PodAllocate
+from app.services.importer import commit_lab
+from app.services.ip_ranges import host_bounds
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from app.services.sqlite_store import SqliteLabDB, SqlitePodDB, connect
+from benchmarks.synthetic import load_dump
+
+
+def _recount(pod_db, lab_db):
+    """Every lab's counters and the subnet ranking, worked out from the devices."""
+    labs, ranking = {}, []
+    for lab_id in lab_db.get_lab_ids():
+        lab = labs[lab_id] = {"pods": 0, "devices": 0, "addresses": 0, "used_hosts": 0,
+                              "total_hosts": 0, "rows": Counter(), "aisles": Counter()}
+        for pod_id in pod_db.get_lab_pod_ids(lab_id):
+            devices = pod_db.get_pod_devices(lab_id, pod_id)
+            addresses = {int(ip) for ip in pod_db.get_all_pod_ip(lab_id, pod_id)}
+            gateways = {int(port.interface.parent.gateway) for d in devices for port in d.ports}
+            lab["pods"] += 1
+            lab["devices"] += len(devices)
+            lab["addresses"] += len(addresses)
+            for device in devices:
+                lab["rows"][device.location.row] += 1
+                lab["aisles"][device.location.aisle] += 1
+            net = pod_db.get_pod_network(lab_id, pod_id)
+            if net is None:
+                continue
+            lo, hi = host_bounds(net)
+            used = sum(1 for a in addresses | gateways if lo <= a <= hi)
+            total = hi - lo + 1
+            lab["used_hosts"] += used
+            lab["total_hosts"] += total
+            ranking.append((-(used / total), total - used, lab_id, pod_id, net, len(devices), used, total))
+        lab["rows"], lab["aisles"] = dict(lab["rows"]), dict(lab["aisles"])
+    return labs, sorted(ranking)
+
+
+def _subnets(subnets):
+    return [(-s.utilization, s.total - s.used, s.lab_id, s.pod_id, s.network, s.devices, s.used, s.total)
+            for s in subnets]
+
+
+def _check(pod_db, lab_db):
+    labs, ranking = _recount(pod_db, lab_db)
+    for lab_id, expected in labs.items():
+        stats = pod_db.get_lab_stats(lab_id, limit=10_000)
+        assert stats.model_dump(exclude={"lab_id", "subnets"}) == expected
+        assert _subnets(stats.subnets) == [r for r in ranking if r[2] == lab_id]
+    stats = pod_db.get_stats(limit=10_000)
+    assert stats.labs == len(labs)
+    for field in ("pods", "devices", "addresses", "used_hosts", "total_hosts"):
+        assert getattr(stats, field) == sum(lab[field] for lab in labs.values())
+    assert _subnets(stats.subnets) == ranking
+    assert _subnets(pod_db.get_stats(offset=3, limit=5).subnets) == ranking[3:8]
+    assert pod_db.count_inventory() == (stats.pods, stats.devices, stats.addresses)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def stores(request, tmp_path):
+    if request.param == "memory":
+        return PodDB(), LabDB()
+    conn = connect(str(tmp_path / "inventory.db"))
+    return SqlitePodDB(conn), SqliteLabDB(conn)
+
+
+def test_counters_follow_every_write(stores):
+    pod_db, lab_db = stores
+    for lab in load_dump()["data"][:4]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    _check(pod_db, lab_db)
+
+    lab_id, other, gone = lab_db.get_lab_ids()[:3]
+    pod_ids = pod_db.get_lab_pod_ids(lab_id)
+    pod_id = next(p for p in pod_ids if pod_db.get_next_free_pod_ip(lab_id, p) is not None)
+    device = next(d for d in pod_db.get_pod_devices(lab_id, pod_id) if d.ports)
+
+    pod_db.patch_device_ip(lab_id, pod_id, device.id, pod_db.get_next_free_pod_ip(lab_id, pod_id))
+    raw = device.model_dump(exclude={"id"})
+    raw["ports"][0]["interface"]["address"] = str(pod_db.get_next_free_pod_ip(lab_id, pod_id))
+    raw["location"] = {"row": "new-row", "aisle": "new-aisle"}
+    created = pod_db.create_device(lab_id, pod_id, DeviceCreate.model_validate(raw))
+    _check(pod_db, lab_db)
+
+    pod_db.delete_device(lab_id, pod_id, device.id)
+    pod_db.patch_pod_devices_location(lab_id, pod_ids[1], Location(row="R9", aisle="A9"))
+    # the devices keep their addresses, now outside the pod's network
+    pod_db.patch_pod_devices_network(
+        lab_id, pod_ids[2], Network(network=IPv4Network("10.250.0.0/24"), gateway="10.250.0.1"))
+    pod_db.apply_device_batch(lab_id, pod_id, DeviceBatch.model_validate({"operations": [
+        {"op": "patch_name", "device_id": created.id, "name": "renamed"},
+        {"op": "delete", "device_id": created.id},
+    ]}).operations)
+    _check(pod_db, lab_db)
+
+    pod_db.delete_pod(lab_id, pod_ids[3])
+    lab_db.delete_lab_meta(gone)
+    pod_db.delete_lab_and_pod(gone)
+    pod_db.put_address_plan(other, IPv4Network("10.251.0.0/24"))
+    pod_db.allocate_pod(other, PodAllocate.model_validate({"assets": [
+        {"name": "a", "description": "a", "accessMethods": [], "location": {"row": "1", "aisle": "1"}}] * 3}))
+    _check(pod_db, lab_db)
+
+
+def test_stats_endpoints(api):
+    client, pod_db, lab_db = api
+    for lab in load_dump()["data"][:2]:
+        commit_lab(LabCreate.model_validate(lab), lab_db, pod_db)
+    lab_id = lab_db.get_lab_ids()[0]
+
+    body = client.get("/stats", params={"offset": 2, "limit": 3}).json()
+    assert body == pod_db.get_stats(2, 3).model_dump(mode="json")
+    assert len(body["subnets"]) == 3
+    body = client.get(f"/labs/{lab_id}/stats").json()
+    assert body == pod_db.get_lab_stats(lab_id).model_dump(mode="json")
+    assert client.get("/labs/missing/stats").status_code == 404
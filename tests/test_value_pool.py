@@ -0,0 +1,119 @@
+"""Shared value objects of stored devices and the pod-wide patches."""
+from ipaddress import IPv4Network
+
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import Location, Network, PodCreate
+from app.services.change_feed import ChangeFeed
+from app.services.lab_store import LabDB
+from app.services.persistence import StorageBackend, restore
+from app.services.pod_store import PodDB
+from app.services.value_pool import ValuePool
+from benchmarks.synthetic import load_dump
+
+
+class RecordingBackend(StorageBackend):
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+    def load(self):
+        return None, list(self.records)
+
+
+def _store(backend=None):
+    changes = ChangeFeed()
+    pod_db = PodDB(backend=backend, changes=changes)
+    lab_db = LabDB(backend=backend, changes=changes)
+    lab_id = lab_db.create_new_lab_meta(
+        LabMetaCreate(name="lab", location="l", building="b", floor="1"), pod_db).id
+    pods = load_dump()["data"][0]["pods"]
+    raw = max(pods, key=lambda pod: sum(1 for device in pod["assets"] if device["ports"]))
+    pod = pod_db.create_pod(lab_id, PodCreate.model_validate(raw))
+    return pod_db, lab_db, lab_id, pod.id, changes
+
+
+def test_pool_shares_equal_values():
+    pool = ValuePool()
+    net = IPv4Network("10.0.0.0/24")
+    first = pool.network(Network(network=net, gateway="10.0.0.1"))
+    assert pool.network(Network(network=net, gateway="10.0.0.1")) is first
+    assert pool.network(Network(network=net, gateway="10.0.0.2")) is not first
+    assert pool.location(Location(row="1", aisle="2")) is pool.location(Location(row="1", aisle="2"))
+
+
+def test_devices_of_a_pod_share_values():
+    pod_db, _, lab_id, pod_id, _ = _store()
+    devices = pod_db.get_pod_devices(lab_id, pod_id)
+    by_value = {}
+    for device in devices:
+        for port in device.ports:
+            parent = port.interface.parent
+            assert by_value.setdefault((parent.network, parent.gateway), parent) is parent
+        location = device.location
+        assert by_value.setdefault((location.row, location.aisle), location) is location
+        assert by_value.setdefault(device.description, device.description) is device.description
+
+
+def test_patch_network_is_one_record(monkeypatch):
+    backend = RecordingBackend()
+    pod_db, _, lab_id, pod_id, changes = _store(backend)
+    before = {d.id: d for d in pod_db.get_pod_devices(lab_id, pod_id)}
+    records, revision = len(backend.records), changes.revision
+
+    def untouched(*args, **kwargs):
+        raise AssertionError("index touched")
+
+    for index, method in [(pod_db.search_index, "put_many"), (pod_db.search_index, "put"),
+                          (pod_db.address_index, "add"), (pod_db.address_index, "discard")]:
+        monkeypatch.setattr(index, method, untouched)
+
+    net = IPv4Network("10.99.0.0/16")
+    devices = pod_db.patch_pod_devices_network(
+        lab_id, pod_id, Network(network=net, gateway="10.99.0.1"))
+
+    network = devices[0].ports[0].interface.parent
+    assert backend.records[records:] == [("pods", "set_pod_network", lab_id, pod_id, network)]
+    [event] = changes.read(revision)
+    assert (event.op, event.pod_id, event.network.network) == ("set_pod_network", pod_id, net)
+    assert {d.id for d in devices} == set(before)
+    for device in devices:
+        assert [p.interface.address for p in device.ports] == [
+            p.interface.address for p in before[device.id].ports]
+        assert all(p.interface.parent.network == net for p in device.ports)
+    assert pod_db.get_pod_network(lab_id, pod_id) == net
+    assert set(pod_db.pods_by_id[lab_id][pod_id]["gateways"]) == {int(net.network_address) + 1}
+    [subnet] = pod_db.get_lab_stats(lab_id).subnets
+    assert subnet.network == net
+
+
+def test_patch_location_is_one_record():
+    backend = RecordingBackend()
+    pod_db, _, lab_id, pod_id, changes = _store(backend)
+    count = len(pod_db.get_pod_devices(lab_id, pod_id))
+    records, revision = len(backend.records), changes.revision
+
+    pod_db.patch_pod_devices_location(lab_id, pod_id, Location(row="R9", aisle="A9"))
+
+    assert [record[:2] for record in backend.records[records:]] == [("pods", "set_pod_location")]
+    assert [event.op for event in changes.read(revision)] == ["set_pod_location"]
+    stats = pod_db.get_lab_stats(lab_id)
+    assert stats.rows == {"R9": count}
+    assert stats.aisles == {"A9": count}
+    assert stats.devices == count
+
+
+def test_pod_wide_patches_replay():
+    backend = RecordingBackend()
+    pod_db, lab_db, lab_id, pod_id, _ = _store(backend)
+    net = IPv4Network("10.99.0.0/16")
+    pod_db.patch_pod_devices_network(lab_id, pod_id, Network(network=net, gateway="10.99.0.1"))
+    pod_db.patch_pod_devices_location(lab_id, pod_id, Location(row="R9", aisle="A9"))
+
+    replayed_pod_db, replayed_lab_db, log = PodDB(), LabDB(), RecordingBackend()
+    log.records = list(backend.records)
+    restore(log, replayed_pod_db, replayed_lab_db)
+    assert replayed_pod_db.get_pod_devices(lab_id, pod_id) == pod_db.get_pod_devices(lab_id, pod_id)
+    assert replayed_pod_db.get_lab_stats(lab_id) == pod_db.get_lab_stats(lab_id)
+    assert replayed_pod_db.get_pod_network(lab_id, pod_id) == net
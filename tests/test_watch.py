@@ -0,0 +1,172 @@
+"""The change feed and /watch over SSE and WebSocket."""
+import asyncio
+import json
+import threading
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.Exceptions.exceptions import RevisionExpiredError
+from app.models.lab_db_model import LabMetaCreate
+from app.models.pod_model import PodCreate
+from app.routers.watch import _sse
+from app.services.change_feed import ChangeFeed, watch
+from app.services.lab_store import LabDB
+from app.services.pod_store import PodDB
+from benchmarks.synthetic import load_dump
+
+
+def _lab(lab_db, pod_db, name="lab"):
+    return lab_db.create_new_lab_meta(
+        LabMetaCreate(name=name, location="l", building="b", floor="1"), pod_db).id
+
+
+def _pods(count=2):
+    return [PodCreate.model_validate(pod) for pod in load_dump()["data"][0]["pods"][:count]]
+
+
+def test_read_after_a_revision():
+    feed = ChangeFeed(history=3)
+    start = feed.revision
+    for i in range(3):
+        feed.publish("put_meta", f"lab{i}")
+    assert [e.lab_id for e in feed.read(start)] == ["lab0", "lab1", "lab2"]
+    assert [e.lab_id for e in feed.read(start + 1, limit=1)] == ["lab1"]
+    assert feed.read(feed.revision) == []
+
+    feed.publish("put_meta", "lab3")
+    # lab0 fell out of the history
+    with pytest.raises(RevisionExpiredError):
+        feed.read(start)
+    assert [e.lab_id for e in feed.read(start + 1)] == ["lab1", "lab2", "lab3"]
+    with pytest.raises(RevisionExpiredError):
+        feed.read(feed.revision + 1)
+
+
+def test_revisions_outlive_a_restart():
+    old = ChangeFeed()
+    old.publish("put_meta", "lab")
+    assert ChangeFeed().revision > old.revision
+
+
+def test_stores_publish_their_primitives():
+    feed = ChangeFeed()
+    pod_db, lab_db = PodDB(changes=feed), LabDB(changes=feed)
+    start = feed.revision
+    lab_id = _lab(lab_db, pod_db)
+    pod = pod_db.create_pod(lab_id, _pods(1)[0])
+    device = pod.assets[0]
+    pod_db.patch_device_name(lab_id, pod.id, device.id, "renamed")
+    pod_db.delete_device(lab_id, pod.id, device.id)
+    pod_db.delete_pod(lab_id, pod.id)
+
+    events = feed.read(start)
+    assert [e.revision for e in events] == list(range(start + 1, feed.revision + 1))
+    ops = [e.op for e in events]
+    assert ops[:2] == ["add_lab", "put_meta"]
+    assert ops[2] == "add_pod"
+    assert ops[-3:] == ["store_device", "drop_device", "drop_pod"]
+    assert events[-3].device.name == "renamed"
+    assert all(e.pod_id == pod.id for e in events[2:])
+
+
+def _collect(feed, count, **filters):
+    async def run():
+        found = []
+        async for event in watch(feed, **filters):
+            found.append(event)
+            if len(found) == count:
+                return found
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_watch_filters_to_a_lab_or_pod():
+    feed = ChangeFeed()
+    start = feed.revision
+    feed.publish("put_meta", "a")
+    feed.publish("store_device", "a", "p1", "d1")
+    feed.publish("store_device", "b", "p1", "d2")
+    feed.publish("store_device", "a", "p2", "d3")
+    feed.publish("drop_lab", "a")
+
+    assert [e.device_id for e in _collect(feed, 4, since=start, lab_id="a")] == [None, "d1", "d3", None]
+    # lab-wide events concern every pod of the lab
+    assert [(e.op, e.device_id) for e in _collect(feed, 3, since=start, lab_id="a", pod_id="p1")] == [
+        ("put_meta", None), ("store_device", "d1"), ("drop_lab", None)]
+
+
+def test_watch_heartbeats_and_wakes_on_publish_from_another_thread():
+    feed = ChangeFeed()
+
+    async def run():
+        events = watch(feed, heartbeat=0.05)
+        assert await events.__anext__() is None
+        threading.Timer(0.05, feed.publish, ("put_meta", "lab")).start()
+        # more heartbeats may come first on a busy machine
+        event = None
+        while event is None:
+            event = await asyncio.wait_for(events.__anext__(), 5)
+        return event
+
+    assert asyncio.run(run()).lab_id == "lab"
+
+
+def test_sse_frames():
+    feed = ChangeFeed(history=1)
+    start = feed.revision
+    feed.publish("put_meta", "lab")
+
+    async def frames(since, count):
+        out = []
+        async for frame in _sse(watch(feed, since, heartbeat=0.01)):
+            out.append(frame.decode())
+            if len(out) == count:
+                break
+        return out
+
+    event, keepalive = asyncio.run(frames(start, 2))
+    head, data = event.rsplit("data: ", 1)
+    assert head == f"id: {start + 1}\nevent: put_meta\n"
+    assert json.loads(data) == {"revision": start + 1, "op": "put_meta", "lab_id": "lab"}
+    assert keepalive == ": keepalive\n\n"
+
+    feed.publish("put_meta", "lab")
+    # the stream ends with a reset once the revision has expired
+    [reset] = asyncio.run(frames(start, 5))
+    assert reset.startswith("event: reset\ndata: ")
+
+
+def test_sse_refuses_an_expired_revision(api):
+    client, pod_db, lab_db = api
+    assert client.get("/watch", params={"since": pod_db.changes.revision + 1}).status_code == 410
+    assert client.get("/watch", headers={"Last-Event-ID": "1"}).status_code == 410
+
+
+def test_websocket_streams_matching_changes(api):
+    client, pod_db, lab_db = api
+    start = pod_db.changes.revision
+    lab_id, other = _lab(lab_db, pod_db), _lab(lab_db, pod_db, "other")
+    pod_db.create_pod(other, _pods(1)[0])
+    pod = pod_db.create_pod(lab_id, _pods(1)[0])
+
+    with client.websocket_connect(f"/watch?since={start}&lab_id={lab_id}") as ws:
+        messages = [json.loads(ws.receive_text()) for _ in range(2)]
+        pod_db.patch_device_name(lab_id, pod.id, pod.assets[0].id, "renamed")
+        pod_db.create_pod(other, _pods(2)[1])
+        lab_db.put_lab_meta(lab_id, LabMetaCreate(name="moved", location="l", building="b", floor="2"))
+        expected = [e for e in pod_db.changes.read(start) if e.lab_id == lab_id]
+        messages += [json.loads(ws.receive_text()) for _ in expected[2:]]
+
+    assert [(m["revision"], m["op"]) for m in messages] == [(e.revision, e.op) for e in expected]
+    assert [m["op"] for m in messages[:3]] == ["add_lab", "put_meta", "add_pod"]
+    assert messages[-2]["device"]["name"] == "renamed"
+    assert messages[-1]["lab"]["floor"] == "2"
+
+
+def test_websocket_resets_an_expired_revision(api):
+    client, pod_db, lab_db = api
+    with client.websocket_connect(f"/watch?since={pod_db.changes.revision + 1}") as ws:
+        assert json.loads(ws.receive_text())["op"] == "reset"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_text()
+    assert closed.value.code == 4410